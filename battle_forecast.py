@@ -0,0 +1,393 @@
+# -*- coding: utf-8 -*-
+"""
+Prognoza wielorundowego starcia jako absorbujący łańcuch Markowa (dokładna; przedziały liczebności tylko ponad limit pracy)
+Absorbing-Markov-chain forecast of an engagement repeated to exhaustion, coarsened only past a work budget
+"""
+
+import math
+from collections import defaultdict
+from itertools import accumulate
+
+from combat_engine import (
+    LOSS_BANDS, LOW_RESULT_LOSS, LOSS_BASE_PEOPLE, OWN_FORTIFICATION_REDUCTION, ENEMY_FORTIFICATION_BANDS,
+    ENEMY_BUILDINGS_BAND, NEGATIVE_EXPERIENCE_PENALTY, numerical_advantage, roll_range, total_modifier
+)
+
+
+QUADRATURE_NODES = 8  # Węzły kwadratury na każdy losowy bonus przeciwnika (fortyfikacje, zabudowania)
+DEFAULT_MAX_ROUNDS = 200
+DEFAULT_TOLERANCE = 1e-12  # Stany przejściowe o mniejszej masie są pomijane (suma raportowana jako pruned)
+DEFAULT_MAX_WORK = 400000  # Limit sumy liczby stanów przejściowych po rundach (prognoza częściowa powyżej)
+DEFAULT_MAX_STATES = 4096  # Powyżej tej liczby par (ludzie 1, ludzie 2) najpierw liczony jest szacunek na przedziałach
+DEFAULT_EXACT_WORK = 2000000  # Limit pracy dokładnego łańcucha dla dużych stron (powyżej zostaje wynik na przedziałach)
+PLATEAU_TOLERANCE = 1e-12  # Względna różnica sąsiednich wartości jądra traktowana jako szum zaokrągleń
+WORKER_FORECASTERS = 64  # Liczba prognozujących zapamiętanych w procesie roboczym (ustawienia stron)
+
+_worker_forecasters = {}  # {ustawienia stron bez liczby ludzi: BattleForecaster} w procesie roboczym
+
+
+def floor_distribution(scale, low, high):
+    """Rozkład floor(scale * U) dla U ~ jednostajny [low, high]; zwraca {j: prawdopodobieństwo}"""
+    start = scale * low
+    end = scale * high
+    if end <= start:
+        return {int(start): 1.0}
+    width = end - start
+    dist = {}
+    j = int(start)
+    while j < end:
+        overlap = min(end, j + 1) - max(start, j)
+        if overlap > 0:
+            dist[j] = overlap / width
+        j += 1
+    return dist
+
+
+def midpoint_nodes(band, count=QUADRATURE_NODES):
+    """Węzły i wagi kwadratury punktu środkowego dla rozkładu jednostajnego na przedziale"""
+    low, high = band
+    step = (high - low) / count
+    return [(low + (i + 0.5) * step, 1.0 / count) for i in range(count)]
+
+
+class BattleForecaster:
+    """Prognoza dla stałych ustawień obu stron; przejścia są zapamiętywane między wywołaniami
+
+    Strony są słownikami z combat_engine.side_inputs (pole "people" jest ignorowane).
+    W danym stanie (ludzie 1, ludzie 2) straty strony 1 zależą tylko od kości strony 2
+    i odwrotnie, więc przejście rozkłada się na dwa niezależne jądra jednowymiarowe
+    (zapamiętywane według liczby ludzi i przewagi przeciwnika), stosowane po kolei.
+    """
+    
+    def __init__(self, side1, side2):
+        self.sides = (dict(side1), dict(side2))
+        self._loss_cache = {}  # {(strona, baza strat, wynik przeciwnika): {straty: p}}
+        self._kernel_cache = {}  # {(strona, ludzie, przewaga przeciwnika): [(ludzie po rundzie, p)]}
+        self._steps_cache = {}  # {(strona, ludzie, przewaga przeciwnika): [(ludzie po rundzie, przyrost p)]}
+        
+        # Część losowa bonusu ataku przeciwnika (kwadratura) dla każdej strony
+        self._attack_nodes = []
+        for own, enemy in (self.sides, self.sides[::-1]):
+            nodes = [(0.0, 1.0)]
+            bands = []
+            if enemy["fortifications"] in ENEMY_FORTIFICATION_BANDS:
+                bands.append(ENEMY_FORTIFICATION_BANDS[enemy["fortifications"]])
+            if enemy["defense_buildings"]:
+                bands.append(ENEMY_BUILDINGS_BAND)
+            for band in bands:
+                nodes = [(value + extra, weight * extra_weight)
+                         for value, weight in nodes for extra, extra_weight in midpoint_nodes(band)]
+            self._attack_nodes.append(nodes)
+    
+    def loss_distribution(self, side_index, loss_base, enemy_final):
+        """Rozkład strat strony przy danym wyniku przeciwnika (bez obcięcia do liczby ludzi)"""
+        key = (side_index, loss_base, enemy_final)
+        cached = self._loss_cache.get(key)
+        if cached is not None:
+            return cached
+        
+        own = self.sides[side_index]
+        enemy = self.sides[1 - side_index]
+        defense_modifier = 1.0 - OWN_FORTIFICATION_REDUCTION.get(own["fortifications"], 0.0)
+        if own["no_supply"]:
+            defense_modifier += 0.05
+        if own["defense_buildings"]:
+            defense_modifier -= 0.05
+        defense_modifier += NEGATIVE_EXPERIENCE_PENALTY.get(own["experience"], 0.0)
+        if enemy["in_motion"]:
+            defense_modifier -= 0.10
+        attack_base = 1.05 if own["attacking"] and enemy["defending"] else 1.0
+        
+        if enemy_final < 1:
+            low = high = LOW_RESULT_LOSS
+        else:
+            low, high = LOSS_BANDS[min(enemy_final, 12)]
+        
+        dist = defaultdict(float)
+        for extra, weight in self._attack_nodes[side_index]:
+            scale = loss_base * max(0.0, defense_modifier * (attack_base + extra))
+            for losses, p in floor_distribution(scale, low, high).items():
+                dist[losses] += weight * p
+        self._loss_cache[key] = dict(dist)
+        return self._loss_cache[key]
+    
+    def kernel(self, side_index, people, enemy_advantage, step=1, break_at=0):
+        """Rozkład liczby ludzi strony po rundzie: [(ludzie, p)] (uśredniony po kości przeciwnika)
+
+        Przy step > 1 wynik jest rozłożony na węzły siatki break_at + k * step (patrz _spread).
+        """
+        key = (side_index, people, enemy_advantage, step, break_at) if step > 1 else (side_index, people, enemy_advantage)
+        cached = self._kernel_cache.get(key)
+        if cached is not None:
+            return cached
+        
+        if step > 1:
+            dist = defaultdict(float)
+            for new_people, p in self.kernel(side_index, people, enemy_advantage):
+                for node, weight in self._spread(new_people, step, break_at):
+                    dist[node] += p * weight
+            self._kernel_cache[key] = list(dist.items())
+            return self._kernel_cache[key]
+        
+        enemy = self.sides[1 - side_index]
+        enemy_max = roll_range(enemy)
+        enemy_modifier = total_modifier(enemy, enemy_advantage)
+        loss_base = LOSS_BASE_PEOPLE if people <= LOSS_BASE_PEOPLE else people
+        
+        dist = defaultdict(float)
+        for enemy_value in range(1, enemy_max + 1):
+            for losses, p in self.loss_distribution(side_index, loss_base, enemy_value + enemy_modifier).items():
+                dist[max(0, people - losses)] += p / enemy_max
+        self._kernel_cache[key] = list(dist.items())
+        return self._kernel_cache[key]
+    
+    def kernel_steps(self, side_index, people, enemy_advantage):
+        """Dokładne jądro jako przyrosty: [(ludzie po rundzie, przyrost p względem ludzi - 1)]
+
+        Jądro jest mieszaniną rozkładów jednostajnych, więc jest stałe na odcinkach i przyrostów
+        niezerowych jest kilka razy mniej niż wartości. Różnice równe z dokładnością do zaokrągleń
+        (PLATEAU_TOLERANCE względem największej wartości) są traktowane jako zero.
+        """
+        key = (side_index, people, enemy_advantage)
+        cached = self._steps_cache.get(key)
+        if cached is not None:
+            return cached
+        
+        dist = dict(self.kernel(side_index, people, enemy_advantage))
+        plateau = max(dist.values()) * PLATEAU_TOLERANCE
+        steps = []
+        level = 0.0
+        for new_people in range(min(dist), max(dist) + 2):
+            value = dist.get(new_people, 0.0)
+            if abs(value - level) > plateau:
+                steps.append((new_people, value - level))
+                level = value
+        self._steps_cache[key] = steps
+        return steps
+    
+    @staticmethod
+    def bucket_step(people1, people2, break_at=0, max_states=DEFAULT_MAX_STATES):
+        """Szerokość przedziału liczebności, przy której liczba stanów przejściowych nie przekracza max_states"""
+        states = (people1 - break_at) * (people2 - break_at)
+        if states <= max_states:
+            return 1
+        return math.ceil(math.sqrt(states / max_states))
+    
+    @staticmethod
+    def _spread(people, step, break_at):
+        """Rozkłada liczebność na sąsiednie węzły siatki break_at + k * step z zachowaniem średniej
+
+        Liczebności poniżej pierwszego węzła zostają dokładne - zaokrąglenie w dół nie może złamać strony.
+        """
+        offset = (people - break_at) % step
+        lower = people - offset
+        if offset == 0 or lower <= break_at:
+            return ((people, 1.0),)
+        fraction = offset / step
+        return (lower, 1.0 - fraction), (lower + step, fraction)
+    
+    def forecast(self, people1, people2, break_at=0, max_rounds=DEFAULT_MAX_ROUNDS, tolerance=DEFAULT_TOLERANCE,
+                 max_work=DEFAULT_MAX_WORK, max_states=DEFAULT_MAX_STATES, exact_work=DEFAULT_EXACT_WORK):
+        """Rozkład liczby rund do złamania strony i końcowej liczby ludzi
+
+        Strona jest złamana, gdy ma nie więcej niż break_at ludzi. Zwraca słownik:
+        rounds {runda: p}, final {(ludzie 1, ludzie 2): p}, side1_wins, side2_wins, mutual,
+        unresolved (masa w stanach przejściowych po ostatniej policzonej rundzie), pruned
+        (pominięte stany o masie < tolerance), truncated (przekroczono limit pracy lub max_rounds),
+        work (suma liczby stanów przejściowych po rundach), step (szerokość przedziału liczebności;
+        powyżej 1 wynik jest przybliżony) oraz expected_rounds i expected_people1/2 liczone
+        dla rozstrzygniętej masy.
+
+        Łańcuch jest dokładny, dopóki mieści się w limicie pracy. Gdy par liczebności jest więcej niż
+        max_states, najpierw liczony jest tani łańcuch na przedziałach; jego praca razy step²
+        szacuje pracę dokładnego. Dokładny łańcuch jest liczony, jeśli szacunek nie przekracza
+        exact_work, a wynik przybliżony zostaje tylko, gdy dokładny wyczerpie ten limit.
+        """
+        rounds = {}
+        final = defaultdict(float)
+        if people1 <= break_at or people2 <= break_at:
+            final[(people1, people2)] = 1.0
+            return self._summary(rounds, final, 0.0, 0.0, False, break_at, 0, 1)
+        
+        step = self.bucket_step(people1, people2, break_at, max_states)
+        if step == 1:
+            return self._exact_chain(people1, people2, break_at, max_rounds, tolerance, max_work)
+        
+        coarse = self._bucketed_chain(people1, people2, break_at, max_rounds, tolerance, max_work, step)
+        if coarse["work"] * step * step > exact_work:
+            return coarse
+        exact = self._exact_chain(people1, people2, break_at, max_rounds, tolerance, exact_work)
+        if exact["truncated"] and exact["work"] >= exact_work:
+            return coarse
+        return exact
+    
+    def _exact_chain(self, people1, people2, break_at, max_rounds, tolerance, max_work):
+        """Dokładny łańcuch: masa stanów jest rozrzucana w tablicach przyrostów (kernel_steps),
+        a rozkład po każdym etapie odtwarza sumowanie prefiksowe (itertools.accumulate)"""
+        steps = self.kernel_steps
+        size1 = people1 + 2
+        size2 = people2 + 2
+        advantages = {}  # {ludzie 1 * size2 + ludzie 2: numerical_advantage}
+        rounds = {}
+        final = defaultdict(float)
+        transient = {people1: [(people2, 1.0)]}  # {ludzie 1: [(ludzie 2, p)]}
+        pruned = 0.0
+        work = 0
+        round_number = 0
+        while transient and round_number < max_rounds and work < max_work:
+            round_number += 1
+            
+            # Etap 1: straty strony 1 - przyrosty w grupach (przewaga strony 1 sprzed rundy, ludzie 2)
+            stage = {}
+            for p1, row in transient.items():
+                work += len(row)
+                for p2, probability in row:
+                    code = p1 * size2 + p2
+                    advantage = advantages.get(code)
+                    if advantage is None:
+                        advantage = advantages[code] = numerical_advantage(p1, p2)
+                    group_code = advantage[0] * size2 + p2
+                    group = stage.get(group_code)
+                    if group is None:
+                        group = stage[group_code] = [0.0] * size1
+                    for new_p1, delta in steps(0, p1, advantage[1]):
+                        group[new_p1] += probability * delta
+            
+            # Etap 2: straty strony 2 - jedno jądro na grupę, przyrosty w wierszach nowych ludzi 1
+            following = {}
+            for group_code, group in stage.items():
+                advantage1, p2 = divmod(group_code, size2)
+                kernel2 = steps(1, p2, advantage1)
+                for new_p1, probability in enumerate(accumulate(group)):
+                    if probability < tolerance:
+                        if probability > 0.0:
+                            pruned += probability
+                        continue
+                    row = following.get(new_p1)
+                    if row is None:
+                        row = following[new_p1] = [0.0] * size2
+                    for new_p2, delta in kernel2:
+                        row[new_p2] += probability * delta
+            
+            # Absorpcja (złamana strona) i pominięcie stanów o znikomej masie (także szumu sumowania)
+            absorbed = 0.0
+            transient = {}
+            for new_p1, row in following.items():
+                kept = []
+                for new_p2, probability in enumerate(accumulate(row)):
+                    if probability < tolerance:
+                        if probability > 0.0:
+                            pruned += probability
+                    elif new_p1 <= break_at or new_p2 <= break_at:
+                        final[(new_p1, new_p2)] += probability
+                        absorbed += probability
+                    else:
+                        kept.append((new_p2, probability))
+                if kept:
+                    transient[new_p1] = kept
+            if absorbed:
+                rounds[round_number] = absorbed
+        
+        unresolved = sum(probability for row in transient.values() for _, probability in row)
+        return self._summary(rounds, final, unresolved, pruned, bool(transient), break_at, work, 1)
+    
+    def _bucketed_chain(self, people1, people2, break_at, max_rounds, tolerance, max_work, step):
+        """Łańcuch na węzłach siatki break_at + k * step (przybliżenie dla dużych stron)"""
+        rounds = {}
+        final = defaultdict(float)
+        
+        # Stany kodowane liczbą ludzie1 * width + ludzie2 (szybsze niż krotki jako klucze)
+        width = people2 + step + 1
+        kernel = self.kernel
+        transient = {people1 * width + people2: 1.0}
+        pruned = 0.0
+        work = 0
+        round_number = 0
+        while transient and round_number < max_rounds and work < max_work:
+            round_number += 1
+            work += len(transient)
+            
+            # Etap 1: straty strony 1 - grupy (przewaga strony 1 sprzed rundy, ludzie 2) -> {nowi ludzie 1: p}
+            stage = {}
+            for code, probability in transient.items():
+                p1, p2 = divmod(code, width)
+                advantage1, advantage2 = numerical_advantage(p1, p2)
+                group = stage.get((advantage1, p2))
+                if group is None:
+                    group = stage[(advantage1, p2)] = defaultdict(float)
+                for new_p1, q in kernel(0, p1, advantage2, step, break_at):
+                    group[new_p1] += probability * q
+            
+            # Etap 2: straty strony 2 - jedno jądro na grupę
+            following = defaultdict(float)
+            for (advantage1, p2), group in stage.items():
+                kernel2 = kernel(1, p2, advantage1, step, break_at)
+                for new_p1, probability in group.items():
+                    base = new_p1 * width
+                    for new_p2, q in kernel2:
+                        following[base + new_p2] += probability * q
+            
+            # Absorpcja (złamana strona) i pominięcie stanów o znikomej masie
+            absorbed = 0.0
+            transient = {}
+            for code, probability in following.items():
+                p1, p2 = divmod(code, width)
+                if p1 <= break_at or p2 <= break_at:
+                    final[(p1, p2)] += probability
+                    absorbed += probability
+                elif probability >= tolerance:
+                    transient[code] = probability
+                else:
+                    pruned += probability
+            if absorbed:
+                rounds[round_number] = absorbed
+        
+        unresolved = sum(transient.values())
+        return self._summary(rounds, final, unresolved, pruned, bool(transient), break_at, work, step)
+    
+    @staticmethod
+    def _summary(rounds, final, unresolved, pruned, truncated, break_at, work, step):
+        side1_wins = sum(p for (p1, p2), p in final.items() if p1 > break_at >= p2)
+        side2_wins = sum(p for (p1, p2), p in final.items() if p2 > break_at >= p1)
+        resolved = sum(final.values())
+        return {
+            "rounds": rounds,
+            "final": dict(final),
+            "side1_wins": side1_wins,
+            "side2_wins": side2_wins,
+            "mutual": resolved - side1_wins - side2_wins,
+            "unresolved": unresolved,
+            "pruned": pruned,
+            "truncated": truncated,
+            "work": work,
+            "step": step,
+            "expected_rounds": sum(r * p for r, p in rounds.items()) / resolved if resolved else 0.0,
+            "expected_people1": sum(p1 * p for (p1, _), p in final.items()) / resolved if resolved else 0.0,
+            "expected_people2": sum(p2 * p for (_, p2), p in final.items()) / resolved if resolved else 0.0
+        }
+
+
+def rounds_quantile(rounds, q):
+    """Najmniejsza liczba rund, po której starcie jest rozstrzygnięte z prawdopodobieństwem ≥ q"""
+    total = sum(rounds.values())
+    cumulative = 0.0
+    for round_number in sorted(rounds):
+        cumulative += rounds[round_number]
+        if cumulative >= q * total:
+            return round_number
+    return None
+
+
+def forecast_task(side1, side2):
+    """Zadanie puli procesów: prognoza dla stron z combat_engine.side_inputs
+
+    Prognozujący (z zapamiętanymi jądrami) żyje w procesie roboczym między zadaniami o tych samych ustawieniach.
+    """
+    key = tuple(sorted((k, v) for k, v in side1.items() if k != "people")) + \
+        tuple(sorted((k, v) for k, v in side2.items() if k != "people"))
+    forecaster = _worker_forecasters.get(key)
+    if forecaster is None:
+        if len(_worker_forecasters) >= WORKER_FORECASTERS:
+            _worker_forecasters.clear()
+        forecaster = _worker_forecasters[key] = BattleForecaster(side1, side2)
+    return forecaster.forecast(side1["people"], side2["people"])
@@ -0,0 +1,317 @@
+# -*- coding: utf-8 -*-
+"""
+Indeks odwrócony starć do szybkiego wyszukiwania w historii bitew i jednostek
+Inverted index over engagements (battle registry entries and unit participations)
+"""
+
+from bisect import bisect_left, bisect_right
+
+
+class BattleIndex:
+    """Indeks odwrócony po jednostce, batalionie, stronie, wyniku, bitwie, dacie i stratach"""
+    
+    # Pola indeksowane przez listy postingów (równość)
+    POSTING_FIELDS = ('rodzaj', 'jednostka', 'batalion', 'strona', 'wynik', 'bitwa')
+    
+    def __init__(self):
+        self.clear()
+    
+    def clear(self):
+        """Czyści cały indeks"""
+        self.records = []  # Rekordy w kolejności dodawania (rid = pozycja na liście; None - rekord usunięty)
+        self.record_keys = []  # Klucze postingów każdego rekordu {pole: krotka wartości}
+        self.entry_rids = {}  # {id(wpis): [rid]} - wpis żyje w rekordzie, więc id nie zostanie ponownie użyte
+        self.live = 0  # Liczba nieusuniętych rekordów
+        self.postings = {field: {} for field in self.POSTING_FIELDS}
+        self.by_date = []  # Posortowane pary (data, rid)
+        self.by_losses = []  # Posortowane pary (straty, rid)
+        self._bulk = False  # Podczas przebudowy kolumny są sortowane raz na końcu
+    
+    def __len__(self):
+        return self.live
+    
+    def _add_record(self, record, keys):
+        """Dodaje rekord i jego klucze do indeksu, zwraca rid"""
+        rid = len(self.records)
+        self.records.append(record)
+        self.record_keys.append({})
+        self.entry_rids.setdefault(id(record['wpis']), []).append(rid)
+        self.live += 1
+        
+        for field, values in keys.items():
+            self._set_keys(rid, field, values)
+        
+        date_key = (record['data'], rid)
+        losses_key = (record['straty'], rid)
+        if self._bulk:
+            self.by_date.append(date_key)
+            self.by_losses.append(losses_key)
+            return rid
+        
+        # Wpisy przychodzą zwykle chronologicznie, więc data trafia na koniec listy
+        if not self.by_date or self.by_date[-1] <= date_key:
+            self.by_date.append(date_key)
+        else:
+            self.by_date.insert(bisect_right(self.by_date, date_key), date_key)
+        self.by_losses.insert(bisect_right(self.by_losses, losses_key), losses_key)
+        return rid
+    
+    def _set_keys(self, rid, field, values):
+        """Zastępuje wartości pola rekordu w listach postingów"""
+        field_postings = self.postings[field]
+        for value in self.record_keys[rid].get(field, ()):
+            rids = field_postings[value]
+            rids.discard(rid)
+            if not rids:
+                del field_postings[value]
+        values = tuple(dict.fromkeys(value for value in values if value is not None and value != ''))
+        for value in values:
+            field_postings.setdefault(value, set()).add(rid)
+        self.record_keys[rid][field] = values
+    
+    @staticmethod
+    def _remove_sorted(column, key):
+        index = bisect_left(column, key)
+        if index < len(column) and column[index] == key:
+            del column[index]
+    
+    def remove_record(self, rid):
+        """Usuwa rekord z postingów i kolumn posortowanych (rid pozostaje zajęty)"""
+        record = self.records[rid]
+        if record is None:
+            return
+        for field in list(self.record_keys[rid]):
+            self._set_keys(rid, field, ())
+        self._remove_sorted(self.by_date, (record['data'], rid))
+        self._remove_sorted(self.by_losses, (record['straty'], rid))
+        rids = self.entry_rids.get(id(record['wpis']))
+        if rids is not None:
+            rids.remove(rid)
+            if not rids:
+                del self.entry_rids[id(record['wpis'])]
+        self.records[rid] = None
+        self.record_keys[rid] = {}
+        self.live -= 1
+    
+    def remove_entries(self, entries):
+        """Usuwa rekordy indeksujące podane wpisy (np. cofnięty rzut); zwraca liczbę usuniętych"""
+        removed = 0
+        for entry in entries:
+            for rid in list(self.entry_rids.get(id(entry), ())):
+                if self.records[rid]['wpis'] is entry:
+                    self.remove_record(rid)
+                    removed += 1
+        return removed
+    
+    @staticmethod
+    def participant_keys(unit_ids, units):
+        """(strony, bataliony) jednostek obecnych w wykazie"""
+        sides = set()
+        battalions = set()
+        for unit_id in unit_ids:
+            for side_name in ('własne', 'wroga'):
+                unit_data = units.get(side_name, {}).get(unit_id)
+                if unit_data is not None:
+                    sides.add(side_name)
+                    battalions.add(unit_data.get('batalion'))
+                    break
+        return sides, battalions
+    
+    def refresh_unit(self, unit_id, units):
+        """Aktualizuje rekordy jednostki po zmianie strony lub batalionu albo jej usunięciu
+
+        Rekordy udziału usuniętej jednostki znikają; wpisy rejestru bitew zostają (jak po przebudowie),
+        ale ich strony i bataliony są liczone od nowa z bieżącego wykazu.
+        """
+        side_name = None
+        unit_data = None
+        for candidate in ('własne', 'wroga'):
+            unit_data = units.get(candidate, {}).get(unit_id)
+            if unit_data is not None:
+                side_name = candidate
+                break
+        for rid in list(self.postings['jednostka'].get(unit_id, ())):
+            record = self.records[rid]
+            if record['rodzaj'] == 'jednostka':
+                if unit_data is None:
+                    self.remove_record(rid)
+                    continue
+                record['strona'] = side_name
+                record['batalion'] = unit_data.get('batalion')
+                self._set_keys(rid, 'strona', (side_name,))
+                self._set_keys(rid, 'batalion', (record['batalion'],))
+            else:
+                sides, battalions = self.participant_keys(record['jednostka'], units)
+                record['strona'] = tuple(sides)
+                record['batalion'] = tuple(battalions)
+                self._set_keys(rid, 'strona', sides)
+                self._set_keys(rid, 'batalion', battalions)
+    
+    @staticmethod
+    def unit_outcome(entry):
+        """Zwraca wynik starcia z perspektywy jednostki"""
+        if entry.get('zwyciestwo'):
+            return 'zwycięstwo'
+        if entry.get('wynik_kostki') is not None and entry.get('wynik_kostki') == entry.get('przeciwnik_kostka'):
+            return 'remis'
+        return 'porażka'
+    
+    @staticmethod
+    def battle_outcome(entry):
+        """Zwraca zwycięską stronę wpisu z rejestru bitew"""
+        if entry.get('exp1'):
+            return 'strona 1'
+        if entry.get('exp2'):
+            return 'strona 2'
+        return 'remis'
+    
+    def add_unit_entry(self, unit_id, side, battalion_id, entry):
+        """Indeksuje udział jednostki w starciu (wpis z historia_bitew)"""
+        record = {
+            'rodzaj': 'jednostka',
+            'jednostka': unit_id,
+            'strona': side,
+            'batalion': battalion_id,
+            'bitwa': entry.get('bitwa', ''),
+            'wynik': self.unit_outcome(entry),
+            'data': entry.get('data', '') or '',
+            'straty': entry.get('straty', 0) or 0,
+            'wpis': entry
+        }
+        keys = {
+            'rodzaj': ('jednostka',),
+            'jednostka': (unit_id,),
+            'batalion': (battalion_id,),
+            'strona': (side,),
+            'wynik': (record['wynik'],),
+            'bitwa': (record['bitwa'],)
+        }
+        return self._add_record(record, keys)
+    
+    def add_battle_entry(self, battle_name, number, entry, unit_ids, units):
+        """Indeksuje wpis z rejestru bitew; unit_ids to ID jednostek obu stron"""
+        sides, battalions = self.participant_keys(unit_ids, units)
+        
+        losses = (entry.get('people1_before', 0) - entry.get('people1_after', 0)) + \
+                 (entry.get('people2_before', 0) - entry.get('people2_after', 0))
+        record = {
+            'rodzaj': 'bitwa',
+            'jednostka': tuple(unit_ids),
+            'strona': tuple(sides),
+            'batalion': tuple(battalions),
+            'bitwa': battle_name,
+            'numer': number,
+            'wynik': self.battle_outcome(entry),
+            'data': entry.get('data', '') or '',
+            'straty': losses,
+            'wpis': entry
+        }
+        keys = {
+            'rodzaj': ('bitwa',),
+            'jednostka': unit_ids,
+            'batalion': battalions,
+            'strona': sides,
+            'wynik': (record['wynik'],),
+            'bitwa': (battle_name,)
+        }
+        return self._add_record(record, keys)
+    
+    def rebuild(self, units, battles, name_to_id):
+        """Buduje indeks od zera z wykazu jednostek i rejestru bitew"""
+        self.clear()
+        self._bulk = True
+        
+        for side_name in ('własne', 'wroga'):
+            for unit_id, unit_data in units.get(side_name, {}).items():
+                battalion_id = unit_data.get('batalion')
+                for entry in unit_data.get('historia_bitew', []):
+                    self.add_unit_entry(unit_id, side_name, battalion_id, entry)
+        
+        for battle_name, battle_data in battles.items():
+            for number, entry in enumerate(battle_data.get('history', []), 1):
+                # Starsze wpisy mają tylko nazwy wyświetlane - rozwiąż je na ID
+                unit_ids = entry.get('side1_unit_ids', []) + entry.get('side2_unit_ids', [])
+                if not unit_ids:
+                    names = entry.get('side1_units', []) + entry.get('side2_units', [])
+                    unit_ids = [name_to_id[name] for name in names if name in name_to_id]
+                self.add_battle_entry(battle_name, number, entry, unit_ids, units)
+        
+        # Jedno sortowanie zamiast wielu wstawień
+        self.by_date.sort()
+        self.by_losses.sort()
+        self._bulk = False
+    
+    def _range_candidates(self, column, low_key, high_key):
+        """Zwraca granice (start, end) wycinka posortowanej kolumny w zakresie [low_key, high_key)"""
+        start = bisect_left(column, low_key) if low_key is not None else 0
+        end = bisect_left(column, high_key) if high_key is not None else len(column)
+        return start, end
+    
+    def query(self, rodzaj=None, jednostki=None, bataliony=None, strony=None, wyniki=None,
+              bitwy=None, data_od=None, data_do=None, straty_min=None, straty_max=None, limit=None):
+        """Zwraca listę pasujących rekordów (od najnowszych)
+
+        Filtry równościowe przyjmują kolekcje wartości (suma w obrębie pola,
+        przecięcie między polami). data_do obejmuje cały podany dzień/prefiks.
+        """
+        equality_filters = []
+        if rodzaj:
+            equality_filters.append(('rodzaj', (rodzaj,)))
+        for field, values in (('jednostka', jednostki), ('batalion', bataliony), ('strona', strony),
+                              ('wynik', wyniki), ('bitwa', bitwy)):
+            if values is not None:
+                equality_filters.append((field, values))
+        
+        candidates = None
+        postings_sets = []
+        for field, values in equality_filters:
+            field_postings = self.postings[field]
+            sets = [field_postings[value] for value in values if value in field_postings]
+            if not sets:
+                return []
+            postings_sets.append(sets[0] if len(sets) == 1 else set().union(*sets))
+        
+        # Przecinaj od najmniejszego zbioru
+        postings_sets.sort(key=len)
+        for rid_set in postings_sets:
+            candidates = set(rid_set) if candidates is None else candidates & rid_set
+            if not candidates:
+                return []
+        
+        has_date = data_od is not None or data_do is not None
+        has_losses = straty_min is not None or straty_max is not None
+        date_low = (data_od, -1) if data_od is not None else None
+        date_high = (data_do + '\uffff', -1) if data_do is not None else None
+        losses_low = (straty_min, -1) if straty_min is not None else None
+        losses_high = (straty_max + 1, -1) if straty_max is not None else None
+        
+        if candidates is None and (has_date or has_losses):
+            # Brak filtrów równościowych - start od węższego zakresu posortowanej kolumny
+            ranges = []
+            if has_date:
+                ranges.append((self.by_date, self._range_candidates(self.by_date, date_low, date_high)))
+            if has_losses:
+                ranges.append((self.by_losses, self._range_candidates(self.by_losses, losses_low, losses_high)))
+            column, (start, end) = min(ranges, key=lambda item: item[1][1] - item[1][0])
+            candidates = {rid for _, rid in column[start:end]}
+        elif candidates is None:
+            candidates = [rid for rid, record in enumerate(self.records) if record is not None]
+        
+        records = self.records
+        results = []
+        for rid in sorted(candidates, reverse=True):
+            record = records[rid]
+            if has_date:
+                if data_od is not None and record['data'] < data_od:
+                    continue
+                if data_do is not None and record['data'] >= data_do + '\uffff':
+                    continue
+            if has_losses:
+                if straty_min is not None and record['straty'] < straty_min:
+                    continue
+                if straty_max is not None and record['straty'] > straty_max:
+                    continue
+            results.append(record)
+            if limit is not None and len(results) >= limit:
+                break
+        return results
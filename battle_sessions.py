@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+Równoległe sesje bitew: osobny stan starcia (uczestnicy, ostatnie rzuty, cofanie, generator losowy) i blokady jednostek
+Concurrent battle sessions sharing one unit registry, with units locked to the session they are committed to
+"""
+
+import random
+
+
+UNSAVED_BATTLE = "Niezapisana"
+
+
+class BattleSession:
+    """Stan jednego starcia
+
+    Stan sesji aktywnej żyje w aplikacji i modelu; przy przełączeniu jest tu odkładany (referencje list
+    i słowników, bez kopiowania) razem z wartościami pól formularza. form/state równe None oznaczają
+    nową sesję z wartościami domyślnymi.
+    """
+    
+    def __init__(self, session_id, name, seed=None):
+        self.session_id = session_id
+        self.name = name
+        self.rng = random.Random(seed)  # Własny strumień losowy silnika starcia
+        self.participating_units = {"strona1": [], "strona2": []}
+        self.history = []
+        self.undo_stack = None  # deque migawek cofania (tworzona przez aplikację)
+        self.current_battle = UNSAVED_BATTLE
+        self.form = None  # {nazwa zmiennej formularza: wartość}
+        self.state = None  # {atrybut stanu rzutu: wartość}
+
+
+class SessionRegistry:
+    """Sesje bitew w kolejności utworzenia, sesja aktywna i blokady jednostek {unit_id: session_id}"""
+    
+    def __init__(self):
+        self.sessions = {}  # {session_id: BattleSession}
+        self.active_id = None
+        self.unit_locks = {}  # {unit_id: session_id} - jednostka uczestniczy w tej sesji
+        self.session_units = {}  # {session_id: zbiór zablokowanych ID} - odwrotność unit_locks
+        self.next_number = 1
+    
+    @property
+    def active(self):
+        return self.sessions.get(self.active_id)
+    
+    def create(self, name=None, seed=None):
+        """Tworzy sesję (pierwsza staje się aktywna); zwraca ją"""
+        session_id = f"S{self.next_number}"
+        session = BattleSession(session_id, name or f"Starcie {self.next_number}", seed)
+        self.next_number += 1
+        self.sessions[session_id] = session
+        self.session_units[session_id] = set()
+        if self.active_id is None:
+            self.active_id = session_id
+        return session
+    
+    def activate(self, session_id):
+        """Ustawia sesję aktywną; zwraca ją"""
+        self.active_id = session_id
+        return self.sessions[session_id]
+    
+    def ordered(self):
+        """Sesje w kolejności utworzenia"""
+        return list(self.sessions.values())
+    
+    def lock_owner(self, unit_id):
+        """ID sesji, do której jednostka jest przypisana, lub None"""
+        return self.unit_locks.get(unit_id)
+    
+    def locked_elsewhere(self, session_id):
+        """Zbiór ID jednostek zablokowanych przez inne sesje"""
+        return {unit_id for unit_id, owner in self.unit_locks.items() if owner != session_id}
+    
+    def sync_locks(self, session_id, unit_ids):
+        """Ustawia blokady sesji na podany zbiór jednostek; zwraca jednostki zablokowane przez inne sesje
+
+        Jednostki, które opuściły sesję, są zwalniane; jednostek innych sesji nie przejmuje.
+        """
+        held = self.session_units[session_id]
+        for unit_id in held - unit_ids:
+            del self.unit_locks[unit_id]
+        conflicts = set()
+        locked = set()
+        for unit_id in unit_ids:
+            owner = self.unit_locks.get(unit_id)
+            if owner is None or owner == session_id:
+                self.unit_locks[unit_id] = session_id
+                locked.add(unit_id)
+            else:
+                conflicts.add(unit_id)
+        self.session_units[session_id] = locked
+        return conflicts
+    
+    def close(self, session_id):
+        """Usuwa sesję i zwalnia jej jednostki; zwraca ID sesji do aktywowania (gdy zamknięto aktywną)"""
+        for unit_id in self.session_units.pop(session_id):
+            del self.unit_locks[unit_id]
+        del self.sessions[session_id]
+        if self.active_id == session_id:
+            self.active_id = next(iter(self.sessions), None)
+        return self.active_id
+    
+    def session_name(self, session_id):
+        session = self.sessions.get(session_id)
+        return session.name if session is not None else session_id
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pomiar dużego starcia: rozdział strat i zapis historii przy setkach jednostek na stronę
+Large-engagement benchmark: loss allocation and per-unit history with hundreds of units per side
+
+Uruchomienie: python benchmarks/large_engagement.py [--units 500] [--rounds 20] [--json]
+Część "engine" działa bez interfejsu; część "app" wymaga serwera X (bez DISPLAY jest pomijana).
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from combat_engine import allocate_losses, loss_weight  # noqa: E402
+
+
+def synthetic_units(count, seed=1):
+    """Wykaz jednostek z count jednostkami po każdej stronie (losowe doświadczenie i liczebność)"""
+    rng = random.Random(seed)
+    units = {"własne": {}, "wroga": {}}
+    for side in units:
+        for number in range(1, count + 1):
+            unit_id = f"{side[0]}{number:05d}"
+            units[side][unit_id] = {
+                "id": unit_id,
+                "numer": number,
+                "typ": "kompania",
+                "batalion": None,
+                "liczba_ludzi": rng.randint(40, 250),
+                "doświadczenie": rng.randint(-2, 2),
+                "zapasy": 3,
+                "liczba_zwycięstw": 0,
+                "liczba_uzupełnień": 0,
+                "strona": side,
+                "historia_bitew": []
+            }
+    return units
+
+
+def legacy_allocation(total_losses, weights):
+    """Dawny podział: część całkowita udziału, ostatnia jednostka dostaje resztę"""
+    total_weight = sum(weights)
+    shares = []
+    assigned = 0
+    for index, weight in enumerate(weights):
+        if index == len(weights) - 1:
+            shares.append(max(0, total_losses - assigned))
+        else:
+            losses = int((total_losses * weight) / total_weight)
+            assigned += losses
+            shares.append(losses)
+    return shares
+
+
+def timed(function, repeats):
+    """Mediana czasu wywołania w milisekundach"""
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        function()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def run_engine(count, repeats):
+    """Podział strat jednej strony: dawny algorytm i metoda największych reszt"""
+    units = synthetic_units(count)["własne"]
+    weights = [loss_weight(u["doświadczenie"], u["liczba_ludzi"]) for u in units.values()]
+    total_losses = sum(u["liczba_ludzi"] for u in units.values()) // 5
+    
+    legacy = legacy_allocation(total_losses, weights)
+    current = allocate_losses(total_losses, weights)
+    return {
+        "weights_ms": timed(lambda: [loss_weight(u["doświadczenie"], u["liczba_ludzi"]) for u in units.values()],
+                            repeats),
+        "legacy_allocation_ms": timed(lambda: legacy_allocation(total_losses, weights), repeats),
+        "allocation_ms": timed(lambda: allocate_losses(total_losses, weights), repeats),
+        "legacy_last_unit_share": legacy[-1],
+        "max_share_deviation": max(abs(share - total_losses * w / sum(weights)) for share, w in zip(current, weights)),
+        "exact_sum": sum(current) == total_losses
+    }
+
+
+def run_app(count, rounds):
+    """Pełny rzut w aplikacji (tryb szybki) z count jednostkami dodanymi do każdej strony"""
+    import tkinter as tk
+    import main
+    
+    root = tk.Tk()
+    root.withdraw()
+    app = main.DiceRollerApp(root)
+    app.model.set_units(synthetic_units(count), {})
+    for side_key, side_name in (("strona1", "własne"), ("strona2", "wroga")):
+        app.participating_units[side_key] = [
+            {'id': unit_id, 'name': unit_id, 'people': data["liczba_ludzi"], 'side': side_name}
+            for unit_id, data in app.units[side_name].items()
+        ]
+    app.model.participation_changed()
+    app.rapid_mode_var.set(True)
+    root.update()
+    
+    roll_samples = []
+    render_samples = []
+    for _ in range(rounds):
+        app.dice1_people_var.set(str(sum(u['people'] for u in app.participating_units["strona1"])))
+        app.dice2_people_var.set(str(sum(u['people'] for u in app.participating_units["strona2"])))
+        started = time.perf_counter()
+        app.roll_dice()
+        rolled = time.perf_counter()
+        root.update()
+        roll_samples.append((rolled - started) * 1000)
+        render_samples.append((time.perf_counter() - rolled) * 1000)
+    root.destroy()
+    return {
+        "roll_ms": statistics.median(roll_samples),
+        "render_ms": statistics.median(render_samples),
+        "rounds": rounds
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pomiar dużego starcia")
+    parser.add_argument("--units", type=int, default=500, help="liczba jednostek na stronę")
+    parser.add_argument("--rounds", type=int, default=20, help="liczba rzutów w części app")
+    parser.add_argument("--repeats", type=int, default=50, help="powtórzenia pomiarów części engine")
+    parser.add_argument("--json", action="store_true", help="wynik w formacie JSON")
+    args = parser.parse_args()
+    
+    results = {"units_per_side": args.units, "engine": run_engine(args.units, args.repeats)}
+    if os.environ.get("DISPLAY") or not sys.platform.startswith("linux"):
+        results["app"] = run_app(args.units, args.rounds)
+    else:
+        results["app"] = None
+    
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"Jednostek na stronę: {args.units}")
+    for key, value in results["engine"].items():
+        print(f"  engine.{key:<24}{value:.3f}" if isinstance(value, float) else f"  engine.{key:<24}{value}")
+    if results["app"] is None:
+        print("  app: pominięte (brak serwera X)")
+    else:
+        for key, value in results["app"].items():
+            print(f"  app.{key:<27}{value:.2f}" if isinstance(value, float) else f"  app.{key:<27}{value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pomiar narzutu komunikacji między procesami: wykaz w pamięci współdzielonej a serializacja wykazu do każdego zadania
+IPC overhead per task for multiprocess roster sweeps: shared-memory columns versus the pickling baseline
+
+Uruchomienie: python benchmarks/roster_ipc.py [--units 500] [--history 20] [--rounds 20] [--jobs N] [--json]
+Narzut na zadanie jest mierzony przebiegiem bez rund symulacji (zostaje tylko przekazanie danych i rozdział zadań);
+pełny przebieg sprawdza, że oba tryby dają identyczne wyniki.
+"""
+
+import argparse
+import json
+import os
+import pickle
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from large_engagement import synthetic_units  # noqa: E402
+from shared_roster import DEFAULT_CHUNK, build_tasks, modifier_grid, roster_rows, run_sweep  # noqa: E402
+
+
+def add_history(units, entries):
+    """Dopisuje każdej jednostce entries wpisów historii bitew (jak w prowadzonej kampanii)"""
+    for side_units in units.values():
+        for unit_data in side_units.values():
+            unit_data["historia_bitew"] = [
+                {"bitwa": f"Bitwa {number % 7}", "data": "2024-01-01 12:00", "ludzie_przed": 150, "straty": number % 9,
+                 "wynik_kości": number % 4 + 1, "wynik_końcowy": number % 6, "zwycięstwo": bool(number % 2)}
+                for number in range(entries)
+            ]
+    return units
+
+
+def payload_bytes(units, grid, tasks):
+    """Bajty serializowane dla jednego zadania w obu trybach (argumenty i wynik)"""
+    task = tasks[0]
+    count = task[2] - task[1]
+    return {
+        "pickle_args": len(pickle.dumps((units, grid, task))),
+        "pickle_result": len(pickle.dumps(([(0.5, 10.0, 10.0)] * count, 0.0))),
+        "shared_args": len(pickle.dumps(task)),
+        "shared_result": len(pickle.dumps(0.0))
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Narzut komunikacji między procesami przy przeglądzie wykazu")
+    parser.add_argument("--units", type=int, default=500, help="liczba jednostek na stronę")
+    parser.add_argument("--history", type=int, default=20, help="wpisów historii bitew na jednostkę")
+    parser.add_argument("--rounds", type=int, default=20, help="rund Monte Carlo na jednostkę i wiersz siatki")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="liczba procesów roboczych")
+    parser.add_argument("--chunk", type=int, default=DEFAULT_CHUNK, help="jednostek w jednym zadaniu")
+    parser.add_argument("--json", action="store_true", help="wynik w formacie JSON")
+    args = parser.parse_args()
+    
+    units = add_history(synthetic_units(args.units), args.history)
+    grid = modifier_grid()
+    _, rows = roster_rows(units)
+    tasks = build_tasks(len(rows), len(grid), 0, 1, args.chunk)
+    
+    results = {"units": len(rows), "grid_rows": len(grid), "tasks": len(tasks), "jobs": args.jobs,
+               "bytes_per_task": payload_bytes(units, grid, tasks)}
+    for mode, shared in (("pickle", False), ("shared", True)):
+        _, overhead = run_sweep(units, grid, 0, args.jobs, chunk=args.chunk, shared=shared)
+        swept, stats = run_sweep(units, grid, args.rounds, args.jobs, chunk=args.chunk, shared=shared)
+        results[mode] = {
+            "overhead_ms_per_task": overhead["map_seconds"] * 1000 / overhead["tasks"],
+            "publish_ms": overhead["publish_seconds"] * 1000,
+            "sweep_ms": stats["map_seconds"] * 1000,
+            "compute_ms": stats["compute_seconds"] * 1000
+        }
+        results[mode + "_results"] = swept
+    results["identical"] = results.pop("pickle_results") == results.pop("shared_results")
+    results["overhead_ratio"] = (results["pickle"]["overhead_ms_per_task"] /
+                                 max(results["shared"]["overhead_ms_per_task"], 1e-9))
+    
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    sizes = results["bytes_per_task"]
+    print(f"Jednostek: {results['units']}, wierszy siatki: {results['grid_rows']}, zadań: {results['tasks']}, "
+          f"procesów: {args.jobs}")
+    print(f"  bajty na zadanie: serializacja {sizes['pickle_args']} + {sizes['pickle_result']}, "
+          f"współdzielona {sizes['shared_args']} + {sizes['shared_result']}")
+    for mode in ("pickle", "shared"):
+        row = results[mode]
+        print(f"  {mode:<7} narzut {row['overhead_ms_per_task']:8.3f} ms/zadanie, publikacja {row['publish_ms']:7.2f} ms, "
+              f"przegląd {row['sweep_ms']:9.1f} ms (obliczenia {row['compute_ms']:9.1f} ms)")
+    print(f"  narzut serializacji / pamięci współdzielonej: {results['overhead_ratio']:.1f}x, "
+          f"wyniki identyczne: {results['identical']}")
+
+
+if __name__ == "__main__":
+    main()
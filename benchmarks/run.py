@@ -0,0 +1,500 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Zestaw pomiarów wydajności: silnik starcia, dziennik rzutów, rozdział strat, zapis/odczyt, migracja i panel historii
+Benchmark suite (stdlib only) with machine-readable results and a baseline tolerance gate
+
+Uruchomienie:
+  python benchmarks/run.py [-k wzorzec] [--quick] [--runs N] [--json wynik.json]
+  python benchmarks/run.py --compare [benchmarks/baseline.json] [--tolerance 0.25] [--report-only]
+  python benchmarks/run.py --save-baseline benchmarks/baseline.json [--runs 5]
+
+Pomiary interfejsu (grupa "ui") działają w osobnym procesie pod serwerem X; bez DISPLAY skrypt
+używa xvfb-run, a gdy go brak - pomiary są oznaczane jako pominięte. Przy --runs N cały zestaw
+jest powtarzany N razy, a min_ms każdego pomiaru to mediana najlepszych czasów z przebiegów;
+odporny rozrzut tych czasów (noise, MAD / mediana) trafia do wyników. Baza jest domyślnie zapisywana
+z BASELINE_RUNS przebiegów, a porównanie liczone z COMPARE_RUNS. Przy porównaniu regresją jest min_ms
+większy od bazowego o więcej niż tolerancja pomiaru - większa z --tolerance i NOISE_FACTOR x szum bazy,
+ale nie większa niż NOISE_CAP x --tolerance (kod wyjścia 1, z --report-only tylko raport). Pomiary,
+których szum przekracza ten limit, są przy zapisie bazy mierzone ponownie, a gdy nadal są zbyt
+zaszumione - pomijane (lista w "skipped").
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from campaign_storage import (  # noqa: E402
+    migrate_legacy_units, read_battles_file, read_units_file, write_battles_file, write_units_file
+)
+from combat_engine import allocate_losses, loss_weight, resolve_round, side_inputs  # noqa: E402
+from roll_log import RollLog  # noqa: E402
+
+BASELINE_PATH = os.path.join(ROOT, "benchmarks", "baseline.json")
+DEFAULT_TOLERANCE = 0.25
+BASELINE_RUNS = 7  # Przebiegów całego zestawu przy zapisie bazy
+COMPARE_RUNS = 3  # Przebiegów całego zestawu przy porównaniu z bazą
+NOISE_FACTOR = 3.0  # Tolerancja pomiaru nie mniejsza niż tyle razy zmierzony rozrzut bazy (MAD / mediana)
+NOISE_CAP = 2.0  # ...ale nie większa niż tyle razy --tolerance
+RERECORD_ATTEMPTS = 2  # Ponowne pomiary zbyt zaszumionych przypadków przy zapisie bazy
+RECORD_COUNTS = (1000, 10000, 100000)
+QUICK_RECORD_COUNTS = (1000, 10000)
+ALLOCATION_UNITS = (10, 100, 500)
+ENGINE_ROUNDS = 10000  # Rund na jeden pomiar przepustowości silnika
+ROLL_LOG_RECORDS = 10000  # Rzutów na jeden pomiar zapisu w dzienniku
+ROLLS_PER_BATTLE = 100
+UI_TIMEOUT = 300
+CALIBRATION_CASE = "calibration.loop"
+
+
+# --- Dane testowe (deterministyczne) ---
+
+def make_unit(unit_id, number, side, rng, history=0):
+    """Jednostka w formacie save_units"""
+    return {
+        "id": unit_id,
+        "numer": number,
+        "typ": rng.choice(("kompania", "grupa")),
+        "batalion": None,
+        "liczba_ludzi": rng.randint(40, 250),
+        "doświadczenie": rng.randint(-2, 2),
+        "zapasy": 3,
+        "liczba_zwycięstw": 0,
+        "liczba_uzupełnień": 0,
+        "strona": side,
+        "historia_bitew": [make_unit_entry(rng) for _ in range(history)]
+    }
+
+
+def make_unit_entry(rng):
+    """Wpis historii bitew jednostki"""
+    return {
+        "data": "2024-05-01 12:00",
+        "wynik_kostki": rng.randint(1, 8),
+        "przeciwnik_kostka": rng.randint(1, 8),
+        "straty": rng.randint(0, 40),
+        "zwyciestwo": rng.random() < 0.5,
+        "bitwa": "Bitwa 1"
+    }
+
+
+def make_roster(count, legacy=0, seed=1):
+    """Wykaz count jednostek (po połowie na stronę); legacy ostatnich jest w starym formacie (bez ID)"""
+    rng = random.Random(seed)
+    units = {"własne": {}, "wroga": {}}
+    for index in range(count):
+        side = "własne" if index % 2 == 0 else "wroga"
+        unit = make_unit(f"U{index:07d}", index // 2 + 1, side, rng, history=1)
+        if index >= count - legacy:
+            del unit["id"], unit["numer"], unit["typ"], unit["batalion"], unit["strona"]
+            units[side][f"Jednostka {index}"] = unit
+        else:
+            units[side][unit["id"]] = unit
+    return units
+
+
+def make_registry(records, seed=1):
+    """Rejestr bitew z records wpisami (po ROLLS_PER_BATTLE na bitwę)"""
+    rng = random.Random(seed)
+    battles = {}
+    for index in range(records):
+        name = f"Bitwa {index // ROLLS_PER_BATTLE + 1}"
+        battle = battles.setdefault(name, {"history": [], "created": "2024-05-01T12:00:00"})
+        people1 = rng.randint(50, 600)
+        people2 = rng.randint(50, 600)
+        battle["history"].append({
+            "dice1": rng.randint(1, 8),
+            "dice2": rng.randint(1, 8),
+            "people1_before": people1,
+            "people1_after": people1 - rng.randint(0, 40),
+            "people2_before": people2,
+            "people2_after": people2 - rng.randint(0, 40),
+            "exp1": False,
+            "exp2": True,
+            "side1_units": ["1 Komp.", "2 Komp."],
+            "side2_units": ["3 Grupa"],
+            "side1_unit_ids": ["U0000000", "U0000002"],
+            "side2_unit_ids": ["U0000001"],
+            "side1_attacking": True,
+            "side2_attacking": False,
+            "side1_in_motion": False,
+            "side2_in_motion": False,
+            "data": "2024-05-01 12:00"
+        })
+    return battles, ["Niezapisana"] + list(battles)
+
+
+# --- Rejestr pomiarów ---
+
+class Case:
+    """Pomiar: setup() przygotowuje dane (poza czasem), run(dane) jest mierzone"""
+    
+    def __init__(self, name, run, setup=None, repeats=5):
+        self.name = name
+        self.run = run
+        self.setup = setup
+        self.repeats = repeats
+
+
+def measure(case):
+    """Zwraca {median_ms, min_ms, max_ms, runs} dla pomiaru"""
+    samples = []
+    for _ in range(case.repeats):
+        data = case.setup() if case.setup else None
+        started = time.perf_counter()
+        case.run(data)
+        samples.append((time.perf_counter() - started) * 1000)
+    return {
+        "median_ms": round(statistics.median(samples), 3),
+        "min_ms": round(min(samples), 3),
+        "max_ms": round(max(samples), 3),
+        "runs": len(samples)
+    }
+
+
+def combine_runs(rows):
+    """Łączy wyniki tego samego pomiaru z kilku przebiegów zestawu
+
+    min_ms i median_ms to mediany z przebiegów; noise to względny rozrzut najlepszych czasów
+    (mediana odchyleń bezwzględnych od mediany / mediana), czyli szum między przebiegami, którego
+    nie widać w jednym - pojedynczy odstający przebieg go nie zawyża.
+    """
+    if len(rows) == 1:
+        return rows[0]
+    mins = [row["min_ms"] for row in rows]
+    best = statistics.median(mins)
+    spread = statistics.median(abs(value - best) for value in mins)
+    return {
+        "median_ms": round(statistics.median(row["median_ms"] for row in rows), 3),
+        "min_ms": round(best, 3),
+        "max_ms": round(max(row["max_ms"] for row in rows), 3),
+        "runs": sum(row["runs"] for row in rows),
+        "noise": round(spread / best, 3) if best else 0.0
+    }
+
+
+def noise_limit(row, tolerance):
+    """Tolerancja pomiaru: większa z tolerance i NOISE_FACTOR x szum, najwyżej NOISE_CAP x tolerance"""
+    return min(max(tolerance, NOISE_FACTOR * row.get("noise", 0.0)), NOISE_CAP * tolerance)
+
+
+def too_noisy(row, tolerance):
+    """True, jeśli szum pomiaru wymagałby tolerancji powyżej limitu (pomiar nie nadaje się do bazy)"""
+    return NOISE_FACTOR * row.get("noise", 0.0) > NOISE_CAP * tolerance
+
+
+def calibration_cases():
+    """Stała pętla interpretera - skala szybkości maszyny przy porównaniu z bazą"""
+    def run(_):
+        total = 0
+        for value in range(200000):
+            total += value & 7
+        return total
+    return [Case(CALIBRATION_CASE, run, repeats=7)]
+
+
+def engine_cases():
+    """Przepustowość jednej rundy starcia (resolve_round zastąpiło calculate_battle_results)"""
+    side1 = side_inputs(people=400, modifier=1, experience=1, fortifications=1, attacking=True)
+    side2 = side_inputs(people=250, defense_buildings=True, defending=True)
+    
+    def run(_):
+        rng = random.Random(7)
+        for _ in range(ENGINE_ROUNDS):
+            resolve_round(side1, side2, rng)
+    return [Case(f"engine.resolve_round.x{ENGINE_ROUNDS}", run)]
+
+
+def roll_log_cases():
+    """Zapis rzutu w dzienniku na gorącej ścieżce (bez pliku - serializacja odbywa się w wątku zapisu)"""
+    side1 = tuple(side_inputs(people=400, modifier=1, attacking=True).values())
+    side2 = tuple(side_inputs(people=250, defending=True).values())
+    units1 = (("U0000000", 200, 12), ("U0000002", 200, 9))
+    units2 = (("U0000001", 250, 30),)
+    
+    def run(_):
+        log = RollLog(capacity=ROLL_LOG_RECORDS)
+        for _ in range(ROLL_LOG_RECORDS):
+            log.record("Bitwa", side1, side2, (3, 2), (5, 3), (0, 0), (379, 220), (21, 30), None, units1, units2)
+    return [Case(f"roll_log.record.x{ROLL_LOG_RECORDS}", run)]
+
+
+def allocation_cases():
+    """Wagi i podział strat jednej strony (rdzeń distribute_losses_for_side) dla 10/100/500 jednostek"""
+    cases = []
+    for count in ALLOCATION_UNITS:
+        rng = random.Random(count)
+        units = [make_unit(f"U{i}", i, "własne", rng) for i in range(count)]
+        total_losses = sum(u["liczba_ludzi"] for u in units) // 5
+        iterations = max(1, 20000 // count)
+        
+        def run(_, units=units, total_losses=total_losses, iterations=iterations):
+            for _ in range(iterations):
+                allocate_losses(total_losses, [loss_weight(u["doświadczenie"], u["liczba_ludzi"]) for u in units])
+        cases.append(Case(f"allocation.units{count}.x{iterations}", run))
+    return cases
+
+
+def persistence_cases(record_counts, workdir):
+    """Zapis i odczyt wykazu jednostek i rejestru bitew"""
+    cases = []
+    for count in record_counts:
+        repeats = 5 if count <= 10000 else 3
+        units = make_roster(count)
+        battles, battle_names = make_registry(count)
+        units_path = os.path.join(workdir, f"units_{count}.json")
+        battles_path = os.path.join(workdir, f"battles_{count}.json")
+        write_units_file(units_path, units, {})
+        write_battles_file(battles_path, battles, battle_names)
+        
+        cases.append(Case(f"save_units.{count}",
+                          lambda _, u=units, p=units_path: write_units_file(p + ".out", u, {}), repeats=repeats))
+        cases.append(Case(f"load_units.{count}", lambda _, p=units_path: read_units_file(p), repeats=repeats))
+        cases.append(Case(f"save_battles.{count}",
+                          lambda _, b=battles, n=battle_names, p=battles_path: write_battles_file(p + ".out", b, n),
+                          repeats=repeats))
+        cases.append(Case(f"load_battles.{count}", lambda _, p=battles_path: read_battles_file(p), repeats=repeats))
+    return cases
+
+
+def migration_cases(record_counts):
+    """Migracja wykazu, w którym połowa jednostek jest w starym formacie"""
+    cases = []
+    for count in record_counts:
+        counter = iter(range(10 ** 9))
+        cases.append(Case(
+            f"migrate_old_units.{count}",
+            lambda units, counter=counter: migrate_legacy_units(units, lambda: f"M{next(counter)}"),
+            setup=lambda count=count: make_roster(count, legacy=count // 2),
+            repeats=5 if count <= 10000 else 3
+        ))
+    return cases
+
+
+# --- Pomiary interfejsu (osobny proces z serwerem X) ---
+
+def run_ui_child():
+    """Rozdział strat w aplikacji i odświeżanie panelu historii; wypisuje wyniki jako JSON"""
+    import tkinter as tk
+    import main
+    
+    root = tk.Tk()
+    app = main.DiceRollerApp(root)
+    deadline = time.perf_counter() + UI_TIMEOUT
+    while "interactive" not in app.startup_marks and time.perf_counter() < deadline:
+        root.update()
+    results = {}
+    
+    # distribute_losses_for_side przy 10/100/500 jednostkach po stronie 1
+    for count in ALLOCATION_UNITS:
+        units = make_roster(count * 2)
+        app.model.set_units(units, {})
+        app.participating_units["strona1"] = [
+            {'id': unit_id, 'name': unit_id, 'people': data["liczba_ludzi"], 'side': "własne"}
+            for unit_id, data in units["własne"].items()
+        ]
+        root.update()
+        
+        def setup(app=app):
+            app.dice1_people_original = sum(u['people'] for u in app.participating_units["strona1"])
+            app.dice1_people_result = app.dice1_people_original * 4 // 5
+        
+        def run(_, app=app):
+            with app.model.batch():
+                app.distribute_losses_for_side(1, report=False)
+            root.update()
+        results[f"ui.distribute_losses_for_side.units{count}"] = measure(Case("", run, setup=setup))
+    app.model.reset_participation()
+    
+    # Panel historii: pełne przerysowanie i dopisanie jednego wpisu
+    battles, _ = make_registry(app.HISTORY_LIMIT)
+    entries = battles["Bitwa 1"]["history"]
+    app.model.set_history(entries)
+    root.update()
+    
+    def redraw(_):
+        app.update_history_display()
+        root.update_idletasks()
+    
+    def append(_):
+        app.model.append_history(dict(entries[0]))
+        root.update()
+    results["ui.history_refresh.full"] = measure(Case("", redraw, repeats=20))
+    results["ui.history_refresh.append"] = measure(Case("", append, repeats=20))
+    
+    root.destroy()
+    print(json.dumps(results))
+
+
+def run_ui_cases():
+    """Uruchamia pomiary interfejsu w osobnym procesie; zwraca (wyniki, powód pominięcia)"""
+    command = [sys.executable, os.path.abspath(__file__), "--ui-child"]
+    if not os.environ.get("DISPLAY") and sys.platform.startswith("linux"):
+        xvfb_run = shutil.which("xvfb-run")
+        if xvfb_run is None:
+            return {}, "brak zmiennej DISPLAY i programu xvfb-run"
+        command = [xvfb_run, "-a"] + command
+    try:
+        completed = subprocess.run(command, capture_output=True, text=True, timeout=UI_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        return {}, "przekroczono czas pomiarów interfejsu"
+    if completed.returncode != 0:
+        return {}, completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else "błąd procesu"
+    return json.loads(completed.stdout.strip().splitlines()[-1]), None
+
+
+# --- Przebiegi zestawu ---
+
+def run_suite(cases, runs, pattern, with_ui, skipped):
+    """Mierzy przypadki (i grupę ui) runs razy; zwraca {pomiar: [wynik z każdego przebiegu]}"""
+    per_case = {}
+    for run_number in range(1, runs + 1):
+        if runs > 1:
+            print(f"-- przebieg {run_number}/{runs}", file=sys.stderr)
+        for case in cases:
+            row = measure(case)
+            per_case.setdefault(case.name, []).append(row)
+            print(f"{case.name:<40}{row['median_ms']:>12.3f} ms", file=sys.stderr)
+        
+        if with_ui and "ui" not in skipped:
+            ui_results, reason = run_ui_cases()
+            if reason:
+                skipped["ui"] = reason
+                print(f"ui: pominięte ({reason})", file=sys.stderr)
+            for name, row in ui_results.items():
+                if pattern in name:
+                    per_case.setdefault(name, []).append(row)
+                    print(f"{name:<40}{row['median_ms']:>12.3f} ms", file=sys.stderr)
+    return per_case
+
+
+# --- Porównanie z bazą ---
+
+def compare(results, baseline, tolerance):
+    """Zwraca (skala maszyny, [(pomiar, bazowa ms, obecna ms, zmiana, tolerancja, regresja)]) dla pomiarów w obu zestawach
+
+    Zmiana jest liczona po podzieleniu przez skalę - stosunek czasów pętli kalibracyjnej
+    (obecny / bazowy), więc wolniejsza lub szybsza maszyna nie jest traktowana jako regresja.
+    Tolerancja pomiaru to większa z podanej i NOISE_FACTOR x szum zapisany w bazie, ograniczona
+    do NOISE_CAP x podana - zaszumiona baza nie wyłącza sprawdzania pomiaru.
+    """
+    scale = 1.0
+    if CALIBRATION_CASE in results and CALIBRATION_CASE in baseline and baseline[CALIBRATION_CASE]["min_ms"]:
+        scale = results[CALIBRATION_CASE]["min_ms"] / baseline[CALIBRATION_CASE]["min_ms"]
+    rows = []
+    for name, row in results.items():
+        base = baseline.get(name)
+        if name == CALIBRATION_CASE or not base or "min_ms" not in base or "min_ms" not in row:
+            continue
+        change = row["min_ms"] / (base["min_ms"] * scale) - 1 if base["min_ms"] else 0.0
+        limit = noise_limit(base, tolerance)
+        rows.append((name, base["min_ms"], row["min_ms"], change, limit, change > limit))
+    return scale, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Zestaw pomiarów wydajności")
+    parser.add_argument("-k", dest="pattern", default="", help="tylko pomiary zawierające wzorzec")
+    parser.add_argument("--quick", action="store_true", help="bez pomiarów na 100k rekordów")
+    parser.add_argument("--no-ui", action="store_true", help="pomiń pomiary interfejsu")
+    parser.add_argument("--json", metavar="PLIK", help="zapisz wyniki do pliku JSON ('-' = standardowe wyjście)")
+    parser.add_argument("--compare", metavar="PLIK", nargs="?", const=BASELINE_PATH,
+                        help="porównaj z bazą (domyślnie benchmarks/baseline.json); kod 1 przy regresji")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="dopuszczalny wzrost najlepszego czasu (0.25 = 25%%)")
+    parser.add_argument("--report-only", action="store_true", help="przy porównaniu tylko raport (kod 0 mimo regresji)")
+    parser.add_argument("--runs", type=int, default=None,
+                        help=f"przebiegów całego zestawu (domyślnie 1, przy --save-baseline {BASELINE_RUNS}, "
+                             f"przy --compare {COMPARE_RUNS})")
+    parser.add_argument("--save-baseline", metavar="PLIK", help="zapisz wyniki jako nową bazę")
+    parser.add_argument("--ui-child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.ui_child:
+        run_ui_child()
+        return 0
+    
+    record_counts = QUICK_RECORD_COUNTS if args.quick else RECORD_COUNTS
+    if args.runs is not None:
+        runs = max(1, args.runs)
+    else:
+        runs = BASELINE_RUNS if args.save_baseline else COMPARE_RUNS if args.compare else 1
+    skipped = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        cases = calibration_cases() + engine_cases() + roll_log_cases() + allocation_cases() + persistence_cases(record_counts, workdir) + \
+            migration_cases(record_counts)
+        cases = [case for case in cases if args.pattern in case.name or case.name == CALIBRATION_CASE]
+        per_case = run_suite(cases, runs, args.pattern, not args.no_ui, skipped)
+        results = {name: combine_runs(rows) for name, rows in per_case.items()}
+        
+        if args.save_baseline:
+            # Zaszumiony pomiar w bazie rozszerzałby tolerancję - mierzony ponownie, a w razie potrzeby pomijany
+            for attempt in range(1, RERECORD_ATTEMPTS + 1):
+                noisy = {name for name, row in results.items() if too_noisy(row, args.tolerance)}
+                if not noisy:
+                    break
+                print(f"-- ponowny pomiar {attempt}/{RERECORD_ATTEMPTS}: {', '.join(sorted(noisy))}", file=sys.stderr)
+                repeated = run_suite([case for case in cases if case.name in noisy], runs, args.pattern,
+                                     not args.no_ui and any(name.startswith("ui.") for name in noisy), skipped)
+                for name, rows in repeated.items():
+                    if name in noisy:
+                        results[name] = combine_runs(rows)
+            for name in sorted(name for name, row in results.items() if too_noisy(row, args.tolerance)):
+                if name != CALIBRATION_CASE:
+                    skipped[name] = f"szum {results.pop(name)['noise']:.0%} powyżej limitu tolerancji"
+                    print(f"{name}: pominięty w bazie ({skipped[name]})", file=sys.stderr)
+    
+    report = {
+        "meta": {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "runs": runs
+        },
+        "results": results,
+        "skipped": skipped
+    }
+    if args.json == "-":
+        print(json.dumps(report, indent=2))
+    elif args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+    
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)["results"]
+        scale, rows = compare(results, baseline, args.tolerance)
+        regressions = [row for row in rows if row[5]]
+        print(f"\nskala maszyny względem bazy: {scale:.2f}", file=sys.stderr)
+        print(f"{'pomiar':<40}{'baza':>12}{'obecnie':>12}{'zmiana':>9}{'tolerancja':>12}", file=sys.stderr)
+        for name, base_ms, current_ms, change, limit, regressed in rows:
+            marker = "  REGRESJA" if regressed else ""
+            print(f"{name:<40}{base_ms:>10.3f}ms{current_ms:>10.3f}ms{change:>+8.0%}{limit:>11.0%}{marker}",
+                  file=sys.stderr)
+        if regressions:
+            print(f"\n{len(regressions)} regresji powyżej tolerancji pomiaru (co najmniej {args.tolerance:.0%})",
+                  file=sys.stderr)
+            if not args.report_only:
+                return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pomiar czasu uruchamiania aplikacji: do pierwszej klatki i do pełnej interaktywności
+Startup benchmark: time-to-first-frame and time-to-interactive
+
+Uruchomienie: python benchmarks/startup.py [--runs 5] [--json]
+Bez zmiennej DISPLAY skrypt uruchamia się ponownie pod xvfb-run.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# "import" to czas importu modułu, pozostałe etapy liczone od utworzenia DiceRollerApp
+MARKS = ("import", "combat_panel", "first_frame", "interactive")
+TIMEOUT = 30.0
+
+
+def ensure_display():
+    """Bez serwera X uruchamia skrypt ponownie pod wirtualnym serwerem (xvfb-run)"""
+    if os.environ.get("DISPLAY") or not sys.platform.startswith("linux"):
+        return
+    xvfb_run = shutil.which("xvfb-run")
+    if xvfb_run is None:
+        print("Brak zmiennej DISPLAY i programu xvfb-run - pomiar niemożliwy", file=sys.stderr)
+        sys.exit(2)
+    os.execv(xvfb_run, [xvfb_run, "-a", sys.executable, os.path.abspath(__file__)] + sys.argv[1:])
+
+
+def run_child():
+    """Jeden pomiar w świeżym procesie; wypisuje czasy etapów jako JSON"""
+    started = time.perf_counter()
+    sys.path.insert(0, ROOT)
+    import tkinter as tk
+    import main
+    import_time = time.perf_counter() - started
+    
+    root = tk.Tk()
+    app = main.DiceRollerApp(root)
+    deadline = time.perf_counter() + TIMEOUT
+    
+    def poll():
+        if "interactive" in app.startup_marks or time.perf_counter() > deadline:
+            root.destroy()
+        else:
+            root.after(5, poll)
+    
+    root.after(5, poll)
+    root.mainloop()
+    
+    marks = {"import": import_time}
+    marks.update(app.startup_marks)
+    print(json.dumps(marks))
+
+
+def run_parent(runs, as_json):
+    """Uruchamia pomiary w osobnych procesach i wypisuje medianę oraz rozrzut"""
+    samples = {mark: [] for mark in MARKS}
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, os.path.abspath(__file__), "--child"],
+                                capture_output=True, text=True, check=True).stdout
+        marks = json.loads(output.strip().splitlines()[-1])
+        for mark in MARKS:
+            if mark in marks:
+                samples[mark].append(marks[mark])
+    
+    summary = {
+        mark: {
+            "median_ms": round(statistics.median(values) * 1000, 2),
+            "min_ms": round(min(values) * 1000, 2),
+            "max_ms": round(max(values) * 1000, 2),
+            "runs": len(values)
+        }
+        for mark, values in samples.items() if values
+    }
+    
+    if as_json:
+        print(json.dumps(summary, indent=2))
+        return
+    print(f"{'etap':<14}{'mediana':>10}{'min':>10}{'max':>10}")
+    for mark in MARKS:
+        if mark in summary:
+            row = summary[mark]
+            print(f"{mark:<14}{row['median_ms']:>8.1f}ms{row['min_ms']:>8.1f}ms{row['max_ms']:>8.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pomiar czasu uruchamiania aplikacji")
+    parser.add_argument("--runs", type=int, default=5, help="liczba pomiarów (osobne procesy)")
+    parser.add_argument("--json", action="store_true", help="wynik w formacie JSON")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    ensure_display()
+    if args.child:
+        run_child()
+    else:
+        run_parent(args.runs, args.json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+Statystyki kampanii dla jednostek i batalionów z pamięcią podręczną
+Cached campaign analytics computed from unit battle histories
+"""
+
+import math
+from collections import Counter
+from itertools import accumulate
+
+
+def percentile(sorted_values, fraction):
+    """Zwraca percentyl (metoda najbliższej pozycji) z posortowanej listy"""
+    if not sorted_values:
+        return 0
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def compute_history_stats(entries):
+    """Oblicza statystyki dla listy wpisów historia_bitew (przebiegi kolumnowe)"""
+    count = len(entries)
+    if count == 0:
+        return {
+            'bitwy': 0, 'zwycięstwa': 0, 'procent_zwycięstw': 0.0,
+            'straty_suma': 0, 'straty_średnie': 0.0, 'straty_p50': 0, 'straty_p90': 0, 'straty_max': 0,
+            'krzywa_strat': [], 'rzuty_na_bitwę': 0.0, 'szczęście': None, 'rzuty_ze_szczęściem': 0
+        }
+    
+    # Kolumny wyciągane raz, dalej tylko operacje na listach
+    losses = [entry.get('straty', 0) or 0 for entry in entries]
+    wins = sum(1 for entry in entries if entry.get('zwyciestwo'))
+    sorted_losses = sorted(losses)
+    total_losses = sum(losses)
+    
+    # Rzuty na bitwę - tylko wpisy przypisane do zapisanej bitwy
+    battles = Counter(entry['bitwa'] for entry in entries if entry.get('bitwa') and entry['bitwa'] != "Niezapisana")
+    rolls_per_battle = (sum(battles.values()) / len(battles)) if battles else 0.0
+    
+    # Szczęście - końcowy wynik kostki względem wartości oczekiwanej
+    luck_deltas = [entry['wynik_kostki'] - entry['oczekiwana_kostka'] for entry in entries
+                   if entry.get('oczekiwana_kostka') is not None and entry.get('wynik_kostki') is not None]
+    
+    return {
+        'bitwy': count,
+        'zwycięstwa': wins,
+        'procent_zwycięstw': wins / count * 100,
+        'straty_suma': total_losses,
+        'straty_średnie': total_losses / count,
+        'straty_p50': percentile(sorted_losses, 0.5),
+        'straty_p90': percentile(sorted_losses, 0.9),
+        'straty_max': sorted_losses[-1],
+        'krzywa_strat': list(accumulate(losses)),
+        'rzuty_na_bitwę': rolls_per_battle,
+        'szczęście': (sum(luck_deltas) / len(luck_deltas)) if luck_deltas else None,
+        'rzuty_ze_szczęściem': len(luck_deltas)
+    }
+
+
+class CampaignAnalytics:
+    """Pamięć podręczna statystyk jednostek i batalionów unieważniana po nowych rzutach"""
+    
+    def __init__(self):
+        self.unit_cache = {}  # {unit_id: statystyki}
+        self.battalion_cache = {}  # {battalion_id: (członkowie, statystyki)}
+    
+    def invalidate_all(self):
+        """Czyści całą pamięć podręczną (np. po wczytaniu wykazu)"""
+        self.unit_cache.clear()
+        self.battalion_cache.clear()
+    
+    def invalidate_units(self, unit_ids, battalion_ids=()):
+        """Unieważnia statystyki podanych jednostek i ich batalionów"""
+        for unit_id in unit_ids:
+            self.unit_cache.pop(unit_id, None)
+        for battalion_id in battalion_ids:
+            self.battalion_cache.pop(battalion_id, None)
+    
+    def unit_stats(self, unit_id, unit_data):
+        """Zwraca statystyki jednostki (z pamięci podręcznej jeśli aktualne)"""
+        stats = self.unit_cache.get(unit_id)
+        if stats is None:
+            stats = compute_history_stats(unit_data.get('historia_bitew', []))
+            self.unit_cache[unit_id] = stats
+        return stats
+    
+    def battalion_stats(self, battalion_id, units):
+        """Zwraca statystyki batalionu połączone z historii wszystkich jego jednostek"""
+        members = tuple(sorted(unit_id for side in ('własne', 'wroga')
+                               for unit_id, unit_data in units.get(side, {}).items()
+                               if unit_data.get('batalion') == battalion_id))
+        
+        # Skład batalionu jest częścią klucza - przeniesienie jednostki unieważnia wpis
+        cached = self.battalion_cache.get(battalion_id)
+        if cached is not None and cached[0] == members:
+            return cached[1]
+        
+        entries = []
+        for side in ('własne', 'wroga'):
+            for unit_id, unit_data in units.get(side, {}).items():
+                if unit_data.get('batalion') == battalion_id:
+                    entries.extend(unit_data.get('historia_bitew', []))
+        
+        # Krzywa strat batalionu w porządku chronologicznym
+        entries.sort(key=lambda entry: entry.get('data', ''))
+        stats = compute_history_stats(entries)
+        stats['jednostki'] = len(members)
+        self.battalion_cache[battalion_id] = (members, stats)
+        return stats
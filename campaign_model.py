@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""
+Model kampanii niezależny od tkinter - stan jednostek, bitew i historii z powiadomieniami o zmianach
+Observable campaign model: state plus fine-grained change events with batched delivery
+"""
+
+from contextlib import contextmanager
+from datetime import datetime
+
+
+class CampaignModel:
+    """Stan kampanii; widoki subskrybują zdarzenia zamiast być odświeżane przy każdej mutacji
+
+    Zdarzenia i ich ładunki (lista elementów, w kolejności zmian):
+      units_reset           - brak (wczytano nowy wykaz)
+      battles_reset         - brak (wczytano nowy rejestr lub cofnięto wpisy)
+      history_reset         - brak (ostatnie rzuty podmienione w całości)
+      unit_changed          - ID jednostek, których dane się zmieniły
+      participation_changed - klucze stron ("strona1", "strona2")
+      battle_created        - nazwy nowo utworzonych bitew
+      battle_appended       - nazwy bitew z nowymi wpisami
+      history_appended      - pary (nowy wpis, usunięte najstarsze wpisy)
+    """
+    
+    EVENTS = ('units_reset', 'battles_reset', 'history_reset', 'unit_changed', 'participation_changed',
+              'battle_created', 'battle_appended', 'history_appended')
+    
+    def __init__(self, history_limit=12):
+        self.history_limit = history_limit
+        self.units = {"własne": {}, "wroga": {}}  # {"własne": {id: dane}, "wroga": {id: dane}}
+        self.battalions = {}  # {id: {"nazwa": string, "id": string}}
+        self.battles = {}  # {nazwa: {"history": [], "created": datetime}}
+        self.battle_names = ["Niezapisana"]  # Lista nazw bitew dla combobox
+        self.history = []  # Ostatnie rzuty (najwyżej history_limit)
+        self.participating_units = {"strona1": [], "strona2": []}  # Jednostki biorące udział w bitwie
+        
+        self._subscribers = {event: [] for event in self.EVENTS}
+        self._batch_depth = 0
+        self._pending = {}  # {zdarzenie: [ładunek]} - zdarzenia wstrzymane podczas batch()
+    
+    # --- Subskrypcje ---
+    
+    def subscribe(self, event, callback):
+        """Rejestruje callback(event, payload) dla zdarzenia"""
+        if event not in self._subscribers:
+            raise ValueError(f"Nieznane zdarzenie: {event}")
+        self._subscribers[event].append(callback)
+        return callback
+    
+    def unsubscribe(self, event, callback):
+        """Wyrejestrowuje callback zdarzenia"""
+        if callback in self._subscribers.get(event, []):
+            self._subscribers[event].remove(callback)
+    
+    def emit(self, event, *items):
+        """Zgłasza zdarzenie; wewnątrz batch() ładunki są łączone i dostarczane raz"""
+        if self._batch_depth:
+            self._pending.setdefault(event, []).extend(items)
+            return
+        self._deliver(event, list(items))
+    
+    def _deliver(self, event, payload):
+        for callback in list(self._subscribers[event]):
+            callback(event, payload)
+    
+    @contextmanager
+    def batch(self):
+        """Grupuje mutacje - każde zdarzenie jest dostarczane jeden raz po zakończeniu bloku"""
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if not self._batch_depth:
+                pending = self._pending
+                self._pending = {}
+                # Kolejność dostarczania zgodna z EVENTS (resety przed zmianami szczegółowymi)
+                for event in self.EVENTS:
+                    if event in pending:
+                        self._deliver(event, pending[event])
+    
+    # --- Wyszukiwanie ---
+    
+    def find_unit(self, unit_id):
+        """Zwraca (strona, dane) jednostki lub (None, None)"""
+        for side_name in ('własne', 'wroga'):
+            unit_data = self.units[side_name].get(unit_id)
+            if unit_data is not None:
+                return side_name, unit_data
+        return None, None
+    
+    # --- Mutacje ---
+    
+    def set_units(self, units, battalions):
+        """Zastępuje cały wykaz jednostek i batalionów"""
+        self.units = units
+        self.battalions = battalions
+        self.emit('units_reset')
+    
+    def set_battles(self, battles, battle_names):
+        """Zastępuje cały rejestr bitew"""
+        self.battles = battles
+        self.battle_names = battle_names
+        self.emit('battles_reset')
+    
+    def units_changed(self, *unit_ids):
+        """Zgłasza zmianę danych jednostek zmodyfikowanych w miejscu"""
+        self.emit('unit_changed', *unit_ids)
+    
+    def append_unit_battle(self, unit_id, entry):
+        """Dopisuje wpis do historii bitew jednostki; zwraca (strona, dane) lub (None, None)"""
+        side_name, unit_data = self.find_unit(unit_id)
+        if unit_data is None:
+            return None, None
+        unit_data.setdefault('historia_bitew', []).append(entry)
+        self.emit('unit_changed', unit_id)
+        return side_name, unit_data
+    
+    def append_unit_battles(self, entries):
+        """Dopisuje wpisy do historii bitew wielu jednostek [(ID, dane, wpis)] - jedno zdarzenie dla wszystkich"""
+        for _, unit_data, entry in entries:
+            unit_data.setdefault('historia_bitew', []).append(entry)
+        if entries:
+            self.emit('unit_changed', *[unit_id for unit_id, _, _ in entries])
+    
+    def append_history(self, entry):
+        """Dopisuje rzut do ostatnich rzutów; zwraca listę usuniętych najstarszych wpisów"""
+        self.history.append(entry)
+        removed_entries = []
+        while len(self.history) > self.history_limit:
+            removed_entries.append(self.history.pop(0))
+        self.emit('history_appended', (entry, removed_entries))
+        return removed_entries
+    
+    def create_battle(self, battle_name, created=None):
+        """Dodaje pustą bitwę do rejestru i listy nazw; zwraca False, jeśli już istnieje"""
+        if battle_name in self.battles:
+            return False
+        self.battles[battle_name] = {"history": [], "created": created or datetime.now().isoformat()}
+        if battle_name not in self.battle_names:
+            self.battle_names.append(battle_name)
+        self.emit('battle_created', battle_name)
+        return True
+    
+    def append_battle_entry(self, battle_name, entry):
+        """Dopisuje wpis do rejestru bitwy (tworzy bitwę jeśli nie istnieje); zwraca numer wpisu"""
+        if battle_name not in self.battles:
+            self.battles[battle_name] = {"history": [], "created": datetime.now().isoformat()}
+        self.battles[battle_name]["history"].append(entry)
+        self.emit('battle_appended', battle_name)
+        return len(self.battles[battle_name]["history"])
+    
+    def replace_battle_entries(self, battle_name, start, entries):
+        """Wstawia wpisy rejestru bitwy od pozycji start (zastępując istniejące) - porządek ustalony z zewnątrz"""
+        history = self.battles[battle_name]["history"]
+        history[start:start + len(entries)] = entries
+        self.emit('battles_reset')
+    
+    def set_history(self, entries):
+        """Zastępuje listę ostatnich rzutów (np. przy cofnięciu rzutu)"""
+        self.history = list(entries)[-self.history_limit:]
+        self.emit('history_reset')
+    
+    def truncate_battle(self, battle_name, length):
+        """Obcina rejestr bitwy do podanej liczby wpisów (cofnięcie rzutów)"""
+        if battle_name in self.battles:
+            del self.battles[battle_name]["history"][length:]
+            self.emit('battles_reset')
+    
+    def swap_combat_state(self, participating_units, history):
+        """Podmienia uczestników i ostatnie rzuty (przełączenie sesji bitwy) - bez kopiowania"""
+        with self.batch():
+            self.participating_units = participating_units
+            self.history = history
+            self.participation_changed()
+            self.emit('history_reset')
+    
+    def participation_changed(self, *side_keys):
+        """Zgłasza zmianę list jednostek biorących udział w bitwie"""
+        self.emit('participation_changed', *(side_keys or ("strona1", "strona2")))
+    
+    def reset_participation(self):
+        """Czyści listy jednostek biorących udział w bitwie"""
+        self.participating_units = {"strona1": [], "strona2": []}
+        self.participation_changed()
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+Zapis i odczyt wykazu jednostek oraz rejestru bitew (format JSON) i migracja starych jednostek
+File formats of save_units/save_battles, independent of tkinter, plus the legacy-unit migration
+"""
+
+import json
+from datetime import datetime
+
+
+UNIT_SIDES = ('własne', 'wroga')
+UNSAVED_BATTLE = "Niezapisana"
+
+
+class CampaignFormatError(ValueError):
+    """Plik nie ma struktury wykazu jednostek lub rejestru bitew"""
+
+
+def write_units_file(path, units, battalions):
+    """Zapisuje wykaz jednostek i batalionów"""
+    data = {
+        "units": units,
+        "battalions": battalions,
+        "saved_at": datetime.now().isoformat()
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def read_units_file(path):
+    """Wczytuje wykaz jednostek; zwraca (jednostki, bataliony) z uzupełnioną strukturą"""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    
+    if not isinstance(data, dict) or "units" not in data:
+        raise CampaignFormatError("Nieprawidłowy format pliku!")
+    
+    # Upewnienie się o prawidłowej strukturze i dodanie pola historia_bitew
+    units = data["units"]
+    for side in UNIT_SIDES:
+        units.setdefault(side, {})
+        for unit_data in units[side].values():
+            unit_data.setdefault("historia_bitew", [])
+    
+    # Stare pliki nie mają batalionów
+    return units, data.get("battalions", {})
+
+
+def write_battles_file(path, battles, battle_names):
+    """Zapisuje rejestr bitew"""
+    data = {
+        "battles": battles,
+        "battle_names": battle_names,
+        "saved_at": datetime.now().isoformat()
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def read_battles_file(path):
+    """Wczytuje rejestr bitew; zwraca (bitwy, nazwy bitew) z "Niezapisana" na początku listy"""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    
+    if not isinstance(data, dict) or "battles" not in data or "battle_names" not in data:
+        raise CampaignFormatError("Nieprawidłowy format pliku!")
+    
+    battle_names = data["battle_names"]
+    if UNSAVED_BATTLE not in battle_names:
+        battle_names.insert(0, UNSAVED_BATTLE)
+    return data["battles"], battle_names
+
+
+def migrate_legacy_units(units, new_id):
+    """Migruje stare jednostki (nazwy jako klucze, bez pola 'id') do formatu z ID; zwraca liczbę migracji
+
+    new_id() zwraca nowy identyfikator. Wszystkie stare jednostki strony dostają numer o jeden
+    większy od najwyższego numeru na tej stronie sprzed migracji (jak dotychczas).
+    """
+    total_migrated = 0
+    for side in UNIT_SIDES:
+        side_units = units[side]
+        legacy_keys = [unit_key for unit_key, unit_data in side_units.items() if 'id' not in unit_data]
+        if not legacy_keys:
+            continue
+        
+        # Najwyższy numer na stronie - liczony raz, migrowane jednostki są dodawane dopiero po przejściu
+        max_number = max([0] + [unit_data['numer'] for unit_data in side_units.values() if 'numer' in unit_data])
+        
+        migrated = []
+        for unit_key in legacy_keys:
+            unit_data = side_units[unit_key]
+            new_unit_id = new_id()
+            migrated.append((unit_key, new_unit_id, {
+                "id": new_unit_id,
+                "numer": max_number + 1,
+                "typ": "kompania",  # domyślnie kompania
+                "batalion": None,   # brak batalionu
+                "liczba_ludzi": unit_data.get("liczba_ludzi", 150),
+                "doświadczenie": unit_data.get("doświadczenie", 0),
+                "zapasy": unit_data.get("zapasy", 3),
+                "liczba_zwycięstw": unit_data.get("liczba_zwycięstw", 0),
+                "liczba_uzupełnień": unit_data.get("liczba_uzupełnień", 0),
+                "strona": side,
+                "historia_bitew": unit_data.get("historia_bitew", [])
+            }))
+        
+        for old_key, new_unit_id, new_data in migrated:
+            del side_units[old_key]
+            side_units[new_unit_id] = new_data
+        total_migrated += len(migrated)
+    return total_migrated
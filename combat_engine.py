@@ -0,0 +1,260 @@
+# -*- coding: utf-8 -*-
+"""
+Silnik starcia niezależny od tkinter - rzut, przewaga liczebna, straty i wynik taktyczny
+Pure combat engine: one round of dice, numerical advantage, losses and tactical outcome
+"""
+
+import random
+from fractions import Fraction
+
+
+# Przedziały procentu strat dla wyniku kostki przeciwnika (wynik: (min, max)); 12+ używa ostatniego
+LOSS_BANDS = {
+    1: (0.0, 0.02),
+    2: (0.03, 0.06),
+    3: (0.07, 0.10),
+    4: (0.11, 0.14),
+    5: (0.15, 0.18),
+    6: (0.19, 0.22),
+    7: (0.23, 0.28),
+    8: (0.29, 0.35),
+    9: (0.36, 0.45),
+    10: (0.46, 0.55),
+    11: (0.56, 0.70),
+    12: (0.75, 0.85),
+}
+LOW_RESULT_LOSS = 0.05  # Procent strat dla wyniku przeciwnika poniżej 1
+
+# Fortyfikacje własne zmniejszają straty, fortyfikacje przeciwnika zwiększają je o losowy procent
+OWN_FORTIFICATION_REDUCTION = {1: 0.05, 2: 0.10, 3: 0.15}
+ENEMY_FORTIFICATION_BANDS = {1: (0.10, 0.15), 2: (0.16, 0.25), 3: (0.30, 0.40)}
+ENEMY_BUILDINGS_BAND = (0.05, 0.15)
+NEGATIVE_EXPERIENCE_PENALTY = {-1: 0.10, -2: 0.25}
+
+NUMERICAL_ADVANTAGE_STEP = 2.1  # Każde 2.1x przewagi liczebnej to +1 do wyniku
+_ADVANTAGE_STEP_RATIO = Fraction(str(NUMERICAL_ADVANTAGE_STEP)).as_integer_ratio()  # (21, 10)
+LOSS_BASE_PEOPLE = 150  # Dla ≤150 ludzi straty liczone od bazy 150
+
+TACTICAL_DESCRIPTIONS = {
+    1: "Pozycja nienaruszona",
+    2: "Lokalne wejście",
+    3: "Częściowe wysunięcie",
+    4: "Wyłom taktyczny",
+    5: "Załamanie obrony",
+    6: "Przełamanie strategiczne"
+}
+
+
+def side_inputs(people=0, modifier=0, range_modifier=0, experience=0, surrounded=False, defense_buildings=False,
+                no_supply=False, fortifications=0, attacking=False, defending=False, in_motion=False):
+    """Ustawienia jednej strony starcia (słownik przekazywany do resolve_round)"""
+    return {
+        "people": people,
+        "modifier": modifier,
+        "range_modifier": range_modifier,
+        "experience": experience,
+        "surrounded": surrounded,
+        "defense_buildings": defense_buildings,
+        "no_supply": no_supply,
+        "fortifications": fortifications,
+        "attacking": attacking,
+        "defending": defending,
+        "in_motion": in_motion
+    }
+
+
+def base_loss_percentage(result, rng=random):
+    """Zwraca procent strat dla danego wyniku kostki przeciwnika (od 1 do 12+)"""
+    if result < 1:
+        return LOW_RESULT_LOSS
+    low, high = LOSS_BANDS[min(result, 12)]
+    return rng.uniform(low, high)
+
+
+def calculate_losses_for_side(enemy_result, own_people, own_fortifications, own_no_supply, own_defense_buildings,
+                              enemy_fortifications, enemy_defense_buildings, own_experience, own_attacking,
+                              enemy_defending, enemy_in_motion, rng=random):
+    """Oblicza straty jednej strony; zwraca (pozostali ludzie, straty)"""
+    # Bazowy procent strat na podstawie wyniku przeciwnika
+    base_loss = base_loss_percentage(enemy_result, rng)
+    
+    # Modyfikatory własne (obrona): fortyfikacje, brak zaopatrzenia, zabudowania, negatywne doświadczenie
+    defense_modifier = 1.0 - OWN_FORTIFICATION_REDUCTION.get(own_fortifications, 0.0)
+    if own_no_supply:
+        defense_modifier += 0.05
+    if own_defense_buildings:
+        defense_modifier -= 0.05
+    defense_modifier += NEGATIVE_EXPERIENCE_PENALTY.get(own_experience, 0.0)
+    
+    # Modyfikatory ataku przeciwnika (fortyfikacje i zabudowania przeciwnika zwiększają nasze straty)
+    attack_modifier = 1.0
+    if enemy_fortifications in ENEMY_FORTIFICATION_BANDS:
+        attack_modifier += rng.uniform(*ENEMY_FORTIFICATION_BANDS[enemy_fortifications])
+    if enemy_defense_buildings:
+        attack_modifier += rng.uniform(*ENEMY_BUILDINGS_BAND)
+    
+    # Straty atakujących są 5% większe, gdy druga strona ma zaznaczoną obronę
+    if own_attacking and enemy_defending:
+        attack_modifier += 0.05
+    
+    # Gdy przeciwnik jest w ruchu, straty są 10% mniejsze
+    if enemy_in_motion:
+        defense_modifier -= 0.10
+    
+    final_loss_percentage = max(0.0, base_loss * defense_modifier * attack_modifier)
+    
+    # Obliczenia strat: dla ≤150 ludzi - baza 150, dla >150 ludzi - baza rzeczywista
+    loss_base = LOSS_BASE_PEOPLE if own_people <= LOSS_BASE_PEOPLE else own_people
+    absolute_losses = int(loss_base * final_loss_percentage)
+    
+    if own_people > 0:
+        actual_losses = min(absolute_losses, own_people)
+        return max(0, own_people - actual_losses), actual_losses
+    return 0, 0
+
+
+def loss_weight(experience, people):
+    """Współczynnik udziału jednostki w stratach strony: doświadczenie (główny wpływ) i rozmiar (mały)"""
+    # Doświadczenie -2 = 1.4x więcej strat, +2 = 0.6x mniej strat (ograniczone do 0.3-1.7)
+    exp_factor = max(0.3, min(1.7, 1.0 - experience * 0.2))
+    # Większe jednostki nieznacznie więcej strat - najwyżej 5% w każdą stronę względem 75 ludzi
+    size_factor = max(0.95, min(1.05, 1.0 + (people - 75) / 750))
+    return exp_factor * size_factor
+
+
+def allocate_losses(total_losses, weights):
+    """Dzieli straty proporcjonalnie do wag metodą największych reszt; suma wyniku równa total_losses
+
+    Każda jednostka dostaje część całkowitą swojego udziału, a pozostałe straty trafiają
+    po jednej do jednostek z największą resztą (przy remisie - wcześniejsza na liście).
+    """
+    count = len(weights)
+    if count == 0 or total_losses <= 0:
+        return [0] * count
+    total_weight = sum(weights)
+    if total_weight <= 0:
+        weights = [1.0] * count
+        total_weight = float(count)
+    
+    shares = []
+    remainders = []
+    assigned = 0
+    for index, weight in enumerate(weights):
+        whole, rest = divmod(total_losses * weight, total_weight)
+        whole = int(whole)
+        shares.append(whole)
+        remainders.append((-rest, index))
+        assigned += whole
+    
+    leftover = total_losses - assigned
+    if leftover > 0:
+        for _, index in sorted(remainders)[:leftover]:
+            shares[index] += 1
+    return shares
+
+
+def numerical_advantage(people1, people2):
+    """Zwraca (przewaga strony 1, przewaga strony 2): 2.1x = +1, 4.2x = +2 itd."""
+    if people1 <= 0 or people2 <= 0:
+        return 0, 0
+    # Arytmetyka całkowita - dzielenie zmiennoprzecinkowe gubiło stopień przy dokładnych wielokrotnościach (np. 147 vs 5)
+    step_numerator, step_denominator = _ADVANTAGE_STEP_RATIO
+    steps_1_vs_2 = (people1 * step_denominator) // (people2 * step_numerator)
+    if steps_1_vs_2 >= 1:
+        return int(steps_1_vs_2), 0
+    steps_2_vs_1 = (people2 * step_denominator) // (people1 * step_numerator)
+    if steps_2_vs_1 >= 1:
+        return 0, int(steps_2_vs_1)
+    return 0, 0
+
+
+def get_tactical_outcome(attack_result, defense_result, rng=random):
+    """Określa wynik taktyczny na skali 1-6"""
+    difference = attack_result - defense_result
+    if difference <= 0:
+        # Losowanie przy -1 zachowane dla zgodności sekwencji liczb losowych; wynik zawsze 1
+        if difference == -1:
+            rng.random()
+        return 1
+    return min(difference + 1, 6)
+
+
+def get_tactical_description(outcome):
+    """Zwraca opis wyniku taktycznego"""
+    return TACTICAL_DESCRIPTIONS.get(outcome, "Nieznany wynik")
+
+
+def roll_range(side):
+    """Maksymalne oczko kości strony: 4 + modyfikator zakresu + 2 za każdy dodatni poziom doświadczenia"""
+    return max(1, 4 + side["range_modifier"] + max(0, side["experience"]) * 2)
+
+
+def total_modifier(side, advantage):
+    """Suma modyfikatorów wyniku strony"""
+    modifier = side["modifier"] + side["experience"] + advantage + side["fortifications"]
+    if side["surrounded"]:
+        modifier -= 1
+    if side["defense_buildings"]:
+        modifier += 1
+    if side["no_supply"]:
+        modifier -= 1
+    return modifier
+
+
+def resolve_round(side1, side2, rng=random):
+    """Rozgrywa jedną rundę starcia; zwraca słownik wyników (bez zmiany stanu aplikacji)
+
+    Kolejność losowań jest taka sama jak w interaktywnym rzucie: kości, straty strony 1,
+    straty strony 2, wynik taktyczny.
+    """
+    advantage1, advantage2 = numerical_advantage(side1["people"], side2["people"])
+    dice1_max = roll_range(side1)
+    dice2_max = roll_range(side2)
+    dice1_value = rng.randint(1, dice1_max)
+    dice2_value = rng.randint(1, dice2_max)
+    modifier1 = total_modifier(side1, advantage1)
+    modifier2 = total_modifier(side2, advantage2)
+    dice1_final = dice1_value + modifier1
+    dice2_final = dice2_value + modifier2
+    
+    result = {
+        "dice1_value": dice1_value,
+        "dice2_value": dice2_value,
+        "dice1_final": dice1_final,
+        "dice2_final": dice2_final,
+        "advantage1": advantage1,
+        "advantage2": advantage2,
+        "expected1": (1 + dice1_max) / 2 + modifier1,
+        "expected2": (1 + dice2_max) / 2 + modifier2,
+        "people1_before": side1["people"],
+        "people2_before": side2["people"],
+        "people1_after": side1["people"],
+        "people2_after": side2["people"],
+        "losses1": 0,
+        "losses2": 0,
+        "exp1": False,
+        "exp2": False,
+        "tactical_outcome": None
+    }
+    
+    if side1["people"] or side2["people"]:
+        # Przy różnicy +1 wyższa strona dostaje "Zwycięstwo"
+        result["exp1"] = dice1_final > dice2_final
+        result["exp2"] = dice2_final > dice1_final
+        result["people1_after"], result["losses1"] = calculate_losses_for_side(
+            dice2_final, side1["people"], side1["fortifications"], side1["no_supply"], side1["defense_buildings"],
+            side2["fortifications"], side2["defense_buildings"], side1["experience"],
+            side1["attacking"], side2["defending"], side2["in_motion"], rng
+        )
+        result["people2_after"], result["losses2"] = calculate_losses_for_side(
+            dice1_final, side2["people"], side2["fortifications"], side2["no_supply"], side2["defense_buildings"],
+            side1["fortifications"], side1["defense_buildings"], side2["experience"],
+            side2["attacking"], side1["defending"], side1["in_motion"], rng
+        )
+    
+    # Wynik taktyczny tylko w klasycznej sytuacji atak vs obrona
+    if side1["attacking"] and side2["defending"]:
+        result["tactical_outcome"] = get_tactical_outcome(dice1_final, dice2_final, rng)
+    elif side2["attacking"] and side1["defending"]:
+        result["tactical_outcome"] = get_tactical_outcome(dice2_final, dice1_final, rng)
+    return result
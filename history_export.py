@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+Strumieniowy eksport historii starć do płaskiego pliku CSV
+Streaming flat CSV export of the battle registry and unit battle histories
+"""
+
+import csv
+
+
+# Kolumny odpowiadają polom z add_to_history i add_to_unit_battle_history
+CSV_COLUMNS = [
+    'rodzaj', 'bitwa', 'numer', 'data',
+    # Wpis z rejestru bitew (add_to_history)
+    'dice1', 'dice2', 'people1_before', 'people1_after', 'people2_before', 'people2_after', 'exp1', 'exp2',
+    'side1_units', 'side2_units', 'side1_unit_ids', 'side2_unit_ids',
+    'side1_battalion_ids', 'side2_battalion_ids', 'side1_sides', 'side2_sides',
+    'side1_attacking', 'side2_attacking', 'side1_in_motion', 'side2_in_motion',
+    # Udział jednostki (add_to_unit_battle_history)
+    'unit_id', 'unit_name', 'unit_side', 'battalion_id',
+    'wynik_kostki', 'przeciwnik_kostka', 'oczekiwana_kostka', 'straty', 'zwyciestwo',
+    'friendly_units', 'enemy_units'
+]
+
+LIST_SEPARATOR = ';'
+
+
+def _join(values):
+    """Łączy listę wartości w jedną komórkę CSV"""
+    return LIST_SEPARATOR.join('' if value is None else str(value) for value in values)
+
+
+def iter_history_rows(units, battles, name_to_id, unit_name):
+    """Generator wierszy CSV: jeden na wpis z rejestru bitew i jeden na udział jednostki
+
+    unit_name(unit_id, side) zwraca nazwę wyświetlaną jednostki. Wiersze są
+    tworzone pojedynczo, więc zużycie pamięci nie zależy od liczby wierszy.
+    """
+    # Mapa ID -> (strona, batalion) do rozwiązywania uczestników
+    unit_lookup = {}
+    for side_name in ('własne', 'wroga'):
+        for unit_id, unit_data in units.get(side_name, {}).items():
+            unit_lookup[unit_id] = (side_name, unit_data.get('batalion'))
+    
+    empty = {column: '' for column in CSV_COLUMNS}
+    
+    for battle_name, battle_data in battles.items():
+        for number, entry in enumerate(battle_data.get('history', []), 1):
+            row = dict(empty)
+            row.update({
+                'rodzaj': 'bitwa',
+                'bitwa': battle_name,
+                'numer': number,
+                'data': entry.get('data', ''),
+                'dice1': entry.get('dice1', ''),
+                'dice2': entry.get('dice2', ''),
+                'people1_before': entry.get('people1_before', ''),
+                'people1_after': entry.get('people1_after', ''),
+                'people2_before': entry.get('people2_before', ''),
+                'people2_after': entry.get('people2_after', ''),
+                'exp1': entry.get('exp1', ''),
+                'exp2': entry.get('exp2', ''),
+                'side1_attacking': entry.get('side1_attacking', ''),
+                'side2_attacking': entry.get('side2_attacking', ''),
+                'side1_in_motion': entry.get('side1_in_motion', ''),
+                'side2_in_motion': entry.get('side2_in_motion', '')
+            })
+            
+            for side_key in ('side1', 'side2'):
+                names = entry.get(f'{side_key}_units', [])
+                # Starsze wpisy nie mają ID - rozwiąż po nazwie wyświetlanej
+                unit_ids = entry.get(f'{side_key}_unit_ids') or [name_to_id.get(name, '') for name in names]
+                resolved = [unit_lookup.get(unit_id, ('', '')) for unit_id in unit_ids]
+                row[f'{side_key}_units'] = _join(names)
+                row[f'{side_key}_unit_ids'] = _join(unit_ids)
+                row[f'{side_key}_sides'] = _join(side for side, _ in resolved)
+                row[f'{side_key}_battalion_ids'] = _join(battalion for _, battalion in resolved)
+            
+            yield [row[column] for column in CSV_COLUMNS]
+    
+    for side_name in ('własne', 'wroga'):
+        for unit_id, unit_data in units.get(side_name, {}).items():
+            display_name = unit_name(unit_id, side_name)
+            battalion_id = unit_data.get('batalion') or ''
+            for number, entry in enumerate(unit_data.get('historia_bitew', []), 1):
+                row = dict(empty)
+                row.update({
+                    'rodzaj': 'jednostka',
+                    'bitwa': entry.get('bitwa', ''),
+                    'numer': number,
+                    'data': entry.get('data', ''),
+                    'side1_units': _join(entry.get('side1_units', [])),
+                    'side2_units': _join(entry.get('side2_units', [])),
+                    'side1_attacking': entry.get('side1_attacking', ''),
+                    'side2_attacking': entry.get('side2_attacking', ''),
+                    'side1_in_motion': entry.get('side1_in_motion', ''),
+                    'side2_in_motion': entry.get('side2_in_motion', ''),
+                    'unit_id': unit_id,
+                    'unit_name': display_name,
+                    'unit_side': side_name,
+                    'battalion_id': battalion_id,
+                    'wynik_kostki': entry.get('wynik_kostki', ''),
+                    'przeciwnik_kostka': entry.get('przeciwnik_kostka', ''),
+                    'oczekiwana_kostka': entry.get('oczekiwana_kostka', ''),
+                    'straty': entry.get('straty', ''),
+                    'zwyciestwo': entry.get('zwyciestwo', ''),
+                    'friendly_units': _join(entry.get('friendly_units', [])),
+                    'enemy_units': _join(entry.get('enemy_units', []))
+                })
+                yield [row[column] for column in CSV_COLUMNS]
+
+
+def write_history_csv(filename, rows):
+    """Zapisuje wiersze z generatora do pliku CSV, zwraca liczbę zapisanych wierszy"""
+    count = 0
+    with open(filename, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(CSV_COLUMNS)
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    return count
@@ -9,15 +9,95 @@ import tkinter as tk
 from tkinter import ttk
 from tkinter import scrolledtext
 from tkinter import filedialog, messagebox
+import multiprocessing
+import os
 import random
-import json
 import string
-from datetime import datetime
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+from battle_forecast import forecast_task, rounds_quantile
+from battle_sessions import SessionRegistry
+from battle_index import BattleIndex
+from campaign_analytics import CampaignAnalytics
+from campaign_model import CampaignModel
+from campaign_storage import (
+    CampaignFormatError, migrate_legacy_units, read_battles_file, read_units_file, write_battles_file, write_units_file
+)
+from combat_engine import allocate_losses, get_tactical_description, loss_weight, resolve_round, side_inputs
+from history_export import iter_history_rows, write_history_csv
+from memory_report import (
+    diff_sites, format_bytes, registry_report, start_tracing, stop_tracing, take_snapshot, top_sites
+)
+from phase_profiler import PhaseProfiler
+from roll_log import RollLog
+from searchable_picker import SearchablePicker
+from session_profiler import SessionProfiler, install_call_wrapper
+from session_sync import DEFAULT_HOST, DEFAULT_PORT, ModelSync, SyncClient, describe_conflict
+
+
+def model_attribute(name):
+    """Właściwość przekazująca odczyt i zapis atrybutu do self.model"""
+    return property(lambda self: getattr(self.model, name),
+                    lambda self, value: setattr(self.model, name, value))
 
 
 class DiceRollerApp:
+    HISTORY_LIMIT = 12  # Liczba ostatnich rzutów w panelu historii
+    BATTLE_HISTORY_DISPLAY_LIMIT = 200  # Liczba wpisów bitwy widocznych w panelu (starsze są obcinane od góry)
+    UNIT_HISTORY_PAGE_SIZE = 40  # Liczba wpisów historii jednostki renderowanych na raz
+    UNIT_HISTORY_WINDOW_PAGES = 3  # Liczba stron trzymanych w oknie historii jednostki (pozostałe są usuwane)
+    RENDER_STATS_WINDOW = 200  # Liczba ostatnich pomiarów czasu odświeżania na region
+    UNDO_LIMIT = 20  # Liczba rzutów, które można cofnąć
+    EVENT_FEED_LINE_LIMIT = 1000  # Maksymalna liczba linii w dzienniku zdarzeń trybu szybkiego
+    AUTO_RESOLVE_MAX_ROUNDS = 50  # Domyślny limit rund auto-rozstrzygnięcia
+    FORECAST_CACHE_SIZE = 64  # Liczba zapamiętanych prognoz (ustawienia stron + liczba ludzi)
+    FORECAST_POLL_MS = 50  # Co ile ms sprawdzać, czy prognoza liczona w tle jest gotowa
+    PROFILER_REFRESH_MS = 1000  # Odświeżanie tabeli w oknie profilera etapów
+    SYNC_POLL_MS = 100  # Co ile ms wysyłać zmiany do huba synchronizacji i stosować zdarzenia innych prowadzących
+    ROLL_LOG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "roll_logs")  # Rotowane pliki dziennika rzutów
+    
+    # Regiony interfejsu odświeżane przez flush_render (w tej kolejności) i metody, które je rysują
+    RENDER_REGIONS = (
+        ("units_display", "update_units_display"),
+        ("exp_bonuses", "update_exp_bonuses_display"),
+        ("unit_details", "render_unit_details"),
+        ("battle_units_combos", "update_battle_units_combos"),
+        ("units_combos", "update_units_combos"),
+        ("history", "render_history"),
+        ("battle_stats", "update_battle_stats"),
+        ("battle_history", "append_battle_history_display"),
+        ("event_feed", "render_event_feed"),
+    )
+    
+    # Pola formularza starcia i atrybuty stanu rzutu odkładane przy przełączaniu sesji bitew
+    SESSION_FORM_VARS = tuple(
+        f"dice{n}_{field}_var" for n in (1, 2)
+        for field in ("people", "modifier", "range", "exp", "surrounded", "defense", "supply", "fort")
+    ) + tuple(f"side{n}_{field}_var" for n in (1, 2) for field in ("attack", "defense", "motion")) + \
+        ("unit_side1_type_var", "unit_side2_type_var", "unit_side1_var", "unit_side2_var")
+    SESSION_STATE_ATTRS = tuple(
+        f"dice{n}_{field}" for n in (1, 2)
+        for field in ("value", "modifier", "range_modifier", "people_original", "people_result", "gets_exp",
+                      "losses", "expected")
+    ) + ("side1_locked", "side2_locked", "selected_unit_side1", "selected_unit_side2", "unit_side1_type",
+         "unit_side2_type", "unit_side1_id_to_display", "unit_side2_id_to_display", "last_round_result")
+    
+    # Stan kampanii przechowywany w modelu (CampaignModel)
+    units = model_attribute("units")
+    battalions = model_attribute("battalions")
+    battles = model_attribute("battles")
+    battle_names = model_attribute("battle_names")
+    history = model_attribute("history")
+    participating_units = model_attribute("participating_units")
+    
     def __init__(self, root):
         self.root = root
+        self.startup_started = time.perf_counter()
+        self.startup_marks = {}  # {etap: sekundy od startu} - czasy uruchamiania
+        self.built_panels = set()  # Panele zbudowane (pozostałe są tworzone przy pierwszym użyciu)
         self.root.title("Rzut dwoma 4-ściennymi kośćmi")
         self.root.geometry("2000x700")
         self.root.resizable(False, False)
@@ -25,6 +105,12 @@ class DiceRollerApp:
         # Centrowanie okna na ekranie
         self.center_window()
         
+        # Model kampanii (jednostki, bataliony, bitwy, historia, uczestnicy) - widoki subskrybują jego zdarzenia
+        self.model = CampaignModel(self.HISTORY_LIMIT)
+        self.participant_id_sets = {"strona1": set(), "strona2": set()}  # Aktualizowane przy participation_changed
+        for event in CampaignModel.EVENTS:
+            self.model.subscribe(event, self.on_model_event)
+        
         # Inicjalizacja zmiennych
         self.dice1_value = 0
         self.dice2_value = 0
@@ -40,31 +126,81 @@ class DiceRollerApp:
         self.dice2_gets_exp = False
         self.dice1_losses = 0
         self.dice2_losses = 0
-        self.history = []  # Lista przechowująca historię rzutów
+        self.dice1_expected = None  # Oczekiwany wynik końcowy (do statystyk szczęścia)
+        self.dice2_expected = None
+        self.last_round_result = None  # Wynik ostatniej rundy (do ponownego wyświetlenia po przełączeniu sesji)
+        
+        # Pamięć podręczna sformatowanych wpisów i stan paneli historii (renderowanie przyrostowe)
+        self.history_bodies = deque()  # [(wpis, tekst wpisu bez numeru)] równolegle do self.history (od najstarszego)
+        self.history_block_lines = deque()  # Liczba linii każdego wpisu w panelu (od góry)
+        self.battle_history_line_cache = {}  # {nazwa bitwy: [sformatowane wpisy]}
+        self.battle_history_block_lines = deque()
+        self.battle_history_displayed = None  # (nazwa bitwy, liczba wyświetlonych wpisów)
+        self.unit_history_line_cache = {}  # {unit_id: {indeks wpisu: tekst}} - wspólne dla okien historii jednostki
+        
+        # Harmonogram odświeżania - regiony oznaczone jako nieaktualne rysowane raz w after_idle
+        self.dirty_regions = set()
+        self.render_scheduled = False
+        self.pending_history_appends = []  # [(wpis, usunięte wpisy)] do dopisania w panelu historii
+        self.roll_started = None  # Początek ostatniego rzutu (do pomiaru czasu rzut -> odświeżenie)
+        self.render_stats = {}  # {region: deque czasów w ms}, plus "flush" i "roll"
+        self.history_needs_redraw = False  # Historia podmieniona w całości (np. cofnięty rzut)
+        self.profiler = PhaseProfiler()  # Czasy etapów rzutu i odświeżania (domyślnie wyłączony)
+        self.session_profiler = SessionProfiler()  # Próbkowanie wywołań zwrotnych Tk w całej sesji (domyślnie wyłączone)
+        self.profiler_window = None  # Okno profilera (tworzone przy pierwszym użyciu)
+        self.profiler_refresh_job = None  # Zaplanowane odświeżenie okna profilera (jedno naraz)
+        self.roll_log = RollLog(self.ROLL_LOG_DIR)  # Pełny zapis każdego rzutu (pamięć + pliki zapisywane w tle)
+        self.memory_window = None  # Okno raportu pamięci (tworzone przy pierwszym użyciu)
+        self.memory_snapshot = None  # (czas, migawka tracemalloc) - punkt odniesienia do porównania
+        self.sync = None  # ModelSync - połączenie z hubem synchronizacji prowadzących (None - praca lokalna)
+        self.sync_job = None  # Zaplanowany cykl synchronizacji
+        self.sync_window = None  # Okno połączenia z hubem (tworzone przy pierwszym użyciu)
+        self.sync_conflicts = 0
+        
+        # Tryb szybki - raporty trafiają do nieblokującego dziennika zdarzeń zamiast okien dialogowych
+        self.rapid_mode_var = tk.BooleanVar(value=False)
+        self.undo_stack = deque(maxlen=self.UNDO_LIMIT)  # Migawki stanu sprzed ostatnich rzutów
+        self.event_feed_window = None  # Okno dziennika zdarzeń (tworzone przy pierwszym użyciu)
+        self.pending_feed_lines = []  # Linie do dopisania w dzienniku w najbliższym odświeżeniu
+        
+        # Prognoza starcia (łańcuch Markowa) liczona w procesie roboczym (poza GIL), wyniki zapamiętane
+        self.forecast_pool = None  # ProcessPoolExecutor tworzony przy pierwszej prognozie
+        self.forecast_cache = {}  # {klucz prognozy: wynik}
+        self.forecast_requested = None  # (klucz, strona 1, strona 2) oczekujące na policzenie
+        self.forecast_future = None  # (klucz, Future) prognozy liczonej w tle
         
         # System bitew
-        self.battles = {}  # Słownik bitew: {nazwa: {"history": [], "created": datetime}}
         self.current_battle = "Niezapisana"  # Obecnie wybrana bitwa
-        self.battle_names = ["Niezapisana"]  # Lista nazw bitew dla combobox
+        self.sessions = SessionRegistry()  # Równoległe sesje bitew; stan aktywnej żyje w aplikacji i modelu
+        self.sessions.create()
+        self.session_defaults = None  # (formularz, stan) nowej sesji - zapamiętane po zbudowaniu interfejsu
+        self.battle_index = BattleIndex()  # Indeks odwrócony starć do wyszukiwania
         
         # System jednostek
-        self.units = {"własne": {}, "wroga": {}}  # Słownik jednostek: {"własne": {id: dane}, "wroga": {id: dane}}
         self.current_unit = None  # Obecnie wybrana jednostka (ID)
         self.current_unit_side = "własne"  # Strona obecnie wybranej jednostki
+        self.unit_details_built = False  # Formularz szczegółów jest budowany raz i tylko przepinany
+        self.analytics = CampaignAnalytics()  # Statystyki jednostek i batalionów (z pamięcią podręczną)
+        
+        # Pamięć podręczna nazw wyświetlanych i ostatnio ustawionych list comboboxów
+        self.display_name_cache = {}  # {unit_id: (strona, nazwa wyświetlana)}
+        self.combo_values = {}  # {nazwa comboboxa: lista wartości}
+        self.combo_sources = {}  # {nazwa comboboxa: dane, z których zbudowano listę}
+        self.roster_version = 0  # Zwiększany przy każdej zmianie składu wykazu lub nazw wyświetlanych
         
         # Mapy ID->display name dla comboboxów bitwy
         self.unit_side1_id_to_display = {}
         self.unit_side2_id_to_display = {}
         
         # System batalionów
-        self.battalions = {}  # Słownik batalionów: {id: {"nazwa": string, "id": string}}
         self.current_battalion = None  # Obecnie wybrany batalion (ID)
         
         
         # Jednostki biorące udział w bitwie
-        self.participating_units = {"strona1": [], "strona2": []}  # Lista jednostek na każdej stronie
         self.side1_locked = False  # Czy strona 1 ma zablokowane automatyczne uzupełnianie
         self.side2_locked = False  # Czy strona 2 ma zablokowane automatyczne uzupełnianie
+        self.side_unit_rows = {1: [], 2: []}  # Pula wierszy listy uczestników (ramka, etykieta, przycisk)
+        self.side_unit_rows_visible = {1: 0, 2: 0}  # Liczba wierszy puli widocznych na każdej stronie
         
         # Jednostki wybrane do bitwy
         self.selected_unit_side1 = None  # ID wybranej jednostki dla strony 1
@@ -80,6 +216,7 @@ class DiceRollerApp:
         
         # Utworzenie interfejsu
         self.create_widgets()
+        self.session_defaults = self.capture_session_values()
     
     def center_window(self):
         """Centruje okno na ekranie"""
@@ -96,10 +233,19 @@ class DiceRollerApp:
     
     def get_unit_display_name(self, unit_id, side):
         """Zwraca sformatowaną nazwę jednostki do wyświetlania"""
+        cached = self.display_name_cache.get(unit_id)
+        if cached is not None and cached[0] == side:
+            return cached[1]
+        
         if unit_id not in self.units[side]:
             return "Nieznana jednostka"
         
-        unit_data = self.units[side][unit_id]
+        display_name = self.format_unit_display_name(self.units[side][unit_id])
+        self.display_name_cache[unit_id] = (side, display_name)
+        return display_name
+    
+    def format_unit_display_name(self, unit_data):
+        """Formatuje nazwę wyświetlaną z numeru, typu i batalionu jednostki"""
         number = unit_data.get('numer', 1)
         unit_type = unit_data.get('typ', 'kompania')
         battalion_id = unit_data.get('batalion', None)
@@ -115,6 +261,30 @@ class DiceRollerApp:
         
         return f"{number} {type_suffix}{battalion_part}"
     
+    def invalidate_display_names(self, unit_ids=None):
+        """Unieważnia nazwy wyświetlane podanych jednostek (None - wszystkich)"""
+        self.roster_version += 1
+        if unit_ids is None:
+            self.display_name_cache.clear()
+            return
+        for unit_id in unit_ids:
+            self.display_name_cache.pop(unit_id, None)
+    
+    def set_combo_values(self, key, combo, values, **options):
+        """Ustawia listę wartości comboboxa tylko gdy różni się od poprzedniej"""
+        if self.combo_values.get(key) != values:
+            combo.config(values=values, **options)
+            self.combo_values[key] = values
+        elif options:
+            combo.config(**options)
+    
+    def combo_source_changed(self, key, *source):
+        """Zwraca True (i zapamiętuje źródło), gdy dane listy comboboxa zmieniły się od ostatniej budowy"""
+        if key in self.combo_sources and self.combo_sources[key] == source:
+            return False
+        self.combo_sources[key] = source
+        return True
+    
     def get_battalion_display_name(self, battalion_id):
         """Zwraca nazwę batalionu do wyświetlania"""
         if battalion_id not in self.battalions:
@@ -145,7 +315,7 @@ class DiceRollerApp:
         self.update_battalion_combos()
         self.new_battalion_var.set("")
         
-        messagebox.showinfo("Sukces", f"Batalion '{battalion_name}' został utworzony!")
+        self.notify("Sukces", f"Batalion '{battalion_name}' został utworzony!")
     
     def on_battalion_selected(self, event=None):
         """Obsługuje wybór batalionu"""
@@ -180,8 +350,11 @@ class DiceRollerApp:
     def update_battalion_combos(self):
         """Aktualizuje comboboxi batalionów"""
         battalion_names = [data['nazwa'] for data in self.battalions.values()]
-        self.battalion_combo.config(values=battalion_names)
-        self.new_unit_battalion_combo.config(values=[''] + battalion_names)
+        # Panele jeszcze niezbudowane pobiorą listę przy tworzeniu
+        if "battalions" in self.built_panels:
+            self.set_combo_values('battalions', self.battalion_combo, battalion_names)
+        if "unit_creation" in self.built_panels:
+            self.set_combo_values('new_unit_battalion', self.new_unit_battalion_combo, [''] + battalion_names)
     
     def update_next_unit_number(self):
         """Aktualizuje następny numer jednostki dla wybranego batalionu"""
@@ -217,51 +390,7 @@ class DiceRollerApp:
     
     def migrate_old_units(self):
         """Migruje stare jednostki (z nazwami jako klucze) do nowego formatu z ID"""
-        units_to_migrate = {}
-        
-        for side in ['własne', 'wroga']:
-            units_to_migrate[side] = []
-            
-            for unit_key, unit_data in list(self.units[side].items()):
-                # Sprawdź czy to stara jednostka (bez pola 'id')
-                if 'id' not in unit_data:
-                    # To stara jednostka - przygotuj do migracji
-                    new_unit_id = self.generate_random_id()
-                    
-                    # Utwórz nowe dane jednostki
-                    # Znajdź najwyższy numer na tej stronie dla migracji
-                    max_number = 0
-                    for existing_data in self.units[side].values():
-                        if 'numer' in existing_data:
-                            if existing_data['numer'] > max_number:
-                                max_number = existing_data['numer']
-                    
-                    new_unit_data = {
-                        "id": new_unit_id,
-                        "numer": max_number + 1,
-                        "typ": "kompania",  # domyślnie kompania
-                        "batalion": None,   # brak batalionu
-                        "liczba_ludzi": unit_data.get("liczba_ludzi", 150),
-                        "doświadczenie": unit_data.get("doświadczenie", 0),
-                        "zapasy": unit_data.get("zapasy", 3),
-                        "liczba_zwycięstw": unit_data.get("liczba_zwycięstw", 0),
-                        "liczba_uzupełnień": unit_data.get("liczba_uzupełnień", 0),
-                        "strona": side,
-                        "historia_bitew": unit_data.get("historia_bitew", [])
-                    }
-                    
-                    units_to_migrate[side].append((unit_key, new_unit_id, new_unit_data))
-        
-        # Wykonaj migrację
-        for side in ['własne', 'wroga']:
-            for old_key, new_id, new_data in units_to_migrate[side]:
-                # Usuń starą jednostkę
-                del self.units[side][old_key]
-                # Dodaj nową jednostkę z ID
-                self.units[side][new_id] = new_data
-        
-        # Aktualizuj interfejs jeśli były migracje
-        total_migrated = sum(len(units_to_migrate[side]) for side in ['własne', 'wroga'])
+        total_migrated = migrate_legacy_units(self.units, self.generate_random_id)
         if total_migrated > 0:
             print(f"Zmigrowano {total_migrated} jednostek do nowego formatu")
     
@@ -312,168 +441,17 @@ class DiceRollerApp:
         )
         self.history_text.grid(row=0, column=0, sticky=tk.W+tk.E+tk.N+tk.S)
         
-        # Frame po prawej stronie (historia bitew)
-        battles_frame = ttk.LabelFrame(main_frame, text="Historia bitew", padding="10")
-        battles_frame.grid(row=0, column=2, sticky=tk.W+tk.E+tk.N+tk.S, padx=(5, 5))
-        
-        # Frame najdalej po prawej (wykaz jednostek)
-        units_frame = ttk.LabelFrame(main_frame, text="Wykaz Jednostek", padding="10")
-        units_frame.grid(row=0, column=3, sticky=tk.W+tk.E+tk.N+tk.S, padx=(5, 0))
-        
-        # Wybor bitwy
-        battle_selection_frame = ttk.Frame(battles_frame)
-        battle_selection_frame.grid(row=0, column=0, sticky=tk.W+tk.E, pady=(0, 10))
-        
-        ttk.Label(battle_selection_frame, text="Wybierz bitwę:", font=("Arial", 10, "bold")).grid(row=0, column=0, sticky=tk.W)
-        
-        self.battle_var = tk.StringVar(value="Niezapisana")
-        self.battle_combo = ttk.Combobox(battle_selection_frame, textvariable=self.battle_var, 
-                                        values=self.battle_names, state="readonly", width=20)
-        self.battle_combo.grid(row=1, column=0, sticky=tk.W+tk.E, pady=(5, 0))
-        self.battle_combo.bind("<<ComboboxSelected>>", self.on_battle_selected)
-        
-        # Tworzenie nowej bitwy
-        new_battle_frame = ttk.Frame(battles_frame)
-        new_battle_frame.grid(row=1, column=0, sticky=tk.W+tk.E, pady=(10, 10))
-        
-        ttk.Label(new_battle_frame, text="Nowa bitwa:", font=("Arial", 10, "bold")).grid(row=0, column=0, sticky=tk.W)
-        
-        self.new_battle_var = tk.StringVar()
-        self.new_battle_entry = ttk.Entry(new_battle_frame, textvariable=self.new_battle_var, width=15)
-        self.new_battle_entry.grid(row=1, column=0, sticky=tk.W+tk.E, pady=(5, 5))
-        
-        ttk.Button(new_battle_frame, text="Stwórz", command=self.create_new_battle).grid(row=1, column=1, padx=(5, 0), pady=(5, 5))
-        
-        # Informacje o stratach dla wybranej bitwy
-        self.battle_stats_label = ttk.Label(battles_frame, text="", font=("Arial", 9), 
-                                           foreground="blue", justify=tk.LEFT)
-        self.battle_stats_label.grid(row=2, column=0, sticky=tk.W+tk.E, pady=(10, 10))
-        
-        # Historia wybranej bitwy
-        self.battle_history_text = scrolledtext.ScrolledText(
-            battles_frame, 
-            width=35, 
-            height=25, 
-            font=("Arial", 9),
-            state=tk.DISABLED
-        )
-        self.battle_history_text.grid(row=3, column=0, sticky=tk.W+tk.E+tk.N+tk.S)
-        
-        # Przyciski zapisz/wczytaj
-        save_load_frame = ttk.Frame(battles_frame)
-        save_load_frame.grid(row=4, column=0, sticky=tk.W+tk.E, pady=(10, 0))
-        
-        ttk.Button(save_load_frame, text="Zapisz rejestr", command=self.save_battles).grid(row=0, column=0, padx=(0, 5))
-        ttk.Button(save_load_frame, text="Wczytaj rejestr", command=self.load_battles).grid(row=0, column=1, padx=(5, 0))
-        
-        # === WYKAZ JEDNOSTEK ===
-        
-        # Przyciski zapisz/wczytaj jednostek
-        units_save_load_frame = ttk.Frame(units_frame)
-        units_save_load_frame.grid(row=0, column=0, sticky=tk.W+tk.E, pady=(0, 10))
-        
-        ttk.Button(units_save_load_frame, text="Zapisz", command=self.save_units).grid(row=0, column=0, padx=(0, 5))
-        ttk.Button(units_save_load_frame, text="Wczytaj", command=self.load_units).grid(row=0, column=1, padx=(5, 0))
-        
-        # Wybierz jednostkę
-        unit_selection_frame = ttk.Frame(units_frame)
-        unit_selection_frame.grid(row=1, column=0, sticky=tk.W+tk.E, pady=(0, 10))
-        
-        ttk.Label(unit_selection_frame, text="Wybierz jednostkę:", font=("Arial", 10, "bold")).grid(row=0, column=0, sticky=tk.W, columnspan=2)
-        
-        # Jednostki własne
-        ttk.Label(unit_selection_frame, text="Własne:", font=("Arial", 9)).grid(row=1, column=0, sticky=tk.W, pady=(5, 0))
-        self.own_units_var = tk.StringVar()
-        self.own_units_combo = ttk.Combobox(unit_selection_frame, textvariable=self.own_units_var, 
-                                           values=[], state="readonly", width=18)
-        self.own_units_combo.grid(row=2, column=0, sticky=tk.W+tk.E, pady=(2, 5))
-        self.own_units_combo.bind("<<ComboboxSelected>>", lambda e: self.on_unit_selected("własne"))
-        
-        # Jednostki wroga
-        ttk.Label(unit_selection_frame, text="Wroga:", font=("Arial", 9)).grid(row=3, column=0, sticky=tk.W)
-        self.enemy_units_var = tk.StringVar()
-        self.enemy_units_combo = ttk.Combobox(unit_selection_frame, textvariable=self.enemy_units_var, 
-                                             values=[], state="readonly", width=18)
-        self.enemy_units_combo.grid(row=4, column=0, sticky=tk.W+tk.E, pady=(2, 5))
-        self.enemy_units_combo.bind("<<ComboboxSelected>>", lambda e: self.on_unit_selected("wroga"))
-        
-        # === BATALIONY ===
-        battalions_frame = ttk.LabelFrame(units_frame, text="Bataliony", padding="5")
-        battalions_frame.grid(row=2, column=0, sticky=tk.W+tk.E, pady=(10, 10))
-        
-        # Wybór batalionu
-        ttk.Label(battalions_frame, text="Batalion:", font=("Arial", 9)).grid(row=0, column=0, sticky=tk.W)
-        self.battalion_var = tk.StringVar()
-        self.battalion_combo = ttk.Combobox(battalions_frame, textvariable=self.battalion_var, 
-                                           values=[], state="readonly", width=15)
-        self.battalion_combo.grid(row=1, column=0, sticky=tk.W+tk.E, pady=(2, 5))
-        self.battalion_combo.bind("<<ComboboxSelected>>", self.on_battalion_selected)
-        
-        # Informacje o batalionie
-        self.battalion_info_label = ttk.Label(battalions_frame, text="", font=("Arial", 8), 
-                                             foreground="blue")
-        self.battalion_info_label.grid(row=2, column=0, sticky=tk.W, pady=(0, 5))
-        
-        # Tworzenie nowego batalionu
-        new_battalion_frame = ttk.Frame(battalions_frame)
-        new_battalion_frame.grid(row=3, column=0, sticky=tk.W+tk.E, pady=(5, 0))
-        
-        self.new_battalion_var = tk.StringVar()
-        self.new_battalion_entry = ttk.Entry(new_battalion_frame, textvariable=self.new_battalion_var, width=10)
-        self.new_battalion_entry.grid(row=0, column=0, sticky=tk.W+tk.E)
-        
-        ttk.Button(new_battalion_frame, text="+", command=self.create_new_battalion, width=3).grid(row=0, column=1, padx=(5, 0))
-        
-        # Stwórz jednostkę
-        create_unit_frame = ttk.Frame(units_frame)
-        create_unit_frame.grid(row=3, column=0, sticky=tk.W+tk.E, pady=(10, 10))
-        
-        ttk.Label(create_unit_frame, text="Stwórz jednostkę:", font=("Arial", 10, "bold")).grid(row=0, column=0, sticky=tk.W, columnspan=2)
-        
-        # Numer jednostki
-        ttk.Label(create_unit_frame, text="Numer:", font=("Arial", 9)).grid(row=1, column=0, sticky=tk.W, pady=(5, 0))
-        self.new_unit_number_var = tk.StringVar()
-        self.new_unit_number_entry = ttk.Entry(create_unit_frame, textvariable=self.new_unit_number_var, width=8)
-        self.new_unit_number_entry.grid(row=1, column=1, sticky=tk.W, pady=(5, 0))
-        
-        # Typ jednostki
-        ttk.Label(create_unit_frame, text="Typ:", font=("Arial", 9)).grid(row=2, column=0, sticky=tk.W, pady=(5, 0))
-        self.new_unit_type_var = tk.StringVar(value="kompania")
-        unit_type_frame = ttk.Frame(create_unit_frame)
-        unit_type_frame.grid(row=2, column=1, sticky=tk.W, pady=(5, 0))
-        ttk.Radiobutton(unit_type_frame, text="Kompania", variable=self.new_unit_type_var, value="kompania").grid(row=0, column=0)
-        ttk.Radiobutton(unit_type_frame, text="Grupa", variable=self.new_unit_type_var, value="grupa").grid(row=0, column=1, padx=(10, 0))
-        
-        # Batalion
-        ttk.Label(create_unit_frame, text="Batalion:", font=("Arial", 9)).grid(row=3, column=0, sticky=tk.W, pady=(5, 0))
-        self.new_unit_battalion_var = tk.StringVar()
-        self.new_unit_battalion_combo = ttk.Combobox(create_unit_frame, textvariable=self.new_unit_battalion_var, 
-                                                    values=[], state="readonly", width=12)
-        self.new_unit_battalion_combo.grid(row=3, column=1, sticky=tk.W, pady=(5, 0))
-        self.new_unit_battalion_combo.bind("<<ComboboxSelected>>", lambda e: self.update_next_unit_number())
-        
-        # Przyciski wyboru strony dla nowej jednostki
-        create_buttons_frame = ttk.Frame(create_unit_frame)
-        create_buttons_frame.grid(row=4, column=0, columnspan=2, pady=(5, 0))
-        
-        self.new_unit_side_var = tk.StringVar(value="własne")
-        ttk.Radiobutton(create_buttons_frame, text="Swoje", variable=self.new_unit_side_var, value="własne").grid(row=0, column=0, padx=(0, 10))
-        ttk.Radiobutton(create_buttons_frame, text="Wróg", variable=self.new_unit_side_var, value="wroga").grid(row=0, column=1, padx=(10, 0))
-        
-        ttk.Button(create_unit_frame, text="Stwórz", command=self.create_new_unit).grid(row=5, column=0, columnspan=2, pady=(5, 0))
+        # Frame po prawej stronie (historia bitew) - zawartość budowana w ensure_battles_panel
+        self.battles_frame = ttk.LabelFrame(main_frame, text="Historia bitew", padding="10")
+        self.battles_frame.grid(row=0, column=2, sticky=tk.W+tk.E+tk.N+tk.S, padx=(5, 5))
         
-        # Frame dla szczegółów jednostki (początkowo ukryty)
-        self.unit_details_frame = ttk.LabelFrame(units_frame, text="Szczegóły jednostki", padding="10")
-        # Nie gridujemy go na początku - pojawi się po wybraniu jednostki
+        # Frame najdalej po prawej (wykaz jednostek) - zawartość budowana w ensure_units_panel
+        self.units_frame = ttk.LabelFrame(main_frame, text="Wykaz Jednostek", padding="10")
+        self.units_frame.grid(row=0, column=3, sticky=tk.W+tk.E+tk.N+tk.S, padx=(5, 0))
         
         # Migracja starych jednostek do nowego formatu
         self.migrate_old_units()
         
-        # Inicjalizacja comboboxów dla batalionów i automat. numer
-        self.update_battalion_combos()
-        self.new_unit_side_var.trace('w', lambda *args: self.update_next_unit_number())
-        self.update_next_unit_number()
-        
         # Bind scroll wheel to canvas for both vertical and horizontal scrolling
         def _on_mousewheel(event):
             # Sprawdzenie czy wciśnięty jest Shift
@@ -503,13 +481,26 @@ class DiceRollerApp:
         self.root.bind("<Button-4>", _on_mousewheel_linux_up)
         self.root.bind("<Button-5>", _on_mousewheel_linux_down)
         
-        # Tytuł aplikacji
+        # Tytuł aplikacji i wybór sesji bitwy
+        header_frame = ttk.Frame(self.game_frame)
+        header_frame.grid(row=0, column=0, columnspan=3, pady=(0, 20), sticky=tk.W+tk.E)
         title_label = ttk.Label(
-            self.game_frame, 
+            header_frame, 
             text="Rzut dwoma 4-ściennymi kośćmi", 
             font=("Arial", 16, "bold")
         )
-        title_label.grid(row=0, column=0, columnspan=3, pady=(0, 20))
+        title_label.pack(side=tk.LEFT)
+        
+        session_frame = ttk.Frame(header_frame)
+        session_frame.pack(side=tk.RIGHT)
+        ttk.Label(session_frame, text="Sesja:").pack(side=tk.LEFT)
+        self.session_var = tk.StringVar(value=self.sessions.active.name)
+        self.session_combo = ttk.Combobox(session_frame, textvariable=self.session_var, state="readonly", width=14,
+                                          values=[session.name for session in self.sessions.ordered()])
+        self.session_combo.pack(side=tk.LEFT, padx=(5, 0))
+        self.session_combo.bind("<<ComboboxSelected>>", self.on_session_selected)
+        ttk.Button(session_frame, text="➕", width=3, command=self.create_session).pack(side=tk.LEFT, padx=(5, 0))
+        ttk.Button(session_frame, text="✖", width=3, command=self.close_session).pack(side=tk.LEFT, padx=(2, 0))
         
         # Frame dla ustawień atak/obrona/w ruchu
         combat_mode_frame = ttk.LabelFrame(self.game_frame, text="Rodzaj działania", padding="10")
@@ -568,7 +559,7 @@ class DiceRollerApp:
         ttk.Radiobutton(side1_unit_frame, text="Brak", variable=self.unit_side1_type_var, value="brak", command=self.on_unit_type_change).grid(row=1, column=2, sticky=tk.W)
         
         self.unit_side1_var = tk.StringVar()
-        self.unit_side1_combo = ttk.Combobox(side1_unit_frame, textvariable=self.unit_side1_var, values=[], state="readonly", width=15)
+        self.unit_side1_combo = SearchablePicker(side1_unit_frame, textvariable=self.unit_side1_var, values=[], state="readonly", width=15)
         self.unit_side1_combo.grid(row=2, column=0, columnspan=3, sticky=tk.W+tk.E, pady=(5, 0))
         self.unit_side1_combo.bind("<<ComboboxSelected>>", self.on_battle_unit_selected)
         
@@ -586,7 +577,7 @@ class DiceRollerApp:
         ttk.Radiobutton(side2_unit_frame, text="Brak", variable=self.unit_side2_type_var, value="brak", command=self.on_unit_type_change).grid(row=1, column=2, sticky=tk.W)
         
         self.unit_side2_var = tk.StringVar()
-        self.unit_side2_combo = ttk.Combobox(side2_unit_frame, textvariable=self.unit_side2_var, values=[], state="readonly", width=15)
+        self.unit_side2_combo = SearchablePicker(side2_unit_frame, textvariable=self.unit_side2_var, values=[], state="readonly", width=15)
         self.unit_side2_combo.grid(row=2, column=0, columnspan=3, sticky=tk.W+tk.E, pady=(5, 0))
         self.unit_side2_combo.bind("<<ComboboxSelected>>", self.on_battle_unit_selected)
         
@@ -711,14 +702,30 @@ class DiceRollerApp:
         self.tactical_result_label.grid(row=4, column=0, columnspan=3, pady=(10, 5))
         
         
-        # Przycisk do generowania wyniku
+        # Przycisk do generowania wyniku i sterowanie trybem szybkim
+        roll_frame = ttk.Frame(self.game_frame)
+        roll_frame.grid(row=5, column=0, columnspan=3, pady=(5, 20))
+        
         self.roll_button = ttk.Button(
-            self.game_frame,
+            roll_frame,
             text="Wynik",
             command=self.roll_dice,
             style="Roll.TButton"
         )
-        self.roll_button.grid(row=5, column=0, columnspan=3, pady=(5, 20))
+        self.roll_button.grid(row=0, column=0, rowspan=2, padx=(0, 10))
+        
+        ttk.Checkbutton(
+            roll_frame,
+            text="⚡ Tryb szybki (F5 rzut, F6 powtórz, Ctrl+Z cofnij)",
+            variable=self.rapid_mode_var,
+            command=self.on_rapid_mode_toggle
+        ).grid(row=0, column=1, columnspan=3, sticky=tk.W)
+        ttk.Button(roll_frame, text="🔁 Powtórz", command=self.repeat_roll).grid(row=1, column=1, sticky=tk.W)
+        ttk.Button(roll_frame, text="↶ Cofnij", command=self.undo_last_roll).grid(row=1, column=2, sticky=tk.W, padx=(5, 0))
+        ttk.Button(roll_frame, text="⏩ Rozstrzygnij", command=self.show_auto_resolve_dialog).grid(row=1, column=3, sticky=tk.W, padx=(5, 0))
+        ttk.Button(roll_frame, text="⏱", command=self.show_profiler_window, width=3).grid(row=1, column=4, sticky=tk.W, padx=(5, 0))
+        ttk.Button(roll_frame, text="RAM", command=self.show_memory_window, width=4).grid(row=1, column=5, sticky=tk.W, padx=(5, 0))
+        ttk.Button(roll_frame, text="🔗", command=self.show_sync_window, width=3).grid(row=1, column=6, sticky=tk.W, padx=(5, 0))
         
         # Stylizacja przycisków
         style = ttk.Style()
@@ -838,6 +845,15 @@ class DiceRollerApp:
         fort_combo2 = ttk.Combobox(right_frame, textvariable=self.dice2_fort_var, values=["0", "1", "2", "3"], width=3, state="readonly")
         fort_combo2.grid(row=7, column=1, padx=(0, 5), pady=(5, 0))
         
+        # Zmiana ustawień stron odświeża prognozę starcia w panelu statystyk bitwy
+        for variable in (self.dice1_people_var, self.dice2_people_var, self.dice1_modifier_var, self.dice2_modifier_var,
+                         self.dice1_range_var, self.dice2_range_var, self.dice1_exp_var, self.dice2_exp_var,
+                         self.dice1_surrounded_var, self.dice2_surrounded_var, self.dice1_defense_var, self.dice2_defense_var,
+                         self.dice1_supply_var, self.dice2_supply_var, self.dice1_fort_var, self.dice2_fort_var,
+                         self.side1_attack_var, self.side2_attack_var, self.side1_defense_var, self.side2_defense_var,
+                         self.side1_motion_var, self.side2_motion_var):
+            variable.trace_add('write', lambda *args: self.mark_dirty("battle_stats"))
+        
         # Informacja o zakresie wartości
         info_label = ttk.Label(
             self.game_frame,
@@ -864,508 +880,1263 @@ class DiceRollerApp:
         modifiers_frame.columnconfigure(1, weight=1)
         history_frame.columnconfigure(0, weight=1)
         history_frame.rowconfigure(0, weight=1)
-        battles_frame.columnconfigure(0, weight=1)
-        battles_frame.rowconfigure(3, weight=1)
-        battle_selection_frame.columnconfigure(0, weight=1)
-        new_battle_frame.columnconfigure(0, weight=1)
-        save_load_frame.columnconfigure(0, weight=1)
-        save_load_frame.columnconfigure(1, weight=1)
         
         # Focus na przycisk
         self.roll_button.focus()
         
         # Bind Enter key to roll dice
         self.root.bind('<Return>', lambda event: self.roll_dice())
-    
-    def reset_modifiers(self):
-        """Resetuje wszystkie modyfikatory do wartości domyślnych"""
-        # Reset modyfikatorów strony 1
-        self.dice1_modifier_var.set("0")
-        self.dice1_range_var.set("0")
-        self.dice1_surrounded_var.set(False)
-        self.dice1_exp_var.set(0)
-        self.dice1_defense_var.set(False)
-        self.dice1_supply_var.set(False)
-        self.dice1_fort_var.set(0)
         
-        # Reset modyfikatorów strony 2
-        self.dice2_modifier_var.set("0")
-        self.dice2_range_var.set("0")
-        self.dice2_surrounded_var.set(False)
-        self.dice2_exp_var.set(0)
-        self.dice2_defense_var.set(False)
-        self.dice2_supply_var.set(False)
-        self.dice2_fort_var.set(0)
-        
-        # Aktualizacja wyświetlania bonusów doświadczenia
-        self.update_exp_bonuses_display()
-    
-    def on_side1_attack_change(self):
-        """Obsługuje zmianę ataku strony 1"""
-        if self.side1_attack_var.get():
-            self.side1_defense_var.set(False)
-            self.side1_motion_var.set(False)
-            self.side2_attack_var.set(False)
-            self.side2_defense_var.set(True)
-            self.side2_motion_var.set(False)
-    
-    def on_side1_defense_change(self):
-        """Obsługuje zmianę obrony strony 1"""
-        if self.side1_defense_var.get():
-            self.side1_attack_var.set(False)
-            self.side1_motion_var.set(False)
-            self.side2_attack_var.set(True)
-            self.side2_defense_var.set(False)
-            self.side2_motion_var.set(False)
-    
-    def on_side1_motion_change(self):
-        """Obsługuje zmianę ruchu strony 1"""
-        if self.side1_motion_var.get():
-            self.side1_attack_var.set(False)
-            self.side1_defense_var.set(False)
-            # Nie wyłączamy W ruchu dla strony 2 - może być niezależnie
-    
-    def on_side2_attack_change(self):
-        """Obsługuje zmianę ataku strony 2"""
-        if self.side2_attack_var.get():
-            self.side2_defense_var.set(False)
-            self.side2_motion_var.set(False)
-            self.side1_attack_var.set(False)
-            self.side1_defense_var.set(True)
-            self.side1_motion_var.set(False)
+        # Skróty trybu szybkiego
+        self.root.bind('<F5>', lambda event: self.rapid_hotkey(self.roll_dice))
+        self.root.bind('<F6>', lambda event: self.rapid_hotkey(self.repeat_roll))
+        self.root.bind('<Control-z>', lambda event: self.rapid_hotkey(self.undo_last_roll))
+        self.root.bind('<F12>', lambda event: self.show_profiler_window())
+        self.root.bind('<F11>', lambda event: self.show_memory_window())
+        self.root.bind('<Control-Tab>', self.next_session)
+        
+        # Panel walki gotowy - pozostałe panele powstaną po pierwszym wyświetleniu okna
+        self.mark_startup("combat_panel")
+        self.deferred_panels = [self.ensure_battles_panel, self.ensure_units_panel]
+        self.game_frame.bind('<Expose>', self.on_first_frame)
     
-    def on_side2_defense_change(self):
-        """Obsługuje zmianę obrony strony 2"""
-        if self.side2_defense_var.get():
-            self.side2_attack_var.set(False)
-            self.side2_motion_var.set(False)
-            self.side1_attack_var.set(True)
-            self.side1_defense_var.set(False)
-            self.side1_motion_var.set(False)
+    def mark_startup(self, name):
+        """Zapisuje czas etapu uruchamiania (sekundy od utworzenia aplikacji)"""
+        if name not in self.startup_marks:
+            self.startup_marks[name] = time.perf_counter() - self.startup_started
     
-    def on_side2_motion_change(self):
-        """Obsługuje zmianę ruchu strony 2"""
-        if self.side2_motion_var.get():
-            self.side2_attack_var.set(False)
-            self.side2_defense_var.set(False)
-            # Nie wyłączamy W ruchu dla strony 1 - może być niezależnie
+    def on_first_frame(self, event=None):
+        """Pierwsze odrysowanie okna - kolejne panele budowane w czasie bezczynności"""
+        self.game_frame.unbind('<Expose>')
+        self.mark_startup("first_frame")
+        self.root.after_idle(self.build_next_deferred_panel)
     
-    def update_exp_bonuses_display(self, event=None):
-        """Aktualizuje wyświetlanie bonusów doświadczenia obok pól wejściowych"""
-        # Strona 1
-        exp1 = self.dice1_exp_var.get() if self.dice1_exp_var.get() > 0 else 0
-        if exp1 > 0:
-            self.dice1_modifier_bonus_label.config(text=f"(+{exp1})")
-            self.dice1_range_bonus_label.config(text=f"(+{exp1 * 2})")
-        else:
-            self.dice1_modifier_bonus_label.config(text="")
-            self.dice1_range_bonus_label.config(text="")
-        
-        # Strona 2
-        exp2 = self.dice2_exp_var.get() if self.dice2_exp_var.get() > 0 else 0
-        if exp2 > 0:
-            self.dice2_modifier_bonus_label.config(text=f"(+{exp2})")
-            self.dice2_range_bonus_label.config(text=f"(+{exp2 * 2})")
+    def build_next_deferred_panel(self):
+        """Buduje jeden odroczony panel na każde wywołanie, żeby nie blokować pętli zdarzeń"""
+        while self.deferred_panels:
+            ensure_panel = self.deferred_panels.pop(0)
+            if ensure_panel():
+                break
+        if self.deferred_panels:
+            self.root.after_idle(self.build_next_deferred_panel)
         else:
-            self.dice2_modifier_bonus_label.config(text="")
-            self.dice2_range_bonus_label.config(text="")
+            self.root.update_idletasks()
+            self.mark_startup("interactive")
     
-    def roll_dice(self):
-        """Rzuca dwiema 4-ściennymi kośćmi i aktualizuje wyniki"""
-        # Pobieranie podstawowych modyfikatorów
-        try:
-            self.dice1_modifier = int(self.dice1_modifier_var.get())
-        except ValueError:
-            self.dice1_modifier = 0
-            self.dice1_modifier_var.set("0")
-            
-        try:
-            self.dice2_modifier = int(self.dice2_modifier_var.get())
-        except ValueError:
-            self.dice2_modifier = 0
-            self.dice2_modifier_var.set("0")
+    def ensure_battles_panel(self):
+        """Buduje panel historii bitew przy pierwszym użyciu; zwraca True jeśli został zbudowany teraz"""
+        if "battles" in self.built_panels:
+            return False
+        self.built_panels.add("battles")
         
-        # Pobieranie modyfikatorów zakresu
-        try:
-            self.dice1_range_modifier = int(self.dice1_range_var.get())
-        except ValueError:
-            self.dice1_range_modifier = 0
-            self.dice1_range_var.set("0")
-            
-        try:
-            self.dice2_range_modifier = int(self.dice2_range_var.get())
-        except ValueError:
-            self.dice2_range_modifier = 0
-            self.dice2_range_var.set("0")
+        # Wybor bitwy
+        battle_selection_frame = ttk.Frame(self.battles_frame)
+        battle_selection_frame.grid(row=0, column=0, sticky=tk.W+tk.E, pady=(0, 10))
         
-        # Pobieranie liczby ludzi
-        try:
-            self.dice1_people_original = int(self.dice1_people_var.get())
-        except ValueError:
-            self.dice1_people_original = 0
-            self.dice1_people_var.set("0")
-            
-        try:
-            self.dice2_people_original = int(self.dice2_people_var.get())
-        except ValueError:
-            self.dice2_people_original = 0
-            self.dice2_people_var.set("0")
-        
-        # Obliczanie przewagi liczebnej (2.1x = +1, 4.2x = +2, itd.)
-        numerical_advantage_1 = 0
-        numerical_advantage_2 = 0
-        
-        if self.dice1_people_original > 0 and self.dice2_people_original > 0:
-            ratio_1_vs_2 = self.dice1_people_original / self.dice2_people_original
-            ratio_2_vs_1 = self.dice2_people_original / self.dice1_people_original
-            
-            if ratio_1_vs_2 >= 2.1:
-                numerical_advantage_1 = int(ratio_1_vs_2 / 2.1)
-            elif ratio_2_vs_1 >= 2.1:
-                numerical_advantage_2 = int(ratio_2_vs_1 / 2.1)
-        
-        # Dodanie bonusów doświadczenia do zakresu i modyfikatora
-        dice1_exp = self.dice1_exp_var.get() if self.dice1_exp_var.get() > 0 else 0
-        dice2_exp = self.dice2_exp_var.get() if self.dice2_exp_var.get() > 0 else 0
-        
-        dice1_exp_range_bonus = dice1_exp * 2  # +2 do oczek za każdy poziom
-        dice2_exp_range_bonus = dice2_exp * 2
-        
-        # Losowanie wartości dla obu kości z uwzględnieniem modyfikatora zakresu i bonusów doświadczenia
-        dice1_max = 4 + self.dice1_range_modifier + dice1_exp_range_bonus
-        dice2_max = 4 + self.dice2_range_modifier + dice2_exp_range_bonus
-        
-        self.dice1_value = random.randint(1, max(1, dice1_max))
-        self.dice2_value = random.randint(1, max(1, dice2_max))
-        
-        # Obliczanie wszystkich modyfikatorów
-        dice1_total_modifier = self.dice1_modifier
-        dice2_total_modifier = self.dice2_modifier
-        
-        # Dodawanie modyfikatora "Otoczony"
-        if self.dice1_surrounded_var.get():
-            dice1_total_modifier -= 1
-        if self.dice2_surrounded_var.get():
-            dice2_total_modifier -= 1
-        
-        # Dodawanie modyfikatorów doświadczenia i przewagi liczebnej
-        dice1_total_modifier += self.dice1_exp_var.get() + numerical_advantage_1
-        dice2_total_modifier += self.dice2_exp_var.get() + numerical_advantage_2
-        
-        # Dodawanie innych modyfikatorów
-        if self.dice1_defense_var.get():
-            dice1_total_modifier += 1
-        if self.dice2_defense_var.get():
-            dice2_total_modifier += 1
-            
-        if self.dice1_supply_var.get():
-            dice1_total_modifier -= 1
-        if self.dice2_supply_var.get():
-            dice2_total_modifier -= 1
-            
-        # Fortyfikacje
-        try:
-            dice1_total_modifier += int(self.dice1_fort_var.get())
-        except ValueError:
-            pass
-        try:
-            dice2_total_modifier += int(self.dice2_fort_var.get())
-        except ValueError:
-            pass
+        ttk.Label(battle_selection_frame, text="Wybierz bitwę:", font=("Arial", 10, "bold")).grid(row=0, column=0, sticky=tk.W)
         
-        # Obliczanie wartości końcowych
-        dice1_final = self.dice1_value + dice1_total_modifier
-        dice2_final = self.dice2_value + dice2_total_modifier
+        self.battle_var = tk.StringVar(value="Niezapisana")
+        self.battle_combo = SearchablePicker(battle_selection_frame, textvariable=self.battle_var, 
+                                             values=self.battle_names, state="readonly", width=20)
+        self.battle_combo.grid(row=1, column=0, sticky=tk.W+tk.E, pady=(5, 0))
+        self.battle_combo.bind("<<ComboboxSelected>>", self.on_battle_selected)
         
-        # Aktualizacja etykiet z wynikami i kolorami (kolor bazuje na wartości końcowej)
-        self.dice1_label.config(text=str(dice1_final), foreground=self.get_color_for_value(dice1_final))
-        self.dice2_label.config(text=str(dice2_final), foreground=self.get_color_for_value(dice2_final))
+        # Tworzenie nowej bitwy
+        new_battle_frame = ttk.Frame(self.battles_frame)
+        new_battle_frame.grid(row=1, column=0, sticky=tk.W+tk.E, pady=(10, 10))
         
-        # Obliczanie wyników bitwy
-        self.calculate_battle_results(dice1_final, dice2_final)
+        ttk.Label(new_battle_frame, text="Nowa bitwa:", font=("Arial", 10, "bold")).grid(row=0, column=0, sticky=tk.W)
         
-        # Aktualizacja wyników liczby ludzi ze stratami i przewagą liczebną
-        dice1_text = f"Wynik: {self.dice1_people_result} ludzi\nStraty: {getattr(self, 'dice1_losses', 0)}"
-        dice2_text = f"Wynik: {self.dice2_people_result} ludzi\nStraty: {getattr(self, 'dice2_losses', 0)}"
+        self.new_battle_var = tk.StringVar()
+        self.new_battle_entry = ttk.Entry(new_battle_frame, textvariable=self.new_battle_var, width=15)
+        self.new_battle_entry.grid(row=1, column=0, sticky=tk.W+tk.E, pady=(5, 5))
         
-        # Dodanie informacji o przewadze liczebnej pod stratami
-        if numerical_advantage_1 > 0:
-            dice1_text += f"\nPrzewaga: +{numerical_advantage_1}"
-        if numerical_advantage_2 > 0:
-            dice2_text += f"\nPrzewaga: +{numerical_advantage_2}"
+        ttk.Button(new_battle_frame, text="Stwórz", command=self.create_new_battle).grid(row=1, column=1, padx=(5, 0), pady=(5, 5))
         
-        self.dice1_people_result_label.config(text=dice1_text)
-        self.dice2_people_result_label.config(text=dice2_text)
+        # Informacje o stratach dla wybranej bitwy
+        self.battle_stats_label = ttk.Label(self.battles_frame, text="", font=("Arial", 9), 
+                                           foreground="blue", justify=tk.LEFT)
+        self.battle_stats_label.grid(row=2, column=0, sticky=tk.W+tk.E, pady=(10, 10))
+        
+        # Historia wybranej bitwy
+        self.battle_history_text = scrolledtext.ScrolledText(
+            self.battles_frame, 
+            width=35, 
+            height=25, 
+            font=("Arial", 9),
+            state=tk.DISABLED
+        )
+        self.battle_history_text.grid(row=3, column=0, sticky=tk.W+tk.E+tk.N+tk.S)
         
-        # Informacja o przewadze liczebnej wyświetlana w tabeli wyników
+        # Przyciski zapisz/wczytaj
+        save_load_frame = ttk.Frame(self.battles_frame)
+        save_load_frame.grid(row=4, column=0, sticky=tk.W+tk.E, pady=(10, 0))
         
-        # Aktualizacja ikon doświadczenia
-        self.dice1_exp_icon.config(text="⭐ Zwycięstwo" if self.dice1_gets_exp else "")
-        self.dice2_exp_icon.config(text="⭐ Zwycięstwo" if self.dice2_gets_exp else "")
+        ttk.Button(save_load_frame, text="Zapisz rejestr", command=self.save_battles).grid(row=0, column=0, padx=(0, 5))
+        ttk.Button(save_load_frame, text="Wczytaj rejestr", command=self.load_battles).grid(row=0, column=1, padx=(5, 0))
+        ttk.Button(save_load_frame, text="🔍 Szukaj starć", command=self.show_battle_search).grid(row=1, column=0, padx=(0, 5), pady=(5, 0))
+        ttk.Button(save_load_frame, text="Eksport CSV", command=self.export_history_csv).grid(row=1, column=1, padx=(5, 0), pady=(5, 0))
+        
+        self.battles_frame.columnconfigure(0, weight=1)
+        self.battles_frame.rowconfigure(3, weight=1)
+        battle_selection_frame.columnconfigure(0, weight=1)
+        new_battle_frame.columnconfigure(0, weight=1)
+        save_load_frame.columnconfigure(0, weight=1)
+        save_load_frame.columnconfigure(1, weight=1)
         
-        # Rozdzielenie strat między jednostkami uczestniczącymi
-        self.distribute_losses_among_units()
+        # Wypełnienie panelu bieżącym stanem
+        self.battle_var.set(self.current_battle)
+        self.update_battle_stats()
+        self.update_battle_history_display()
+        return True
+    
+    def ensure_units_panel(self):
+        """Buduje panel wykazu jednostek (z batalionami i tworzeniem jednostek) przy pierwszym użyciu"""
+        if "units" in self.built_panels:
+            return False
+        self.built_panels.add("units")
         
-        # Aktualizacja statystyk jednostek po rzucie
-        self.update_unit_stats_after_battle(dice1_final, dice2_final)
+        # === WYKAZ JEDNOSTEK ===
         
-        # Obliczanie i wyświetlanie wyników taktycznych
-        self.calculate_and_display_tactical_results(dice1_final, dice2_final)
+        # Przyciski zapisz/wczytaj jednostek
+        units_save_load_frame = ttk.Frame(self.units_frame)
+        units_save_load_frame.grid(row=0, column=0, sticky=tk.W+tk.E, pady=(0, 10))
         
-        # Dodanie do historii (bez informacji o jednostkach)
-        self.add_to_history(dice1_final, dice2_final)
+        ttk.Button(units_save_load_frame, text="Zapisz", command=self.save_units).grid(row=0, column=0, padx=(0, 5))
+        ttk.Button(units_save_load_frame, text="Wczytaj", command=self.load_units).grid(row=0, column=1, padx=(5, 0))
         
-        # Dodanie do historii jednostek
-        self.add_to_unit_battle_history(dice1_final, dice2_final)
+        # Wybierz jednostkę
+        unit_selection_frame = ttk.Frame(self.units_frame)
+        unit_selection_frame.grid(row=1, column=0, sticky=tk.W+tk.E, pady=(0, 10))
         
-        # Efekt wizualny - krótka animacja przycisku
-        self.roll_button.config(state="disabled")
-        self.root.after(200, lambda: self.roll_button.config(state="normal"))
+        ttk.Label(unit_selection_frame, text="Wybierz jednostkę:", font=("Arial", 10, "bold")).grid(row=0, column=0, sticky=tk.W, columnspan=2)
         
-        # Komunikat o wyniku w zależności od rzutu
-        self.display_result_message()
-    
-    def calculate_and_display_tactical_results(self, dice1_final, dice2_final):
-        """Oblicza i wyświetla wyniki taktyczne na podstawie systemu atak/obrona"""
-        # Sprawdzanie czy mamy klasyczną sytuację atak vs obrona
-        attack_result = 0
-        defense_result = 0
-        
-        if self.side1_attack_var.get() and self.side2_defense_var.get():
-            attack_result = dice1_final
-            defense_result = dice2_final
-        elif self.side2_attack_var.get() and self.side1_defense_var.get():
-            attack_result = dice2_final
-            defense_result = dice1_final
+        # Jednostki własne
+        ttk.Label(unit_selection_frame, text="Własne:", font=("Arial", 9)).grid(row=1, column=0, sticky=tk.W, pady=(5, 0))
+        self.own_units_var = tk.StringVar()
+        self.own_units_combo = SearchablePicker(unit_selection_frame, textvariable=self.own_units_var, 
+                                                values=[], state="readonly", width=18)
+        self.own_units_combo.grid(row=2, column=0, sticky=tk.W+tk.E, pady=(2, 5))
+        self.own_units_combo.bind("<<ComboboxSelected>>", lambda e: self.on_unit_selected("własne"))
+        
+        # Jednostki wroga
+        ttk.Label(unit_selection_frame, text="Wroga:", font=("Arial", 9)).grid(row=3, column=0, sticky=tk.W)
+        self.enemy_units_var = tk.StringVar()
+        self.enemy_units_combo = SearchablePicker(unit_selection_frame, textvariable=self.enemy_units_var, 
+                                                  values=[], state="readonly", width=18)
+        self.enemy_units_combo.grid(row=4, column=0, sticky=tk.W+tk.E, pady=(2, 5))
+        self.enemy_units_combo.bind("<<ComboboxSelected>>", lambda e: self.on_unit_selected("wroga"))
+        
+        # Frame dla szczegółów jednostki (początkowo ukryty)
+        self.unit_details_frame = ttk.LabelFrame(self.units_frame, text="Szczegóły jednostki", padding="10")
+        # Nie gridujemy go na początku - pojawi się po wybraniu jednostki
+        
+        self.ensure_battalions_panel()
+        self.ensure_unit_creation_panel()
+        self.update_units_combos()
+        return True
+    
+    def ensure_battalions_panel(self):
+        """Buduje panel batalionów przy pierwszym użyciu"""
+        if "battalions" in self.built_panels:
+            return False
+        self.built_panels.add("battalions")
+        
+        # === BATALIONY ===
+        battalions_frame = ttk.LabelFrame(self.units_frame, text="Bataliony", padding="5")
+        battalions_frame.grid(row=2, column=0, sticky=tk.W+tk.E, pady=(10, 10))
+        
+        # Wybór batalionu
+        ttk.Label(battalions_frame, text="Batalion:", font=("Arial", 9)).grid(row=0, column=0, sticky=tk.W)
+        self.battalion_var = tk.StringVar()
+        self.battalion_combo = ttk.Combobox(battalions_frame, textvariable=self.battalion_var, 
+                                           values=[], state="readonly", width=15)
+        self.battalion_combo.grid(row=1, column=0, sticky=tk.W+tk.E, pady=(2, 5))
+        self.battalion_combo.bind("<<ComboboxSelected>>", self.on_battalion_selected)
+        
+        # Informacje o batalionie
+        self.battalion_info_label = ttk.Label(battalions_frame, text="", font=("Arial", 8), 
+                                             foreground="blue")
+        self.battalion_info_label.grid(row=2, column=0, sticky=tk.W, pady=(0, 5))
+        
+        # Tworzenie nowego batalionu
+        new_battalion_frame = ttk.Frame(battalions_frame)
+        new_battalion_frame.grid(row=3, column=0, sticky=tk.W+tk.E, pady=(5, 0))
+        
+        self.new_battalion_var = tk.StringVar()
+        self.new_battalion_entry = ttk.Entry(new_battalion_frame, textvariable=self.new_battalion_var, width=10)
+        self.new_battalion_entry.grid(row=0, column=0, sticky=tk.W+tk.E)
+        
+        ttk.Button(new_battalion_frame, text="+", command=self.create_new_battalion, width=3).grid(row=0, column=1, padx=(5, 0))
+        
+        self.update_battalion_combos()
+        return True
+    
+    def ensure_unit_creation_panel(self):
+        """Buduje formularz tworzenia jednostki przy pierwszym użyciu"""
+        if "unit_creation" in self.built_panels:
+            return False
+        self.built_panels.add("unit_creation")
+        
+        # Stwórz jednostkę
+        create_unit_frame = ttk.Frame(self.units_frame)
+        create_unit_frame.grid(row=3, column=0, sticky=tk.W+tk.E, pady=(10, 10))
+        
+        ttk.Label(create_unit_frame, text="Stwórz jednostkę:", font=("Arial", 10, "bold")).grid(row=0, column=0, sticky=tk.W, columnspan=2)
+        
+        # Numer jednostki
+        ttk.Label(create_unit_frame, text="Numer:", font=("Arial", 9)).grid(row=1, column=0, sticky=tk.W, pady=(5, 0))
+        self.new_unit_number_var = tk.StringVar()
+        self.new_unit_number_entry = ttk.Entry(create_unit_frame, textvariable=self.new_unit_number_var, width=8)
+        self.new_unit_number_entry.grid(row=1, column=1, sticky=tk.W, pady=(5, 0))
+        
+        # Typ jednostki
+        ttk.Label(create_unit_frame, text="Typ:", font=("Arial", 9)).grid(row=2, column=0, sticky=tk.W, pady=(5, 0))
+        self.new_unit_type_var = tk.StringVar(value="kompania")
+        unit_type_frame = ttk.Frame(create_unit_frame)
+        unit_type_frame.grid(row=2, column=1, sticky=tk.W, pady=(5, 0))
+        ttk.Radiobutton(unit_type_frame, text="Kompania", variable=self.new_unit_type_var, value="kompania").grid(row=0, column=0)
+        ttk.Radiobutton(unit_type_frame, text="Grupa", variable=self.new_unit_type_var, value="grupa").grid(row=0, column=1, padx=(10, 0))
+        
+        # Batalion
+        ttk.Label(create_unit_frame, text="Batalion:", font=("Arial", 9)).grid(row=3, column=0, sticky=tk.W, pady=(5, 0))
+        self.new_unit_battalion_var = tk.StringVar()
+        self.new_unit_battalion_combo = ttk.Combobox(create_unit_frame, textvariable=self.new_unit_battalion_var, 
+                                                    values=[], state="readonly", width=12)
+        self.new_unit_battalion_combo.grid(row=3, column=1, sticky=tk.W, pady=(5, 0))
+        self.new_unit_battalion_combo.bind("<<ComboboxSelected>>", lambda e: self.update_next_unit_number())
+        
+        # Przyciski wyboru strony dla nowej jednostki
+        create_buttons_frame = ttk.Frame(create_unit_frame)
+        create_buttons_frame.grid(row=4, column=0, columnspan=2, pady=(5, 0))
+        
+        self.new_unit_side_var = tk.StringVar(value="własne")
+        ttk.Radiobutton(create_buttons_frame, text="Swoje", variable=self.new_unit_side_var, value="własne").grid(row=0, column=0, padx=(0, 10))
+        ttk.Radiobutton(create_buttons_frame, text="Wróg", variable=self.new_unit_side_var, value="wroga").grid(row=0, column=1, padx=(10, 0))
+        
+        ttk.Button(create_unit_frame, text="Stwórz", command=self.create_new_unit).grid(row=5, column=0, columnspan=2, pady=(5, 0))
+        
+        # Inicjalizacja comboboxów dla batalionów i automat. numer
+        self.update_battalion_combos()
+        self.new_unit_side_var.trace('w', lambda *args: self.update_next_unit_number())
+        self.update_next_unit_number()
+        return True
+    
+    def reset_modifiers(self):
+        """Resetuje wszystkie modyfikatory do wartości domyślnych"""
+        # Reset modyfikatorów strony 1
+        self.dice1_modifier_var.set("0")
+        self.dice1_range_var.set("0")
+        self.dice1_surrounded_var.set(False)
+        self.dice1_exp_var.set(0)
+        self.dice1_defense_var.set(False)
+        self.dice1_supply_var.set(False)
+        self.dice1_fort_var.set(0)
+        
+        # Reset modyfikatorów strony 2
+        self.dice2_modifier_var.set("0")
+        self.dice2_range_var.set("0")
+        self.dice2_surrounded_var.set(False)
+        self.dice2_exp_var.set(0)
+        self.dice2_defense_var.set(False)
+        self.dice2_supply_var.set(False)
+        self.dice2_fort_var.set(0)
+        
+        # Aktualizacja wyświetlania bonusów doświadczenia
+        self.update_exp_bonuses_display()
+    
+    def on_side1_attack_change(self):
+        """Obsługuje zmianę ataku strony 1"""
+        if self.side1_attack_var.get():
+            self.side1_defense_var.set(False)
+            self.side1_motion_var.set(False)
+            self.side2_attack_var.set(False)
+            self.side2_defense_var.set(True)
+            self.side2_motion_var.set(False)
+    
+    def on_side1_defense_change(self):
+        """Obsługuje zmianę obrony strony 1"""
+        if self.side1_defense_var.get():
+            self.side1_attack_var.set(False)
+            self.side1_motion_var.set(False)
+            self.side2_attack_var.set(True)
+            self.side2_defense_var.set(False)
+            self.side2_motion_var.set(False)
+    
+    def on_side1_motion_change(self):
+        """Obsługuje zmianę ruchu strony 1"""
+        if self.side1_motion_var.get():
+            self.side1_attack_var.set(False)
+            self.side1_defense_var.set(False)
+            # Nie wyłączamy W ruchu dla strony 2 - może być niezależnie
+    
+    def on_side2_attack_change(self):
+        """Obsługuje zmianę ataku strony 2"""
+        if self.side2_attack_var.get():
+            self.side2_defense_var.set(False)
+            self.side2_motion_var.set(False)
+            self.side1_attack_var.set(False)
+            self.side1_defense_var.set(True)
+            self.side1_motion_var.set(False)
+    
+    def on_side2_defense_change(self):
+        """Obsługuje zmianę obrony strony 2"""
+        if self.side2_defense_var.get():
+            self.side2_attack_var.set(False)
+            self.side2_motion_var.set(False)
+            self.side1_attack_var.set(True)
+            self.side1_defense_var.set(False)
+            self.side1_motion_var.set(False)
+    
+    def on_side2_motion_change(self):
+        """Obsługuje zmianę ruchu strony 2"""
+        if self.side2_motion_var.get():
+            self.side2_attack_var.set(False)
+            self.side2_defense_var.set(False)
+            # Nie wyłączamy W ruchu dla strony 1 - może być niezależnie
+    
+    def update_exp_bonuses_display(self, event=None):
+        """Aktualizuje wyświetlanie bonusów doświadczenia obok pól wejściowych"""
+        # Strona 1
+        exp1 = self.dice1_exp_var.get() if self.dice1_exp_var.get() > 0 else 0
+        if exp1 > 0:
+            self.dice1_modifier_bonus_label.config(text=f"(+{exp1})")
+            self.dice1_range_bonus_label.config(text=f"(+{exp1 * 2})")
         else:
-            # Brak jasnego ataku vs obrony - wyczyść wynik
-            self.tactical_result_label.config(text="")
+            self.dice1_modifier_bonus_label.config(text="")
+            self.dice1_range_bonus_label.config(text="")
+        
+        # Strona 2
+        exp2 = self.dice2_exp_var.get() if self.dice2_exp_var.get() > 0 else 0
+        if exp2 > 0:
+            self.dice2_modifier_bonus_label.config(text=f"(+{exp2})")
+            self.dice2_range_bonus_label.config(text=f"(+{exp2 * 2})")
+        else:
+            self.dice2_modifier_bonus_label.config(text="")
+            self.dice2_range_bonus_label.config(text="")
+    
+    def roll_dice(self):
+        """Rzuca dwiema 4-ściennymi kośćmi i aktualizuje wyniki"""
+        # Jednostka zablokowana przez inną sesję nie może ponieść strat w dwóch sesjach - rzut jest wstrzymany
+        if self.sync_session_locks():
             return
+        self.roll_started = time.perf_counter()
+        phase = self.profiler.phase
+        
+        # Ustawienia obu stron i jedna runda silnika starcia
+        with phase("roll.read_inputs"):
+            side1, side2 = self.read_combat_inputs()
+        with phase("roll.resolve_round"):
+            result = resolve_round(side1, side2, self.sessions.active.rng)
+            self.apply_round_result(result)
+        dice1_final = result["dice1_final"]
+        dice2_final = result["dice2_final"]
+        with phase("ui.show_round_result"):
+            self.show_round_result(result)
+        
+        # Migawka stanu do cofnięcia rzutu
+        with phase("roll.undo_snapshot"):
+            self.undo_stack.append(self.capture_roll_snapshot())
+        
+        # Zmiany modelu po rzucie - jedno zbiorcze powiadomienie widoków
+        with self.model.batch():
+            # Rozdzielenie strat między jednostkami uczestniczącymi
+            with phase("roll.distribute_losses"):
+                allocation = self.distribute_losses_among_units()
+            
+            # Aktualizacja statystyk jednostek po rzucie
+            with phase("roll.update_unit_stats"):
+                self.update_unit_stats_after_battle(dice1_final, dice2_final)
+            
+            # Dodanie do historii (bez informacji o jednostkach)
+            with phase("roll.add_to_history"):
+                self.add_to_history(dice1_final, dice2_final)
+            
+            # Dodanie do historii jednostek
+            with phase("roll.add_to_unit_battle_history"):
+                self.add_to_unit_battle_history(dice1_final, dice2_final)
         
-        # Obliczanie wyniku taktycznego
-        tactical_outcome = self.get_tactical_outcome(attack_result, defense_result)
-        outcome_description = self.get_tactical_description(tactical_outcome)
+        # Zapis rzutu w dzienniku (serializacja i zapis do pliku w wątku w tle)
+        with phase("roll.log"):
+            self.log_roll(side1, side2, result, allocation)
         
-        # Wyświetlanie jednego wyniku nad przyciskiem
-        self.tactical_result_label.config(text=f"Wynik ataku: {outcome_description}")
-    
-    def get_tactical_outcome(self, attack_result, defense_result):
-        """Określa wynik taktyczny na skali 1-6"""
-        difference = attack_result - defense_result
+        # Wyświetlanie wyniku taktycznego
+        with phase("ui.tactical_result"):
+            self.display_tactical_result(result["tactical_outcome"])
         
-        if difference <= 0:
-            # Obrona wygrywa lub remis - dodajemy element losowości dla różnicy -1
-            if difference == -1 and random.random() < 0.3:
-                return 1  # Pozycja nienaruszona (30% szansy przy -1)
-            else:
-                return 1  # Pozycja nienaruszona
-        elif difference == 1:
-            return 2  # Lokalne wejście
-        elif difference == 2:
-            return 3  # Częściowe wysunięcie
-        elif difference == 3:
-            return 4  # Wyłom taktyczny
-        elif difference == 4:
-            return 5  # Załamanie obrony
-        else:  # difference >= 5
-            return 6  # Przełamanie strategiczne
-    
-    def get_tactical_description(self, outcome):
-        """Zwraca opis wyniku taktycznego"""
-        descriptions = {
-            1: "Pozycja nienaruszona",
-            2: "Lokalne wejście", 
-            3: "Częściowe wysunięcie",
-            4: "Wyłom taktyczny",
-            5: "Załamanie obrony",
-            6: "Przełamanie strategiczne"
+        # Efekt wizualny - krótka animacja przycisku (w trybie szybkim pomijana, by nie blokować kolejnego rzutu)
+        if not self.rapid_mode_var.get():
+            self.roll_button.config(state="disabled")
+            self.root.after(200, lambda: self.roll_button.config(state="normal"))
+        
+        # Komunikat o wyniku w zależności od rzutu
+        with phase("ui.result_message"):
+            self.display_result_message(dice1_final, dice2_final)
+    
+    def on_rapid_mode_toggle(self):
+        """Włączenie trybu szybkiego otwiera dziennik zdarzeń"""
+        if self.rapid_mode_var.get():
+            self.show_event_feed()
+            self.roll_button.config(state="normal")
+    
+    def rapid_hotkey(self, action):
+        """Skróty klawiszowe działają tylko w trybie szybkim"""
+        if self.rapid_mode_var.get():
+            action()
+            return "break"
+    
+    def repeat_roll(self):
+        """Kolejny rzut tej samej bitwy - liczba ludzi po ostatnim rzucie staje się stanem wyjściowym"""
+        if self.dice1_people_original or self.dice2_people_original:
+            self.dice1_people_var.set(str(self.dice1_people_result))
+            self.dice2_people_var.set(str(self.dice2_people_result))
+        self.roll_dice()
+    
+    def log_roll(self, side1, side2, result, allocation):
+        """Dopisuje rzut do dziennika: ustawienia stron, kości, wyniki i podział strat na jednostki"""
+        self.roll_log.record(
+            self.current_battle, tuple(side1.values()), tuple(side2.values()),
+            (result["dice1_value"], result["dice2_value"]), (result["dice1_final"], result["dice2_final"]),
+            (result["advantage1"], result["advantage2"]), (result["people1_after"], result["people2_after"]),
+            (result["losses1"], result["losses2"]), result["tactical_outcome"], allocation[0], allocation[1]
+        )
+    
+    def sync_session_locks(self):
+        """Blokuje w aktywnej sesji jednostki, które poniosą straty w rzucie (jak get_all_participating_units)
+
+        Jednostki zablokowane przez inne sesje są usuwane z udziału w bitwie; zwraca ich zbiór.
+        """
+        unit_ids = self.participant_ids("strona1") | self.participant_ids("strona2")
+        for selected_unit, unit_type in ((self.selected_unit_side1, self.unit_side1_type),
+                                         (self.selected_unit_side2, self.unit_side2_type)):
+            if selected_unit and unit_type != "brak":
+                unit_ids = unit_ids | {selected_unit}
+        conflicts = self.sessions.sync_locks(self.sessions.active_id, unit_ids)
+        if conflicts:
+            self.drop_conflicting_units(conflicts)
+        return conflicts
+    
+    def drop_conflicting_units(self, conflicts):
+        """Usuwa jednostki innych sesji z uczestników i wyboru stron (np. po cofnięciu rzutu) z ostrzeżeniem"""
+        owners = [f"{unit_id} - sesja '{self.sessions.session_name(self.sessions.lock_owner(unit_id))}'"
+                  for unit_id in sorted(conflicts)]
+        if self.selected_unit_side1 in conflicts:
+            self.selected_unit_side1 = None
+            self.unit_side1_var.set("")
+        if self.selected_unit_side2 in conflicts:
+            self.selected_unit_side2 = None
+            self.unit_side2_var.set("")
+        with self.model.batch():
+            for side_number, side_key in ((1, "strona1"), (2, "strona2")):
+                units = self.participating_units[side_key]
+                for unit_index in reversed(range(len(units))):
+                    if self.get_unit_id(units[unit_index]) in conflicts:
+                        self.remove_unit_from_side(side_number, unit_index)
+        messagebox.showwarning("Jednostka zajęta", "Jednostki uczestniczą w innych sesjach i zostały usunięte z bitwy:\n"
+                               + "\n".join(owners))
+    
+    def check_unit_lock(self, unit_id):
+        """Czy jednostkę można użyć w aktywnej sesji (ostrzeżenie, gdy uczestniczy w innej)"""
+        owner = self.sessions.lock_owner(unit_id)
+        if owner is None or owner == self.sessions.active_id:
+            return True
+        messagebox.showwarning("Jednostka zajęta", f"Jednostka uczestniczy w sesji '{self.sessions.session_name(owner)}'!")
+        return False
+    
+    def capture_session_values(self):
+        """Zwraca (wartości pól formularza, atrybuty stanu rzutu) aktywnej sesji"""
+        form = {name: getattr(self, name).get() for name in self.SESSION_FORM_VARS}
+        state = {name: getattr(self, name) for name in self.SESSION_STATE_ATTRS}
+        return form, state
+    
+    def store_active_session(self):
+        """Odkłada stan aktywnej sesji (listy i słowniki przez referencję, bez kopiowania)"""
+        session = self.sessions.active
+        session.form, session.state = self.capture_session_values()
+        session.participating_units = self.participating_units
+        session.history = self.history
+        session.undo_stack = self.undo_stack
+        session.current_battle = self.current_battle
+    
+    def load_session(self, session):
+        """Przywraca stan sesji do formularza, modelu i etykiet wyniku - bez przebudowy widżetów"""
+        self.sessions.activate(session.session_id)
+        default_form, default_state = self.session_defaults
+        for name, value in (session.form or default_form).items():
+            getattr(self, name).set(value)
+        for name, value in (session.state or default_state).items():
+            setattr(self, name, value)
+        # Mapy nazw comboboxów bitwy należą do sesji - listy trzeba zbudować dla niej od nowa
+        self.combo_sources.pop('unit_side1', None)
+        self.combo_sources.pop('unit_side2', None)
+        self.undo_stack = session.undo_stack if session.undo_stack is not None else deque(maxlen=self.UNDO_LIMIT)
+        self.current_battle = session.current_battle if session.current_battle in self.battles else "Niezapisana"
+        
+        # Podmiana uczestników i ostatnich rzutów - zdarzenia modelu odświeżą listy, historię i comboboxy
+        self.model.swap_combat_state(session.participating_units, session.history)
+        
+        if "battles" in self.built_panels:
+            self.battle_var.set(self.current_battle)
+        if self.last_round_result is not None:
+            self.show_round_result(self.last_round_result)
+            self.display_tactical_result(self.last_round_result["tactical_outcome"])
+        else:
+            self.clear_round_result()
+        self.mark_dirty("battle_stats", "battle_history", "battle_units_combos", "exp_bonuses")
+        self.update_session_selector()
+    
+    def clear_round_result(self):
+        """Etykiety wyniku jak przed pierwszym rzutem"""
+        for label in (self.dice1_label, self.dice2_label):
+            label.config(text="--", foreground="gray")
+        for label in (self.dice1_people_result_label, self.dice2_people_result_label,
+                      self.dice1_exp_icon, self.dice2_exp_icon):
+            label.config(text="")
+        self.display_tactical_result(None)
+    
+    def switch_session(self, session_id):
+        """Przełącza aktywną sesję bitwy"""
+        if session_id == self.sessions.active_id or session_id not in self.sessions.sessions:
+            return
+        self.store_active_session()
+        self.load_session(self.sessions.sessions[session_id])
+    
+    def update_session_selector(self):
+        """Lista sesji i nazwa aktywnej w selektorze"""
+        self.session_combo.config(values=[session.name for session in self.sessions.ordered()])
+        self.session_var.set(self.sessions.active.name)
+    
+    def on_session_selected(self, event=None):
+        """Wybór sesji z listy"""
+        index = self.session_combo.current()
+        sessions = self.sessions.ordered()
+        if 0 <= index < len(sessions):
+            self.switch_session(sessions[index].session_id)
+    
+    def next_session(self, event=None):
+        """Przełącza na kolejną sesję (Ctrl+Tab)"""
+        sessions = self.sessions.ordered()
+        if len(sessions) > 1:
+            index = sessions.index(self.sessions.active)
+            self.switch_session(sessions[(index + 1) % len(sessions)].session_id)
+        return "break"
+    
+    def create_session(self):
+        """Tworzy nową sesję bitwy z pustym formularzem i przełącza na nią"""
+        session = self.sessions.create()
+        self.switch_session(session.session_id)
+        self.notify("Sesja", f"Utworzono sesję: {session.name}")
+    
+    def close_session(self):
+        """Zamyka aktywną sesję (zwalnia jej jednostki); ostatniej sesji nie można zamknąć"""
+        sessions = self.sessions.ordered()
+        if len(sessions) < 2:
+            messagebox.showwarning("Sesja", "Nie można zamknąć jedynej sesji!")
+            return
+        closing = self.sessions.active
+        if not messagebox.askyesno("Sesja", f"Zamknąć sesję '{closing.name}'? Jej jednostki zostaną zwolnione."):
+            return
+        index = sessions.index(closing)
+        self.switch_session(sessions[index - 1 if index else 1].session_id)
+        self.sessions.close(closing.session_id)
+        self.update_session_selector()
+        self.mark_dirty("battle_units_combos")
+    
+    def capture_roll_snapshot(self):
+        """Zapamiętuje stan zmieniany przez rzut (tylko jednostki uczestniczące, historia, bitwa)"""
+        # Ten sam zbiór co w rzucie: dodani uczestnicy i jednostka wybrana w comboboxie strony
+        unit_states = {}
+        for _, unit_id, _, unit_data, _ in self.get_side_participants(1) + self.get_side_participants(2):
+            if unit_data is not None:
+                unit_states[unit_id] = (
+                    unit_data.get('liczba_ludzi'),
+                    unit_data.get('liczba_zwycięstw'),
+                    len(unit_data.get('historia_bitew', []))
+                )
+        
+        battle_length = None
+        if self.current_battle in self.battles:
+            battle_length = len(self.battles[self.current_battle]["history"])
+        
+        return {
+            "units": unit_states,
+            "participants": {side_key: [dict(unit) for unit in units]
+                             for side_key, units in self.participating_units.items()},
+            "history": list(self.history),
+            "battle": (self.current_battle, battle_length),
+            "people": (self.dice1_people_var.get(), self.dice2_people_var.get())
         }
-        return descriptions.get(outcome, "Nieznany wynik")
     
-    def calculate_battle_results(self, dice1_final, dice2_final):
-        """Oblicza wyniki bitwy na podstawie rzutów kośćmi"""
-        # Resetowanie flag doświadczenia
-        self.dice1_gets_exp = False
-        self.dice2_gets_exp = False
-        
-        # Obliczanie różnicy
-        difference = abs(dice1_final - dice2_final)
+    def undo_last_roll(self):
+        """Cofa ostatni rzut: straty, zwycięstwa, wpisy historii jednostek, bitwy i ostatnich rzutów"""
+        if not self.undo_stack:
+            self.notify("Cofnij", "Brak rzutów do cofnięcia.")
+            return
+        snapshot = self.undo_stack.pop()
+        undone_entries = []  # Wpisy cofnięte z historii jednostek i rejestru bitwy (do usunięcia z indeksu)
+        battalion_ids = set()
+        
+        with self.model.batch():
+            for unit_id, (people, victories, history_length) in snapshot["units"].items():
+                side_name, unit_data = self.model.find_unit(unit_id)
+                if unit_data is None:
+                    continue
+                unit_data['liczba_ludzi'] = people
+                unit_data['liczba_zwycięstw'] = victories
+                unit_history = unit_data.setdefault('historia_bitew', [])
+                undone_entries.extend(unit_history[history_length:])
+                del unit_history[history_length:]
+                battalion_ids.add(unit_data.get('batalion'))
+                self.unit_history_line_cache.pop(unit_id, None)
+            self.model.units_changed(*snapshot["units"])
+            
+            self.participating_units = snapshot["participants"]
+            self.model.participation_changed()
+            self.model.set_history(snapshot["history"])
+            
+            battle_name, battle_length = snapshot["battle"]
+            if battle_length is not None and battle_name in self.battles:
+                undone_entries.extend(self.battles[battle_name]["history"][battle_length:])
+                self.model.truncate_battle(battle_name, battle_length)
+        
+        self.dice1_people_var.set(snapshot["people"][0])
+        self.dice2_people_var.set(snapshot["people"][1])
+        # Tylko cofnięte wpisy i jednostki rzutu - bez przebudowy indeksu i całej analityki
+        self.battle_index.remove_entries(undone_entries)
+        self.analytics.invalidate_units(snapshot["units"], battalion_ids)
+        self.notify("Cofnij", f"↶ Cofnięto rzut (pozostało do cofnięcia: {len(self.undo_stack)})")
+    
+    def notify(self, title, message):
+        """Komunikat informacyjny: okno dialogowe lub, w trybie szybkim, wpis w dzienniku zdarzeń"""
+        if self.rapid_mode_var.get():
+            self.feed_line(f"{title}: {message}")
+        else:
+            messagebox.showinfo(title, message)
+    
+    def feed_line(self, text):
+        """Dopisuje linię do dziennika zdarzeń (w jednym przebiegu odświeżania)"""
+        self.pending_feed_lines.append(f"[{datetime.now().strftime('%H:%M:%S')}] {text}\n")
+        self.mark_dirty("event_feed")
+    
+    def show_event_feed(self):
+        """Pokazuje nieblokujące okno dziennika zdarzeń (tworzone raz, potem tylko ukrywane)"""
+        if self.event_feed_window is not None:
+            self.event_feed_window.deiconify()
+            self.event_feed_window.lift()
+            return
         
-        # Inicjalne wartości - brak strat
-        self.dice1_people_result = self.dice1_people_original
-        self.dice2_people_result = self.dice2_people_original
+        self.event_feed_window = tk.Toplevel(self.root)
+        self.event_feed_window.title("Dziennik zdarzeń")
+        self.event_feed_window.geometry("600x400")
+        self.event_feed_window.protocol("WM_DELETE_WINDOW", self.event_feed_window.withdraw)
         
-        # Jeśli brak ludzi, nie ma co obliczać
-        if self.dice1_people_original == 0 and self.dice2_people_original == 0:
+        self.event_feed_text = scrolledtext.ScrolledText(
+            self.event_feed_window,
+            wrap=tk.WORD,
+            font=("Consolas", 9),
+            state=tk.DISABLED
+        )
+        self.event_feed_text.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        ttk.Button(self.event_feed_window, text="Wyczyść", command=self.clear_event_feed).pack(pady=(0, 5))
+    
+    def clear_event_feed(self):
+        """Czyści dziennik zdarzeń"""
+        self.event_feed_text.config(state=tk.NORMAL)
+        self.event_feed_text.delete(1.0, tk.END)
+        self.event_feed_text.config(state=tk.DISABLED)
+    
+    def render_event_feed(self):
+        """Dopisuje oczekujące linie do dziennika i obcina najstarsze ponad limit"""
+        lines = self.pending_feed_lines
+        self.pending_feed_lines = []
+        if self.event_feed_window is None:
+            self.show_event_feed()
+        
+        self.event_feed_text.config(state=tk.NORMAL)
+        self.event_feed_text.insert(tk.END, "".join(lines))
+        line_count = int(self.event_feed_text.index("end-1c").split(".")[0])
+        if line_count > self.EVENT_FEED_LINE_LIMIT:
+            self.event_feed_text.delete("1.0", f"{line_count - self.EVENT_FEED_LINE_LIMIT + 1}.0")
+        self.event_feed_text.config(state=tk.DISABLED)
+        self.event_feed_text.see(tk.END)
+    
+    def show_profiler_window(self):
+        """Pokazuje okno profilera etapów rzutu (tworzone raz, potem tylko ukrywane)"""
+        if self.profiler_window is not None:
+            self.profiler_window.deiconify()
+            self.profiler_window.lift()
+            self.refresh_profiler_window()
             return
         
-        # Przy różnicy +1, wyższa strona dostaje ikonkę "Zwycięstwo"
-        if difference >= 1:
-            if dice1_final > dice2_final:
-                self.dice1_gets_exp = True
-            elif dice2_final > dice1_final:
-                self.dice2_gets_exp = True
-        
-        # Nowa logika strat - bazuje na wyniku kostki z bazą 150 ludzi
-        def get_base_loss_percentage_for_result(result):
-            """Zwraca procent strat dla danego wyniku kostki (od 1 do 12+)"""
-            if result == 1:
-                return random.uniform(0.0, 0.02)  # 0-2%
-            elif result == 2:
-                return random.uniform(0.03, 0.06)  # 3-6%
-            elif result == 3:
-                return random.uniform(0.07, 0.10)  # 7-10%
-            elif result == 4:
-                return random.uniform(0.11, 0.14)  # 11-14%
-            elif result == 5:
-                return random.uniform(0.15, 0.18)  # 15-18%
-            elif result == 6:
-                return random.uniform(0.19, 0.22)  # 19-22%
-            elif result == 7:
-                return random.uniform(0.23, 0.28)  # 23-28%
-            elif result == 8:
-                return random.uniform(0.29, 0.35)  # 29-35%
-            elif result == 9:
-                return random.uniform(0.36, 0.45)  # 36-45%
-            elif result == 10:
-                return random.uniform(0.46, 0.55)  # 46-55%
-            elif result == 11:
-                return random.uniform(0.56, 0.70)  # 56-70%
-            elif result >= 12:
-                return random.uniform(0.75, 0.85)  # 75-85%
-            else:
-                return 0.05
-        
-        def calculate_losses_for_side(enemy_result, own_people, own_fortifications, own_no_supply, own_defense_buildings, enemy_fortifications, enemy_defense_buildings, own_experience, own_attacking, enemy_defending, enemy_in_motion):
-            """Oblicza straty dla jednej strony"""
-            # Bazowy procent strat na podstawie wyniku przeciwnika
-            base_loss_percentage = get_base_loss_percentage_for_result(enemy_result)
-            
-            # Modyfikatory własne (obrona)
-            defense_modifier = 1.0  # Bazowy mnożnik
-            
-            # Fortyfikacje własne zmniejszają straty własne
-            if own_fortifications == 1:
-                defense_modifier -= 0.05  # -5%
-            elif own_fortifications == 2:
-                defense_modifier -= 0.10  # -10%
-            elif own_fortifications == 3:
-                defense_modifier -= 0.15  # -15%
-            
-            # Brak zaopatrzenia zwiększa straty własne
-            if own_no_supply:
-                defense_modifier += 0.05  # +5%
-            
-            # Obrona w zabudowaniach zmniejsza straty własne
-            if own_defense_buildings:
-                defense_modifier -= 0.05  # -5%
-            
-            # Negatywne doświadczenie zwiększa straty własne
-            if own_experience == -1:
-                defense_modifier += 0.10  # +10%
-            elif own_experience == -2:
-                defense_modifier += 0.25  # +25%
-            
-            # Modyfikatory ataku przeciwnika (fortyfikacje przeciwnika zwiększają nasze straty)
-            attack_modifier = 1.0  # Bazowy mnożnik
-            
-            # Fortyfikacje przeciwnika zwiększają nasze straty
-            if enemy_fortifications == 1:
-                attack_modifier += random.uniform(0.10, 0.15)  # +10-15%
-            elif enemy_fortifications == 2:
-                attack_modifier += random.uniform(0.16, 0.25)  # +16-25%
-            elif enemy_fortifications == 3:
-                attack_modifier += random.uniform(0.30, 0.40)  # +30-40%
-            
-            # Obrona w zabudowaniach przeciwnika zwiększa nasze straty
-            if enemy_defense_buildings:
-                attack_modifier += random.uniform(0.05, 0.15)  # +5-15%
-            
-            # Nowe mechaniki atak/obrona/w ruchu
-            
-            # Straty atakujących są 5% większe, gdy druga strona ma zaznaczoną obronę
-            if own_attacking and enemy_defending:
-                attack_modifier += 0.05  # +5% strat dla atakujących vs obrona
-            
-            # W przypadku zaznaczenia "W Ruchu", strona przeciwna ma straty 10% mniejsze
-            if enemy_in_motion:
-                defense_modifier -= 0.10  # -10% strat gdy przeciwnik jest w ruchu
-            
-            # Końcowy procent strat (nie może być ujemny)
-            final_loss_percentage = max(0.0, base_loss_percentage * defense_modifier * attack_modifier)
-            
-            # Obliczenia strat: dla ≤150 ludzi - baza 150, dla >150 ludzi - baza rzeczywista
-            loss_base = 150 if own_people <= 150 else own_people
-            absolute_losses = int(loss_base * final_loss_percentage)
-            
-            # Aplikowanie strat - nie może być mniej niż 0
-            if own_people > 0:
-                actual_losses = min(absolute_losses, own_people)  # Nie więcej niż mamy
-                remaining_people = max(0, own_people - actual_losses)
-                return remaining_people, actual_losses
-            else:
-                return 0, 0
+        self.profiler_window = tk.Toplevel(self.root)
+        self.profiler_window.title("Profiler etapów rzutu")
+        self.profiler_window.geometry("760x700")
+        self.profiler_window.protocol("WM_DELETE_WINDOW", self.profiler_window.withdraw)
+        
+        controls = ttk.Frame(self.profiler_window, padding="5")
+        controls.pack(fill=tk.X)
+        self.profiler_enabled_var = tk.BooleanVar(value=self.profiler.enabled)
+        ttk.Checkbutton(controls, text="Pomiar włączony", variable=self.profiler_enabled_var,
+                        command=self.on_profiler_toggle).pack(side=tk.LEFT)
+        ttk.Button(controls, text="Wyczyść", command=self.clear_profiler).pack(side=tk.LEFT, padx=(10, 0))
+        ttk.Button(controls, text="Zapisz JSON", command=self.dump_profiler).pack(side=tk.LEFT, padx=(5, 0))
+        
+        columns = ("count", "last_ms", "p50_ms", "p90_ms", "p99_ms", "max_ms")
+        headings = ("n", "ostatni", "p50", "p90", "p99", "maks.")
+        self.profiler_tree = ttk.Treeview(self.profiler_window, columns=columns, height=16)
+        self.profiler_tree.heading("#0", text="Etap")
+        self.profiler_tree.column("#0", width=260)
+        for column, heading in zip(columns, headings):
+            self.profiler_tree.heading(column, text=heading)
+            self.profiler_tree.column(column, width=70, anchor=tk.E)
+        self.profiler_tree.pack(fill=tk.BOTH, expand=True, padx=5, pady=(0, 5))
+        
+        # Profil sesji - próbki stosu tylko w trakcie wywołań zwrotnych Tk
+        session_controls = ttk.Frame(self.profiler_window, padding="5")
+        session_controls.pack(fill=tk.X)
+        self.session_profiler_var = tk.BooleanVar(value=self.session_profiler.running)
+        ttk.Checkbutton(session_controls, text="Profil sesji (wywołania Tk)", variable=self.session_profiler_var,
+                        command=self.on_session_profiler_toggle).pack(side=tk.LEFT)
+        ttk.Button(session_controls, text="Zapisz stosy (collapsed)",
+                   command=self.export_session_stacks).pack(side=tk.LEFT, padx=(10, 0))
+        ttk.Button(session_controls, text="Zapisz tabelę", command=self.export_session_table).pack(side=tk.LEFT, padx=(5, 0))
+        self.session_profiler_status_var = tk.StringVar(value="")
+        ttk.Label(session_controls, textvariable=self.session_profiler_status_var).pack(side=tk.LEFT, padx=(10, 0))
+        
+        columns = ("cumulative_ms", "own_ms", "share")
+        headings = ("łącznie ms", "własne ms", "udział")
+        self.session_tree = ttk.Treeview(self.profiler_window, columns=columns, height=14)
+        self.session_tree.heading("#0", text="Funkcja")
+        self.session_tree.column("#0", width=460)
+        for column, heading in zip(columns, headings):
+            self.session_tree.heading(column, text=heading)
+            self.session_tree.column(column, width=80, anchor=tk.E)
+        self.session_tree.pack(fill=tk.BOTH, expand=True, padx=5, pady=(0, 5))
+        
+        self.refresh_profiler_window()
+    
+    def on_profiler_toggle(self):
+        """Włącza lub wyłącza pomiar etapów"""
+        self.profiler.enabled = self.profiler_enabled_var.get()
+        if self.profiler.enabled:
+            self.refresh_profiler_window()
+    
+    def on_session_profiler_toggle(self):
+        """Włącza lub wyłącza profil sesji (pomiar wywołań zwrotnych i wątek próbkujący)"""
+        if self.session_profiler_var.get():
+            self.session_profiler.start()
+            self.refresh_profiler_window()
+        else:
+            self.session_profiler.stop()
+    
+    def export_session_stacks(self):
+        """Zapisuje stosy profilu sesji w formacie collapsed (flamegraph.pl, speedscope)"""
+        self.export_session_profile("Zapisz stosy profilu sesji", ".folded", self.session_profiler.write_collapsed)
+    
+    def export_session_table(self):
+        """Zapisuje tabelę czasu łącznego funkcji i wywołań zwrotnych"""
+        self.export_session_profile("Zapisz tabelę profilu sesji", ".txt", self.session_profiler.write_top_table)
+    
+    def export_session_profile(self, title, extension, write):
+        """Wspólny zapis wyników profilu sesji do wybranego pliku"""
+        if not self.session_profiler.samples:
+            self.notify("Profil sesji", "Brak próbek - włącz profil sesji i użyj aplikacji.")
+            return
+        filename = filedialog.asksaveasfilename(
+            title=title,
+            defaultextension=extension,
+            filetypes=[("Pliki tekstowe", f"*{extension}"), ("Wszystkie pliki", "*.*")]
+        )
+        if filename:
+            try:
+                write(filename)
+            except OSError as e:
+                messagebox.showerror("Błąd", f"Nie udało się zapisać profilu: {str(e)}")
+    
+    def clear_profiler(self):
+        """Usuwa zebrane pomiary etapów i próbki profilu sesji"""
+        self.profiler.reset()
+        self.session_profiler.reset()
+        self.refresh_profiler_window()
+    
+    def dump_profiler(self):
+        """Zapisuje pomiary profilera do pliku JSON"""
+        filename = filedialog.asksaveasfilename(
+            title="Zapisz pomiary profilera",
+            defaultextension=".json",
+            filetypes=[("Pliki JSON", "*.json"), ("Wszystkie pliki", "*.*")]
+        )
+        if filename:
+            try:
+                self.profiler.dump(filename)
+            except OSError as e:
+                messagebox.showerror("Błąd", f"Nie udało się zapisać pomiarów: {str(e)}")
+    
+    def refresh_profiler_window(self):
+        """Przepisuje tabele etapów i profilu sesji; gdy pomiar trwa i okno jest widoczne - ponownie po PROFILER_REFRESH_MS"""
+        if self.profiler_window is None or not self.profiler_window.winfo_exists():
+            return
+        self.profiler_tree.delete(*self.profiler_tree.get_children())
+        for name, row in self.profiler.summary():
+            self.profiler_tree.insert("", tk.END, text=name, values=(
+                row["count"], f"{row['last_ms']:.2f}", f"{row['p50_ms']:.2f}",
+                f"{row['p90_ms']:.2f}", f"{row['p99_ms']:.2f}", f"{row['max_ms']:.2f}"
+            ))
+        
+        self.session_tree.delete(*self.session_tree.get_children())
+        for label, _, _, cumulative_ms, own_ms, share in self.session_profiler.top():
+            self.session_tree.insert("", tk.END, text=label, values=(f"{cumulative_ms:.1f}", f"{own_ms:.1f}", f"{share:.1%}"))
+        self.session_profiler_status_var.set(
+            f"próbki: {self.session_profiler.samples}, wywołania: {self.session_profiler.callback_seconds * 1000:.0f} ms"
+        )
         
-        # Pobieranie wartości modyfikatorów dla obu stron
-        dice1_fort = int(self.dice1_fort_var.get()) if self.dice1_fort_var.get() else 0
-        dice2_fort = int(self.dice2_fort_var.get()) if self.dice2_fort_var.get() else 0
+        running = self.profiler.enabled or self.session_profiler.running
+        if running and self.profiler_window.winfo_viewable():
+            if self.profiler_refresh_job is not None:
+                self.root.after_cancel(self.profiler_refresh_job)
+            self.profiler_refresh_job = self.root.after(self.PROFILER_REFRESH_MS, self.refresh_profiler_window)
+    
+    def show_memory_window(self):
+        """Pokazuje okno raportu pamięci rejestrów (tworzone raz, potem tylko ukrywane)"""
+        if self.memory_window is not None:
+            self.memory_window.deiconify()
+            self.memory_window.lift()
+            self.refresh_memory_window()
+            return
         
-        dice1_no_supply = self.dice1_supply_var.get()
-        dice2_no_supply = self.dice2_supply_var.get()
+        self.memory_window = tk.Toplevel(self.root)
+        self.memory_window.title("Pamięć rejestrów")
+        self.memory_window.geometry("760x620")
+        self.memory_window.protocol("WM_DELETE_WINDOW", self.memory_window.withdraw)
+        
+        controls = ttk.Frame(self.memory_window, padding="5")
+        controls.pack(fill=tk.X)
+        ttk.Button(controls, text="Odśwież", command=self.refresh_memory_window).pack(side=tk.LEFT)
+        self.memory_tracing_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(controls, text="Śledzenie alokacji (tracemalloc)", variable=self.memory_tracing_var,
+                        command=self.on_memory_tracing_toggle).pack(side=tk.LEFT, padx=(10, 0))
+        ttk.Button(controls, text="Migawka", command=self.take_memory_snapshot).pack(side=tk.LEFT, padx=(10, 0))
+        ttk.Button(controls, text="Różnica od migawki", command=self.show_memory_diff).pack(side=tk.LEFT, padx=(5, 0))
+        self.memory_status_var = tk.StringVar(value="")
+        ttk.Label(self.memory_window, textvariable=self.memory_status_var, padding=(5, 0)).pack(fill=tk.X)
+        
+        # Rejestry według kategorii (powtórzone napisy jako wiersze podrzędne)
+        self.memory_tree = ttk.Treeview(self.memory_window, columns=("bytes", "objects", "share"), height=12)
+        self.memory_tree.heading("#0", text="Kategoria")
+        self.memory_tree.column("#0", width=420)
+        for column, heading in (("bytes", "rozmiar"), ("objects", "obiekty"), ("share", "udział")):
+            self.memory_tree.heading(column, text=heading)
+            self.memory_tree.column(column, width=90, anchor=tk.E)
+        self.memory_tree.pack(fill=tk.BOTH, expand=True, padx=5, pady=(5, 5))
+        
+        # Miejsca alokacji (tracemalloc) lub różnica między migawkami
+        self.memory_sites_tree = ttk.Treeview(self.memory_window, columns=("size", "count", "change"), height=10)
+        self.memory_sites_tree.heading("#0", text="Miejsce alokacji")
+        self.memory_sites_tree.column("#0", width=420)
+        for column, heading in (("size", "rozmiar"), ("count", "bloki"), ("change", "zmiana")):
+            self.memory_sites_tree.heading(column, text=heading)
+            self.memory_sites_tree.column(column, width=90, anchor=tk.E)
+        self.memory_sites_tree.pack(fill=tk.BOTH, expand=True, padx=5, pady=(0, 5))
+        
+        self.refresh_memory_window()
+    
+    def memory_extra_categories(self):
+        """Pamięci podręczne i bufory aplikacji liczone obok rejestrów"""
+        return [
+            ("pamięć podręczna widoków", [self.history_bodies, self.battle_history_line_cache,
+                                          self.unit_history_line_cache, self.display_name_cache]),
+            ("indeks bitew", self.battle_index),
+            ("analityka", self.analytics),
+            ("prognozy", self.forecast_cache),
+            ("cofanie rzutów", self.undo_stack),
+            ("sesje bitew", self.sessions),
+            ("dziennik rzutów", self.roll_log.records)
+        ]
+    
+    def refresh_memory_window(self):
+        """Przelicza rozmiary rejestrów; przy włączonym śledzeniu pokazuje też największe miejsca alokacji"""
+        if self.memory_window is None or not self.memory_window.winfo_exists():
+            return
+        started = time.perf_counter()
+        report = registry_report(self.units, self.battles, self.history, self.participating_units,
+                                 self.memory_extra_categories())
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        total = report["total_bytes"] or 1
+        
+        self.memory_tree.delete(*self.memory_tree.get_children())
+        for name, size, objects in report["categories"]:
+            self.memory_tree.insert("", tk.END, text=name, values=(format_bytes(size), objects, f"{size / total:.1%}"))
+        strings = report["strings"]
+        strings_item = self.memory_tree.insert(
+            "", tk.END, open=True,
+            text=f"powtórzone napisy ({strings['values_repeated']} wartości, {strings['extra_copies']} zbędnych kopii)",
+            values=(format_bytes(strings["wasted_bytes"]), strings["extra_copies"], f"{strings['wasted_bytes'] / total:.1%}")
+        )
+        for value, count, extra in strings["top"]:
+            label = value if len(value) <= 50 else value[:47] + "..."
+            self.memory_tree.insert(strings_item, tk.END, text=f"{label!r} ×{count}", values=(format_bytes(extra), count - 1, ""))
+        
+        status = f"Razem: {format_bytes(report['total_bytes'])} (obliczono w {elapsed_ms:.0f} ms)"
+        snapshot = take_snapshot()
+        if snapshot is not None:
+            self.fill_memory_sites([(site, size, count, "") for site, size, count in top_sites(snapshot)])
+        else:
+            self.fill_memory_sites([])
+            status += " - włącz śledzenie alokacji, aby zobaczyć miejsca alokacji"
+        if self.memory_snapshot is not None:
+            status += f"; migawka z {self.memory_snapshot[0]}"
+        self.memory_status_var.set(status)
+    
+    def fill_memory_sites(self, rows):
+        """Wypełnia tabelę miejsc alokacji wierszami (miejsce, bajty, bloki, zmiana)"""
+        self.memory_sites_tree.delete(*self.memory_sites_tree.get_children())
+        for site, size, count, change in rows:
+            self.memory_sites_tree.insert("", tk.END, text=site, values=(format_bytes(size), count, change))
+    
+    def on_memory_tracing_toggle(self):
+        """Włącza lub wyłącza tracemalloc (wyłączenie usuwa też migawkę)"""
+        if self.memory_tracing_var.get():
+            start_tracing()
+        else:
+            stop_tracing()
+            self.memory_snapshot = None
+        self.refresh_memory_window()
+    
+    def take_memory_snapshot(self):
+        """Zapamiętuje migawkę alokacji jako punkt odniesienia"""
+        if not self.memory_tracing_var.get():
+            self.memory_tracing_var.set(True)
+            start_tracing()
+        self.memory_snapshot = (datetime.now().strftime('%H:%M:%S'), take_snapshot())
+        self.refresh_memory_window()
+    
+    def show_memory_diff(self):
+        """Pokazuje miejsca alokacji, które najbardziej urosły od zapamiętanej migawki"""
+        if self.memory_snapshot is None:
+            self.notify("Pamięć", "Najpierw zrób migawkę.")
+            return
+        snapshot = take_snapshot()
+        if snapshot is None:
+            return
+        rows = diff_sites(self.memory_snapshot[1], snapshot)
+        self.fill_memory_sites([(site, size, count_diff, format_bytes(size_diff))
+                                for site, size_diff, size, count_diff in rows])
+        growth = sum(size_diff for _, size_diff, _, _ in rows)
+        self.memory_status_var.set(f"Różnica od migawki z {self.memory_snapshot[0]}: {format_bytes(growth)} "
+                                   f"(największe zmiany)")
+    
+    def show_sync_window(self):
+        """Pokazuje okno połączenia z hubem synchronizacji prowadzących (tworzone raz, potem tylko ukrywane)"""
+        if self.sync_window is not None:
+            self.sync_window.deiconify()
+            self.sync_window.lift()
+            return
         
-        dice1_defense = self.dice1_defense_var.get()
-        dice2_defense = self.dice2_defense_var.get()
+        self.sync_window = tk.Toplevel(self.root)
+        self.sync_window.title("Synchronizacja prowadzących")
+        self.sync_window.resizable(False, False)
+        self.sync_window.protocol("WM_DELETE_WINDOW", self.sync_window.withdraw)
+        
+        frame = ttk.Frame(self.sync_window, padding="10")
+        frame.pack(fill=tk.BOTH, expand=True)
+        self.sync_host_var = tk.StringVar(value=DEFAULT_HOST)
+        self.sync_port_var = tk.StringVar(value=str(DEFAULT_PORT))
+        self.sync_name_var = tk.StringVar(value=f"MG-{random.randint(100, 999)}")
+        for row, (label, variable) in enumerate((("Host:", self.sync_host_var), ("Port:", self.sync_port_var),
+                                                 ("Prowadzący:", self.sync_name_var))):
+            ttk.Label(frame, text=label).grid(row=row, column=0, sticky=tk.W, pady=2)
+            ttk.Entry(frame, textvariable=variable, width=24).grid(row=row, column=1, sticky=tk.W, pady=2)
+        
+        buttons = ttk.Frame(frame)
+        buttons.grid(row=3, column=0, columnspan=2, sticky=tk.W, pady=(8, 0))
+        ttk.Button(buttons, text="Połącz", command=self.connect_sync).pack(side=tk.LEFT)
+        ttk.Button(buttons, text="Rozłącz", command=self.disconnect_sync).pack(side=tk.LEFT, padx=(5, 0))
+        self.sync_status_var = tk.StringVar(value="Niepołączono")
+        ttk.Label(frame, textvariable=self.sync_status_var, foreground="blue").grid(row=4, column=0, columnspan=2,
+                                                                                   sticky=tk.W, pady=(8, 0))
+    
+    def connect_sync(self):
+        """Łączy się z hubem; zdarzenia z dziennika huba są doganiane od początku, potem na bieżąco"""
+        if self.sync is not None:
+            return
+        name = self.sync_name_var.get().strip()
+        try:
+            port = int(self.sync_port_var.get())
+        except ValueError:
+            messagebox.showwarning("Błąd", "Port musi być liczbą!")
+            return
+        if not name:
+            messagebox.showwarning("Błąd", "Wprowadź nazwę prowadzącego!")
+            return
         
-        # Pobieranie informacji o stanie atak/obrona/w ruchu
-        side1_attacking = self.side1_attack_var.get()
-        side1_defending = self.side1_defense_var.get()
-        side1_in_motion = self.side1_motion_var.get()
+        client = SyncClient(name)
+        try:
+            client.connect(self.sync_host_var.get().strip() or DEFAULT_HOST, port)
+        except OSError as e:
+            messagebox.showerror("Błąd", f"Nie udało się połączyć z hubem: {str(e)}")
+            return
+        self.sync = ModelSync(self.model, client)
+        self.sync_conflicts = 0
+        self.update_sync_status()
+        self.sync_job = self.root.after(self.SYNC_POLL_MS, self.poll_sync)
+    
+    def disconnect_sync(self, reason=None):
+        """Publikuje ostatnie zmiany i zamyka połączenie z hubem"""
+        if self.sync is None:
+            return
+        if self.sync_job is not None:
+            self.root.after_cancel(self.sync_job)
+            self.sync_job = None
+        if reason is None and self.sync.client.connected:
+            try:
+                self.sync.flush()
+            except OSError:
+                pass
+        self.sync.detach()
+        self.sync.client.close()
+        self.sync = None
+        self.update_sync_status(reason)
+    
+    def sync_units(self, *unit_ids):
+        """Zgłasza do synchronizacji jednostki zmienione poza zdarzeniami modelu"""
+        if self.sync is not None:
+            self.sync.units_touched(*unit_ids)
+    
+    def poll_sync(self):
+        """Cykl synchronizacji: wysyła zebrane zmiany lokalne i stosuje zdarzenia z huba"""
+        self.sync_job = None
+        if self.sync is None:
+            return
+        try:
+            summary = self.sync.process()
+        except OSError as e:
+            self.disconnect_sync(f"błąd połączenia: {str(e)}")
+            return
+        self.apply_sync_summary(summary)
+        if summary["disconnected"]:
+            self.disconnect_sync("hub zamknął połączenie")
+            self.notify("Synchronizacja", "Utracono połączenie z hubem synchronizacji.")
+            return
+        if summary["events"]:
+            self.update_sync_status()
+        self.sync_job = self.root.after(self.SYNC_POLL_MS, self.poll_sync)
+    
+    def apply_sync_summary(self, summary):
+        """Aktualizuje pamięci podręczne i indeks po zmianach innych prowadzących; konflikty trafiają do dziennika"""
+        unit_ids = summary["units"]
+        if unit_ids:
+            self.invalidate_display_names(unit_ids)
+            self.analytics.invalidate_units(unit_ids, summary["battalions"])
+            for unit_id in unit_ids:
+                self.unit_history_line_cache.pop(unit_id, None)
+            self.mark_dirty("units_combos")
+            if self.current_unit in unit_ids and self.model.find_unit(self.current_unit)[1] is None:
+                self.hide_unit_details()
         
-        side2_attacking = self.side2_attack_var.get()
-        side2_defending = self.side2_defense_var.get()
-        side2_in_motion = self.side2_motion_var.get()
+        if summary["reindex"] or summary["structural"]:
+            self.rebuild_battle_index()
+        else:
+            for unit_id, side_name, battalion_id, entry in summary["unit_entries"]:
+                self.battle_index.add_unit_entry(unit_id, side_name, battalion_id, entry)
+            for battle_name, number, entry in summary["battle_entries"]:
+                self.battle_index.add_battle_entry(
+                    battle_name, number, entry,
+                    entry.get('side1_unit_ids', []) + entry.get('side2_unit_ids', []), self.units
+                )
+        
+        for event in summary["conflicts"]:
+            self.sync_conflicts += 1
+            unit_id = event["payload"].get("id")
+            side_name, unit_data = self.model.find_unit(unit_id)
+            name = self.get_unit_display_name(unit_id, side_name) if unit_data is not None else None
+            self.feed_line(describe_conflict(event, name))
+        for message in summary["errors"]:
+            self.feed_line(f"Synchronizacja: {message}")
+    
+    def update_sync_status(self, reason=None):
+        """Stan połączenia w oknie synchronizacji"""
+        if self.sync_window is None:
+            return
+        if self.sync is None:
+            self.sync_status_var.set(f"Niepołączono ({reason})" if reason else "Niepołączono")
+            return
+        client = self.sync.client
+        self.sync_status_var.set(f"Połączono jako {client.client_id}; zdarzenie #{client.offset}, "
+                                 f"wysłane: {client.published}, konflikty: {self.sync_conflicts}")
+    
+    def read_combat_inputs(self, reset_invalid=True):
+        """Odczytuje ustawienia obu stron z formularza (nieprawidłowe pola są liczone jako 0 i zerowane)"""
+        def read_int(variable):
+            try:
+                return int(variable.get())
+            except (ValueError, tk.TclError):
+                if reset_invalid:
+                    variable.set("0")
+                return 0
+        
+        sides = []
+        for n, prefix in ((1, "side1"), (2, "side2")):
+            sides.append(side_inputs(
+                people=read_int(getattr(self, f"dice{n}_people_var")),
+                modifier=read_int(getattr(self, f"dice{n}_modifier_var")),
+                range_modifier=read_int(getattr(self, f"dice{n}_range_var")),
+                experience=getattr(self, f"dice{n}_exp_var").get(),
+                surrounded=getattr(self, f"dice{n}_surrounded_var").get(),
+                defense_buildings=getattr(self, f"dice{n}_defense_var").get(),
+                no_supply=getattr(self, f"dice{n}_supply_var").get(),
+                fortifications=read_int(getattr(self, f"dice{n}_fort_var")),
+                attacking=getattr(self, f"{prefix}_attack_var").get(),
+                defending=getattr(self, f"{prefix}_defense_var").get(),
+                in_motion=getattr(self, f"{prefix}_motion_var").get()
+            ))
+        return sides[0], sides[1]
+    
+    def apply_round_result(self, result):
+        """Przepisuje wynik rundy do stanu rzutu (czytanego przez historię i rozdział strat)"""
+        self.dice1_value = result["dice1_value"]
+        self.dice2_value = result["dice2_value"]
+        self.dice1_people_original = result["people1_before"]
+        self.dice2_people_original = result["people2_before"]
+        self.dice1_people_result = result["people1_after"]
+        self.dice2_people_result = result["people2_after"]
+        self.dice1_losses = result["losses1"]
+        self.dice2_losses = result["losses2"]
+        self.dice1_gets_exp = result["exp1"]
+        self.dice2_gets_exp = result["exp2"]
+        self.dice1_expected = result["expected1"]
+        self.dice2_expected = result["expected2"]
+        self.last_round_result = result
+    
+    def show_round_result(self, result):
+        """Aktualizuje etykiety wyników, strat, przewagi liczebnej i zwycięstwa"""
+        dice1_final = result["dice1_final"]
+        dice2_final = result["dice2_final"]
+        self.dice1_label.config(text=str(dice1_final), foreground=self.get_color_for_value(dice1_final))
+        self.dice2_label.config(text=str(dice2_final), foreground=self.get_color_for_value(dice2_final))
         
-        # Obliczanie strat dla obu stron
-        dice1_experience = self.dice1_exp_var.get()
-        dice2_experience = self.dice2_exp_var.get()
+        dice1_text = f"Wynik: {self.dice1_people_result} ludzi\nStraty: {self.dice1_losses}"
+        dice2_text = f"Wynik: {self.dice2_people_result} ludzi\nStraty: {self.dice2_losses}"
+        if result["advantage1"] > 0:
+            dice1_text += f"\nPrzewaga: +{result['advantage1']}"
+        if result["advantage2"] > 0:
+            dice2_text += f"\nPrzewaga: +{result['advantage2']}"
+        self.dice1_people_result_label.config(text=dice1_text)
+        self.dice2_people_result_label.config(text=dice2_text)
         
-        self.dice1_people_result, self.dice1_losses = calculate_losses_for_side(
-            dice2_final, self.dice1_people_original, dice1_fort, dice1_no_supply, dice1_defense, dice2_fort, dice2_defense, dice1_experience,
-            side1_attacking, side2_defending, side2_in_motion
+        self.dice1_exp_icon.config(text="⭐ Zwycięstwo" if self.dice1_gets_exp else "")
+        self.dice2_exp_icon.config(text="⭐ Zwycięstwo" if self.dice2_gets_exp else "")
+    
+    def display_tactical_result(self, tactical_outcome):
+        """Wyświetla wynik taktyczny nad przyciskiem (pusty bez klasycznej sytuacji atak vs obrona)"""
+        if tactical_outcome is None:
+            self.tactical_result_label.config(text="")
+        else:
+            self.tactical_result_label.config(text=f"Wynik ataku: {get_tactical_description(tactical_outcome)}")
+    
+    def show_auto_resolve_dialog(self):
+        """Okno warunków zakończenia auto-rozstrzygnięcia"""
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Auto-rozstrzygnięcie")
+        dialog.transient(self.root)
+        dialog.resizable(False, False)
+        
+        frame = ttk.Frame(dialog, padding="10")
+        frame.pack(fill=tk.BOTH, expand=True)
+        
+        people_var = tk.StringVar(value="0")
+        tactical_var = tk.StringVar(value="")
+        rounds_var = tk.StringVar(value=str(self.AUTO_RESOLVE_MAX_ROUNDS))
+        
+        fields = (
+            ("Stop, gdy strona ma ≤ ludzi:", people_var),
+            ("Stop przy wyniku taktycznym ≥ (1-6, puste = bez):", tactical_var),
+            ("Maksymalna liczba rund:", rounds_var)
         )
+        for row, (label, variable) in enumerate(fields):
+            ttk.Label(frame, text=label).grid(row=row, column=0, sticky=tk.W, pady=2)
+            ttk.Entry(frame, textvariable=variable, width=6).grid(row=row, column=1, sticky=tk.W, padx=(5, 0), pady=2)
+        
+        def run():
+            try:
+                people_threshold = int(people_var.get() or "0")
+                tactical_threshold = int(tactical_var.get()) if tactical_var.get().strip() else None
+                max_rounds = int(rounds_var.get())
+            except ValueError:
+                messagebox.showwarning("Błąd", "Warunki zakończenia muszą być liczbami!", parent=dialog)
+                return
+            if max_rounds < 1:
+                messagebox.showwarning("Błąd", "Liczba rund musi być większa od zera!", parent=dialog)
+                return
+            dialog.destroy()
+            self.auto_resolve(people_threshold, tactical_threshold, max_rounds)
         
-        self.dice2_people_result, self.dice2_losses = calculate_losses_for_side(
-            dice1_final, self.dice2_people_original, dice2_fort, dice2_no_supply, dice2_defense, dice1_fort, dice1_defense, dice2_experience,
-            side2_attacking, side1_defending, side1_in_motion
+        ttk.Button(frame, text="⏩ Rozstrzygnij", command=run).grid(row=len(fields), column=0, columnspan=2, pady=(10, 0))
+        dialog.bind('<Return>', lambda event: run())
+    
+    def auto_resolve(self, people_threshold=0, tactical_threshold=None, max_rounds=None):
+        """Rozgrywa starcie w pamięci do spełnienia warunku zakończenia; zwraca (liczba rund, powód)
+
+        Każda runda trafia do historii i rozdziela straty między jednostki, ale zdarzenia modelu
+        są dostarczane raz, więc interfejs odświeża się jeden raz po całym starciu.
+        """
+        if max_rounds is None:
+            max_rounds = self.AUTO_RESOLVE_MAX_ROUNDS
+        self.roll_started = time.perf_counter()
+        side1, side2 = self.read_combat_inputs()
+        people_before = (side1["people"], side2["people"])
+        
+        # Cofnięcie (Ctrl+Z / ↶) wycofuje całe starcie
+        self.undo_stack.append(self.capture_roll_snapshot())
+        
+        result = None
+        rounds = 0
+        reason = "limit rund"
+        with self.model.batch():
+            while rounds < max_rounds:
+                result = resolve_round(side1, side2, self.sessions.active.rng)
+                self.apply_round_result(result)
+                rounds += 1
+                
+                allocation = self.distribute_losses_among_units(report=False)
+                self.log_roll(side1, side2, result, allocation)
+                self.update_unit_stats_after_battle(result["dice1_final"], result["dice2_final"])
+                self.add_to_history(result["dice1_final"], result["dice2_final"])
+                self.add_to_unit_battle_history(result["dice1_final"], result["dice2_final"])
+                
+                side1["people"] = result["people1_after"]
+                side2["people"] = result["people2_after"]
+                if min(side1["people"], side2["people"]) <= people_threshold:
+                    reason = "próg liczby ludzi"
+                    break
+                if tactical_threshold is not None and result["tactical_outcome"] is not None \
+                        and result["tactical_outcome"] >= tactical_threshold:
+                    reason = f"wynik taktyczny: {get_tactical_description(result['tactical_outcome'])}"
+                    break
+        
+        # Formularz pokazuje stan po starciu - kolejny rzut kontynuuje walkę
+        self.dice1_people_var.set(str(side1["people"]))
+        self.dice2_people_var.set(str(side2["people"]))
+        self.show_round_result(result)
+        self.display_tactical_result(result["tactical_outcome"])
+        
+        elapsed_ms = (time.perf_counter() - self.roll_started) * 1000
+        self.notify(
+            "Auto-rozstrzygnięcie",
+            f"Rund: {rounds} (koniec: {reason}, {elapsed_ms:.1f} ms)\n"
+            f"Strona 1: {people_before[0]} → {side1['people']} (straty: {people_before[0] - side1['people']})\n"
+            f"Strona 2: {people_before[1]} → {side2['people']} (straty: {people_before[1] - side2['people']})"
         )
+        return rounds, reason
     
     def add_to_history(self, dice1_final, dice2_final):
         """Dodaje wynik do historii"""
-        # Zbierz informacje o jednostkach uczestniczących z sformatowanymi nazwami
-        side1_units = []
-        for u in self.participating_units["strona1"]:
-            unit_id = u.get('id', u.get('name', ''))
-            side_name = u.get('side', '')
-            display_name = self.get_unit_display_name(unit_id, side_name) if unit_id and side_name else u.get('name', unit_id)
-            side1_units.append(display_name)
-            
-        side2_units = []
-        for u in self.participating_units["strona2"]:
-            unit_id = u.get('id', u.get('name', ''))
-            side_name = u.get('side', '')
-            display_name = self.get_unit_display_name(unit_id, side_name) if unit_id and side_name else u.get('name', unit_id)
-            side2_units.append(display_name)
-        
-        # Dodaj jednostki wybrane normalnie (nie przez "Dodaj więcej")
-        if self.selected_unit_side1 and self.unit_side1_type != "brak":
-            display_name = self.get_unit_display_name(self.selected_unit_side1, self.unit_side1_type)
-            if display_name not in side1_units:
-                side1_units.append(display_name)
-        
-        if self.selected_unit_side2 and self.unit_side2_type != "brak":
-            display_name = self.get_unit_display_name(self.selected_unit_side2, self.unit_side2_type)
-            if display_name not in side2_units:
-                side2_units.append(display_name)
+        # Jednostki uczestniczące (także wybrane normalnie) z sformatowanymi nazwami i ID dla indeksu
+        side1_participants = self.get_side_participants(1)
+        side2_participants = self.get_side_participants(2)
+        side1_units = [p[4] for p in side1_participants]
+        side2_units = [p[4] for p in side2_participants]
+        side1_unit_ids = [p[1] for p in side1_participants]
+        side2_unit_ids = [p[1] for p in side2_participants]
         
         # Określ tryb walki - użyj poprawnych nazw zmiennych
         side1_attacking = self.side1_attack_var.get()
@@ -1387,82 +2158,217 @@ class DiceRollerApp:
             'side1_attacking': side1_attacking,
             'side2_attacking': side2_attacking,
             'side1_in_motion': side1_in_motion,
-            'side2_in_motion': side2_in_motion
+            'side2_in_motion': side2_in_motion,
+            'side1_unit_ids': side1_unit_ids,
+            'side2_unit_ids': side2_unit_ids,
+            'data': datetime.now().strftime('%Y-%m-%d %H:%M')
         }
         
-        # Dodanie do listy historii
-        self.history.append(history_entry)
-        
-        # Zachowanie tylko ostatnich 12 wyników
-        if len(self.history) > 12:
-            self.history.pop(0)
+        # Dodanie do listy historii (model zachowuje tylko ostatnie 12 wyników)
+        self.model.append_history(history_entry)
         
         # Dodanie do historii wybranej bitwy (jeśli nie "Niezapisana")
         if self.current_battle != "Niezapisana":
-            if self.current_battle not in self.battles:
-                self.battles[self.current_battle] = {"history": [], "created": datetime.now().isoformat()}
-            self.battles[self.current_battle]["history"].append(history_entry)
+            number = self.model.append_battle_entry(self.current_battle, history_entry)
+            
+            # Przyrostowa aktualizacja indeksu starć
+            self.battle_index.add_battle_entry(
+                self.current_battle, number, history_entry,
+                side1_unit_ids + side2_unit_ids, self.units
+            )
+    
+    def on_model_event(self, event, payload):
+        """Mapuje zdarzenia modelu na nieaktualne regiony interfejsu"""
+        if event == 'units_reset':
+            self.invalidate_display_names()
+            self.analytics.invalidate_all()
+            self.unit_history_line_cache = {}
+            self.mark_dirty("units_combos", "battle_units_combos", "units_display")
+        elif event == 'unit_changed':
+            regions = ["battle_units_combos"]
+            if self.current_unit in payload:
+                regions.append("unit_details")
+            if any(not unit_ids.isdisjoint(payload) for unit_ids in self.participant_id_sets.values()):
+                regions.append("units_display")
+            self.mark_dirty(*regions)
+        elif event == 'participation_changed':
+            for side_key in set(payload):
+                self.participant_id_sets[side_key] = {self.get_unit_id(u) for u in self.participating_units[side_key]}
+            self.sync_session_locks()
+            self.mark_dirty("units_display", "exp_bonuses", "battle_units_combos")
+        elif event == 'battles_reset':
+            self.battle_history_line_cache = {}
+            self.battle_history_displayed = None
+            self.mark_dirty("battle_stats", "battle_history")
+        elif event == 'battle_created':
+            if "battles" in self.built_panels:
+                self.battle_combo.config(values=self.battle_names)
+        elif event == 'battle_appended':
+            if self.current_battle in payload:
+                self.mark_dirty("battle_stats", "battle_history")
+        elif event == 'history_reset':
+            self.pending_history_appends = []
+            self.history_needs_redraw = True
+            self.mark_dirty("history")
+        elif event == 'history_appended':
+            self.pending_history_appends.extend(payload)
+            self.mark_dirty("history")
+    
+    def mark_dirty(self, *regions):
+        """Oznacza regiony interfejsu jako nieaktualne; odświeżenie nastąpi raz w after_idle"""
+        self.dirty_regions.update(regions)
+        if not self.render_scheduled:
+            self.render_scheduled = True
+            self.root.after_idle(self.flush_render)
+    
+    def flush_render(self):
+        """Odświeża każdy nieaktualny region dokładnie raz"""
+        self.render_scheduled = False
+        dirty = self.dirty_regions
+        self.dirty_regions = set()
+        flush_started = time.perf_counter()
+        
+        for region, method_name in self.RENDER_REGIONS:
+            if region in dirty:
+                started = time.perf_counter()
+                getattr(self, method_name)()
+                self.record_render_time(region, time.perf_counter() - started)
+        
+        finished = time.perf_counter()
+        self.record_render_time("flush", finished - flush_started)
+        if self.roll_started is not None:
+            self.record_render_time("roll", finished - self.roll_started)
+            self.roll_started = None
+    
+    def record_render_time(self, region, seconds):
+        """Zapisuje czas odświeżania regionu (w ms); włączony profiler dostaje go jako etap render.<region>"""
+        if region not in self.render_stats:
+            self.render_stats[region] = deque(maxlen=self.RENDER_STATS_WINDOW)
+        self.render_stats[region].append(seconds * 1000)
+        if self.profiler.enabled:
+            self.profiler.record("render." + region, seconds)
+    
+    def render_stats_summary(self):
+        """Zwraca {region: (liczba pomiarów, średnia ms, maks. ms)} dla ostatnich odświeżeń"""
+        return {
+            region: (len(times), sum(times) / len(times), max(times))
+            for region, times in self.render_stats.items() if times
+        }
+    
+    def render_unit_details(self):
+        """Odświeża formularz wybranej jednostki (jeśli jest wybrana)"""
+        if self.current_unit:
+            self.show_unit_details()
+    
+    def render_history(self):
+        """Dopisuje oczekujące wpisy do panelu historii (kilka naraz - pełne przerysowanie)"""
+        pending = self.pending_history_appends
+        self.pending_history_appends = []
+        if self.history_needs_redraw:
+            self.history_needs_redraw = False
+            self.update_history_display()
+        elif len(pending) == 1:
+            self.append_history_display(*pending[0])
+        elif pending:
+            self.update_history_display()
+    
+    def format_recent_history_entry(self, entry):
+        """Formatuje wpis panelu ostatnich rzutów (bez numeru porządkowego)"""
+        exp1_icon = " ⭐" if entry['exp1'] else ""
+        exp2_icon = " ⭐" if entry['exp2'] else ""
+        
+        # Nowy format nazw w zależności od trybu i jednostek
+        side1_units = entry.get('side1_units', [])
+        side2_units = entry.get('side2_units', [])
+        
+        # Określ format na podstawie jednostek i trybu
+        if side1_units and side2_units:
+            # Mamy jednostki po obu stronach
+            side1_in_motion = entry.get('side1_in_motion', False)
+            side2_in_motion = entry.get('side2_in_motion', False)
+            side1_attacking = entry.get('side1_attacking', False)
+            side2_attacking = entry.get('side2_attacking', False)
+            
+            # Formatuj nazwę jednostek (główna + dodatkowe po przecinku)
+            side1_name = side1_units[0]
+            if len(side1_units) > 1:
+                side1_name += ", " + ", ".join(side1_units[1:])
+                
+            side2_name = side2_units[0]
+            if len(side2_units) > 1:
+                side2_name += ", " + ", ".join(side2_units[1:])
+            
+            if side1_in_motion or side2_in_motion:
+                # W ruchu
+                battle_desc = f"Bitwa \"{side1_name}\" z \"{side2_name}\""
+            elif side1_attacking:
+                # Strona 1 atakuje
+                battle_desc = f"Ofensywa \"{side1_name}\" na \"{side2_name}\""
+            elif side2_attacking:
+                # Strona 2 atakuje
+                battle_desc = f"Ofensywa \"{side2_name}\" na \"{side1_name}\""
+            else:
+                # Domyślnie atak vs obrona
+                battle_desc = f"Ofensywa \"{side1_name}\" na \"{side2_name}\""
+        else:
+            # Brak jednostek - format oryginalny
+            battle_desc = f"Strona 1: {entry['dice1']}{exp1_icon} | Strona 2: {entry['dice2']}{exp2_icon}"
         
-        # Aktualizacja wyświetlania historii
-        self.update_history_display()
-        self.update_battle_stats()
-        self.update_battle_history_display()
+        if side1_units and side2_units:
+            history_line = f"{battle_desc}\n"
+            history_line += f"    Kostki: {entry['dice1']}{exp1_icon} vs {entry['dice2']}{exp2_icon}\n"
+        else:
+            history_line = f"{battle_desc}\n"
+            
+        history_line += f"    Ludzie: {entry['people1_before']}→{entry['people1_after']} | {entry['people2_before']}→{entry['people2_after']}\n\n"
+        return history_line
     
     def update_history_display(self):
-        """Aktualizuje wyświetlanie historii"""
+        """Aktualizuje wyświetlanie historii (pełne przerysowanie z pamięci podręcznej)"""
         self.history_text.config(state=tk.NORMAL)
         self.history_text.delete(1.0, tk.END)
         
-        for i, entry in enumerate(reversed(self.history), 1):
-            exp1_icon = " ⭐" if entry['exp1'] else ""
-            exp2_icon = " ⭐" if entry['exp2'] else ""
-            
-            # Nowy format nazw w zależności od trybu i jednostek
-            side1_units = entry.get('side1_units', [])
-            side2_units = entry.get('side2_units', [])
-            
-            # Określ format na podstawie jednostek i trybu
-            if side1_units and side2_units:
-                # Mamy jednostki po obu stronach
-                side1_in_motion = entry.get('side1_in_motion', False)
-                side2_in_motion = entry.get('side2_in_motion', False)
-                side1_attacking = entry.get('side1_attacking', False)
-                side2_attacking = entry.get('side2_attacking', False)
-                
-                # Formatuj nazwę jednostek (główna + dodatkowe po przecinku)
-                side1_name = side1_units[0]
-                if len(side1_units) > 1:
-                    side1_name += ", " + ", ".join(side1_units[1:])
-                    
-                side2_name = side2_units[0]
-                if len(side2_units) > 1:
-                    side2_name += ", " + ", ".join(side2_units[1:])
-                
-                if side1_in_motion or side2_in_motion:
-                    # W ruchu
-                    battle_desc = f"Bitwa \"{side1_name}\" z \"{side2_name}\""
-                elif side1_attacking:
-                    # Strona 1 atakuje
-                    battle_desc = f"Ofensywa \"{side1_name}\" na \"{side2_name}\""
-                elif side2_attacking:
-                    # Strona 2 atakuje
-                    battle_desc = f"Ofensywa \"{side2_name}\" na \"{side1_name}\""
-                else:
-                    # Domyślnie atak vs obrona
-                    battle_desc = f"Ofensywa \"{side1_name}\" na \"{side2_name}\""
-            else:
-                # Brak jednostek - format oryginalny
-                battle_desc = f"Strona 1: {entry['dice1']}{exp1_icon} | Strona 2: {entry['dice2']}{exp2_icon}"
-            
-            if side1_units and side2_units:
-                history_line = f"#{i}: {battle_desc}\n"
-                history_line += f"    Kostki: {entry['dice1']}{exp1_icon} vs {entry['dice2']}{exp2_icon}\n"
-            else:
-                history_line = f"#{i}: {battle_desc}\n"
-                
-            history_line += f"    Ludzie: {entry['people1_before']}→{entry['people1_after']} | {entry['people2_before']}→{entry['people2_after']}\n\n"
-            
-            self.history_text.insert(tk.END, history_line)
+        # Poprzednie pary trzymają swoje wpisy, więc zgodne id oznacza ten sam obiekt (bez ponownego użycia id)
+        previous = {id(entry): body for entry, body in self.history_bodies}
+        self.history_bodies = deque((entry, previous.get(id(entry)) or self.format_recent_history_entry(entry))
+                                    for entry in self.history)
+        self.history_block_lines = deque()
+        
+        for i, (entry, body) in enumerate(reversed(self.history_bodies), 1):
+            self.history_text.insert(tk.END, f"#{i}", ("nr",), f": {body}", ())
+            self.history_block_lines.append(body.count("\n"))
+        
+        self.history_text.config(state=tk.DISABLED)
+        self.history_text.see(tk.END)  # Przewiń na dół
+    
+    def append_history_display(self, entry, removed_entries):
+        """Dopisuje nowy wpis na górze panelu historii i usuwa najstarsze z dołu"""
+        # Panel niezgodny ze stanem historii - pełne przerysowanie
+        if len(self.history_block_lines) + 1 - len(removed_entries) != len(self.history):
+            self.update_history_display()
+            return
+        
+        self.history_text.config(state=tk.NORMAL)
+        
+        # Usuń najstarsze wpisy (na dole panelu)
+        for removed in removed_entries:
+            self.history_bodies.popleft()
+            total_lines = sum(self.history_block_lines)
+            block_lines = self.history_block_lines.pop()
+            self.history_text.delete(f"{total_lines - block_lines + 1}.0", "end-1c")
+        
+        # Nowy wpis na górze jako #1
+        body = self.format_recent_history_entry(entry)
+        self.history_bodies.append((entry, body))
+        self.history_text.insert("1.0", "#1", ("nr",), f": {body}", ())
+        self.history_block_lines.appendleft(body.count("\n"))
+        
+        # Przenumerowanie pozostałych wpisów (co najwyżej HISTORY_LIMIT krótkich zamian)
+        ranges = self.history_text.tag_ranges("nr")
+        for number in range(2, len(ranges) // 2 + 1):
+            start, end = ranges[2 * (number - 1)], ranges[2 * (number - 1) + 1]
+            self.history_text.delete(start, end)
+            self.history_text.insert(start, f"#{number}", ("nr",))
         
         self.history_text.config(state=tk.DISABLED)
         self.history_text.see(tk.END)  # Przewiń na dół
@@ -1491,7 +2397,7 @@ class DiceRollerApp:
         else:
             return "black"
     
-    def display_result_message(self):
+    def display_result_message(self, dice1_final=None, dice2_final=None):
         """Wyświetla komunikat w zależności od wyniku rzutu"""
         if self.dice1_value == self.dice2_value:
             message = f"Dublet! Obie strony pokazują {self.dice1_value}"
@@ -1502,6 +2408,14 @@ class DiceRollerApp:
         else:
             message = f"Podstawowe strony: {self.dice1_value} i {self.dice2_value}"
         
+        # W trybie szybkim wynik trafia do dziennika zdarzeń (tytuł okna nie migocze przy każdym rzucie)
+        if self.rapid_mode_var.get():
+            self.feed_line(
+                f"🎲 {dice1_final} : {dice2_final} | Ludzie: {self.dice1_people_original}→{self.dice1_people_result}, "
+                f"{self.dice2_people_original}→{self.dice2_people_result} | {message}"
+            )
+            return
+        
         # Tymczasowe wyświetlenie wiadomości w title bar
         original_title = self.root.title()
         self.root.title(f"Rzut dwoma 4-ściennymi kośćmi - {message}")
@@ -1528,12 +2442,8 @@ class DiceRollerApp:
             messagebox.showwarning("Błąd", "Nazwa 'Niezapisana' jest zarezerwowana!")
             return
         
-        # Dodanie nowej bitwy
-        self.battle_names.append(battle_name)
-        self.battles[battle_name] = {"history": [], "created": datetime.now().isoformat()}
-        
-        # Aktualizacja combobox
-        self.battle_combo.config(values=self.battle_names)
+        # Dodanie nowej bitwy (zdarzenie modelu odświeża listę bitew)
+        self.model.create_battle(battle_name)
         self.battle_var.set(battle_name)
         self.current_battle = battle_name
         
@@ -1544,17 +2454,20 @@ class DiceRollerApp:
         self.update_battle_stats()
         self.update_battle_history_display()
         
-        messagebox.showinfo("Sukces", f"Utworzono bitwę: {battle_name}")
+        self.notify("Sukces", f"Utworzono bitwę: {battle_name}")
     
     def update_battle_stats(self):
         """Aktualizuje wyświetlanie statystyk wybranej bitwy"""
+        if "battles" not in self.built_panels:
+            return
+        
         if self.current_battle == "Niezapisana" or self.current_battle not in self.battles:
             self.battle_stats_label.config(text="")
             return
         
         battle_history = self.battles[self.current_battle]["history"]
         if not battle_history:
-            self.battle_stats_label.config(text="Brak rzutów w tej bitwie.")
+            self.battle_stats_label.config(text=f"Brak rzutów w tej bitwie.\n\n{self.get_forecast_text()}")
             return
         
         # Obliczanie sumarycznych strat
@@ -1568,70 +2481,212 @@ class DiceRollerApp:
             total_losses_2 += losses_2
         
         stats_text = f"Sumaryczne straty:\nStrona 1: {total_losses_1} ludzi\nStrona 2: {total_losses_2} ludzi\n\nLiczba rzutów: {len(battle_history)}"
-        self.battle_stats_label.config(text=stats_text)
+        self.battle_stats_label.config(text=f"{stats_text}\n\n{self.get_forecast_text()}")
+    
+    def get_forecast_text(self):
+        """Tekst prognozy dla bieżących ustawień stron (z pamięci lub zlecenie policzenia w tle)"""
+        if self.rapid_mode_var.get():
+            return "Prognoza: wstrzymana w trybie szybkim"
+        side1, side2 = self.read_combat_inputs(reset_invalid=False)
+        if side1["people"] <= 0 or side2["people"] <= 0:
+            return "Prognoza: podaj liczbę ludzi obu stron"
+        
+        settings_key = tuple(sorted((k, v) for k, v in side1.items() if k != "people")) + \
+            tuple(sorted((k, v) for k, v in side2.items() if k != "people"))
+        key = (settings_key, side1["people"], side2["people"])
+        forecast = self.forecast_cache.get(key)
+        if forecast is None:
+            self.request_forecast(key, side1, side2)
+            return "Prognoza: liczenie…"
+        if "error" in forecast:
+            return f"Prognoza: niedostępna ({forecast['error']})"
+        
+        # Prognoza częściowa lub liczona na przedziałach liczebności nie jest pokazywana jako dokładna
+        if forecast['truncated']:
+            title, approx = "Prognoza częściowa (przybliżona)", "≈"
+        elif forecast['step'] > 1:
+            title, approx = f"Prognoza przybliżona (przedziały po {forecast['step']} ludzi)", "≈"
+        else:
+            title, approx = "Prognoza (do wyczerpania)", ""
+        text = (
+            f"{title}:\n"
+            f"Wygrywa strona 1: {approx}{forecast['side1_wins']:.1%}, strona 2: {approx}{forecast['side2_wins']:.1%}\n"
+            f"Obie złamane: {approx}{forecast['mutual']:.1%}\n"
+            f"Rundy: śr. {approx}{forecast['expected_rounds']:.1f}, "
+            f"mediana {approx}{rounds_quantile(forecast['rounds'], 0.5)}, "
+            f"p90 {approx}{rounds_quantile(forecast['rounds'], 0.9)}\n"
+            f"Ocaleni (śr.): {approx}{forecast['expected_people1']:.0f} / {approx}{forecast['expected_people2']:.0f}"
+        )
+        if forecast['truncated']:
+            text += f"\nNierozstrzygnięte: {forecast['unresolved']:.1%} (wyniki dotyczą tylko rozstrzygniętej części)"
+        return text
+    
+    def request_forecast(self, key, side1, side2):
+        """Zleca prognozę procesowi roboczemu (liczy się tylko ostatnie zlecenie)"""
+        self.forecast_requested = (key, side1, side2)
+        if self.forecast_future is None:
+            self.start_forecast_worker()
+    
+    def start_forecast_worker(self):
+        """Przekazuje oczekującą prognozę do puli procesów (jeden proces, przejścia zapamiętane w nim)"""
+        key, side1, side2 = self.forecast_requested
+        self.forecast_requested = None
+        if self.forecast_pool is None:
+            # spawn - proces roboczy nie dziedziczy stanu Tk ani wątków aplikacji
+            self.forecast_pool = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+        self.forecast_future = (key, self.forecast_pool.submit(forecast_task, side1, side2))
+        self.root.after(self.FORECAST_POLL_MS, self.poll_forecast)
+    
+    def poll_forecast(self):
+        """Odbiera gotową prognozę z procesu roboczego i odświeża panel statystyk"""
+        key, future = self.forecast_future
+        if not future.done():
+            self.root.after(self.FORECAST_POLL_MS, self.poll_forecast)
+            return
+        
+        self.forecast_future = None
+        try:
+            forecast = future.result()
+        except Exception as e:
+            # Uszkodzona pula (np. zabity proces) jest tworzona od nowa przy następnej prognozie
+            self.shutdown_forecast_pool()
+            forecast = {"error": str(e) or type(e).__name__}
+        if len(self.forecast_cache) >= self.FORECAST_CACHE_SIZE:
+            self.forecast_cache.pop(next(iter(self.forecast_cache)))
+        self.forecast_cache[key] = forecast
+        if self.forecast_requested is not None:
+            if self.forecast_requested[0] in self.forecast_cache:
+                self.forecast_requested = None
+            else:
+                self.start_forecast_worker()
+        self.mark_dirty("battle_stats")
+    
+    def shutdown_forecast_pool(self):
+        """Zamyka pulę procesów prognozy (oczekujące zadania są anulowane)"""
+        if self.forecast_pool is not None:
+            self.forecast_pool.shutdown(wait=False, cancel_futures=True)
+            self.forecast_pool = None
+    
+    def format_battle_history_entry(self, i, entry):
+        """Formatuje wpis historii bitwy o numerze i"""
+        exp1_icon = " ⭐" if entry['exp1'] else ""
+        exp2_icon = " ⭐" if entry['exp2'] else ""
+        
+        # Nowy format nazw w zależności od trybu i jednostek
+        side1_units = entry.get('side1_units', [])
+        side2_units = entry.get('side2_units', [])
+        
+        # Określ format na podstawie jednostek i trybu
+        if side1_units and side2_units:
+            # Mamy jednostki po obu stronach
+            side1_in_motion = entry.get('side1_in_motion', False)
+            side2_in_motion = entry.get('side2_in_motion', False)
+            side1_attacking = entry.get('side1_attacking', False)
+            side2_attacking = entry.get('side2_attacking', False)
+            
+            # Formatuj nazwę jednostek (główna + dodatkowe po przecinku)
+            side1_name = side1_units[0]
+            if len(side1_units) > 1:
+                side1_name += ", " + ", ".join(side1_units[1:])
+                
+            side2_name = side2_units[0]
+            if len(side2_units) > 1:
+                side2_name += ", " + ", ".join(side2_units[1:])
+            
+            if side1_in_motion or side2_in_motion:
+                # W ruchu
+                battle_desc = f"Bitwa \"{side1_name}\" z \"{side2_name}\""
+            elif side1_attacking:
+                # Strona 1 atakuje
+                battle_desc = f"Ofensywa \"{side1_name}\" na \"{side2_name}\""
+            elif side2_attacking:
+                # Strona 2 atakuje
+                battle_desc = f"Ofensywa \"{side2_name}\" na \"{side1_name}\""
+            else:
+                # Domyślnie atak vs obrona
+                battle_desc = f"Ofensywa \"{side1_name}\" na \"{side2_name}\""
+            
+            history_line = f"#{i}: {battle_desc}\n"
+            history_line += f"    Kostki: {entry['dice1']}{exp1_icon} vs {entry['dice2']}{exp2_icon}\n"
+        else:
+            # Stary format dla starych zapisów lub brak jednostek
+            unit1_info = f" ({entry.get('unit1_name', '')})" if entry.get('unit1_name') else ""
+            unit2_info = f" ({entry.get('unit2_name', '')})" if entry.get('unit2_name') else ""
+            
+            history_line = f"#{i}: Strona 1: {entry['dice1']}{exp1_icon}{unit1_info} | Strona 2: {entry['dice2']}{exp2_icon}{unit2_info}\n"
+            
+        history_line += f"    Ludzie: {entry['people1_before']}→{entry['people1_after']} | {entry['people2_before']}→{entry['people2_after']}\n\n"
+        return history_line
+    
+    def get_battle_history_lines(self, battle_name):
+        """Zwraca sformatowane wpisy bitwy, formatując tylko te jeszcze nie zapisane w pamięci podręcznej"""
+        battle_history = self.battles[battle_name]["history"]
+        lines = self.battle_history_line_cache.setdefault(battle_name, [])
+        if len(lines) > len(battle_history):
+            # Historia bitwy została podmieniona - sformatuj od nowa
+            del lines[:]
+        for i in range(len(lines), len(battle_history)):
+            lines.append(self.format_battle_history_entry(i + 1, battle_history[i]))
+        return lines
     
     def update_battle_history_display(self):
-        """Aktualizuje wyświetlanie historii wybranej bitwy"""
+        """Aktualizuje wyświetlanie historii wybranej bitwy (pełne przerysowanie)"""
+        if "battles" not in self.built_panels:
+            return
+        
         self.battle_history_text.config(state=tk.NORMAL)
         self.battle_history_text.delete(1.0, tk.END)
+        self.battle_history_block_lines = deque()
+        self.battle_history_displayed = None
         
         if self.current_battle == "Niezapisana" or self.current_battle not in self.battles:
             self.battle_history_text.config(state=tk.DISABLED)
             return
         
-        battle_history = self.battles[self.current_battle]["history"]
+        # Tylko ostatnie BATTLE_HISTORY_DISPLAY_LIMIT wpisów, jednym wstawieniem
+        lines = self.get_battle_history_lines(self.current_battle)
+        visible_lines = lines[-self.BATTLE_HISTORY_DISPLAY_LIMIT:]
+        self.battle_history_text.insert(tk.END, "".join(visible_lines))
+        self.battle_history_block_lines.extend(line.count("\n") for line in visible_lines)
+        self.battle_history_displayed = (self.current_battle, len(lines))
         
-        for i, entry in enumerate(battle_history, 1):
-            exp1_icon = " ⭐" if entry['exp1'] else ""
-            exp2_icon = " ⭐" if entry['exp2'] else ""
-            
-            # Nowy format nazw w zależności od trybu i jednostek
-            side1_units = entry.get('side1_units', [])
-            side2_units = entry.get('side2_units', [])
-            
-            # Określ format na podstawie jednostek i trybu
-            if side1_units and side2_units:
-                # Mamy jednostki po obu stronach
-                side1_in_motion = entry.get('side1_in_motion', False)
-                side2_in_motion = entry.get('side2_in_motion', False)
-                side1_attacking = entry.get('side1_attacking', False)
-                side2_attacking = entry.get('side2_attacking', False)
-                
-                # Formatuj nazwę jednostek (główna + dodatkowe po przecinku)
-                side1_name = side1_units[0]
-                if len(side1_units) > 1:
-                    side1_name += ", " + ", ".join(side1_units[1:])
-                    
-                side2_name = side2_units[0]
-                if len(side2_units) > 1:
-                    side2_name += ", " + ", ".join(side2_units[1:])
-                
-                if side1_in_motion or side2_in_motion:
-                    # W ruchu
-                    battle_desc = f"Bitwa \"{side1_name}\" z \"{side2_name}\""
-                elif side1_attacking:
-                    # Strona 1 atakuje
-                    battle_desc = f"Ofensywa \"{side1_name}\" na \"{side2_name}\""
-                elif side2_attacking:
-                    # Strona 2 atakuje
-                    battle_desc = f"Ofensywa \"{side2_name}\" na \"{side1_name}\""
-                else:
-                    # Domyślnie atak vs obrona
-                    battle_desc = f"Ofensywa \"{side1_name}\" na \"{side2_name}\""
-                
-                history_line = f"#{i}: {battle_desc}\n"
-                history_line += f"    Kostki: {entry['dice1']}{exp1_icon} vs {entry['dice2']}{exp2_icon}\n"
-            else:
-                # Stary format dla starych zapisów lub brak jednostek
-                unit1_info = f" ({entry.get('unit1_name', '')})" if entry.get('unit1_name') else ""
-                unit2_info = f" ({entry.get('unit2_name', '')})" if entry.get('unit2_name') else ""
-                
-                history_line = f"#{i}: Strona 1: {entry['dice1']}{exp1_icon}{unit1_info} | Strona 2: {entry['dice2']}{exp2_icon}{unit2_info}\n"
-                
-            history_line += f"    Ludzie: {entry['people1_before']}→{entry['people1_after']} | {entry['people2_before']}→{entry['people2_after']}\n\n"
-            
-            self.battle_history_text.insert(tk.END, history_line)
+        self.battle_history_text.config(state=tk.DISABLED)
+        self.battle_history_text.see(tk.END)
+    
+    def append_battle_history_display(self):
+        """Dopisuje nowe wpisy wybranej bitwy na końcu panelu i obcina najstarsze od góry"""
+        if "battles" not in self.built_panels:
+            return
+        
+        if self.current_battle == "Niezapisana" or self.current_battle not in self.battles:
+            if self.battle_history_displayed is not None:
+                self.update_battle_history_display()
+            return
         
+        # Panel pokazuje inną bitwę - pełne przerysowanie
+        if self.battle_history_displayed is None or self.battle_history_displayed[0] != self.current_battle:
+            self.update_battle_history_display()
+            return
+        
+        lines = self.get_battle_history_lines(self.current_battle)
+        shown_count = self.battle_history_displayed[1]
+        if shown_count > len(lines):
+            self.update_battle_history_display()
+            return
+        if shown_count == len(lines):
+            return
+        
+        self.battle_history_text.config(state=tk.NORMAL)
+        for line in lines[shown_count:]:
+            self.battle_history_text.insert(tk.END, line)
+            self.battle_history_block_lines.append(line.count("\n"))
+        
+        # Obcięcie najstarszych wpisów od góry
+        while len(self.battle_history_block_lines) > self.BATTLE_HISTORY_DISPLAY_LIMIT:
+            block_lines = self.battle_history_block_lines.popleft()
+            self.battle_history_text.delete("1.0", f"{block_lines + 1}.0")
+        
+        self.battle_history_displayed = (self.current_battle, len(lines))
         self.battle_history_text.config(state=tk.DISABLED)
         self.battle_history_text.see(tk.END)
     
@@ -1645,15 +2700,7 @@ class DiceRollerApp:
             )
             
             if filename:
-                data = {
-                    "battles": self.battles,
-                    "battle_names": self.battle_names,
-                    "saved_at": datetime.now().isoformat()
-                }
-                
-                with open(filename, 'w', encoding='utf-8') as f:
-                    json.dump(data, f, ensure_ascii=False, indent=2)
-                
+                write_battles_file(filename, self.battles, self.battle_names)
                 messagebox.showinfo("Sukces", f"Rejestr bitew zapisany do: {filename}")
         except Exception as e:
             messagebox.showerror("Błąd", f"Nie udało się zapisać rejestru: {str(e)}")
@@ -1667,34 +2714,214 @@ class DiceRollerApp:
             )
             
             if filename:
-                with open(filename, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                
-                # Sprawdzenie struktury danych
-                if "battles" not in data or "battle_names" not in data:
-                    messagebox.showerror("Błąd", "Nieprawidłowy format pliku!")
-                    return
-                
-                # Wczytanie danych
-                self.battles = data["battles"]
-                self.battle_names = data["battle_names"]
+                # Wczytanie i sprawdzenie struktury danych ("Niezapisana" zawsze na początku listy)
+                battles, battle_names = read_battles_file(filename)
                 
-                # Upewnienie się, że "Niezapisana" jest na początku
-                if "Niezapisana" not in self.battle_names:
-                    self.battle_names.insert(0, "Niezapisana")
+                # Wczytanie danych (zdarzenie battles_reset odświeży statystyki i historię bitwy)
+                self.current_battle = "Niezapisana"
+                self.model.set_battles(battles, battle_names)
                 
                 # Aktualizacja interfejsu
                 self.battle_combo.config(values=self.battle_names)
                 self.battle_var.set("Niezapisana")
-                self.current_battle = "Niezapisana"
-                
-                self.update_battle_stats()
-                self.update_battle_history_display()
+                self.rebuild_battle_index()
                 
                 messagebox.showinfo("Sukces", f"Rejestr bitew wczytany z: {filename}")
+        except CampaignFormatError as e:
+            messagebox.showerror("Błąd", str(e))
         except Exception as e:
             messagebox.showerror("Błąd", f"Nie udało się wczytać rejestru: {str(e)}")
     
+    def build_display_name_map(self):
+        """Zwraca mapę nazwa wyświetlana -> ID jednostki (dla starszych wpisów bez zapisanych ID)"""
+        name_to_id = {}
+        for side in ['własne', 'wroga']:
+            for unit_id in self.units[side]:
+                name_to_id[self.get_unit_display_name(unit_id, side)] = unit_id
+        return name_to_id
+    
+    def rebuild_battle_index(self):
+        """Przebudowuje indeks starć z wykazu jednostek i rejestru bitew"""
+        self.battle_index.rebuild(self.units, self.battles, self.build_display_name_map())
+    
+    def export_history_csv(self):
+        """Eksportuje historię starć i udziałów jednostek do płaskiego pliku CSV"""
+        try:
+            filename = filedialog.asksaveasfilename(
+                title="Eksportuj historię do CSV",
+                defaultextension=".csv",
+                filetypes=[("Pliki CSV", "*.csv"), ("Wszystkie pliki", "*.*")]
+            )
+            
+            if filename:
+                rows = iter_history_rows(self.units, self.battles, self.build_display_name_map(), self.get_unit_display_name)
+                count = write_history_csv(filename, rows)
+                messagebox.showinfo("Sukces", f"Wyeksportowano {count} wierszy do: {filename}")
+        except Exception as e:
+            messagebox.showerror("Błąd", f"Nie udało się wyeksportować historii: {str(e)}")
+    
+    def show_battle_search(self):
+        """Pokazuje okno wyszukiwania starć w indeksie"""
+        search_window = tk.Toplevel(self.root)
+        search_window.title("Wyszukiwanie starć")
+        search_window.geometry("860x540")
+        search_window.resizable(True, True)
+        
+        # Ramka główna
+        main_frame = ttk.Frame(search_window, padding="10")
+        main_frame.grid(row=0, column=0, sticky=tk.W+tk.E+tk.N+tk.S)
+        search_window.columnconfigure(0, weight=1)
+        search_window.rowconfigure(0, weight=1)
+        
+        # Filtry
+        filters_frame = ttk.LabelFrame(main_frame, text="Filtry", padding="10")
+        filters_frame.grid(row=0, column=0, sticky=tk.W+tk.E, pady=(0, 10))
+        
+        filters = {
+            'kind': tk.StringVar(value="jednostka"),
+            'unit': tk.StringVar(),
+            'battalion': tk.StringVar(),
+            'side': tk.StringVar(),
+            'outcome': tk.StringVar(),
+            'battle': tk.StringVar(),
+            'date_from': tk.StringVar(),
+            'date_to': tk.StringVar(),
+            'losses_min': tk.StringVar(),
+            'losses_max': tk.StringVar()
+        }
+        
+        # Rodzaj rekordów
+        ttk.Label(filters_frame, text="Szukaj w:", font=("Arial", 9)).grid(row=0, column=0, sticky=tk.W)
+        kind_frame = ttk.Frame(filters_frame)
+        kind_frame.grid(row=0, column=1, columnspan=3, sticky=tk.W)
+        ttk.Radiobutton(kind_frame, text="Udziały jednostek", variable=filters['kind'], value="jednostka").grid(row=0, column=0)
+        ttk.Radiobutton(kind_frame, text="Rejestr bitew", variable=filters['kind'], value="bitwa").grid(row=0, column=1, padx=(10, 0))
+        
+        # Jednostka i batalion
+        ttk.Label(filters_frame, text="Jednostka:", font=("Arial", 9)).grid(row=1, column=0, sticky=tk.W, pady=(5, 0))
+        ttk.Entry(filters_frame, textvariable=filters['unit'], width=18).grid(row=1, column=1, sticky=tk.W, pady=(5, 0))
+        ttk.Label(filters_frame, text="Batalion:", font=("Arial", 9)).grid(row=1, column=2, sticky=tk.W, padx=(10, 0), pady=(5, 0))
+        ttk.Combobox(filters_frame, textvariable=filters['battalion'], state="readonly", width=15,
+                     values=[''] + [data['nazwa'] for data in self.battalions.values()]).grid(row=1, column=3, sticky=tk.W, pady=(5, 0))
+        
+        # Strona i wynik
+        ttk.Label(filters_frame, text="Strona:", font=("Arial", 9)).grid(row=2, column=0, sticky=tk.W, pady=(5, 0))
+        ttk.Combobox(filters_frame, textvariable=filters['side'], state="readonly", width=15,
+                     values=['', 'własne', 'wroga']).grid(row=2, column=1, sticky=tk.W, pady=(5, 0))
+        ttk.Label(filters_frame, text="Wynik:", font=("Arial", 9)).grid(row=2, column=2, sticky=tk.W, padx=(10, 0), pady=(5, 0))
+        ttk.Combobox(filters_frame, textvariable=filters['outcome'], state="readonly", width=15,
+                     values=['', 'zwycięstwo', 'porażka', 'remis', 'strona 1', 'strona 2']).grid(row=2, column=3, sticky=tk.W, pady=(5, 0))
+        
+        # Bitwa
+        ttk.Label(filters_frame, text="Bitwa:", font=("Arial", 9)).grid(row=3, column=0, sticky=tk.W, pady=(5, 0))
+        ttk.Combobox(filters_frame, textvariable=filters['battle'], state="readonly", width=15,
+                     values=[''] + self.battle_names).grid(row=3, column=1, sticky=tk.W, pady=(5, 0))
+        
+        # Zakres dat (RRRR-MM-DD)
+        ttk.Label(filters_frame, text="Data od/do:", font=("Arial", 9)).grid(row=4, column=0, sticky=tk.W, pady=(5, 0))
+        dates_frame = ttk.Frame(filters_frame)
+        dates_frame.grid(row=4, column=1, columnspan=3, sticky=tk.W, pady=(5, 0))
+        ttk.Entry(dates_frame, textvariable=filters['date_from'], width=11).grid(row=0, column=0)
+        ttk.Label(dates_frame, text="–").grid(row=0, column=1, padx=3)
+        ttk.Entry(dates_frame, textvariable=filters['date_to'], width=11).grid(row=0, column=2)
+        ttk.Button(dates_frame, text="Ostatnie 30 dni",
+                   command=lambda: (filters['date_from'].set((datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d')),
+                                    filters['date_to'].set(""))).grid(row=0, column=3, padx=(10, 0))
+        
+        # Zakres strat
+        ttk.Label(filters_frame, text="Straty od/do:", font=("Arial", 9)).grid(row=5, column=0, sticky=tk.W, pady=(5, 0))
+        losses_frame = ttk.Frame(filters_frame)
+        losses_frame.grid(row=5, column=1, columnspan=3, sticky=tk.W, pady=(5, 0))
+        ttk.Entry(losses_frame, textvariable=filters['losses_min'], width=6).grid(row=0, column=0)
+        ttk.Label(losses_frame, text="–").grid(row=0, column=1, padx=3)
+        ttk.Entry(losses_frame, textvariable=filters['losses_max'], width=6).grid(row=0, column=2)
+        
+        # Wyniki
+        results_frame = ttk.Frame(main_frame)
+        results_frame.grid(row=2, column=0, sticky=tk.W+tk.E+tk.N+tk.S)
+        
+        columns = ("data", "bitwa", "jednostki", "wynik", "straty")
+        results_tree = ttk.Treeview(results_frame, columns=columns, show="headings", height=15)
+        for column, heading, width in zip(columns, ("Data", "Bitwa", "Jednostki", "Wynik", "Straty"), (110, 120, 380, 90, 60)):
+            results_tree.heading(column, text=heading)
+            results_tree.column(column, width=width, anchor=tk.W)
+        scrollbar = ttk.Scrollbar(results_frame, orient=tk.VERTICAL, command=results_tree.yview)
+        results_tree.configure(yscrollcommand=scrollbar.set)
+        results_tree.grid(row=0, column=0, sticky=tk.W+tk.E+tk.N+tk.S)
+        scrollbar.grid(row=0, column=1, sticky=tk.N+tk.S)
+        
+        status_label = ttk.Label(main_frame, text=f"Rekordów w indeksie: {len(self.battle_index)}", font=("Arial", 9), foreground="blue")
+        status_label.grid(row=3, column=0, sticky=tk.W, pady=(5, 0))
+        
+        # Przyciski
+        search_command = lambda: self.run_battle_search(filters, results_tree, status_label)
+        buttons_frame = ttk.Frame(main_frame)
+        buttons_frame.grid(row=1, column=0, pady=(0, 10))
+        ttk.Button(buttons_frame, text="Szukaj", command=search_command).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Button(buttons_frame, text="Zamknij", command=search_window.destroy).pack(side=tk.LEFT, padx=(5, 0))
+        search_window.bind('<Return>', lambda event: search_command())
+        
+        # Konfiguracja kolumn i wierszy
+        main_frame.columnconfigure(0, weight=1)
+        main_frame.rowconfigure(2, weight=1)
+        results_frame.columnconfigure(0, weight=1)
+        results_frame.rowconfigure(0, weight=1)
+    
+    def run_battle_search(self, filters, results_tree, status_label, max_rows=500):
+        """Wykonuje zapytanie do indeksu starć i wypełnia listę wyników"""
+        # Jednostka - dopasowanie fragmentu nazwy wyświetlanej
+        unit_ids = None
+        unit_text = filters['unit'].get().strip().lower()
+        if unit_text:
+            unit_ids = [unit_id for side in ['własne', 'wroga'] for unit_id in self.units[side]
+                        if unit_text in self.get_unit_display_name(unit_id, side).lower()]
+        
+        battalion_ids = None
+        battalion_name = filters['battalion'].get()
+        if battalion_name:
+            battalion_ids = [bid for bid, data in self.battalions.items() if data['nazwa'] == battalion_name]
+        
+        side = filters['side'].get()
+        outcome = filters['outcome'].get()
+        battle = filters['battle'].get()
+        date_from = filters['date_from'].get().strip() or None
+        date_to = filters['date_to'].get().strip() or None
+        
+        try:
+            losses_min = int(filters['losses_min'].get()) if filters['losses_min'].get().strip() else None
+            losses_max = int(filters['losses_max'].get()) if filters['losses_max'].get().strip() else None
+        except ValueError:
+            messagebox.showwarning("Błąd", "Zakres strat musi być liczbą!")
+            return
+        
+        start_time = time.perf_counter()
+        results = self.battle_index.query(
+            rodzaj=filters['kind'].get(),
+            jednostki=unit_ids,
+            bataliony=battalion_ids,
+            strony=[side] if side else None,
+            wyniki=[outcome] if outcome else None,
+            bitwy=[battle] if battle else None,
+            data_od=date_from,
+            data_do=date_to,
+            straty_min=losses_min,
+            straty_max=losses_max
+        )
+        elapsed_ms = (time.perf_counter() - start_time) * 1000
+        
+        # Wypełnienie listy (tylko pierwsze max_rows wyników)
+        results_tree.delete(*results_tree.get_children())
+        for record in results[:max_rows]:
+            entry = record['wpis']
+            if record['rodzaj'] == 'jednostka':
+                units_text = self.get_unit_display_name(record['jednostka'], record['strona'])
+            else:
+                units_text = f"{', '.join(entry.get('side1_units', []))} vs {', '.join(entry.get('side2_units', []))}"
+            results_tree.insert('', tk.END, values=(record['data'], record['bitwa'], units_text, record['wynik'], record['straty']))
+        
+        shown = min(len(results), max_rows)
+        status_label.config(text=f"Znaleziono: {len(results)} (pokazano {shown}) | Zapytanie: {elapsed_ms:.1f} ms | Rekordów w indeksie: {len(self.battle_index)}")
+    
     # === FUNKCJE DLA ZARZĄDZANIA JEDNOSTKAMI ===
     
     def save_units(self):
@@ -1707,15 +2934,7 @@ class DiceRollerApp:
             )
             
             if filename:
-                data = {
-                    "units": self.units,
-                    "battalions": self.battalions,
-                    "saved_at": datetime.now().isoformat()
-                }
-                
-                with open(filename, 'w', encoding='utf-8') as f:
-                    json.dump(data, f, ensure_ascii=False, indent=2)
-                
+                write_units_file(filename, self.units, self.battalions)
                 messagebox.showinfo("Sukces", f"Wykaz jednostek zapisany do: {filename}")
         except Exception as e:
             messagebox.showerror("Błąd", f"Nie udało się zapisać wykazu: {str(e)}")
@@ -1729,44 +2948,22 @@ class DiceRollerApp:
             )
             
             if filename:
-                with open(filename, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                
-                # Sprawdzenie struktury danych
-                if "units" not in data:
-                    messagebox.showerror("Błąd", "Nieprawidłowy format pliku!")
-                    return
-                
-                # Wczytanie danych jednostek
-                self.units = data["units"]
-                
-                # Wczytanie batalionów (jeśli są w pliku)
-                if "battalions" in data:
-                    self.battalions = data["battalions"]
-                else:
-                    # Dla starych plików bez batalionów
-                    self.battalions = {}
-                
-                # Upewnienie się o prawidłowej strukturze
-                if "własne" not in self.units:
-                    self.units["własne"] = {}
-                if "wroga" not in self.units:
-                    self.units["wroga"] = {}
+                # Wczytanie i sprawdzenie struktury danych (uzupełnia brakujące strony i historia_bitew)
+                units, battalions = read_units_file(filename)
                 
-                # Dodanie pola historia_bitew do istniejących jednostek
-                for side in ["własne", "wroga"]:
-                    for unit_name, unit_data in self.units[side].items():
-                        if "historia_bitew" not in unit_data:
-                            unit_data["historia_bitew"] = []
+                # Wczytanie batalionów (dla starych plików bez batalionów - pusty słownik) i migracja starych jednostek;
+                # zdarzenie units_reset czyści pamięci podręczne i odświeża comboboxy po migracji
+                with self.model.batch():
+                    self.model.set_units(units, battalions)
+                    self.migrate_old_units()
                 
-                # Migracja starych jednostek i aktualizacja interfejsu
-                self.migrate_old_units()
-                self.update_units_combos()
-                self.update_battle_units_combos()
                 self.update_battalion_combos()
                 self.hide_unit_details()
+                self.rebuild_battle_index()
                 
                 messagebox.showinfo("Sukces", f"Wykaz jednostek wczytany z: {filename}")
+        except CampaignFormatError as e:
+            messagebox.showerror("Błąd", str(e))
         except Exception as e:
             messagebox.showerror("Błąd", f"Nie udało się wczytać wykazu: {str(e)}")
     
@@ -1823,7 +3020,8 @@ class DiceRollerApp:
         
         # Dodanie jednostki
         self.units[side][unit_id] = unit_data
-        
+        self.sync_units(unit_id)
+        self.roster_version += 1
         
         # Aktualizacja interfejsu
         self.update_units_combos()
@@ -1844,7 +3042,7 @@ class DiceRollerApp:
         # Automatyczne zwiększenie numeru dla następnej jednostki (zachowaj batalion)
         self.new_unit_number_var.set(str(unit_number + 1))
         
-        messagebox.showinfo("Sukces", f"Utworzono jednostkę: {display_name}")
+        self.notify("Sukces", f"Utworzono jednostkę: {display_name}")
     
     def on_unit_selected(self, side):
         """Obsługuje wybór jednostki"""
@@ -1874,38 +3072,30 @@ class DiceRollerApp:
     
     def update_units_combos(self):
         """Aktualizuje zawartość comboboxów jednostek"""
+        if "units" not in self.built_panels:
+            return
+        if not self.combo_source_changed('units', self.roster_version):
+            return
+        
         # Twórz listy nazw do wyświetlania
         own_units_display = [self.get_unit_display_name(unit_id, "własne") for unit_id in self.units["własne"].keys()]
         enemy_units_display = [self.get_unit_display_name(unit_id, "wroga") for unit_id in self.units["wroga"].keys()]
         
-        self.own_units_combo.config(values=own_units_display)
-        self.enemy_units_combo.config(values=enemy_units_display)
+        self.set_combo_values('own_units', self.own_units_combo, own_units_display)
+        self.set_combo_values('enemy_units', self.enemy_units_combo, enemy_units_display)
     
-    def show_unit_details(self):
-        """Pokazuje szczegóły wybranej jednostki"""
+    def get_current_unit_data(self):
+        """Zwraca dane obecnie wybranej jednostki lub None"""
         if not self.current_unit or self.current_unit_side not in self.units:
-            return
-        
-        if self.current_unit not in self.units[self.current_unit_side]:
-            return
-        
-        # Pokaż frame szczegółów
-        self.unit_details_frame.grid(row=4, column=0, sticky=tk.W+tk.E+tk.N+tk.S, pady=(10, 0))
-        
-        # Uaktualnij tytuł
-        display_name = self.get_unit_display_name(self.current_unit, self.current_unit_side)
-        self.unit_details_frame.config(text=f"Szczegóły: {display_name} ({self.current_unit_side})")
-        
-        # Usuń poprzednie contentery jeśli istnieją
-        for widget in self.unit_details_frame.winfo_children():
-            widget.destroy()
-        
-        unit_data = self.units[self.current_unit_side][self.current_unit]
-        
+            return None
+        return self.units[self.current_unit_side].get(self.current_unit)
+    
+    def build_unit_details_form(self):
+        """Buduje formularz szczegółów jednostki (raz, później tylko przepinane są wartości)"""
         # Numer jednostki
         row = 0
         ttk.Label(self.unit_details_frame, text="Numer:", font=("Arial", 9)).grid(row=row, column=0, sticky=tk.W, padx=(0, 5))
-        self.unit_number_var = tk.StringVar(value=str(unit_data.get("numer", 1)))
+        self.unit_number_var = tk.StringVar()
         self.unit_number_entry = ttk.Entry(self.unit_details_frame, textvariable=self.unit_number_var, width=8)
         self.unit_number_entry.grid(row=row, column=1, sticky=tk.W, padx=(0, 5))
         self.unit_number_entry.bind('<KeyRelease>', self.on_unit_data_change)
@@ -1913,7 +3103,7 @@ class DiceRollerApp:
         # Typ jednostki
         row += 1
         ttk.Label(self.unit_details_frame, text="Typ:", font=("Arial", 9)).grid(row=row, column=0, sticky=tk.W, padx=(0, 5), pady=(5, 0))
-        self.unit_type_var = tk.StringVar(value=unit_data.get("typ", "kompania"))
+        self.unit_type_var = tk.StringVar(value="kompania")
         unit_type_detail_frame = ttk.Frame(self.unit_details_frame)
         unit_type_detail_frame.grid(row=row, column=1, sticky=tk.W, padx=(0, 5), pady=(5, 0))
         ttk.Radiobutton(unit_type_detail_frame, text="Komp.", variable=self.unit_type_var, value="kompania", command=self.on_unit_data_change).grid(row=0, column=0)
@@ -1922,16 +3112,12 @@ class DiceRollerApp:
         # Batalion
         row += 1
         ttk.Label(self.unit_details_frame, text="Batalion:", font=("Arial", 9)).grid(row=row, column=0, sticky=tk.W, padx=(0, 5), pady=(5, 0))
-        battalion_id = unit_data.get("batalion", None)
-        battalion_name = ""
-        if battalion_id and battalion_id in self.battalions:
-            battalion_name = self.battalions[battalion_id]['nazwa']
-        self.unit_battalion_var = tk.StringVar(value=battalion_name)
+        self.unit_battalion_var = tk.StringVar()
         self.unit_battalion_combo = ttk.Combobox(self.unit_details_frame, textvariable=self.unit_battalion_var, 
-                                                values=[''] + [data['nazwa'] for data in self.battalions.values()], 
-                                                state="readonly", width=12)
+                                                values=[''], state="readonly", width=12)
         self.unit_battalion_combo.grid(row=row, column=1, sticky=tk.W, padx=(0, 5), pady=(5, 0))
         self.unit_battalion_combo.bind('<<ComboboxSelected>>', self.on_unit_data_change)
+        self.unit_battalion_values = ['']
         
         
         # Liczba ludzi (format X/150)
@@ -1940,7 +3126,7 @@ class DiceRollerApp:
         people_frame = ttk.Frame(self.unit_details_frame)
         people_frame.grid(row=row, column=1, sticky=tk.W+tk.E, padx=(0, 5), pady=(5, 0))
         
-        self.unit_people_var = tk.StringVar(value=str(unit_data["liczba_ludzi"]))
+        self.unit_people_var = tk.StringVar()
         self.unit_people_entry = ttk.Entry(people_frame, textvariable=self.unit_people_var, width=5)
         self.unit_people_entry.grid(row=0, column=0)
         self.unit_people_entry.bind('<KeyRelease>', self.on_unit_data_change)
@@ -1949,7 +3135,7 @@ class DiceRollerApp:
         # Doświadczenie
         row += 1
         ttk.Label(self.unit_details_frame, text="Doświadczenie:", font=("Arial", 9)).grid(row=row, column=0, sticky=tk.W, padx=(0, 5), pady=(5, 0))
-        self.unit_exp_var = tk.StringVar(value=str(unit_data["doświadczenie"]))
+        self.unit_exp_var = tk.StringVar()
         self.unit_exp_entry = ttk.Entry(self.unit_details_frame, textvariable=self.unit_exp_var, width=5)
         self.unit_exp_entry.grid(row=row, column=1, sticky=tk.W, padx=(0, 5), pady=(5, 0))
         self.unit_exp_entry.bind('<KeyRelease>', self.on_unit_data_change)
@@ -1960,7 +3146,7 @@ class DiceRollerApp:
         supplies_frame = ttk.Frame(self.unit_details_frame)
         supplies_frame.grid(row=row, column=1, sticky=tk.W+tk.E, padx=(0, 5), pady=(5, 0))
         
-        self.unit_supplies_var = tk.StringVar(value=str(unit_data["zapasy"]))
+        self.unit_supplies_var = tk.StringVar()
         self.unit_supplies_entry = ttk.Entry(supplies_frame, textvariable=self.unit_supplies_var, width=5)
         self.unit_supplies_entry.grid(row=0, column=0)
         self.unit_supplies_entry.bind('<KeyRelease>', self.on_unit_data_change)
@@ -1969,7 +3155,7 @@ class DiceRollerApp:
         # Liczba zwycięstw
         row += 1
         ttk.Label(self.unit_details_frame, text="Zwycięstwa:", font=("Arial", 9)).grid(row=row, column=0, sticky=tk.W, padx=(0, 5), pady=(5, 0))
-        self.unit_victories_var = tk.StringVar(value=str(unit_data["liczba_zwycięstw"]))
+        self.unit_victories_var = tk.StringVar()
         self.unit_victories_entry = ttk.Entry(self.unit_details_frame, textvariable=self.unit_victories_var, width=5)
         self.unit_victories_entry.grid(row=row, column=1, sticky=tk.W, padx=(0, 5), pady=(5, 0))
         self.unit_victories_entry.bind('<KeyRelease>', self.on_unit_data_change)
@@ -1977,7 +3163,7 @@ class DiceRollerApp:
         # Liczba uzupełnień
         row += 1
         ttk.Label(self.unit_details_frame, text="Uzupełnienia:", font=("Arial", 9)).grid(row=row, column=0, sticky=tk.W, padx=(0, 5), pady=(5, 0))
-        self.unit_reinforcements_var = tk.StringVar(value=str(unit_data["liczba_uzupełnień"]))
+        self.unit_reinforcements_var = tk.StringVar()
         self.unit_reinforcements_entry = ttk.Entry(self.unit_details_frame, textvariable=self.unit_reinforcements_var, width=5)
         self.unit_reinforcements_entry.grid(row=row, column=1, sticky=tk.W, padx=(0, 5), pady=(5, 0))
         self.unit_reinforcements_entry.bind('<KeyRelease>', self.on_unit_data_change)
@@ -1987,18 +3173,67 @@ class DiceRollerApp:
         side_buttons_frame = ttk.Frame(self.unit_details_frame)
         side_buttons_frame.grid(row=row, column=0, columnspan=2, pady=(10, 5))
         
-        self.unit_side_var = tk.StringVar(value=unit_data.get("strona", self.current_unit_side))
+        self.unit_side_var = tk.StringVar(value="własne")
         ttk.Radiobutton(side_buttons_frame, text="Swoje", variable=self.unit_side_var, value="własne", command=self.on_unit_side_change).grid(row=0, column=0, padx=(0, 10))
         ttk.Radiobutton(side_buttons_frame, text="Wróg", variable=self.unit_side_var, value="wroga", command=self.on_unit_side_change).grid(row=0, column=1, padx=(10, 0))
         
-        # Przyciski na dole
+        # Przyciski na dole - działają na jednostce wybranej w chwili kliknięcia
         row += 1
         buttons_bottom_frame = ttk.Frame(self.unit_details_frame)
         buttons_bottom_frame.grid(row=row, column=0, columnspan=2, pady=(5, 0))
         
         ttk.Button(buttons_bottom_frame, text="Eksportuj dane", command=self.export_unit_data).pack(side=tk.LEFT, padx=(0, 5))
-        ttk.Button(buttons_bottom_frame, text="📋", command=lambda unit_data=unit_data: self.show_unit_battle_history(unit_data), width=3).pack(side=tk.LEFT, padx=(5, 0))
-        ttk.Button(buttons_bottom_frame, text="🗑️", command=lambda unit_data=unit_data: self.delete_unit(unit_data), width=3).pack(side=tk.LEFT, padx=(5, 0))
+        ttk.Button(buttons_bottom_frame, text="📋", command=lambda: self.with_current_unit(self.show_unit_battle_history), width=3).pack(side=tk.LEFT, padx=(5, 0))
+        ttk.Button(buttons_bottom_frame, text="📈", command=lambda: self.with_current_unit(self.show_unit_analytics), width=3).pack(side=tk.LEFT, padx=(5, 0))
+        ttk.Button(buttons_bottom_frame, text="🗑️", command=lambda: self.with_current_unit(self.delete_unit), width=3).pack(side=tk.LEFT, padx=(5, 0))
+        
+        self.unit_details_built = True
+    
+    def with_current_unit(self, action):
+        """Wywołuje action(unit_data) dla obecnie wybranej jednostki (jeśli istnieje)"""
+        unit_data = self.get_current_unit_data()
+        if unit_data is not None:
+            action(unit_data)
+    
+    def show_unit_details(self):
+        """Pokazuje szczegóły wybranej jednostki"""
+        unit_data = self.get_current_unit_data()
+        if unit_data is None:
+            return
+        
+        # Pokaż frame szczegółów
+        self.unit_details_frame.grid(row=4, column=0, sticky=tk.W+tk.E+tk.N+tk.S, pady=(10, 0))
+        
+        # Uaktualnij tytuł
+        display_name = self.get_unit_display_name(self.current_unit, self.current_unit_side)
+        self.unit_details_frame.config(text=f"Szczegóły: {display_name} ({self.current_unit_side})")
+        
+        if not self.unit_details_built:
+            self.build_unit_details_form()
+        
+        # Lista batalionów - konfiguracja tylko przy zmianie
+        battalion_values = [''] + [data['nazwa'] for data in self.battalions.values()]
+        if battalion_values != self.unit_battalion_values:
+            self.unit_battalion_combo.config(values=battalion_values)
+            self.unit_battalion_values = battalion_values
+        
+        battalion_id = unit_data.get("batalion", None)
+        battalion_name = ""
+        if battalion_id and battalion_id in self.battalions:
+            battalion_name = self.battalions[battalion_id]['nazwa']
+        
+        # Przepięcie wartości formularza na wybraną jednostkę
+        for var, value in ((self.unit_number_var, str(unit_data.get("numer", 1))),
+                           (self.unit_type_var, unit_data.get("typ", "kompania")),
+                           (self.unit_battalion_var, battalion_name),
+                           (self.unit_people_var, str(unit_data["liczba_ludzi"])),
+                           (self.unit_exp_var, str(unit_data["doświadczenie"])),
+                           (self.unit_supplies_var, str(unit_data["zapasy"])),
+                           (self.unit_victories_var, str(unit_data["liczba_zwycięstw"])),
+                           (self.unit_reinforcements_var, str(unit_data["liczba_uzupełnień"])),
+                           (self.unit_side_var, unit_data.get("strona", self.current_unit_side))):
+            if var.get() != value:
+                var.set(value)
     
     def delete_unit(self, unit_data):
         """Usuwa jednostkę"""
@@ -2011,8 +3246,8 @@ class DiceRollerApp:
             return
         
         # Sprawdź czy jednostka nie uczestniczy w bitwie
-        participating_in_side1 = any(u['name'] == unit_id for u in self.participating_units["strona1"])
-        participating_in_side2 = any(u['name'] == unit_id for u in self.participating_units["strona2"])
+        participating_in_side1 = unit_id in self.participant_ids("strona1")
+        participating_in_side2 = unit_id in self.participant_ids("strona2")
         
         if participating_in_side1 or participating_in_side2:
             messagebox.showwarning("Błąd", "Nie można usunąć jednostki która uczestniczy w bitwie!\nPierw zresetuj jednostki biorące udział w bitwie.")
@@ -2022,6 +3257,10 @@ class DiceRollerApp:
         
         # Usuń jednostkę
         del self.units[unit_side][unit_id]
+        self.sync_units(unit_id)
+        self.unit_history_line_cache.pop(unit_id, None)
+        self.invalidate_display_names([unit_id])
+        self.battle_index.refresh_unit(unit_id, self.units)
         
         # Ukryj szczegóły
         self.hide_unit_details()
@@ -2037,7 +3276,8 @@ class DiceRollerApp:
     
     def hide_unit_details(self):
         """Ukrywa szczegóły jednostki"""
-        self.unit_details_frame.grid_remove()
+        if "units" in self.built_panels:
+            self.unit_details_frame.grid_remove()
         self.current_unit = None
         self.current_unit_side = "własne"
     
@@ -2052,6 +3292,7 @@ class DiceRollerApp:
         try:
             # Aktualizacja danych jednostki
             unit_data = self.units[self.current_unit_side][self.current_unit]
+            name_fields = (unit_data.get("numer"), unit_data.get("typ"), unit_data.get("batalion"))
             
             # Aktualizacja numeru
             if hasattr(self, 'unit_number_var'):
@@ -2073,18 +3314,24 @@ class DiceRollerApp:
                             break
                 unit_data["batalion"] = battalion_id
             
-            # Aktualizuj wyświetlaną nazwę w interfejsie
-            new_display_name = self.get_unit_display_name(self.current_unit, self.current_unit_side)
-            if self.current_unit_side == "własne":
-                self.own_units_var.set(new_display_name)
-            else:
-                self.enemy_units_var.set(new_display_name)
-            
-            # Aktualizuj tytuł szczegółów
-            self.unit_details_frame.config(text=f"Szczegóły: {new_display_name} ({self.current_unit_side})")
-            
-            # Aktualizuj comboboxy
-            self.update_units_combos()
+            # Nazwa wyświetlana zależy tylko od numeru, typu i batalionu
+            if (unit_data.get("numer"), unit_data.get("typ"), unit_data.get("batalion")) != name_fields:
+                self.invalidate_display_names([self.current_unit])
+                if unit_data.get("batalion") != name_fields[2]:
+                    self.battle_index.refresh_unit(self.current_unit, self.units)
+                
+                # Aktualizuj wyświetlaną nazwę w interfejsie
+                new_display_name = self.get_unit_display_name(self.current_unit, self.current_unit_side)
+                if self.current_unit_side == "własne":
+                    self.own_units_var.set(new_display_name)
+                else:
+                    self.enemy_units_var.set(new_display_name)
+                
+                # Aktualizuj tytuł szczegółów
+                self.unit_details_frame.config(text=f"Szczegóły: {new_display_name} ({self.current_unit_side})")
+                
+                # Aktualizuj comboboxy
+                self.update_units_combos()
             
             # Liczba ludzi (max 150)
             if hasattr(self, 'unit_people_var'):
@@ -2117,6 +3364,7 @@ class DiceRollerApp:
                 reinforcements = max(0, reinforcements)
                 unit_data["liczba_uzupełnień"] = reinforcements
             
+            self.sync_units(self.current_unit)
         except ValueError:
             # Ignoruj błędy konwersji podczas wpisywania
             pass
@@ -2178,47 +3426,20 @@ class DiceRollerApp:
     
     def on_unit_type_change(self):
         """Obsługuje zmianę typu jednostki (własne/wroga/brak)"""
-        # Aktualizacja comboboxów dla strony 1
+        # Aktualizacja comboboxów obu stron (wybór jest zerowany)
         unit_type1 = self.unit_side1_type_var.get()
-        if unit_type1 == "brak":
-            self.unit_side1_combo.config(values=[], state="disabled")
-            self.unit_side1_var.set("")
-            self.selected_unit_side1 = None
-        else:
-            # Stwórz mapę ID -> sformatowana nazwa i lista sformatowanych nazw
-            units_display_names = []
-            self.unit_side1_id_to_display = {}
-            for unit_id in self.units[unit_type1].keys():
-                display_name = self.get_unit_display_name(unit_id, unit_type1)
-                units_display_names.append(display_name)
-                self.unit_side1_id_to_display[display_name] = unit_id
-            
-            self.unit_side1_combo.config(values=units_display_names, state="readonly")
-            self.unit_side1_var.set("")
-            self.selected_unit_side1 = None
-        
-        # Aktualizacja comboboxów dla strony 2
         unit_type2 = self.unit_side2_type_var.get()
-        if unit_type2 == "brak":
-            self.unit_side2_combo.config(values=[], state="disabled")
-            self.unit_side2_var.set("")
-            self.selected_unit_side2 = None
-        else:
-            # Stwórz mapę ID -> sformatowana nazwa i lista sformatowanych nazw
-            units_display_names = []
-            self.unit_side2_id_to_display = {}
-            for unit_id in self.units[unit_type2].keys():
-                display_name = self.get_unit_display_name(unit_id, unit_type2)
-                units_display_names.append(display_name)
-                self.unit_side2_id_to_display[display_name] = unit_id
-            
-            self.unit_side2_combo.config(values=units_display_names, state="readonly")
-            self.unit_side2_var.set("")
-            self.selected_unit_side2 = None
+        self.fill_battle_unit_combo(1, unit_type1)
+        self.fill_battle_unit_combo(2, unit_type2)
+        self.unit_side1_var.set("")
+        self.unit_side2_var.set("")
+        self.selected_unit_side1 = None
+        self.selected_unit_side2 = None
         
         # Zapisz typy jednostek
         self.unit_side1_type = unit_type1
         self.unit_side2_type = unit_type2
+        self.sync_session_locks()
         
         # NIE resetuj pól doświadczenia i liczby ludzi - tylko gdy wybierze się konkretną jednostkę
     
@@ -2234,7 +3455,11 @@ class DiceRollerApp:
                 # Konwertuj display name na ID jednostki
                 if hasattr(self, 'unit_side1_id_to_display') and display_name in self.unit_side1_id_to_display:
                     unit_id = self.unit_side1_id_to_display[display_name]
+                    if not self.check_unit_lock(unit_id):
+                        self.unit_side1_var.set("")
+                        return
                     self.selected_unit_side1 = unit_id
+                    self.sync_session_locks()
                     # Automatyczne wypełnienie danych z jednostki
                     unit_data = self.units[self.unit_side1_type][unit_id]
                     self.dice1_exp_var.set(unit_data["doświadczenie"])
@@ -2252,7 +3477,11 @@ class DiceRollerApp:
                 # Konwertuj display name na ID jednostki
                 if hasattr(self, 'unit_side2_id_to_display') and display_name in self.unit_side2_id_to_display:
                     unit_id = self.unit_side2_id_to_display[display_name]
+                    if not self.check_unit_lock(unit_id):
+                        self.unit_side2_var.set("")
+                        return
                     self.selected_unit_side2 = unit_id
+                    self.sync_session_locks()
                     # Automatyczne wypełnienie danych z jednostki
                     unit_data = self.units[self.unit_side2_type][unit_id]
                     self.dice2_exp_var.set(unit_data["doświadczenie"])
@@ -2265,45 +3494,38 @@ class DiceRollerApp:
     
     def update_battle_units_combos(self):
         """Aktualizuje comboboxi wyboru jednostek do bitwy po załadowaniu danych"""
-        # Combobox dla strony 1
+        # Ukryj jednostki uczestniczące (także w innych sesjach)
+        locked_elsewhere = self.sessions.locked_elsewhere(self.sessions.active_id)
         if hasattr(self, 'unit_side1_combo'):
-            if self.unit_side1_type == "brak":
-                self.unit_side1_combo.config(values=[], state="disabled")
-            else:
-                # Pobierz wszystkie jednostki z sformatowanymi nazwami i ukryj te, które już uczestniczą
-                all_unit_ids = list(self.units[self.unit_side1_type].keys())
-                participating_ids = [self.get_unit_id(u) for u in self.participating_units["strona1"]]
-                available_unit_ids = [unit_id for unit_id in all_unit_ids if unit_id not in participating_ids]
-                
-                # Stwórz listę sformatowanych nazw i mapę
-                units_display_names = []
-                self.unit_side1_id_to_display = {}
-                for unit_id in available_unit_ids:
-                    display_name = self.get_unit_display_name(unit_id, self.unit_side1_type)
-                    units_display_names.append(display_name)
-                    self.unit_side1_id_to_display[display_name] = unit_id
-                
-                self.unit_side1_combo.config(values=units_display_names, state="readonly")
-        
-        # Combobox dla strony 2
+            self.fill_battle_unit_combo(1, self.unit_side1_type, self.participant_ids("strona1") | locked_elsewhere)
         if hasattr(self, 'unit_side2_combo'):
-            if self.unit_side2_type == "brak":
-                self.unit_side2_combo.config(values=[], state="disabled")
-            else:
-                # Pobierz wszystkie jednostki z sformatowanymi nazwami i ukryj te, które już uczestniczą
-                all_unit_ids = list(self.units[self.unit_side2_type].keys())
-                participating_ids = [self.get_unit_id(u) for u in self.participating_units["strona2"]]
-                available_unit_ids = [unit_id for unit_id in all_unit_ids if unit_id not in participating_ids]
-                
-                # Stwórz listę sformatowanych nazw i mapę
-                units_display_names = []
-                self.unit_side2_id_to_display = {}
-                for unit_id in available_unit_ids:
-                    display_name = self.get_unit_display_name(unit_id, self.unit_side2_type)
-                    units_display_names.append(display_name)
-                    self.unit_side2_id_to_display[display_name] = unit_id
-                
-                self.unit_side2_combo.config(values=units_display_names, state="readonly")
+            self.fill_battle_unit_combo(2, self.unit_side2_type, self.participant_ids("strona2") | locked_elsewhere)
+    
+    def fill_battle_unit_combo(self, side_number, unit_type, hidden_ids=frozenset()):
+        """Buduje listę jednostek strony do wyboru; pomija budowę, gdy wykaz, typ i ukryte jednostki się nie zmieniły"""
+        key, combo = ('unit_side1', self.unit_side1_combo) if side_number == 1 else ('unit_side2', self.unit_side2_combo)
+        if unit_type == "brak":
+            self.combo_sources.pop(key, None)
+            self.set_combo_values(key, combo, [], state="disabled")
+            return
+        if not self.combo_source_changed(key, self.roster_version, unit_type, frozenset(hidden_ids)):
+            return
+        
+        # Stwórz listę sformatowanych nazw i mapę
+        units_display_names = []
+        id_to_display = {}
+        for unit_id in self.units[unit_type].keys():
+            if unit_id in hidden_ids:
+                continue
+            display_name = self.get_unit_display_name(unit_id, unit_type)
+            units_display_names.append(display_name)
+            id_to_display[display_name] = unit_id
+        
+        if side_number == 1:
+            self.unit_side1_id_to_display = id_to_display
+        else:
+            self.unit_side2_id_to_display = id_to_display
+        self.set_combo_values(key, combo, units_display_names, state="readonly")
     
     def on_unit_side_change(self, event=None):
         """Obsługuje zmianę strony jednostki w szczegółach"""
@@ -2329,9 +3551,12 @@ class DiceRollerApp:
             
             del self.units[old_side][self.current_unit]
             self.units[new_side][self.current_unit] = unit_data
+            self.sync_units(self.current_unit)
             
             # Aktualizuj stan
             self.current_unit_side = new_side
+            self.invalidate_display_names([self.current_unit])
+            self.battle_index.refresh_unit(self.current_unit, self.units)
             
             # Aktualizuj interfejs
             self.update_units_combos()
@@ -2353,29 +3578,39 @@ class DiceRollerApp:
     def get_all_participating_units(self, side_number):
         """Pomocnicza funkcja do zbierania wszystkich jednostek uczestniczących po stronie"""
         if side_number == 1:
-            all_units = list(self.participating_units["strona1"])
-            if self.selected_unit_side1 and self.unit_side1_type != "brak":
-                if not any(self.get_unit_id(u) == self.selected_unit_side1 for u in all_units):
-                    unit_data = self.units[self.unit_side1_type][self.selected_unit_side1]
-                    all_units.append({
-                        'id': self.selected_unit_side1,
-                        'name': self.selected_unit_side1,
-                        'people': unit_data["liczba_ludzi"],
-                        'side': self.unit_side1_type
-                    })
+            side_key, selected_unit, unit_type = "strona1", self.selected_unit_side1, self.unit_side1_type
         else:
-            all_units = list(self.participating_units["strona2"])
-            if self.selected_unit_side2 and self.unit_side2_type != "brak":
-                if not any(self.get_unit_id(u) == self.selected_unit_side2 for u in all_units):
-                    unit_data = self.units[self.unit_side2_type][self.selected_unit_side2]
-                    all_units.append({
-                        'id': self.selected_unit_side2,
-                        'name': self.selected_unit_side2,
-                        'people': unit_data["liczba_ludzi"],
-                        'side': self.unit_side2_type
-                    })
+            side_key, selected_unit, unit_type = "strona2", self.selected_unit_side2, self.unit_side2_type
+        
+        all_units = list(self.participating_units[side_key])
+        if selected_unit and unit_type != "brak" and selected_unit not in self.participant_ids(side_key):
+            unit_data = self.units[unit_type][selected_unit]
+            all_units.append({
+                'id': selected_unit,
+                'name': selected_unit,
+                'people': unit_data["liczba_ludzi"],
+                'side': unit_type
+            })
         return all_units
     
+    def participant_ids(self, side_key):
+        """Zbiór ID jednostek dodanych do udziału w bitwie po stronie (utrzymywany przy participation_changed; tylko do odczytu)"""
+        return self.participant_id_sets[side_key]
+    
+    def get_side_participants(self, side_number):
+        """Zwraca [(jednostka, ID, strona danych, dane lub None, nazwa wyświetlana)] w jednym przebiegu"""
+        participants = []
+        for unit in self.get_all_participating_units(side_number):
+            unit_id = self.get_unit_id(unit)
+            side_name = unit.get('side', '')
+            unit_data = self.units[side_name].get(unit_id) if side_name in self.units else None
+            data_side = side_name
+            if unit_data is None:
+                data_side, unit_data = self.model.find_unit(unit_id)
+            display_name = self.get_unit_display_name(unit_id, side_name) if unit_id and side_name else unit.get('name', unit_id)
+            participants.append((unit, unit_id, data_side, unit_data, display_name))
+        return participants
+    
     def get_unit_id(self, unit):
         """Pomocnicza funkcja do pobierania ID jednostki z obiektu"""
         return unit.get('id', unit.get('name', ''))
@@ -2385,47 +3620,36 @@ class DiceRollerApp:
         side1_won = dice1_final > 1 and dice1_final > dice2_final
         side2_won = dice2_final > 1 and dice2_final > dice1_final
         
-        # Debug info z sformatowanymi nazwami
         all_side1_units = self.get_all_participating_units(1)
         all_side2_units = self.get_all_participating_units(2)
         
-        side1_names = [self.get_unit_display_name(self.get_unit_id(u), u.get('side', '')) for u in all_side1_units]
-        side2_names = [self.get_unit_display_name(self.get_unit_id(u), u.get('side', '')) for u in all_side2_units]
-        
-        
-        # Aktualizuj zwycięstwa dla strony 1
-        for unit in all_side1_units:
-            if side1_won:
+        # Aktualizuj zwycięstwa zwycięskiej strony
+        if side1_won:
+            for unit in all_side1_units:
                 self.update_unit_victories(self.get_unit_id(unit))
-        
-        # Aktualizuj zwycięstwa dla strony 2
-        for unit in all_side2_units:
-            if side2_won:
+        if side2_won:
+            for unit in all_side2_units:
                 self.update_unit_victories(self.get_unit_id(unit))
         
-        # Aktualizacja interfejsu
-        if self.current_unit:
-            self.show_unit_details()
-        self.update_battle_units_combos()
+        # Aktualizacja interfejsu (zdarzenie modelu - odświeżenie w jednym przebiegu po rzucie)
+        self.model.units_changed(*[self.get_unit_id(u) for u in all_side1_units + all_side2_units])
     
     def update_unit_victories(self, unit_id):
         """Aktualizuje liczbę zwycięstw jednostki"""
-        for side_name in ['własne', 'wroga']:
-            if unit_id in self.units[side_name]:
-                self.units[side_name][unit_id]["liczba_zwycięstw"] += 1
-                break
+        _, unit_data = self.model.find_unit(unit_id)
+        if unit_data is not None:
+            unit_data["liczba_zwycięstw"] += 1
     
-    def distribute_losses_among_units(self):
-        """Rozdziela straty między jednostkami uczestniczącymi w bitwie"""
-        self.distribute_losses_for_side(1)
-        self.distribute_losses_for_side(2)
+    def distribute_losses_among_units(self, report=True):
+        """Rozdziela straty między jednostkami uczestniczącymi w bitwie; zwraca podział obu stron"""
+        return self.distribute_losses_for_side(1, report), self.distribute_losses_for_side(2, report)
     
-    def distribute_losses_for_side(self, side_number):
-        """Rozdziela straty dla określonej strony uwzględniając doświadczenie i rozmiar"""
-        all_units = self.get_all_participating_units(side_number)
+    def distribute_losses_for_side(self, side_number, report=True):
+        """Rozdziela straty dla określonej strony uwzględniając doświadczenie i rozmiar; zwraca ((ID, przed, straty), ...)"""
+        participants = self.get_side_participants(side_number)
         
-        if not all_units:
-            return
+        if not participants:
+            return ()
             
         if side_number == 1:
             total_losses = self.dice1_people_original - self.dice1_people_result
@@ -2435,86 +3659,52 @@ class DiceRollerApp:
             participating_key = "strona2"
             
         if total_losses <= 0:
-            return
+            return tuple((unit_id, unit_data['liczba_ludzi'], 0) for _, unit_id, _, unit_data, _ in participants if unit_data)
         
-        # Oblicz współczynniki strat dla każdej jednostki
-        loss_factors = []
-        total_factor = 0
+        # Współczynniki strat (doświadczenie i rozmiar) i podział metodą największych reszt - suma równa stratom strony
+        weights = [
+            loss_weight(unit_data.get('doświadczenie', 0), unit_data.get('liczba_ludzi', 150)) if unit_data else 1.0
+            for _, _, _, unit_data, _ in participants
+        ]
+        allocation = allocate_losses(total_losses, weights)
         
-        for unit in all_units:
-            unit_id = self.get_unit_id(unit)
-            
-            # Znajdź dane jednostki w głównym słowniku
-            unit_data = None
-            for side_name in ['własne', 'wroga']:
-                if unit_id in self.units[side_name]:
-                    unit_data = self.units[side_name][unit_id]
-                    break
-            
-            if unit_data:
-                experience = unit_data.get('doświadczenie', 0)
-                people_count = unit_data.get('liczba_ludzi', 150)
-                
-                # Współczynnik doświadczenia (główny wpływ)
-                # Doświadczenie -2 = 1.4x więcej strat, +2 = 0.6x mniej strat
-                exp_factor = 1.0 - (experience * 0.2)  # Każdy poziom doświadczenia to 20% różnicy
-                exp_factor = max(0.3, min(1.7, exp_factor))  # Ogranicz do rozsądnych wartości
-                
-                # Współczynnik rozmiaru (mały wpływ)
-                # Większe jednostki nieznacznie więcej strat (max 10% różnicy)
-                size_factor = 1.0 + ((people_count - 75) / 750)  # Normalizacja względem 75 ludzi
-                size_factor = max(0.95, min(1.05, size_factor))  # Ogranicz do 5% różnicy w każdą stronę
-                
-                # Końcowy współczynnik
-                final_factor = exp_factor * size_factor
-            else:
-                final_factor = 1.0
-            
-            loss_factors.append(final_factor)
-            total_factor += final_factor
+        # Jednostki dodane do bitwy według ID (aktualizacja liczby ludzi bez przeszukiwania listy)
+        participating_by_id = {}
+        for pu in self.participating_units[participating_key]:
+            participating_by_id.setdefault(self.get_unit_id(pu), pu)
         
-        # Rozdziel straty proporcjonalnie do współczynników
         losses_detail = []
-        total_assigned = 0
-        
-        for i, (unit, factor) in enumerate(zip(all_units, loss_factors)):
-            if i == len(all_units) - 1:  # Ostatnia jednostka dostaje resztę
-                losses = total_losses - total_assigned
-            else:
-                losses = int((total_losses * factor) / total_factor)
-                total_assigned += losses
+        unit_losses = []
+        for (_, unit_id, side_name, unit_data, _), losses in zip(participants, allocation):
+            if not unit_data:
+                continue
             
-            losses = max(0, losses)  # Nie może być ujemnych strat
+            old_people = unit_data['liczba_ludzi']
+            new_people = max(0, old_people - losses)
+            unit_data['liczba_ludzi'] = new_people
+            unit_losses.append((unit_id, old_people, losses))
             
-            unit_id = self.get_unit_id(unit)
+            # Zapisz szczegóły do raportu
+            losses_detail.append({
+                'name': self.get_unit_display_name(unit_id, side_name),
+                'losses': losses,
+                'before': old_people,
+                'after': new_people,
+                'experience': unit_data.get('doświadczenie', 0)
+            })
             
-            # Aktualizuj w głównym słowniku jednostek
-            for side_name in ['własne', 'wroga']:
-                if unit_id in self.units[side_name]:
-                    old_people = self.units[side_name][unit_id]['liczba_ludzi']
-                    new_people = max(0, old_people - losses)
-                    self.units[side_name][unit_id]['liczba_ludzi'] = new_people
-                    
-                    # Zapisz szczegóły do raportu
-                    display_name = self.get_unit_display_name(unit_id, side_name)
-                    losses_detail.append({
-                        'name': display_name,
-                        'losses': losses,
-                        'before': old_people,
-                        'after': new_people,
-                        'experience': self.units[side_name][unit_id].get('doświadczenie', 0)
-                    })
-                    
-                    # Aktualizuj także w participating_units jeśli tam jest
-                    for pu in self.participating_units[participating_key]:
-                        if self.get_unit_id(pu) == unit_id:
-                            pu['people'] = new_people
-                            break
-                    break
+            # Aktualizuj także w participating_units jeśli tam jest
+            participating_unit = participating_by_id.get(unit_id)
+            if participating_unit is not None:
+                participating_unit['people'] = new_people
+        
+        self.model.units_changed(*[unit_id for _, unit_id, _, _, _ in participants])
+        self.model.participation_changed(participating_key)
         
         # Wyświetl szczegółowy raport strat jeśli więcej niż 1 jednostka
-        if len(losses_detail) > 1:
+        if report and len(losses_detail) > 1:
             self.show_losses_report(side_number, losses_detail)
+        return tuple(unit_losses)
     
     def show_losses_report(self, side_number, losses_detail):
         """Pokazuje szczegółowy raport strat"""
@@ -2535,8 +3725,8 @@ class DiceRollerApp:
         report_lines.append("═" * 50)
         report_lines.append(f"Łączne straty: {total_losses} ludzi")
         
-        # Wyświetl w messagebox
-        messagebox.showinfo(f"Raport strat - {side_name}", "\n".join(report_lines))
+        # Wyświetl w messagebox (w trybie szybkim - w dzienniku zdarzeń)
+        self.notify(f"Raport strat - {side_name}", "\n".join(report_lines))
     
     def add_more_units_side(self, side_number):
         """Dodaje jednostkę do udziału w bitwie dla określonej strony"""
@@ -2558,13 +3748,15 @@ class DiceRollerApp:
             }
             
             # Sprawdź czy jednostka już nie uczestniczy
-            existing = [u for u in self.participating_units["strona1"] if self.get_unit_id(u) == unit_info['id']]
-            if existing:
+            if unit_info['id'] in self.participant_ids("strona1"):
                 messagebox.showwarning("Błąd", "Ta jednostka już uczestniczy w bitwie!")
                 return
+            if not self.check_unit_lock(unit_info['id']):
+                return
             
-            # Dodaj jednostkę
+            # Dodaj jednostkę (zdarzenie odświeży listę, bonusy i combobox - ukryje dodane jednostki)
             self.participating_units["strona1"].append(unit_info)
+            self.model.participation_changed("strona1")
             
             # Zwiększ liczbę ludzi tylko jeśli to nie pierwsza jednostka
             # (pierwsza jednostka już ma swoją liczbę ludzi w polu)
@@ -2586,11 +3778,8 @@ class DiceRollerApp:
             self.unit_side1_var.set("")
             self.selected_unit_side1 = None
             
-            # Aktualizuj combobox - ukryj dodane jednostki
-            self.update_battle_units_combos()
-            
             unit_display_name = self.get_unit_display_name(self.selected_unit_side1, self.unit_side1_type)
-            messagebox.showinfo("Sukces", f"Jednostka dodana do strony 1!\n{unit_display_name}\n(Dodano: {unit_people}, Łącznie: {new_total})")
+            self.notify("Sukces", f"Jednostka dodana do strony 1!\n{unit_display_name}\n(Dodano: {unit_people}, Łącznie: {new_total})")
             
         elif side_number == 2:
             # Strona 2
@@ -2610,13 +3799,15 @@ class DiceRollerApp:
             }
             
             # Sprawdź czy jednostka już nie uczestniczy
-            existing = [u for u in self.participating_units["strona2"] if self.get_unit_id(u) == unit_info['id']]
-            if existing:
+            if unit_info['id'] in self.participant_ids("strona2"):
                 messagebox.showwarning("Błąd", "Ta jednostka już uczestniczy w bitwie!")
                 return
+            if not self.check_unit_lock(unit_info['id']):
+                return
             
-            # Dodaj jednostkę
+            # Dodaj jednostkę (zdarzenie odświeży listę, bonusy i combobox - ukryje dodane jednostki)
             self.participating_units["strona2"].append(unit_info)
+            self.model.participation_changed("strona2")
             
             # Zwiększ liczbę ludzi tylko jeśli to nie pierwsza jednostka
             # (pierwsza jednostka już ma swoją liczbę ludzi w polu)
@@ -2638,20 +3829,12 @@ class DiceRollerApp:
             self.unit_side2_var.set("")
             self.selected_unit_side2 = None
             
-            # Aktualizuj combobox - ukryj dodane jednostki
-            self.update_battle_units_combos()
-            
             unit_display_name = self.get_unit_display_name(self.selected_unit_side2, self.unit_side2_type)
-            messagebox.showinfo("Sukces", f"Jednostka dodana do strony 2!\n{unit_display_name}\n(Dodano: {unit_people}, Łącznie: {new_total})")
-        
-        # Aktualizuj wyświetlanie
-        self.update_units_display()
-        self.update_exp_bonuses_display()
-        self.update_battle_units_combos()
+            self.notify("Sukces", f"Jednostka dodana do strony 2!\n{unit_display_name}\n(Dodano: {unit_people}, Łącznie: {new_total})")
     
     def reset_participating_units(self):
         """Resetuje jednostki biorące udział w bitwie"""
-        self.participating_units = {"strona1": [], "strona2": []}
+        self.model.reset_participation()
         
         # Odblokuj automatyczne uzupełnianie
         self.side1_locked = False
@@ -2663,16 +3846,12 @@ class DiceRollerApp:
         self.dice1_people_var.set("0")
         self.dice2_people_var.set("0")
         
-        # Wyczyść wybory jednostek
+        # Wyczyść wybory jednostek (i zwolnij ich blokady)
         self.unit_side1_var.set("")
         self.unit_side2_var.set("")
         self.selected_unit_side1 = None
         self.selected_unit_side2 = None
-        
-        # Aktualizuj wyświetlanie
-        self.update_units_display()
-        self.update_exp_bonuses_display()
-        self.update_battle_units_combos()
+        self.sync_session_locks()
     
     def update_units_display(self):
         """Aktualizuje wyświetlanie szczegółowej listy jednostek"""
@@ -2680,7 +3859,7 @@ class DiceRollerApp:
         self.update_side_units_display(2)
     
     def update_side_units_display(self, side_number):
-        """Aktualizuje wyświetlanie jednostek dla konkretnej strony"""
+        """Aktualizuje wyświetlanie jednostek dla konkretnej strony (wiersze z puli)"""
         if side_number == 1:
             frame = self.side1_units_frame
             label = self.side1_units_label
@@ -2690,10 +3869,8 @@ class DiceRollerApp:
             label = self.side2_units_label
             units = self.participating_units["strona2"]
         
-        # Wyczyść poprzednie elementy (oprócz głównej etykiety)
-        for widget in frame.winfo_children():
-            if widget != label:
-                widget.destroy()
+        rows = self.side_unit_rows[side_number]
+        visible = self.side_unit_rows_visible[side_number]
         
         if units:
             # Nagłówek
@@ -2703,22 +3880,36 @@ class DiceRollerApp:
             
             # Lista jednostek z przyciskami usuwania
             for i, unit in enumerate(units):
-                unit_frame = ttk.Frame(frame)
-                unit_frame.grid(row=i+1, column=0, sticky=tk.W, pady=1)
+                if i >= len(rows):
+                    # Nowy wiersz puli - wiersz i zawsze usuwa jednostkę z pozycji i
+                    unit_frame = ttk.Frame(frame)
+                    name_label = ttk.Label(unit_frame, text="", font=("Arial", 8))
+                    name_label.grid(row=0, column=0, sticky=tk.W)
+                    
+                    # Przycisk usuwania
+                    remove_btn = ttk.Button(unit_frame, text="✖", width=3, 
+                                          command=lambda idx=i, side=side_number: self.remove_unit_from_side(side, idx))
+                    remove_btn.grid(row=0, column=1, padx=(5, 0))
+                    rows.append({'frame': unit_frame, 'label': name_label, 'text': ""})
+                
+                row = rows[i]
                 
                 # Nazwa jednostki
                 unit_id = self.get_unit_id(unit)
                 side_name = unit.get('side', '')
-                display_name = self.get_unit_display_name(unit_id, side_name)
-                
-                ttk.Label(unit_frame, text=f"• {display_name}", font=("Arial", 8)).grid(row=0, column=0, sticky=tk.W)
-                
-                # Przycisk usuwania
-                remove_btn = ttk.Button(unit_frame, text="✖", width=3, 
-                                      command=lambda idx=i, side=side_number: self.remove_unit_from_side(side, idx))
-                remove_btn.grid(row=0, column=1, padx=(5, 0))
+                text = f"• {self.get_unit_display_name(unit_id, side_name)}"
+                if row['text'] != text:
+                    row['label'].config(text=text)
+                    row['text'] = text
+                if i >= visible:
+                    row['frame'].grid(row=i+1, column=0, sticky=tk.W, pady=1)
         else:
             label.config(text="")
+        
+        # Nadmiarowe wiersze są ukrywane, nie niszczone
+        for row in rows[len(units):visible]:
+            row['frame'].grid_remove()
+        self.side_unit_rows_visible[side_number] = len(units)
     
     def remove_unit_from_side(self, side_number, unit_index):
         """Usuwa jednostkę z udziału w bitwie"""
@@ -2750,43 +3941,15 @@ class DiceRollerApp:
                     self.side2_locked = False
             
             # Aktualizuj wyświetlanie
-            self.update_units_display()
-            self.update_exp_bonuses_display()
-            self.update_battle_units_combos()
+            self.model.participation_changed(side_key)
     
     def add_to_unit_battle_history(self, dice1_final, dice2_final):
         """Dodaje informacje o bitwie do historii jednostek"""
-        import datetime
-        
-        # Zbierz ID jednostek (do operacji na danych) i nazwy (do wyświetlania)
-        side1_unit_ids = [u.get('id', u.get('name', '')) for u in self.participating_units["strona1"]]
-        side2_unit_ids = [u.get('id', u.get('name', '')) for u in self.participating_units["strona2"]]
-        
-        # Nazwy do wyświetlania w historii
-        side1_display_names = []
-        for u in self.participating_units["strona1"]:
-            unit_id = u.get('id', u.get('name', ''))
-            side_name = u.get('side', '')
-            display_name = self.get_unit_display_name(unit_id, side_name) if unit_id and side_name else u.get('name', unit_id)
-            side1_display_names.append(display_name)
-            
-        side2_display_names = []
-        for u in self.participating_units["strona2"]:
-            unit_id = u.get('id', u.get('name', ''))
-            side_name = u.get('side', '')
-            display_name = self.get_unit_display_name(unit_id, side_name) if unit_id and side_name else u.get('name', unit_id)
-            side2_display_names.append(display_name)
-        
-        # Dodaj jednostki wybrane normalnie
-        if self.selected_unit_side1 and self.unit_side1_type != "brak":
-            if self.selected_unit_side1 not in side1_unit_ids:
-                side1_unit_ids.append(self.selected_unit_side1)
-                side1_display_names.append(self.get_unit_display_name(self.selected_unit_side1, self.unit_side1_type))
-        
-        if self.selected_unit_side2 and self.unit_side2_type != "brak":
-            if self.selected_unit_side2 not in side2_unit_ids:
-                side2_unit_ids.append(self.selected_unit_side2)
-                side2_display_names.append(self.get_unit_display_name(self.selected_unit_side2, self.unit_side2_type))
+        # Jednostki obu stron (także wybrane normalnie) z nazwami do wyświetlania - jeden przebieg na stronę
+        side1_participants = self.get_side_participants(1)
+        side2_participants = self.get_side_participants(2)
+        side1_display_names = [p[4] for p in side1_participants]
+        side2_display_names = [p[4] for p in side2_participants]
         
         # Określ tryb walki - użyj poprawnych nazw zmiennych  
         side1_attacking = self.side1_attack_var.get()
@@ -2795,7 +3958,7 @@ class DiceRollerApp:
         side2_in_motion = self.side2_motion_var.get()
         
         battle_info = {
-            'data': datetime.datetime.now().strftime('%Y-%m-%d %H:%M'),
+            'data': datetime.now().strftime('%Y-%m-%d %H:%M'),
             'wynik_kostki': None,
             'przeciwnik_kostka': None,
             'straty': 0,
@@ -2805,82 +3968,51 @@ class DiceRollerApp:
             'side1_attacking': side1_attacking,
             'side2_attacking': side2_attacking,
             'side1_in_motion': side1_in_motion,
-            'side2_in_motion': side2_in_motion
+            'side2_in_motion': side2_in_motion,
+            'bitwa': self.current_battle
         }
         
-        # Pobierz wszystkie jednostki strony 1
-        all_side1_units = self.get_all_participating_units(1)
-        
         # Historia dla jednostek strony 1
-        if all_side1_units:
+        if side1_participants:
             battle_info_side1 = battle_info.copy()
             battle_info_side1['wynik_kostki'] = dice1_final
             battle_info_side1['przeciwnik_kostka'] = dice2_final
             battle_info_side1['straty'] = max(0, self.dice1_people_original - self.dice1_people_result)
             battle_info_side1['zwyciestwo'] = dice1_final > dice2_final and dice1_final > 1
-            
-            # Rozdziel straty między jednostkami
-            total_losses = battle_info_side1['straty']
-            if len(all_side1_units) > 0:
-                losses_per_unit = total_losses // len(all_side1_units) if total_losses > 0 else 0
-                remainder = total_losses % len(all_side1_units) if total_losses > 0 else 0
-                
-                for i, unit in enumerate(all_side1_units):
-                    unit_losses = losses_per_unit
-                    if i < remainder:
-                        unit_losses += 1
-                    
-                    unit_battle_info = battle_info_side1.copy()
-                    unit_battle_info['straty'] = unit_losses
-                    # Dodaj informacje specyficzne dla strony 1
-                    unit_battle_info['friendly_units'] = side1_display_names
-                    unit_battle_info['enemy_units'] = side2_display_names
-                    
-                    # Dodaj do historii jednostki
-                    unit_id = self.get_unit_id(unit)
-                    for side_name in ['własne', 'wroga']:
-                        if unit_id in self.units[side_name]:
-                            if 'historia_bitew' not in self.units[side_name][unit_id]:
-                                self.units[side_name][unit_id]['historia_bitew'] = []
-                            self.units[side_name][unit_id]['historia_bitew'].append(unit_battle_info)
-                            break
-        
-        # Pobierz wszystkie jednostki strony 2
-        all_side2_units = self.get_all_participating_units(2)
+            if self.dice1_expected is not None:
+                battle_info_side1['oczekiwana_kostka'] = round(self.dice1_expected, 2)
+            battle_info_side1['friendly_units'] = side1_display_names
+            battle_info_side1['enemy_units'] = side2_display_names
+            self.append_side_battle_history(side1_participants, battle_info_side1)
         
         # Historia dla jednostek strony 2
-        if all_side2_units:
+        if side2_participants:
             battle_info_side2 = battle_info.copy()
             battle_info_side2['wynik_kostki'] = dice2_final
             battle_info_side2['przeciwnik_kostka'] = dice1_final
             battle_info_side2['straty'] = max(0, self.dice2_people_original - self.dice2_people_result)
             battle_info_side2['zwyciestwo'] = dice2_final > dice1_final and dice2_final > 1
-            
-            # Rozdziel straty między jednostkami
-            total_losses = battle_info_side2['straty']
-            if len(all_side2_units) > 0:
-                losses_per_unit = total_losses // len(all_side2_units) if total_losses > 0 else 0
-                remainder = total_losses % len(all_side2_units) if total_losses > 0 else 0
-                
-                for i, unit in enumerate(all_side2_units):
-                    unit_losses = losses_per_unit
-                    if i < remainder:
-                        unit_losses += 1
-                    
-                    unit_battle_info = battle_info_side2.copy()
-                    unit_battle_info['straty'] = unit_losses
-                    # Dodaj informacje specyficzne dla strony 2
-                    unit_battle_info['friendly_units'] = side2_display_names
-                    unit_battle_info['enemy_units'] = side1_display_names
-                    
-                    # Dodaj do historii jednostki
-                    unit_id = self.get_unit_id(unit)
-                    for side_name in ['własne', 'wroga']:
-                        if unit_id in self.units[side_name]:
-                            if 'historia_bitew' not in self.units[side_name][unit_id]:
-                                self.units[side_name][unit_id]['historia_bitew'] = []
-                            self.units[side_name][unit_id]['historia_bitew'].append(unit_battle_info)
-                            break
+            if self.dice2_expected is not None:
+                battle_info_side2['oczekiwana_kostka'] = round(self.dice2_expected, 2)
+            battle_info_side2['friendly_units'] = side2_display_names
+            battle_info_side2['enemy_units'] = side1_display_names
+            self.append_side_battle_history(side2_participants, battle_info_side2)
+    
+    def append_side_battle_history(self, participants, side_info):
+        """Dopisuje wpis strony do historii każdej jej jednostki (straty strony dzielone po równo)"""
+        unit_losses = allocate_losses(side_info['straty'], [1.0] * len(participants))
+        entries = []
+        for (_, unit_id, side_name, unit_data, _), losses in zip(participants, unit_losses):
+            if unit_data is None:
+                continue
+            unit_battle_info = side_info.copy()
+            unit_battle_info['straty'] = losses
+            entries.append((unit_id, unit_data, unit_battle_info))
+            self.battle_index.add_unit_entry(unit_id, side_name, unit_data.get('batalion'), unit_battle_info)
+        
+        self.model.append_unit_battles(entries)
+        self.analytics.invalidate_units([unit_id for unit_id, _, _ in entries],
+                                        {unit_data.get('batalion') for _, unit_data, _ in entries})
     
     def show_unit_battle_history(self, unit_data):
         """Pokazuje okienko z historią bitew jednostki"""
@@ -2906,27 +4038,171 @@ class DiceRollerApp:
         header_label = ttk.Label(main_frame, text=f"Historia bitew: {display_name}", font=("Arial", 12, "bold"))
         header_label.grid(row=0, column=0, columnspan=2, pady=(0, 10))
         
-        # Statystyki ogólne
-        total_battles = len(unit_data['historia_bitew'])
-        total_losses = sum(battle['straty'] for battle in unit_data['historia_bitew'])
-        victories = sum(1 for battle in unit_data['historia_bitew'] if battle['zwyciestwo'])
-        
-        stats_text = f"Liczba bitew: {total_battles} | Zwycięstwa: {victories} | Łączne straty: {total_losses}"
+        # Statystyki ogólne (z pamięci podręcznej statystyk kampanii)
+        stats = self.analytics.unit_stats(unit_data['id'], unit_data)
+        stats_text = f"Liczba bitew: {stats['bitwy']} | Zwycięstwa: {stats['zwycięstwa']} | Łączne straty: {stats['straty_suma']}"
         stats_label = ttk.Label(main_frame, text=stats_text, font=("Arial", 10))
         stats_label.grid(row=1, column=0, columnspan=2, pady=(0, 10))
         
+        # Podgląd ostatnich bitew (ta sama pamięć podręczna co w oknie szczegółów)
+        preview_text = tk.Text(main_frame, wrap=tk.WORD, height=10, width=60, font=("Arial", 9))
+        preview_text.grid(row=2, column=0, columnspan=2, sticky=tk.W+tk.E+tk.N+tk.S, pady=(0, 10))
+        history = unit_data['historia_bitew']
+        if history:
+            preview_count = min(3, len(history))
+            preview_text.insert(tk.END, "".join(
+                f"#{i}: {self.get_unit_history_body(unit_data['id'], history, len(history) - i)}"
+                for i in range(1, preview_count + 1)
+            ))
+        else:
+            preview_text.insert(tk.END, "Brak historii bitew dla tej jednostki.\n")
+        preview_text.config(state=tk.DISABLED)
+        
         # Przycisk do pokazania szczegółów
         ttk.Button(main_frame, text="Pokaż szczegóły bitew", 
-                  command=lambda: self.show_detailed_battle_history(unit_data)).grid(row=2, column=0, columnspan=2, pady=(0, 10))
+                  command=lambda: self.show_detailed_battle_history(unit_data)).grid(row=3, column=0, columnspan=2, pady=(0, 10))
         
         # Przycisk zamknij
-        ttk.Button(main_frame, text="Zamknij", command=history_window.destroy).grid(row=3, column=0, columnspan=2, pady=(10, 0))
+        ttk.Button(main_frame, text="Zamknij", command=history_window.destroy).grid(row=4, column=0, columnspan=2, pady=(10, 0))
         
         main_frame.columnconfigure(0, weight=1)
         main_frame.columnconfigure(1, weight=1)
+        main_frame.rowconfigure(2, weight=1)
+    
+    def format_analytics_stats(self, stats):
+        """Formatuje statystyki kampanii do wyświetlenia"""
+        luck = stats['szczęście']
+        luck_text = f"{luck:+.2f} ({stats['rzuty_ze_szczęściem']} rzutów)" if luck is not None else "brak danych"
+        lines = [
+            f"Starcia: {stats['bitwy']} | Zwycięstwa: {stats['zwycięstwa']} ({stats['procent_zwycięstw']:.1f}%)",
+            f"Straty łącznie: {stats['straty_suma']} ludzi",
+            f"Straty na starcie: śr. {stats['straty_średnie']:.1f} | mediana {stats['straty_p50']} | p90 {stats['straty_p90']} | max {stats['straty_max']}",
+            f"Rzuty na bitwę: {stats['rzuty_na_bitwę']:.1f}",
+            f"Szczęście (kostka - oczekiwana): {luck_text}"
+        ]
+        return "\n".join(lines)
+    
+    def draw_attrition_curve(self, canvas, curve, width, height):
+        """Rysuje krzywą narastających strat na canvas"""
+        canvas.delete("all")
+        if len(curve) < 2 or curve[-1] == 0:
+            canvas.create_text(width // 2, height // 2, text="Brak strat do wykreślenia", fill="gray")
+            return
+        
+        # Ograniczenie liczby punktów do szerokości wykresu
+        step = max(1, len(curve) // width)
+        points = curve[::step]
+        if points[-1] != curve[-1]:
+            points.append(curve[-1])
+        
+        max_value = curve[-1]
+        coords = []
+        for i, value in enumerate(points):
+            coords.append(5 + i * (width - 10) / (len(points) - 1))
+            coords.append(height - 5 - value * (height - 10) / max_value)
+        canvas.create_line(*coords, fill="darkred", width=2)
+        canvas.create_text(8, 8, text=f"{max_value}", anchor=tk.NW, fill="gray")
+    
+    def show_unit_analytics(self, unit_data):
+        """Pokazuje okno statystyk kampanii jednostki i jej batalionu"""
+        unit_id = unit_data['id']
+        display_name = self.get_unit_display_name(unit_id, unit_data['strona'])
+        
+        analytics_window = tk.Toplevel(self.root)
+        analytics_window.title(f"Statystyki: {display_name}")
+        analytics_window.geometry("560x520")
+        analytics_window.resizable(True, True)
+        
+        # Ramka główna
+        main_frame = ttk.Frame(analytics_window, padding="10")
+        main_frame.grid(row=0, column=0, sticky=tk.W+tk.E+tk.N+tk.S)
+        analytics_window.columnconfigure(0, weight=1)
+        analytics_window.rowconfigure(0, weight=1)
+        
+        # Statystyki jednostki
+        unit_stats = self.analytics.unit_stats(unit_id, unit_data)
+        unit_frame = ttk.LabelFrame(main_frame, text=f"Jednostka: {display_name}", padding="10")
+        unit_frame.grid(row=0, column=0, sticky=tk.W+tk.E, pady=(0, 10))
+        ttk.Label(unit_frame, text=self.format_analytics_stats(unit_stats), font=("Arial", 9), justify=tk.LEFT).grid(row=0, column=0, sticky=tk.W)
+        
+        ttk.Label(unit_frame, text="Narastające straty:", font=("Arial", 9, "bold")).grid(row=1, column=0, sticky=tk.W, pady=(5, 0))
+        unit_canvas = tk.Canvas(unit_frame, width=500, height=90, background="white")
+        unit_canvas.grid(row=2, column=0, sticky=tk.W)
+        self.draw_attrition_curve(unit_canvas, unit_stats['krzywa_strat'], 500, 90)
+        
+        # Statystyki batalionu
+        battalion_id = unit_data.get('batalion')
+        if battalion_id and battalion_id in self.battalions:
+            battalion_stats = self.analytics.battalion_stats(battalion_id, self.units)
+            battalion_frame = ttk.LabelFrame(main_frame, text=f"Batalion: {self.get_battalion_display_name(battalion_id)} ({battalion_stats['jednostki']} jedn.)", padding="10")
+            battalion_frame.grid(row=1, column=0, sticky=tk.W+tk.E, pady=(0, 10))
+            ttk.Label(battalion_frame, text=self.format_analytics_stats(battalion_stats), font=("Arial", 9), justify=tk.LEFT).grid(row=0, column=0, sticky=tk.W)
+            
+            battalion_canvas = tk.Canvas(battalion_frame, width=500, height=90, background="white")
+            battalion_canvas.grid(row=1, column=0, sticky=tk.W, pady=(5, 0))
+            self.draw_attrition_curve(battalion_canvas, battalion_stats['krzywa_strat'], 500, 90)
+        
+        # Przycisk zamknij
+        ttk.Button(main_frame, text="Zamknij", command=analytics_window.destroy).grid(row=2, column=0, pady=(10, 0))
+        main_frame.columnconfigure(0, weight=1)
+    
+    def format_unit_history_entry(self, battle):
+        """Formatuje wpis historii bitew jednostki (bez numeru porządkowego)"""
+        victory_icon = " ⭐" if battle['zwyciestwo'] else ""
+        
+        # Nowy format z ofensywami jeśli są dostępne dane
+        friendly_units = battle.get('friendly_units', [])
+        enemy_units = battle.get('enemy_units', [])
+        
+        if friendly_units and enemy_units:
+            # Nowy format z nazwami jednostek i trybem bitwy
+            side_in_motion = battle.get('side1_in_motion', False) or battle.get('side2_in_motion', False)
+            side_attacking = battle.get('side1_attacking', False) or battle.get('side2_attacking', False)
+            
+            # Formatuj nazwy jednostek
+            friendly_name = friendly_units[0]
+            if len(friendly_units) > 1:
+                friendly_name += ", " + ", ".join(friendly_units[1:])
+                
+            enemy_name = enemy_units[0]
+            if len(enemy_units) > 1:
+                enemy_name += ", " + ", ".join(enemy_units[1:])
+            
+            # Określ typ bitwy
+            if side_in_motion:
+                battle_desc = f"Bitwa \"{friendly_name}\" z \"{enemy_name}\""
+            elif side_attacking:
+                # Sprawdź kto atakuje na podstawie wyników
+                if battle['wynik_kostki'] >= battle['przeciwnik_kostka']:
+                    battle_desc = f"Ofensywa \"{friendly_name}\" na \"{enemy_name}\""
+                else:
+                    battle_desc = f"Obrona \"{friendly_name}\" przed \"{enemy_name}\""
+            else:
+                battle_desc = f"Ofensywa \"{friendly_name}\" na \"{enemy_name}\""
+            
+            history_line = f"{battle['data']}\n"
+            history_line += f"   {battle_desc}\n"
+            history_line += f"   Kostka: {battle['wynik_kostki']}{victory_icon} vs Przeciwnik: {battle['przeciwnik_kostka']}\n"
+            history_line += f"   Straty: {battle['straty']} ludzi\n\n"
+        else:
+            # Stary format dla starych zapisów
+            history_line = f"{battle['data']}\n"
+            history_line += f"   Kostka: {battle['wynik_kostki']}{victory_icon} vs Przeciwnik: {battle['przeciwnik_kostka']}\n"
+            history_line += f"   Straty: {battle['straty']} ludzi\n\n"
+        
+        return history_line
+    
+    def get_unit_history_body(self, unit_id, history, index):
+        """Zwraca sformatowany wpis historii jednostki o indeksie index (z pamięci podręcznej)"""
+        unit_cache = self.unit_history_line_cache.setdefault(unit_id, {})
+        body = unit_cache.get(index)
+        if body is None:
+            body = self.format_unit_history_entry(history[index])
+            unit_cache[index] = body
+        return body
     
     def show_detailed_battle_history(self, unit_data):
-        """Pokazuje szczegółową historię bitew w osobnym oknie"""
+        """Pokazuje szczegółową historię bitew w osobnym oknie (przesuwane okno kilku stron wpisów)"""
         details_window = tk.Toplevel(self.root)
         display_name = self.get_unit_display_name(unit_data['id'], unit_data['strona'])
         details_window.title(f"Szczegóły bitew: {display_name}")
@@ -2940,7 +4216,6 @@ class DiceRollerApp:
         details_window.rowconfigure(0, weight=1)
         
         # Nagłówek  
-        display_name = self.get_unit_display_name(unit_data['id'], unit_data['strona'])
         header_label = ttk.Label(main_frame, text=f"Szczegółowa historia: {display_name}", font=("Arial", 12, "bold"))
         header_label.grid(row=0, column=0, pady=(0, 10))
         
@@ -2951,64 +4226,82 @@ class DiceRollerApp:
         # Scrollowany tekst
         history_text = tk.Text(history_frame, wrap=tk.WORD, height=20, width=70)
         scrollbar = ttk.Scrollbar(history_frame, orient=tk.VERTICAL, command=history_text.yview)
-        history_text.configure(yscrollcommand=scrollbar.set)
         
         history_text.grid(row=0, column=0, sticky=tk.W+tk.E+tk.N+tk.S)
         scrollbar.grid(row=0, column=1, sticky=tk.N+tk.S)
         
-        # Wypełnienie historii
-        if not unit_data['historia_bitew']:
+        # Informacja o liczbie wyrenderowanych wpisów
+        status_label = ttk.Label(main_frame, text="", font=("Arial", 9), foreground="gray")
+        status_label.grid(row=2, column=0, sticky=tk.W, pady=(5, 0))
+        
+        unit_id = unit_data['id']
+        history = unit_data['historia_bitew']
+        total = len(history)  # Numeracja liczona względem stanu z chwili otwarcia okna
+        pages = deque()  # Wyrenderowane strony (pierwszy wpis, koniec zakresu, liczba linii) od góry
+        state = {'pending': False}
+        
+        def render_page(at_end):
+            """Dokłada stronę na dole lub na górze; gdy stron jest za dużo, usuwa najdalszą z drugiego końca"""
+            state['pending'] = False
+            if at_end:
+                start = pages[-1][1] if pages else 0
+                end = min(total, start + self.UNIT_HISTORY_PAGE_SIZE)
+            else:
+                end = pages[0][0]
+                start = max(0, end - self.UNIT_HISTORY_PAGE_SIZE)
+            if start >= end:
+                return
+            
+            chunk = "".join(
+                f"#{i + 1}: {self.get_unit_history_body(unit_id, history, total - 1 - i)}"
+                for i in range(start, end)
+            )
+            lines = chunk.count("\n")
+            # Pierwsza widoczna linia - po zmianie tekstu widok wraca na ten sam wpis
+            top_line = int(history_text.index("@0,0").split(".")[0])
+            history_text.config(state=tk.NORMAL)
+            if at_end:
+                history_text.insert("end-1c", chunk)
+                pages.append((start, end, lines))
+                if len(pages) > self.UNIT_HISTORY_WINDOW_PAGES:
+                    evicted = pages.popleft()[2]
+                    history_text.delete("1.0", f"{evicted + 1}.0")
+                    top_line -= evicted
+            else:
+                history_text.insert("1.0", chunk)
+                pages.appendleft((start, end, lines))
+                top_line += lines
+                if len(pages) > self.UNIT_HISTORY_WINDOW_PAGES:
+                    pages.pop()
+                    kept = sum(page[2] for page in pages)
+                    history_text.delete(f"{kept + 1}.0", "end-1c")
+            history_text.config(state=tk.DISABLED)
+            history_text.yview(f"{max(1, top_line)}.0")
+            status_label.config(text=f"Wyświetlono bitwy {pages[0][0] + 1}-{pages[-1][1]} z {total}")
+        
+        def on_scroll(first, last):
+            """Doczytuje sąsiednią stronę, gdy widok zbliża się do końca lub początku wyrenderowanego tekstu"""
+            scrollbar.set(first, last)
+            if not pages or state['pending']:
+                return
+            if float(last) > 0.9 and pages[-1][1] < total:
+                state['pending'] = True
+                history_text.after_idle(render_page, True)
+            elif float(first) < 0.1 and pages[0][0] > 0:
+                state['pending'] = True
+                history_text.after_idle(render_page, False)
+        
+        history_text.configure(yscrollcommand=on_scroll)
+        
+        # Wypełnienie historii - tylko pierwsza strona (widoczna część + bufor)
+        if not history:
             history_text.insert(tk.END, "Brak historii bitew dla tej jednostki.\n")
+            history_text.config(state=tk.DISABLED)
         else:
-            for i, battle in enumerate(reversed(unit_data['historia_bitew']), 1):
-                victory_icon = " ⭐" if battle['zwyciestwo'] else ""
-                
-                # Nowy format z ofensywami jeśli są dostępne dane
-                friendly_units = battle.get('friendly_units', [])
-                enemy_units = battle.get('enemy_units', [])
-                
-                if friendly_units and enemy_units:
-                    # Nowy format z nazwami jednostek i trybem bitwy
-                    side_in_motion = battle.get('side1_in_motion', False) or battle.get('side2_in_motion', False)
-                    side_attacking = battle.get('side1_attacking', False) or battle.get('side2_attacking', False)
-                    
-                    # Formatuj nazwy jednostek
-                    friendly_name = friendly_units[0]
-                    if len(friendly_units) > 1:
-                        friendly_name += ", " + ", ".join(friendly_units[1:])
-                        
-                    enemy_name = enemy_units[0]
-                    if len(enemy_units) > 1:
-                        enemy_name += ", " + ", ".join(enemy_units[1:])
-                    
-                    # Określ typ bitwy
-                    if side_in_motion:
-                        battle_desc = f"Bitwa \"{friendly_name}\" z \"{enemy_name}\""
-                    elif side_attacking:
-                        # Sprawdź kto atakuje na podstawie wyników
-                        if battle['wynik_kostki'] >= battle['przeciwnik_kostka']:
-                            battle_desc = f"Ofensywa \"{friendly_name}\" na \"{enemy_name}\""
-                        else:
-                            battle_desc = f"Obrona \"{friendly_name}\" przed \"{enemy_name}\""
-                    else:
-                        battle_desc = f"Ofensywa \"{friendly_name}\" na \"{enemy_name}\""
-                    
-                    history_line = f"#{i}: {battle['data']}\n"
-                    history_line += f"   {battle_desc}\n"
-                    history_line += f"   Kostka: {battle['wynik_kostki']}{victory_icon} vs Przeciwnik: {battle['przeciwnik_kostka']}\n"
-                    history_line += f"   Straty: {battle['straty']} ludzi\n\n"
-                else:
-                    # Stary format dla starych zapisów
-                    history_line = f"#{i}: {battle['data']}\n"
-                    history_line += f"   Kostka: {battle['wynik_kostki']}{victory_icon} vs Przeciwnik: {battle['przeciwnik_kostka']}\n"
-                    history_line += f"   Straty: {battle['straty']} ludzi\n\n"
-                
-                history_text.insert(tk.END, history_line)
-        
-        history_text.config(state=tk.DISABLED)
+            render_page(True)
         
         # Przycisk zamknij
-        ttk.Button(main_frame, text="Zamknij", command=details_window.destroy).grid(row=2, column=0, pady=(10, 0))
+        ttk.Button(main_frame, text="Zamknij", command=details_window.destroy).grid(row=3, column=0, pady=(10, 0))
         
         # Konfiguracja kolumn i wierszy
         main_frame.columnconfigure(0, weight=1)
@@ -3019,6 +4312,9 @@ class DiceRollerApp:
 
 def main():
     """Główna funkcja aplikacji"""
+    # Profil sesji obejmuje tylko wywołania zwrotne zarejestrowane po podmianie CallWrapper
+    install_call_wrapper()
+    
     # Utworzenie głównego okna
     root = tk.Tk()
     
@@ -3027,6 +4323,12 @@ def main():
     
     # Uruchomienie pętli głównej
     root.mainloop()
+    
+    # Zapis rzutów oczekujących w dzienniku
+    app.roll_log.close()
+    app.shutdown_forecast_pool()
+    if app.sync is not None:
+        app.sync.client.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+"""
+Raport pamięci rejestrów kampanii (jednostki, historia bitew, bitwy, powtórzone napisy) i miejsca alokacji
+Memory accounting: a structural walker over the in-memory registries plus tracemalloc top sites and diffs
+"""
+
+import os
+import sys
+import tracemalloc
+from collections import deque
+
+
+TRACE_FRAMES = 1  # Głębokość stosu tracemalloc (raport grupuje po linii; więcej ramek wielokrotnie spowalnia alokacje)
+TOP_SITES = 20  # Liczba miejsc alokacji w raporcie
+TOP_STRINGS = 15  # Liczba najbardziej powielonych napisów w raporcie
+UNIT_SIDES = ('własne', 'wroga')
+
+_CONTAINERS = (list, tuple, set, frozenset, deque)
+_TRACE_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def walk_size(root, seen, strings):
+    """Zwraca (bajty, liczba obiektów) obiektu i jego zawartości; obiekty z seen są pomijane
+
+    Przechodzi słowniki, listy, krotki, zbiory, deque i atrybuty instancji (__dict__).
+    Napisy są zliczane w strings: {wartość: [liczba kopii, bajty wszystkich kopii]}.
+    """
+    total = 0
+    objects = 0
+    stack = [root]
+    while stack:
+        item = stack.pop()
+        key = id(item)
+        if key in seen:
+            continue
+        seen.add(key)
+        size = sys.getsizeof(item)
+        total += size
+        objects += 1
+        item_type = type(item)
+        if item_type is str:
+            entry = strings.get(item)
+            if entry is None:
+                strings[item] = [1, size]
+            else:
+                entry[0] += 1
+                entry[1] += size
+        elif item_type is dict:
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, _CONTAINERS):
+            stack.extend(item)
+        elif isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif hasattr(item, "__dict__") and not isinstance(item, type) and item_type.__module__ != "builtins":
+            stack.append(vars(item))
+    return total, objects
+
+
+def repeated_strings(strings, limit=TOP_STRINGS):
+    """Podsumowanie napisów o tej samej wartości przechowywanych w wielu kopiach"""
+    repeated = []
+    copies = 0
+    wasted = 0
+    for value, (count, size) in strings.items():
+        if count > 1:
+            extra = size - size // count
+            copies += count - 1
+            wasted += extra
+            repeated.append((extra, count, value))
+    repeated.sort(key=lambda row: (-row[0], row[2]))
+    return {
+        "distinct": len(strings),
+        "values_repeated": len(repeated),
+        "extra_copies": copies,
+        "wasted_bytes": wasted,
+        "top": [(value, count, extra) for extra, count, value in repeated[:limit]]
+    }
+
+
+def registry_report(units, battles, history, participating_units, extra=()):
+    """Bajty i liczba obiektów na kategorię rejestrów; extra to dodatkowe [(nazwa, obiekt)] (np. pamięci podręczne)
+
+    Obiekty współdzielone są liczone raz - w pierwszej kategorii, w której wystąpią
+    (kolejność: historia jednostek, jednostki, bitwy, ostatnie rzuty, uczestnicy, extra).
+    """
+    seen = set()
+    strings = {}
+    unit_histories = [unit_data.get('historia_bitew', []) for side in UNIT_SIDES
+                      for unit_data in units.get(side, {}).values()]
+    categories = []
+    for name, root in [("historia_bitew", unit_histories), ("jednostki", units), ("bitwy", battles),
+                       ("ostatnie rzuty", history), ("uczestnicy bitwy", participating_units)] + list(extra):
+        size, objects = walk_size(root, seen, strings)
+        categories.append((name, size, objects))
+    # Lista pomocnicza historii jednostek nie należy do rejestrów
+    name, size, objects = categories[0]
+    categories[0] = (name, size - sys.getsizeof(unit_histories), objects - 1)
+    return {
+        "categories": categories,
+        "total_bytes": sum(size for _, size, _ in categories),
+        "strings": repeated_strings(strings)
+    }
+
+
+def start_tracing(frames=TRACE_FRAMES):
+    """Włącza tracemalloc (alokacje sprzed włączenia nie są widoczne)"""
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+
+
+def stop_tracing():
+    """Wyłącza tracemalloc i zwalnia jego dane"""
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def take_snapshot():
+    """Migawka alokacji bez śladów samego tracemalloc i importów (None, gdy śledzenie jest wyłączone)"""
+    if not tracemalloc.is_tracing():
+        return None
+    return tracemalloc.take_snapshot().filter_traces(_TRACE_FILTERS)
+
+
+def format_frame(frame):
+    return f"{os.path.basename(frame.filename)}:{frame.lineno}"
+
+
+def top_sites(snapshot, limit=TOP_SITES):
+    """Miejsca z największą zajętą pamięcią: [(plik:linia, bajty, liczba bloków)]"""
+    return [(format_frame(stat.traceback[0]), stat.size, stat.count)
+            for stat in snapshot.statistics("lineno")[:limit]]
+
+
+def diff_sites(old_snapshot, new_snapshot, limit=TOP_SITES):
+    """Największe zmiany między migawkami: [(plik:linia, zmiana bajtów, bajty, zmiana liczby bloków)]"""
+    return [(format_frame(stat.traceback[0]), stat.size_diff, stat.size, stat.count_diff)
+            for stat in new_snapshot.compare_to(old_snapshot, "lineno")[:limit]]
+
+
+def format_bytes(size):
+    """Rozmiar w czytelnych jednostkach (ze znakiem dla zmian)"""
+    sign = "-" if size < 0 else ""
+    size = abs(size)
+    for unit in ("B", "KB", "MB"):
+        if size < 1024 or unit == "MB":
+            return f"{sign}{size:.0f} {unit}" if unit == "B" else f"{sign}{size:.1f} {unit}"
+        size /= 1024
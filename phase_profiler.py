@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+Liczniki czasu etapów gorącej ścieżki (rzut, odświeżanie) z kroczącymi percentylami
+Low-overhead phase timers with rolling percentiles; a shared no-op context when disabled
+"""
+
+import json
+import time
+from collections import deque
+from contextlib import nullcontext
+from datetime import datetime
+
+
+DEFAULT_WINDOW = 500  # Liczba ostatnich pomiarów na etap
+PERCENTILES = (50, 90, 99)
+
+_DISABLED = nullcontext()  # Wspólny kontekst bez działania - wyłączony profiler nic nie alokuje
+
+
+class _PhaseTimer:
+    """Kontekst mierzący jeden etap"""
+    
+    __slots__ = ("profiler", "name", "started")
+    
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.started = 0.0
+    
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.profiler.record(self.name, time.perf_counter() - self.started)
+        return False
+
+
+def percentile(sorted_values, q):
+    """Percentyl metodą najbliższej rangi dla posortowanej listy"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-q * len(sorted_values) // 100))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class PhaseProfiler:
+    """Pomiary czasu nazwanych etapów; domyślnie wyłączony (phase() zwraca wspólny pusty kontekst)"""
+    
+    def __init__(self, window=DEFAULT_WINDOW, enabled=False):
+        self.window = window
+        self.enabled = enabled
+        self.samples = {}  # {etap: deque czasów w ms}
+        self.order = []  # Etapy w kolejności pierwszego pomiaru
+    
+    def phase(self, name):
+        """Kontekst mierzący etap: with profiler.phase("nazwa"): ..."""
+        if not self.enabled:
+            return _DISABLED
+        return _PhaseTimer(self, name)
+    
+    def record(self, name, seconds):
+        """Zapisuje czas etapu (ignorowane, gdy profiler jest wyłączony)"""
+        if not self.enabled:
+            return
+        times = self.samples.get(name)
+        if times is None:
+            times = self.samples[name] = deque(maxlen=self.window)
+            self.order.append(name)
+        times.append(seconds * 1000)
+    
+    def reset(self):
+        """Usuwa wszystkie pomiary"""
+        self.samples = {}
+        self.order = []
+    
+    def summary(self):
+        """Zwraca [(etap, {count, last_ms, mean_ms, p50_ms, p90_ms, p99_ms, max_ms})] w kolejności etapów"""
+        rows = []
+        for name in self.order:
+            times = self.samples[name]
+            if not times:
+                continue
+            ordered = sorted(times)
+            row = {
+                "count": len(ordered),
+                "last_ms": times[-1],
+                "mean_ms": sum(ordered) / len(ordered),
+                "max_ms": ordered[-1]
+            }
+            for q in PERCENTILES:
+                row[f"p{q}_ms"] = percentile(ordered, q)
+            rows.append((name, row))
+        return rows
+    
+    def dump(self, path):
+        """Zapisuje podsumowanie i surowe pomiary do pliku JSON"""
+        data = {
+            "saved_at": datetime.now().isoformat(),
+            "window": self.window,
+            "phases": {name: row for name, row in self.summary()},
+            "samples_ms": {name: list(self.samples[name]) for name in self.order}
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""
+Dziennik rzutów: ostatnie rzuty w pamięci (bufor cykliczny) i zapis w tle do rotowanych plików JSON Lines
+Structured roll journal: compact tuples in a bounded ring buffer, serialised off the hot path by a flush thread
+"""
+
+import itertools
+import json
+import logging
+import logging.handlers
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from combat_engine import side_inputs
+
+
+DEFAULT_CAPACITY = 5000  # Liczba ostatnich rzutów w pamięci
+DEFAULT_FLUSH_INTERVAL = 2.0  # Co ile sekund wątek zapisu opróżnia kolejkę
+DEFAULT_MAX_BYTES = 5 * 1024 * 1024  # Rozmiar pliku przed rotacją
+DEFAULT_BACKUP_COUNT = 5  # Liczba zachowanych plików po rotacji
+LOG_FILE_NAME = "rolls.jsonl"
+
+# Pola rekordu (krotki) w kolejności zapisu; seq i czas nadaje record()
+RECORD_FIELDS = (
+    "seq", "time", "battle", "side1", "side2", "dice", "final", "advantage", "people_after", "losses",
+    "tactical_outcome", "units1", "units2"
+)
+SIDE_FIELDS = tuple(side_inputs())  # Kolejność pól ustawień strony (jak w side_inputs)
+UNIT_FIELDS = ("id", "before", "losses")
+
+
+def record_to_dict(record):
+    """Rozwija zwarty rekord do słownika z nazwami pól (poza gorącą ścieżką)"""
+    data = dict(zip(RECORD_FIELDS, record))
+    data["time"] = datetime.fromtimestamp(data["time"]).isoformat(timespec="milliseconds")
+    for key in ("side1", "side2"):
+        data[key] = dict(zip(SIDE_FIELDS, data[key]))
+    for key in ("units1", "units2"):
+        data[key] = [dict(zip(UNIT_FIELDS, unit)) for unit in data[key]]
+    return data
+
+
+class RollLog:
+    """Bufor cykliczny rzutów; rekordy czekające na zapis są zrzucane do pliku przez wątek w tle
+
+    record() tylko dopisuje krotkę do dwóch kolejek - serializacja i zapis odbywają się w wątku.
+    Bez katalogu (directory=None) dziennik działa wyłącznie w pamięci.
+    """
+    
+    def __init__(self, directory=None, capacity=DEFAULT_CAPACITY, flush_interval=DEFAULT_FLUSH_INTERVAL,
+                 max_bytes=DEFAULT_MAX_BYTES, backup_count=DEFAULT_BACKUP_COUNT):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.records = deque(maxlen=capacity)  # Ostatnie rzuty (najstarsze wypadają)
+        self.pending = deque()  # Rekordy do zapisu (deque.append/popleft są bezpieczne między wątkami)
+        self.sequence = itertools.count(1)
+        self.handler = None  # RotatingFileHandler (tworzony przy pierwszym zapisie)
+        self.thread = None
+        self.wake = threading.Event()
+        self.stopping = False
+        self.write_lock = threading.Lock()
+        self.written = 0
+        self.write_errors = 0
+    
+    def record(self, battle, side1, side2, dice, final, advantage, people_after, losses, tactical_outcome,
+               units1, units2):
+        """Zapamiętuje rzut (krotki ustawień stron, wyniki, podział strat [(ID, przed, straty)])"""
+        entry = (next(self.sequence), time.time(), battle, side1, side2, dice, final, advantage, people_after,
+                 losses, tactical_outcome, units1, units2)
+        self.records.append(entry)
+        if self.directory is not None:
+            self.pending.append(entry)
+            if self.thread is None:
+                self.start()
+        return entry
+    
+    def recent(self, count=None):
+        """Ostatnie rzuty jako słowniki (najnowszy na końcu)"""
+        records = list(self.records)
+        if count is not None:
+            records = records[-count:]
+        return [record_to_dict(record) for record in records]
+    
+    def start(self):
+        """Uruchamia wątek zapisu"""
+        self.stopping = False
+        self.thread = threading.Thread(target=self.flush_loop, name="roll-log-writer", daemon=True)
+        self.thread.start()
+    
+    def flush_loop(self):
+        """Pętla wątku zapisu: opróżnia kolejkę co flush_interval sekund i przy zamykaniu"""
+        while not self.stopping:
+            self.wake.wait(self.flush_interval)
+            self.wake.clear()
+            self.flush()
+    
+    def open_handler(self):
+        """Tworzy katalog i rotowany plik dziennika"""
+        os.makedirs(self.directory, exist_ok=True)
+        handler = logging.handlers.RotatingFileHandler(
+            os.path.join(self.directory, LOG_FILE_NAME), maxBytes=self.max_bytes, backupCount=self.backup_count,
+            encoding="utf-8", delay=True
+        )
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        return handler
+    
+    def flush(self):
+        """Zapisuje oczekujące rekordy jako linie JSON; zwraca liczbę zapisanych"""
+        with self.write_lock:
+            written = 0
+            while self.pending:
+                entry = self.pending.popleft()
+                try:
+                    if self.handler is None:
+                        self.handler = self.open_handler()
+                    line = json.dumps(record_to_dict(entry), ensure_ascii=False, separators=(",", ":"))
+                    self.handler.emit(logging.makeLogRecord({"msg": line}))
+                    written += 1
+                except (OSError, TypeError, ValueError):
+                    self.write_errors += 1
+            if written and self.handler is not None:
+                self.handler.flush()
+            self.written += written
+            return written
+    
+    def close(self):
+        """Zatrzymuje wątek, zapisuje pozostałe rekordy i zamyka plik"""
+        if self.thread is not None:
+            self.stopping = True
+            self.wake.set()
+            self.thread.join()
+            self.thread = None
+        self.flush()
+        if self.handler is not None:
+            self.handler.close()
+            self.handler = None
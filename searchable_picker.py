@@ -0,0 +1,306 @@
+# -*- coding: utf-8 -*-
+"""
+Wyszukiwarka z podpowiedziami zastępująca combobox przy dużych wykazach
+Type-ahead searchable picker with a virtualized result list
+"""
+
+import tkinter as tk
+from tkinter import ttk
+from bisect import bisect_left
+
+
+class PickerIndex:
+    """Indeks prefiksowy i podciągowy nazw wyświetlanych"""
+    
+    def __init__(self, values=()):
+        self.set_values(values)
+    
+    def set_values(self, values):
+        """Buduje indeks od zera dla nowej listy wartości"""
+        self.values = list(values)
+        self.lowered = [value.lower() for value in self.values]
+        # Posortowane pary (nazwa, indeks) i (słowo, indeks) do wyszukiwania prefiksów
+        self.names = sorted((name, i) for i, name in enumerate(self.lowered))
+        self.words = sorted((word, i) for i, name in enumerate(self.lowered) for word in set(name.split()))
+        self._last_query = None
+        self._last_matches = None  # Indeksy zawierające ostatnie zapytanie (w kolejności wartości)
+    
+    def __len__(self):
+        return len(self.values)
+    
+    @staticmethod
+    def _prefix_range(column, prefix):
+        """Zwraca indeksy wartości z posortowanej kolumny zaczynające się od prefiksu"""
+        start = bisect_left(column, (prefix, -1))
+        end = bisect_left(column, (prefix + '\uffff', -1))
+        return [i for _, i in column[start:end]]
+    
+    def search(self, query):
+        """Zwraca indeksy pasujących wartości: najpierw prefiks nazwy, potem prefiks słowa, potem fragment"""
+        query = query.strip().lower()
+        if not query:
+            self._last_query = None
+            self._last_matches = None
+            return list(range(len(self.values)))
+        
+        # Zawężanie przyrostowe - dopisanie znaku przeszukuje tylko poprzednie trafienia
+        if self._last_query is not None and query.startswith(self._last_query):
+            candidates = self._last_matches
+        else:
+            candidates = range(len(self.values))
+        lowered = self.lowered
+        matches = [i for i in candidates if query in lowered[i]]
+        self._last_query = query
+        self._last_matches = matches
+        
+        ordered = self._prefix_range(self.names, query)
+        seen = set(ordered)
+        for i in self._prefix_range(self.words, query):
+            if i not in seen:
+                seen.add(i)
+                ordered.append(i)
+        ordered.extend(i for i in matches if i not in seen)
+        return ordered
+
+
+class SearchablePicker(ttk.Frame):
+    """Pole wyboru z filtrowaniem podczas pisania i wirtualizowaną listą wyników
+
+    Zachowuje się jak ttk.Combobox w zakresie używanym przez aplikację:
+    config(values=..., state=...), get()/set() oraz zdarzenie <<ComboboxSelected>>.
+    """
+    
+    def __init__(self, master, textvariable=None, values=(), state="readonly", width=20, visible_rows=10, **kwargs):
+        super().__init__(master, **kwargs)
+        self.variable = textvariable if textvariable is not None else tk.StringVar(master)
+        self.index = PickerIndex(values)
+        self.visible_rows = visible_rows
+        self.picker_state = state
+        
+        self.results = []  # Indeksy wartości pasujących do zapytania
+        self.offset = 0  # Pierwszy wynik widoczny na liście
+        self.cursor = 0  # Wynik zaznaczony klawiaturą
+        self.popup = None
+        self._syncing = False
+        
+        self.entry_var = tk.StringVar(master, value=self.variable.get())
+        self.entry = ttk.Entry(self, textvariable=self.entry_var, width=width)
+        self.entry.grid(row=0, column=0, sticky=tk.W+tk.E)
+        self.button = ttk.Button(self, text="▼", width=2, takefocus=0, command=self.toggle_popup)
+        self.button.grid(row=0, column=1)
+        self.columnconfigure(0, weight=1)
+        
+        self.entry_var.trace_add('write', self._on_query_change)
+        self.variable.trace_add('write', self._on_variable_change)
+        self.entry.bind('<Down>', lambda e: self._move_cursor(1))
+        self.entry.bind('<Up>', lambda e: self._move_cursor(-1))
+        self.entry.bind('<Next>', lambda e: self._move_cursor(self.visible_rows))
+        self.entry.bind('<Prior>', lambda e: self._move_cursor(-self.visible_rows))
+        self.entry.bind('<Return>', self._on_return)
+        self.entry.bind('<KP_Enter>', self._on_return)
+        self.entry.bind('<Escape>', lambda e: self.close_popup(revert=True))
+        self.entry.bind('<FocusIn>', lambda e: self.entry.select_range(0, tk.END))
+        self.entry.bind('<FocusOut>', lambda e: self.after(150, self._close_if_unfocused))
+        
+        self._apply_state()
+    
+    # --- Emulacja interfejsu ttk.Combobox ---
+    
+    def configure(self, cnf=None, **kwargs):
+        """Obsługuje values i state, pozostałe opcje przekazuje do ramki"""
+        if cnf:
+            kwargs.update(cnf)
+        if 'values' in kwargs:
+            self.index.set_values(kwargs.pop('values'))
+            if self.popup is not None and self.popup.winfo_viewable():
+                self._refresh_results()
+        if 'state' in kwargs:
+            self.picker_state = kwargs.pop('state')
+            self._apply_state()
+        if kwargs:
+            return super().configure(**kwargs)
+    
+    config = configure
+    
+    def cget(self, key):
+        if key == 'values':
+            return tuple(self.index.values)
+        if key == 'state':
+            return self.picker_state
+        return super().cget(key)
+    
+    __getitem__ = cget
+    
+    def get(self):
+        return self.variable.get()
+    
+    def set(self, value):
+        self.variable.set(value)
+    
+    def _apply_state(self):
+        """Blokuje lub odblokowuje pole i przycisk"""
+        widget_state = "disabled" if self.picker_state == "disabled" else "normal"
+        self.entry.config(state=widget_state)
+        self.button.config(state=widget_state)
+        if widget_state == "disabled":
+            self.close_popup(revert=True)
+    
+    # --- Synchronizacja pola z wybraną wartością ---
+    
+    def _set_entry_text(self, text):
+        """Ustawia tekst pola bez uruchamiania filtrowania"""
+        self._syncing = True
+        try:
+            self.entry_var.set(text)
+        finally:
+            self._syncing = False
+    
+    def _on_variable_change(self, *args):
+        """Wartość ustawiona z zewnątrz - pokaż ją w polu"""
+        if self.popup is None or not self.popup.winfo_viewable():
+            self._set_entry_text(self.variable.get())
+    
+    def _on_query_change(self, *args):
+        """Pisanie w polu filtruje wyniki"""
+        if self._syncing or self.picker_state == "disabled":
+            return
+        self.open_popup()
+        self._refresh_results()
+    
+    # --- Lista wyników ---
+    
+    def _build_popup(self):
+        """Tworzy okno listy wyników (raz, później tylko pokazywane/ukrywane)"""
+        self.popup = tk.Toplevel(self)
+        self.popup.withdraw()
+        self.popup.overrideredirect(True)
+        self.popup.transient(self.winfo_toplevel())
+        
+        self.listbox = tk.Listbox(self.popup, height=self.visible_rows, activestyle="none",
+                                  exportselection=False, takefocus=0)
+        self.scrollbar = ttk.Scrollbar(self.popup, orient=tk.VERTICAL, command=self._on_scrollbar)
+        self.listbox.grid(row=0, column=0, sticky=tk.W+tk.E+tk.N+tk.S)
+        self.scrollbar.grid(row=0, column=1, sticky=tk.N+tk.S)
+        self.popup.columnconfigure(0, weight=1)
+        
+        # Własna obsługa kliknięć - fokus zostaje w polu tekstowym
+        self.listbox.bind('<Button-1>', self._on_listbox_click)
+        self.listbox.bind('<MouseWheel>', lambda e: self._scroll(-1 if e.delta > 0 else 1))
+        self.listbox.bind('<Button-4>', lambda e: self._scroll(-1))
+        self.listbox.bind('<Button-5>', lambda e: self._scroll(1))
+    
+    def open_popup(self):
+        """Pokazuje listę wyników pod polem"""
+        if self.picker_state == "disabled":
+            return
+        if self.popup is None:
+            self._build_popup()
+        if not self.popup.winfo_viewable():
+            self.update_idletasks()
+            x = self.winfo_rootx()
+            y = self.winfo_rooty() + self.winfo_height()
+            self.popup.geometry(f"{max(self.winfo_width(), 120)}x{self.listbox.winfo_reqheight()}+{x}+{y}")
+            self.popup.deiconify()
+            self.popup.lift()
+    
+    def close_popup(self, revert=False):
+        """Ukrywa listę wyników; revert przywraca w polu wybraną wartość"""
+        if self.popup is not None:
+            self.popup.withdraw()
+        if revert:
+            self._set_entry_text(self.variable.get())
+    
+    def toggle_popup(self):
+        """Przycisk ▼ - pokazuje wszystkie wartości lub chowa listę"""
+        if self.popup is not None and self.popup.winfo_viewable():
+            self.close_popup(revert=True)
+            return
+        self.entry.focus_set()
+        self.open_popup()
+        self._refresh_results(query="")
+    
+    def _close_if_unfocused(self):
+        if self.focus_get() is not self.entry:
+            self.close_popup(revert=True)
+    
+    def _refresh_results(self, query=None):
+        """Filtruje wartości według zapytania i renderuje pierwszą stronę"""
+        if query is None:
+            query = self.entry_var.get()
+        self.results = self.index.search(query)
+        self.offset = 0
+        self.cursor = 0
+        self._render()
+    
+    def _render(self):
+        """Wypełnia listę tylko widocznym wycinkiem wyników"""
+        if self.popup is None:
+            return
+        total = len(self.results)
+        values = self.index.values
+        self.listbox.delete(0, tk.END)
+        if not total:
+            self.listbox.insert(tk.END, "Brak wyników")
+            self.scrollbar.set(0.0, 1.0)
+            return
+        
+        window = self.results[self.offset:self.offset + self.visible_rows]
+        self.listbox.insert(tk.END, *[values[i] for i in window])
+        if self.offset <= self.cursor < self.offset + len(window):
+            self.listbox.selection_set(self.cursor - self.offset)
+        self.scrollbar.set(self.offset / total, min(1.0, (self.offset + len(window)) / total))
+    
+    def _max_offset(self):
+        return max(0, len(self.results) - self.visible_rows)
+    
+    def _scroll(self, rows):
+        """Przesuwa widoczny wycinek o podaną liczbę wierszy"""
+        self.offset = max(0, min(self._max_offset(), self.offset + rows))
+        self._render()
+        return "break"
+    
+    def _on_scrollbar(self, action, amount, unit=None):
+        """Obsługa paska przewijania dla wirtualnej listy"""
+        if action == "moveto":
+            self.offset = max(0, min(self._max_offset(), int(float(amount) * len(self.results))))
+            self._render()
+        elif action == "scroll":
+            step = self.visible_rows if unit == "pages" else 1
+            self._scroll(int(amount) * step)
+    
+    def _move_cursor(self, delta):
+        """Strzałki - przesuwają zaznaczenie, przewijając listę przy krawędzi"""
+        if self.picker_state == "disabled":
+            return "break"
+        if self.popup is None or not self.popup.winfo_viewable():
+            self.open_popup()
+            self._refresh_results(query="" if self.entry_var.get() == self.variable.get() else None)
+            return "break"
+        if not self.results:
+            return "break"
+        
+        self.cursor = max(0, min(len(self.results) - 1, self.cursor + delta))
+        if self.cursor < self.offset:
+            self.offset = self.cursor
+        elif self.cursor >= self.offset + self.visible_rows:
+            self.offset = self.cursor - self.visible_rows + 1
+        self._render()
+        return "break"
+    
+    def _on_listbox_click(self, event):
+        if self.results:
+            row = self.listbox.nearest(event.y)
+            self.select_index(self.results[min(self.offset + row, len(self.results) - 1)])
+        return "break"
+    
+    def _on_return(self, event=None):
+        if self.popup is not None and self.popup.winfo_viewable() and self.results:
+            self.select_index(self.results[self.cursor])
+        return "break"
+    
+    def select_index(self, value_index):
+        """Wybiera wartość o podanym indeksie i zgłasza <<ComboboxSelected>>"""
+        self.close_popup()
+        self.variable.set(self.index.values[value_index])
+        self._set_entry_text(self.variable.get())
+        self.event_generate("<<ComboboxSelected>>")
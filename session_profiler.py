@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+"""
+Profil całej sesji: próbkowanie stosu wątku Tk tylko w trakcie wywołań zwrotnych (zdarzenia, after, zmienne)
+Session-wide sampling profiler scoped to Tk callbacks, with collapsed-stack and top-N cumulative-time export
+"""
+
+import os
+import sys
+import threading
+import time
+import tkinter
+
+
+DEFAULT_INTERVAL = 0.005  # Odstęp między próbkami w sekundach
+TOP_N = 30  # Liczba funkcji w tabeli czasu łącznego
+
+_original_call_wrapper = tkinter.CallWrapper
+_active = None  # SessionProfiler w trakcie pomiaru (None - wywołania zwrotne tylko przekazywane)
+
+
+def frame_label(code):
+    """Etykieta funkcji w stosie: nazwa kwalifikowana (plik:linia definicji)"""
+    return f"{code.co_qualname} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def callback_name(func):
+    """Nazwa wywołania zwrotnego Tk (metoda, funkcja lub lambda)"""
+    return getattr(func, "__qualname__", None) or repr(func)
+
+
+class ProfiledCallWrapper(_original_call_wrapper):
+    """CallWrapper wywołań zwrotnych Tk; mierzy czas wywołania, gdy profiler sesji jest włączony
+
+    Misc._register zapamiętuje metodę __call__ instancji w chwili rejestracji, dlatego podmiana musi
+    nastąpić przed utworzeniem interfejsu (install_call_wrapper()) - późniejsza zmiana klasy nie obejmuje
+    już zarejestrowanych poleceń przycisków, obsług bind() i śledzenia zmiennych.
+    """
+    
+    def __call__(self, *args):
+        profiler = _active
+        if profiler is None:
+            return _original_call_wrapper.__call__(self, *args)
+        profiler.depth += 1
+        started = time.perf_counter()
+        try:
+            return _original_call_wrapper.__call__(self, *args)
+        finally:
+            profiler.depth -= 1
+            if not profiler.depth:
+                profiler.record_callback(self.func, time.perf_counter() - started)
+
+
+def install_call_wrapper():
+    """Podmienia tkinter.CallWrapper na ProfiledCallWrapper (wywołać przed utworzeniem okien)"""
+    tkinter.CallWrapper = ProfiledCallWrapper
+
+
+class SessionProfiler:
+    """Próbkujący profiler wywołań zwrotnych Tk
+
+    Wywołania zwrotne (obsługi zdarzeń, after() i śledzenie zmiennych) przechodzą przez ProfiledCallWrapper
+    zainstalowany przed utworzeniem interfejsu; po start() liczy on czas wywołań, a wątek próbkujący co interval
+    sekund zapisuje stos wątku Tk, ale tylko gdy trwa wywołanie zwrotne - czas bezczynności mainloop nie trafia
+    do raportu.
+    Czas funkcji to jej udział w próbkach pomnożony przez zmierzony łączny czas wywołań zwrotnych.
+    """
+    
+    def __init__(self, interval=DEFAULT_INTERVAL):
+        self.interval = interval
+        self.running = False
+        self.lock = threading.Lock()
+        self.thread = None
+        self.target_thread = None  # Identyfikator wątku Tk (tego, który wywołał start())
+        self.depth = 0  # Zagnieżdżenie wywołań zwrotnych (np. update() wewnątrz obsługi zdarzenia)
+        self.reset()
+    
+    def reset(self):
+        """Usuwa zebrane próbki i czasy wywołań"""
+        with self.lock:
+            self.stacks = {}  # {krotka obiektów kodu od korzenia do liścia: liczba próbek}
+            self.samples = 0
+            self.callbacks = {}  # {nazwa wywołania: [liczba, łączny czas w s]}
+            self.callback_seconds = 0.0
+    
+    def start(self):
+        """Włącza pomiar wywołań zwrotnych i uruchamia wątek próbkujący"""
+        global _active
+        if self.running:
+            return
+        install_call_wrapper()  # Bez wcześniejszej instalacji obejmuje tylko wywołania rejestrowane od teraz
+        self.target_thread = threading.get_ident()
+        self.depth = 0
+        _active = self
+        self.running = True
+        self.thread = threading.Thread(target=self.sample_loop, name="session-profiler", daemon=True)
+        self.thread.start()
+    
+    def stop(self):
+        """Wyłącza pomiar wywołań zwrotnych i zatrzymuje próbkowanie"""
+        global _active
+        if not self.running:
+            return
+        self.running = False
+        if _active is self:
+            _active = None
+        self.thread.join()
+        self.thread = None
+    
+    def record_callback(self, func, seconds):
+        """Dolicza czas zakończonego (zewnętrznego) wywołania zwrotnego"""
+        name = callback_name(func)
+        with self.lock:
+            entry = self.callbacks.get(name)
+            if entry is None:
+                entry = self.callbacks[name] = [0, 0.0]
+            entry[0] += 1
+            entry[1] += seconds
+            self.callback_seconds += seconds
+    
+    def sample_loop(self):
+        """Wątek próbkujący: stos wątku Tk od najbardziej zewnętrznego wywołania zwrotnego"""
+        wrapper_code = ProfiledCallWrapper.__call__.__code__
+        skipped = _original_call_wrapper.__call__.__code__
+        while self.running:
+            time.sleep(self.interval)
+            if not self.depth:
+                continue
+            frame = sys._current_frames().get(self.target_thread)
+            codes = []
+            cut = None
+            while frame is not None:
+                code = frame.f_code
+                if code is wrapper_code:
+                    cut = len(codes)  # Idąc w górę stosu, ostatnie trafienie to zewnętrzne wywołanie
+                elif code is not skipped:
+                    codes.append(code)
+                frame = frame.f_back
+            del frame
+            if not cut:
+                continue
+            key = tuple(reversed(codes[:cut]))
+            with self.lock:
+                self.stacks[key] = self.stacks.get(key, 0) + 1
+                self.samples += 1
+    
+    def collapsed_lines(self):
+        """Stosy w formacie collapsed ("korzeń;...;liść liczba") dla flamegraph.pl i speedscope"""
+        with self.lock:
+            stacks = list(self.stacks.items())
+        merged = {}
+        for codes, count in stacks:
+            line = ";".join(frame_label(code).replace(";", ",") for code in codes)
+            merged[line] = merged.get(line, 0) + count
+        return [f"{line} {count}" for line, count in sorted(merged.items())]
+    
+    def top(self, limit=TOP_N):
+        """[(funkcja, próbki łącznie, próbki własne, ms łącznie, ms własne, udział)] według czasu łącznego"""
+        with self.lock:
+            stacks = list(self.stacks.items())
+            samples = self.samples
+            callback_ms = self.callback_seconds * 1000
+        cumulative = {}
+        own = {}
+        for codes, count in stacks:
+            for code in set(codes):  # Rekurencja liczona raz na próbkę
+                cumulative[code] = cumulative.get(code, 0) + count
+            own[codes[-1]] = own.get(codes[-1], 0) + count
+        ms_per_sample = callback_ms / samples if samples else 0.0
+        rows = sorted(cumulative.items(), key=lambda item: (-item[1], -own.get(item[0], 0), frame_label(item[0])))
+        return [(frame_label(code), count, own.get(code, 0), count * ms_per_sample, own.get(code, 0) * ms_per_sample,
+                 count / samples) for code, count in rows[:limit]]
+    
+    def callback_summary(self):
+        """[(wywołanie zwrotne, liczba, łączny czas ms)] według czasu"""
+        with self.lock:
+            rows = [(name, count, seconds * 1000) for name, (count, seconds) in self.callbacks.items()]
+        return sorted(rows, key=lambda row: -row[2])
+    
+    def write_collapsed(self, path):
+        """Zapisuje stosy w formacie collapsed"""
+        with open(path, 'w', encoding='utf-8') as f:
+            for line in self.collapsed_lines():
+                f.write(line + "\n")
+    
+    def write_top_table(self, path, limit=TOP_N):
+        """Zapisuje tabelę czasu łącznego funkcji i wywołań zwrotnych jako tekst"""
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(f"próbki: {self.samples}, odstęp: {self.interval * 1000:.1f} ms, "
+                    f"czas wywołań zwrotnych: {self.callback_seconds * 1000:.1f} ms\n\n")
+            f.write(f"{'łącznie ms':>12}{'własne ms':>12}{'udział':>9}  funkcja\n")
+            for label, _, _, cumulative_ms, own_ms, share in self.top(limit):
+                f.write(f"{cumulative_ms:>12.1f}{own_ms:>12.1f}{share:>9.1%}  {label}\n")
+            f.write(f"\n{'liczba':>12}{'łącznie ms':>12}  wywołanie zwrotne\n")
+            for name, count, total_ms in self.callback_summary():
+                f.write(f"{count:>12}{total_ms:>12.1f}  {name}\n")
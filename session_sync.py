@@ -0,0 +1,739 @@
+# -*- coding: utf-8 -*-
+"""
+Synchronizacja sesji wielu prowadzących: koncentrator TCP z dziennikiem zdarzeń, wektory wersji i doganianie od przesunięcia
+Networked multi-GM sync: a local TCP hub keeps an append-only event log that clients replay from an offset
+
+Protokół: jedna wiadomość JSON na linię (UTF-8).
+  klient -> hub: {"type": "hello", "client": ID, "offset": n}
+                 {"type": "publish", "kind": rodzaj, "key": klucz, "vector": {ID: licznik}, "payload": {...}}
+  hub -> klient: {"type": "event", "offset": n, "origin": ID, "kind": ..., "key": ..., "vector": ...,
+                  "payload": ..., "conflict": bool, "concurrent": [ID], "time": ...}
+                 {"type": "welcome", "offset": n} (po zdarzeniach doganiania), {"type": "error", "message": ...}
+
+Uruchomienie: python session_sync.py hub [--host H] [--port P] [--log plik.jsonl]
+              python session_sync.py demo [--clients N]
+"""
+
+import argparse
+import json
+import os
+import queue
+import socket
+import socketserver
+import sys
+import threading
+import time
+from datetime import datetime
+
+from campaign_model import CampaignModel
+
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+UNIT_SIDES = ('własne', 'wroga')
+
+# Rodzaje zdarzeń; tylko zmiany stanu jednostki mogą być ze sobą w konflikcie (wpisy bitew są dopisywane,
+# obcięcie po cofnięciu rzutu i podmiana po wczytaniu rejestru ustalają nową długość bitwy w dzienniku)
+UNIT_KINDS = ("unit", "unit_deleted")
+BATTLE_KINDS = ("battle_created", "battle_entries", "battle_truncate", "battle_replace")
+
+
+def encode(message):
+    return (json.dumps(message, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+def dominates(vector, other):
+    """True, jeśli wektor wersji uwzględnia wszystkie zmiany z other"""
+    return all(vector.get(client, 0) >= count for client, count in other.items())
+
+
+def merge_vectors(vector, other):
+    """Maksimum po współrzędnych (nowy słownik)"""
+    merged = dict(vector)
+    for client, count in other.items():
+        if count > merged.get(client, 0):
+            merged[client] = count
+    return merged
+
+
+def unit_key(unit_id):
+    return f"unit:{unit_id}"
+
+
+def battle_key(battle_name):
+    return f"battle:{battle_name}"
+
+
+# --- Koncentrator ---
+
+class HubHandler(socketserver.StreamRequestHandler):
+    """Połączenie jednego klienta: doganianie od przesunięcia, potem publikacje i rozgłaszanie"""
+    
+    def handle(self):
+        hub = self.server.hub
+        client_id = None
+        try:
+            for line in self.rfile:
+                try:
+                    message = json.loads(line)
+                except ValueError:
+                    self.send({"type": "error", "message": "niepoprawny JSON"})
+                    continue
+                message_type = message.get("type")
+                if message_type == "hello" and client_id is None:
+                    client_id = str(message.get("client") or "")
+                    if not hub.register(client_id, self, int(message.get("offset", 0))):
+                        self.send({"type": "error", "message": f"klient '{client_id}' jest już połączony"})
+                        client_id = None
+                        return
+                elif message_type == "publish" and client_id is not None:
+                    hub.publish(client_id, message)
+                else:
+                    self.send({"type": "error", "message": f"nieoczekiwana wiadomość: {message_type}"})
+        except OSError:
+            pass
+        finally:
+            if client_id is not None:
+                hub.unregister(client_id, self)
+    
+    def send(self, message):
+        self.wfile.write(encode(message))
+
+
+class HubServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class SyncHub:
+    """Dziennik zdarzeń z kolejnymi przesunięciami; kolejność w dzienniku jest rozstrzygająca dla wszystkich klientów
+
+    Dla kluczy jednostek hub pamięta scalony wektor wersji: publikacja, której wektor nie obejmuje
+    dotychczasowego, jest współbieżną zmianą tej samej jednostki i zostaje oznaczona jako konflikt.
+    Wpisy bitew dostają od huba pozycję w rejestrze bitwy (start), więc równoległe rzuty się nie nadpisują.
+    """
+    
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, log_path=None):
+        self.lock = threading.Lock()
+        self.events = []  # Zakodowane linie zdarzeń; indeks = przesunięcie
+        self.key_versions = {}  # {klucz: scalony wektor wersji}
+        self.battle_lengths = {}  # {nazwa bitwy: liczba wpisów w dzienniku}
+        self.clients = {}  # {ID klienta: HubHandler}
+        self.conflicts = 0
+        self.log_path = log_path
+        self.log_file = None
+        if log_path is not None:
+            self.load_log(log_path)
+            self.log_file = open(log_path, "a", encoding="utf-8")
+        self.server = HubServer((host, port), HubHandler)
+        self.server.hub = self
+        self.thread = None
+        self.serving = False
+    
+    @property
+    def address(self):
+        return self.server.server_address
+    
+    def load_log(self, path):
+        """Odtwarza dziennik i stan wektorów z pliku (wznowienie pracy huba)"""
+        if not os.path.exists(path):
+            return
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    self.record(json.loads(line))
+    
+    def record(self, event):
+        """Dopisuje zdarzenie do dziennika i aktualizuje stan kluczy; zwraca zakodowaną linię"""
+        key = event["key"]
+        self.key_versions[key] = merge_vectors(self.key_versions.get(key, {}), event["vector"])
+        if event["kind"] == "battle_entries":
+            name = event["payload"]["battle"]
+            self.battle_lengths[name] = event["payload"]["start"] + len(event["payload"]["entries"])
+        elif event["kind"] == "battle_truncate":
+            self.battle_lengths[event["payload"]["battle"]] = event["payload"]["length"]
+        elif event["kind"] == "battle_replace":
+            self.battle_lengths[event["payload"]["battle"]] = len(event["payload"]["entries"])
+        line = encode(event)
+        self.events.append(line)
+        return line
+    
+    def start(self):
+        """Obsługuje połączenia w wątku w tle"""
+        self.thread = threading.Thread(target=self.serve_forever, name="sync-hub", daemon=True)
+        self.thread.start()
+        return self
+    
+    def serve_forever(self):
+        self.serving = True
+        try:
+            self.server.serve_forever()
+        finally:
+            self.serving = False
+    
+    def stop(self):
+        if self.serving:
+            self.server.shutdown()
+        self.server.server_close()
+        with self.lock:
+            for handler in self.clients.values():
+                try:
+                    handler.connection.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+            self.clients = {}
+            if self.log_file is not None:
+                self.log_file.close()
+                self.log_file = None
+    
+    def register(self, client_id, handler, offset):
+        """Wysyła zdarzenia od przesunięcia i dołącza klienta do rozgłaszania (pod blokadą - bez luk i powtórzeń)"""
+        with self.lock:
+            if not client_id or client_id in self.clients:
+                return False
+            offset = max(0, min(offset, len(self.events)))
+            handler.wfile.write(b"".join(self.events[offset:]))
+            handler.send({"type": "welcome", "offset": len(self.events)})
+            self.clients[client_id] = handler
+            return True
+    
+    def unregister(self, client_id, handler):
+        with self.lock:
+            if self.clients.get(client_id) is handler:
+                del self.clients[client_id]
+    
+    def publish(self, client_id, message):
+        """Nadaje zdarzeniu przesunięcie, sprawdza konflikt, zapisuje i rozgłasza"""
+        kind = message.get("kind")
+        key = message.get("key")
+        vector = {str(client): int(count) for client, count in (message.get("vector") or {}).items()}
+        payload = message.get("payload") or {}
+        with self.lock:
+            current = self.key_versions.get(key, {})
+            concurrent = []
+            if kind in UNIT_KINDS:
+                concurrent = sorted(client for client, count in current.items() if count > vector.get(client, 0))
+            if kind == "battle_entries":
+                payload["start"] = self.battle_lengths.get(payload.get("battle"), 0)
+            event = {
+                "type": "event", "offset": len(self.events), "origin": client_id, "kind": kind, "key": key,
+                "vector": vector, "payload": payload, "conflict": bool(concurrent), "concurrent": concurrent,
+                "time": datetime.now().isoformat(timespec="milliseconds")
+            }
+            if concurrent:
+                self.conflicts += 1
+            line = self.record(event)
+            if self.log_file is not None:
+                self.log_file.write(line.decode("utf-8"))
+                self.log_file.flush()
+            for other_id, handler in list(self.clients.items()):
+                try:
+                    handler.wfile.write(line)
+                except OSError:
+                    del self.clients[other_id]
+
+
+# --- Klient ---
+
+class SyncClient:
+    """Połączenie z hubem; wątek czytający przekazuje wiadomości do kolejki odbieranej przez receive()
+
+    Wektor wersji klucza jest podbijany przy publikacji i scalany przy zastosowaniu zdarzenia.
+    in_flight liczy własne publikacje danego klucza, które jeszcze nie wróciły z huba.
+    """
+    
+    def __init__(self, client_id):
+        self.client_id = client_id
+        self.sock = None
+        self.reader = None
+        self.send_lock = threading.Lock()
+        self.messages = queue.Queue()
+        self.offset = 0  # Przesunięcie następnego oczekiwanego zdarzenia
+        self.versions = {}  # {klucz: wektor wersji}
+        self.in_flight = {}  # {klucz: liczba niepotwierdzonych własnych publikacji}
+        self.published = 0
+        self.connected = False
+        self.caught_up = False
+    
+    def connect(self, host=DEFAULT_HOST, port=DEFAULT_PORT, timeout=5.0):
+        """Łączy się i prosi o zdarzenia od bieżącego przesunięcia"""
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.settimeout(None)
+        self.connected = True
+        self.caught_up = False
+        self.reader = threading.Thread(target=self.read_loop, args=(self.sock,), name="sync-client", daemon=True)
+        self.reader.start()
+        self.send({"type": "hello", "client": self.client_id, "offset": self.offset})
+    
+    def read_loop(self, sock):
+        try:
+            with sock.makefile("rb") as stream:
+                for line in stream:
+                    self.messages.put(json.loads(line))
+        except (OSError, ValueError):
+            pass
+        self.messages.put({"type": "disconnected"})
+    
+    def send(self, message):
+        with self.send_lock:
+            self.sock.sendall(encode(message))
+    
+    def publish(self, kind, key, payload):
+        """Publikuje zmianę klucza z podbitym własnym licznikiem wektora wersji"""
+        vector = dict(self.versions.get(key, {}))
+        vector[self.client_id] = vector.get(self.client_id, 0) + 1
+        self.versions[key] = vector
+        self.in_flight[key] = self.in_flight.get(key, 0) + 1
+        self.published += 1
+        self.send({"type": "publish", "kind": kind, "key": key, "vector": vector, "payload": payload})
+    
+    def receive(self):
+        """Wiadomości odebrane od ostatniego wywołania (bez blokowania)"""
+        received = []
+        while True:
+            try:
+                message = self.messages.get_nowait()
+            except queue.Empty:
+                return received
+            if message["type"] == "event":
+                self.offset = message["offset"] + 1
+                if message["origin"] == self.client_id and self.in_flight.get(message["key"]):
+                    self.in_flight[message["key"]] -= 1
+            elif message["type"] == "welcome":
+                self.caught_up = True
+            elif message["type"] == "disconnected":
+                self.connected = False
+            received.append(message)
+    
+    def acknowledge(self, event):
+        """Scala wektor zastosowanego zdarzenia z wektorem klucza"""
+        key = event["key"]
+        self.versions[key] = merge_vectors(self.versions.get(key, {}), event["vector"])
+    
+    def close(self):
+        if self.sock is not None:
+            try:
+                self.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self.sock.close()
+            self.sock = None
+        self.connected = False
+
+
+# --- Most między modelem a hubem ---
+
+class ModelSync:
+    """Publikuje zmiany CampaignModel i stosuje zdarzenia innych prowadzących
+
+    Jednostki: zdarzenie niesie stan pól (bez historii) oraz przyrost historii bitew od pozycji
+    history_base - zmiany jednostki w jednym cyklu są łączone w jedną publikację (flush()).
+    Zdarzenie jednostki jest pomijane, dopóki ta sama jednostka ma własne niewysłane lub niepotwierdzone
+    zmiany - późniejsza własna publikacja i tak je zastąpi. Wektor pominiętego zdarzenia jest scalany
+    (hub zgłosił już współbieżną parę), więc kolejne zmiany tej jednostki nie są konfliktami.
+    Wpisy bitew są wstawiane na pozycje nadane przez hub (także własne), więc wszyscy klienci kończą
+    z tym samym rejestrem w kolejności dziennika. Cofnięcie rzutu publikuje obcięcie bitwy do nowej długości,
+    a wczytanie wykazu lub rejestru (nowe obiekty w modelu) publikuje je w całości.
+    """
+    
+    def __init__(self, model, client):
+        self.model = model
+        self.client = client
+        self.applying = False  # Zdarzenia modelu wywołane przez zastosowanie zmian zdalnych nie są publikowane
+        self.pending_units = set()
+        self.unit_history = {}  # {ID jednostki: długość historii znana wszystkim}
+        self.battle_lengths = {}  # {nazwa bitwy: liczba wpisów opublikowanych lub odebranych}
+        self.units_source = model.units  # Wykaz i rejestr znane hubowi - inny obiekt w modelu oznacza wczytanie
+        self.battles_source = model.battles
+        self.snapshot_lengths()
+        model.subscribe('units_reset', self.on_units_reset)
+        model.subscribe('battles_reset', self.on_battles_reset)
+        model.subscribe('unit_changed', self.on_unit_changed)
+        model.subscribe('battle_created', self.on_battle_created)
+        model.subscribe('battle_appended', self.on_battle_appended)
+    
+    def detach(self):
+        self.model.unsubscribe('units_reset', self.on_units_reset)
+        self.model.unsubscribe('battles_reset', self.on_battles_reset)
+        self.model.unsubscribe('unit_changed', self.on_unit_changed)
+        self.model.unsubscribe('battle_created', self.on_battle_created)
+        self.model.unsubscribe('battle_appended', self.on_battle_appended)
+    
+    def snapshot_lengths(self):
+        """Stan wyjściowy: istniejące wpisy nie są publikowane ponownie"""
+        for side_name in UNIT_SIDES:
+            for unit_id, unit_data in self.model.units[side_name].items():
+                self.unit_history[unit_id] = len(unit_data.get('historia_bitew', []))
+        for battle_name, battle in self.model.battles.items():
+            self.battle_lengths[battle_name] = len(battle["history"])
+    
+    # --- Zmiany lokalne ---
+    
+    def on_units_reset(self, event, payload):
+        """Wczytany wykaz jest publikowany w całości; jednostki spoza niego są usuwane u pozostałych"""
+        if self.applying or self.model.units is self.units_source:
+            return
+        self.units_source = self.model.units
+        self.pending_units.update(self.unit_history)
+        self.unit_history = {}
+        for side_units in self.model.units.values():
+            self.pending_units.update(side_units)
+    
+    def on_battles_reset(self, event, payload):
+        """Publikuje nową długość bitew obciętych przy cofnięciu rzutu lub cały wczytany rejestr"""
+        if self.applying:
+            return
+        replaced = self.model.battles is not self.battles_source
+        self.battles_source = self.model.battles
+        for battle_name, battle in self.model.battles.items():
+            history = battle["history"]
+            known = self.battle_lengths.get(battle_name, 0)
+            if replaced:
+                self.client.publish("battle_replace", battle_key(battle_name),
+                                    {"battle": battle_name, "created": battle.get("created"), "entries": history})
+            elif len(history) < known:
+                self.client.publish("battle_truncate", battle_key(battle_name),
+                                    {"battle": battle_name, "length": len(history)})
+            elif len(history) > known:
+                self.client.publish("battle_entries", battle_key(battle_name),
+                                    {"battle": battle_name, "entries": history[known:]})
+            self.battle_lengths[battle_name] = len(history)
+    
+    def on_unit_changed(self, event, payload):
+        if self.applying:
+            return
+        self.pending_units.update(payload)
+        # Historia skrócona przy cofnięciu rzutu jest publikowana od miejsca obcięcia, nawet gdy przed flush()
+        # dopisano już kolejne wpisy
+        for unit_id in set(payload):
+            unit_data = self.model.find_unit(unit_id)[1]
+            if unit_data is not None and unit_id in self.unit_history:
+                self.unit_history[unit_id] = min(self.unit_history[unit_id], len(unit_data.get('historia_bitew', [])))
+    
+    def units_touched(self, *unit_ids):
+        """Zgłasza jednostki zmienione poza zdarzeniami modelu (formularz, tworzenie, usunięcie, zmiana strony)"""
+        self.pending_units.update(unit_ids)
+    
+    def on_battle_created(self, event, payload):
+        if self.applying:
+            return
+        for battle_name in payload:
+            self.battle_lengths[battle_name] = 0
+            self.client.publish("battle_created", battle_key(battle_name),
+                                {"battle": battle_name, "created": self.model.battles[battle_name].get("created")})
+    
+    def on_battle_appended(self, event, payload):
+        if self.applying:
+            return
+        for battle_name in dict.fromkeys(payload):
+            history = self.model.battles[battle_name]["history"]
+            known = self.battle_lengths.get(battle_name, 0)
+            if len(history) > known:
+                self.client.publish("battle_entries", battle_key(battle_name),
+                                    {"battle": battle_name, "entries": history[known:]})
+                self.battle_lengths[battle_name] = len(history)
+    
+    def flush(self):
+        """Publikuje zebrane zmiany jednostek (jedna publikacja na jednostkę); zwraca ich liczbę"""
+        pending = self.pending_units
+        self.pending_units = set()
+        for unit_id in pending:
+            side_name, unit_data = self.model.find_unit(unit_id)
+            if unit_data is None:
+                self.unit_history.pop(unit_id, None)
+                self.client.publish("unit_deleted", unit_key(unit_id), {"id": unit_id})
+                continue
+            history = unit_data.get('historia_bitew', [])
+            base = min(self.unit_history.get(unit_id, 0), len(history))
+            fields = {field: value for field, value in unit_data.items() if field != 'historia_bitew'}
+            self.client.publish("unit", unit_key(unit_id), {
+                "id": unit_id, "side": side_name, "fields": fields,
+                "history_base": base, "history_append": history[base:]
+            })
+            self.unit_history[unit_id] = len(history)
+        return len(pending)
+    
+    # --- Zmiany zdalne ---
+    
+    def process(self):
+        """Publikuje zmiany lokalne, stosuje odebrane zdarzenia; zwraca podsumowanie dla widoków"""
+        self.flush()
+        summary = {
+            "events": 0, "units": set(), "battalions": set(), "structural": False, "reindex": False,
+            "unit_entries": [], "battles_created": [], "battle_entries": [], "battles": set(),
+            "conflicts": [], "skipped": [], "disconnected": False, "errors": []
+        }
+        messages = self.client.receive()
+        if not messages:
+            return summary
+        self.applying = True
+        try:
+            with self.model.batch():
+                for message in messages:
+                    if message["type"] == "event":
+                        summary["events"] += 1
+                        self.apply_event(message, summary)
+                    elif message["type"] == "disconnected":
+                        summary["disconnected"] = True
+                    elif message["type"] == "error":
+                        summary["errors"].append(message.get("message", ""))
+                if summary["structural"]:
+                    self.model.set_units(self.model.units, self.model.battalions)
+        finally:
+            self.applying = False
+        return summary
+    
+    def apply_event(self, event, summary):
+        kind = event["kind"]
+        payload = event["payload"]
+        own = event["origin"] == self.client.client_id
+        if event["conflict"]:
+            summary["conflicts"].append(event)
+        if kind in UNIT_KINDS:
+            unit_id = payload["id"]
+            if self.client.in_flight.get(event["key"]) or unit_id in self.pending_units:
+                if not own:
+                    summary["skipped"].append(event)
+                self.client.acknowledge(event)
+                return
+            if kind == "unit":
+                self.apply_unit(unit_id, payload, summary)
+            else:
+                self.apply_unit_deleted(unit_id, summary)
+        elif kind == "battle_created":
+            if self.model.create_battle(payload["battle"], payload.get("created")):
+                summary["battles_created"].append(payload["battle"])
+            self.battle_lengths.setdefault(payload["battle"], 0)
+        elif kind == "battle_entries":
+            self.apply_battle_entries(payload, summary)
+        elif kind == "battle_truncate":
+            self.apply_battle_truncate(payload["battle"], payload["length"], summary)
+        elif kind == "battle_replace":
+            self.apply_battle_entries(dict(payload, start=0), summary)
+            self.apply_battle_truncate(payload["battle"], len(payload["entries"]), summary)
+        self.client.acknowledge(event)
+    
+    def apply_unit(self, unit_id, payload, summary):
+        side_name, unit_data = self.model.find_unit(unit_id)
+        target_side = payload["side"]
+        base = payload["history_base"]
+        appended = payload["history_append"]
+        if unit_data is not None and side_name == target_side:
+            # Stan już zgodny (zwykle powrót własnej publikacji) - bez zdarzeń i odświeżania widoków
+            history = unit_data.get('historia_bitew', [])
+            if len(history) == base + len(appended) and history[base:] == appended and \
+                    {field: value for field, value in unit_data.items() if field != 'historia_bitew'} == payload["fields"]:
+                self.unit_history[unit_id] = len(history)
+                return
+        if unit_data is None:
+            unit_data = {"historia_bitew": []}
+            self.model.units[target_side][unit_id] = unit_data
+            summary["structural"] = True
+        elif side_name != target_side:
+            del self.model.units[side_name][unit_id]
+            self.model.units[target_side][unit_id] = unit_data
+            summary["structural"] = True
+        old_battalion = unit_data.get('batalion')
+        for field in [field for field in unit_data if field != 'historia_bitew' and field not in payload["fields"]]:
+            del unit_data[field]
+        unit_data.update(payload["fields"])
+        history = unit_data.setdefault('historia_bitew', [])
+        if base == len(history):
+            summary["unit_entries"].extend((unit_id, target_side, unit_data.get('batalion'), entry)
+                                           for entry in appended)
+        elif appended or base < len(history):
+            summary["reindex"] = True
+        del history[base:]
+        history.extend(appended)
+        self.unit_history[unit_id] = len(history)
+        summary["units"].add(unit_id)
+        summary["battalions"].update((old_battalion, unit_data.get('batalion')))
+        self.model.units_changed(unit_id)
+    
+    def apply_unit_deleted(self, unit_id, summary):
+        side_name, unit_data = self.model.find_unit(unit_id)
+        if unit_data is None:
+            return
+        del self.model.units[side_name][unit_id]
+        self.unit_history.pop(unit_id, None)
+        summary["units"].add(unit_id)
+        summary["battalions"].add(unit_data.get('batalion'))
+        summary["structural"] = True
+        summary["reindex"] = True
+    
+    def apply_battle_entries(self, payload, summary):
+        battle_name = payload["battle"]
+        start = payload["start"]
+        entries = payload["entries"]
+        if battle_name not in self.model.battles:
+            self.model.create_battle(battle_name, payload.get("created"))
+            summary["battles_created"].append(battle_name)
+        history = self.model.battles[battle_name]["history"]
+        if history[start:start + len(entries)] != entries:
+            summary["battles"].add(battle_name)
+            if start == len(history):
+                for entry in entries:
+                    number = self.model.append_battle_entry(battle_name, entry)
+                    summary["battle_entries"].append((battle_name, number, entry))
+            else:
+                self.model.replace_battle_entries(battle_name, start, entries)
+                summary["reindex"] = True
+        self.battle_lengths[battle_name] = max(self.battle_lengths.get(battle_name, 0), len(history))
+    
+    def apply_battle_truncate(self, battle_name, length, summary):
+        if battle_name not in self.model.battles:
+            return
+        history = self.model.battles[battle_name]["history"]
+        if len(history) > length:
+            self.model.truncate_battle(battle_name, length)
+            summary["battles"].add(battle_name)
+            summary["reindex"] = True
+        self.battle_lengths[battle_name] = len(history)
+
+
+def describe_conflict(event, name=None):
+    """Opis konfliktu do dziennika zdarzeń"""
+    subject = name or event["payload"].get("id") or event["key"]
+    action = "usunięcie" if event["kind"] == "unit_deleted" else "zmiana"
+    return (f"konflikt: {subject} - {action} od {event['origin']} bez uwzględnienia zmian "
+            f"{', '.join(event['concurrent'])} (obowiązuje późniejsza w dzienniku, #{event['offset']})")
+
+
+# --- Demonstracja na localhost ---
+
+def demo_roster():
+    """Mały, identyczny u wszystkich klientów wykaz jednostek"""
+    units = {"własne": {}, "wroga": {}}
+    for side_name, prefix in (("własne", "W"), ("wroga", "N")):
+        for number in range(1, 5):
+            unit_id = f"{prefix}{number}"
+            units[side_name][unit_id] = {
+                "id": unit_id, "numer": number, "typ": "piechota", "batalion": None, "liczba_ludzi": 150,
+                "doświadczenie": 0, "zapasy": 3, "liczba_zwycięstw": 0, "liczba_uzupełnień": 0,
+                "strona": side_name, "historia_bitew": []
+            }
+    model = CampaignModel()
+    model.set_units(units, {})
+    return model
+
+
+def pump(peers, hub, timeout=5.0):
+    """Przetwarza zdarzenia wszystkich klientów, aż hub zapisze wszystkie publikacje, a każdy klient je odbierze"""
+    deadline = time.monotonic() + timeout
+    summaries = {name: [] for name in peers}
+    while time.monotonic() < deadline:
+        for name, (_, sync) in peers.items():
+            summary = sync.process()
+            if summary["events"]:
+                summaries[name].append(summary)
+        published = sum(sync.client.published for _, sync in peers.values())
+        if len(hub.events) == published and all(
+                sync.client.offset == published and not sync.pending_units and sync.client.caught_up
+                for _, sync in peers.values()):
+            return summaries
+        time.sleep(0.01)
+    raise TimeoutError("klienci nie dogonili dziennika huba")
+
+
+def model_state(model):
+    return json.dumps({"units": model.units, "battles": {name: battle["history"]
+                                                          for name, battle in model.battles.items()},
+                       "names": sorted(model.battle_names)}, sort_keys=True, ensure_ascii=False)
+
+
+def run_demo(client_count=3):
+    """Kilku klientów na localhost: zmiany różnych jednostek, konflikt na jednej, bitwa, spóźniony klient"""
+    hub = SyncHub(DEFAULT_HOST, 0).start()
+    host, port = hub.address
+    print(f"hub: {host}:{port}")
+    peers = {}
+    
+    def join(name):
+        model = demo_roster()
+        client = SyncClient(name)
+        client.connect(host, port)
+        peers[name] = (model, ModelSync(model, client))
+        return model
+    
+    names = [f"MG{number}" for number in range(1, max(2, client_count) + 1)]
+    for name in names:
+        join(name)
+    pump(peers, hub)
+    
+    # 1. Równoczesne zmiany różnych jednostek - scalane bez konfliktu
+    for index, name in enumerate(names):
+        model, sync = peers[name]
+        unit_id = f"W{index % 4 + 1}" if index < 4 else f"N{index % 4 + 1}"
+        model.units[model.find_unit(unit_id)[0]][unit_id]["doświadczenie"] = index + 1
+        sync.units_touched(unit_id)
+        sync.flush()
+    results = pump(peers, hub)
+    merged_conflicts = sum(len(summary["conflicts"]) for summary in results[names[0]])
+    print(f"zmiany różnych jednostek: {len(names)}, konflikty: {merged_conflicts}")
+    
+    # 2. Równoczesna zmiana tej samej jednostki przez dwóch prowadzących - konflikt
+    for name, people in ((names[0], 120), (names[1], 90)):
+        model, sync = peers[name]
+        model.units["wroga"]["N4"]["liczba_ludzi"] = people
+        sync.units_touched("N4")
+        sync.flush()
+    results = pump(peers, hub)
+    conflicts = [event for summary in results[names[-1]] for event in summary["conflicts"]]
+    for event in conflicts:
+        print(describe_conflict(event))
+    
+    # 3. Bitwa tworzona przez jednego, rzuty dopisywane równolegle przez dwóch
+    model, sync = peers[names[-1]]
+    model.create_battle("Most")
+    pump(peers, hub)
+    for name in names[:2]:
+        model, sync = peers[name]
+        for roll in range(3):
+            entry = {"dice1": roll + 1, "dice2": 4 - roll, "autor": name}
+            with model.batch():
+                model.append_battle_entry("Most", entry)
+                model.append_unit_battle("W1" if name == names[0] else "N1", {"bitwa": "Most", "rzut": roll})
+            sync.flush()
+    pump(peers, hub)
+    
+    # 4. Spóźniony klient dogania od przesunięcia 0 zamiast pobierać pliki
+    late = join("spóźniony")
+    pump(peers, hub)
+    print(f"dziennik huba: {len(hub.events)} zdarzeń, konflikty: {hub.conflicts}, "
+          f"wpisy bitwy Most: {len(late.battles['Most']['history'])}")
+    
+    states = {name: model_state(model) for name, (model, _) in peers.items()}
+    converged = len(set(states.values())) == 1
+    print(f"zbieżność {len(peers)} klientów: {'OK' if converged else 'BRAK'}")
+    for _, sync in peers.values():
+        sync.client.close()
+    hub.stop()
+    return 0 if converged and hub.conflicts == 1 else 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Synchronizacja sesji wielu prowadzących")
+    commands = parser.add_subparsers(dest="command", required=True)
+    hub_parser = commands.add_parser("hub", help="uruchamia koncentrator zdarzeń")
+    hub_parser.add_argument("--host", default=DEFAULT_HOST)
+    hub_parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    hub_parser.add_argument("--log", help="plik JSONL dziennika (wznawiany przy starcie)")
+    demo_parser = commands.add_parser("demo", help="kilku klientów na localhost i sprawdzenie zbieżności")
+    demo_parser.add_argument("--clients", type=int, default=3)
+    args = parser.parse_args(argv)
+    
+    if args.command == "demo":
+        return run_demo(args.clients)
+    hub = SyncHub(args.host, args.port, args.log)
+    print(f"hub: {hub.address[0]}:{hub.address[1]}, zdarzeń w dzienniku: {len(hub.events)}")
+    try:
+        hub.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        hub.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+"""
+Wykaz jednostek w pamięci współdzielonej: kolumny liczbowe, siatka modyfikatorów i tablica wyników dla procesów roboczych
+Zero-copy shared-memory roster for multiprocess sweeps; workers read columns in place and write into a shared result array
+"""
+
+import multiprocessing
+import random
+import time
+from array import array
+from multiprocessing import shared_memory
+
+from combat_engine import resolve_round, side_inputs
+
+
+UNIT_SIDES = ('własne', 'wroga')
+# Kolumny liczbowe wykazu (int32, każda kolumna w ciągłym obszarze); "strona" to indeks w UNIT_SIDES
+ROSTER_COLUMNS = ("liczba_ludzi", "doświadczenie", "zapasy", "liczba_zwycięstw", "liczba_uzupełnień", "numer", "strona")
+# Pola wiersza siatki: ustawienia jednostki z wykazu (liczebność, doświadczenie i zapasy bierze z kolumn) i przeciwnika
+OWN_FIELDS = ("modifier", "range_modifier", "fortifications", "surrounded", "defense_buildings",
+              "attacking", "defending", "in_motion")
+ENEMY_FIELDS = tuple(side_inputs())
+GRID_FIELDS = tuple(f"own_{field}" for field in OWN_FIELDS) + tuple(f"enemy_{field}" for field in ENEMY_FIELDS)
+# Wyniki na (wiersz siatki, jednostka): odsetek wygranych rzutów, średnie straty własne i przeciwnika
+RESULT_FIELDS = ("win_rate", "mean_losses", "mean_enemy_losses")
+DEFAULT_CHUNK = 64  # Jednostek w jednym zadaniu
+
+_worker_roster = None  # SharedRoster dołączony w procesie roboczym (initializer puli)
+
+
+def modifier_grid(modifiers=range(-2, 3), fortifications=range(0, 4), enemy=None):
+    """Siatka scenariuszy: modyfikator x fortyfikacje jednostki przeciw stałemu przeciwnikowi; lista krotek GRID_FIELDS"""
+    enemy = enemy or side_inputs(people=150, defending=True)
+    rows = []
+    for modifier in modifiers:
+        for fortification in fortifications:
+            own = side_inputs(modifier=modifier, fortifications=fortification, attacking=True)
+            rows.append(tuple(int(own[field]) for field in OWN_FIELDS) + tuple(int(enemy[field]) for field in ENEMY_FIELDS))
+    return rows
+
+
+def roster_rows(units):
+    """(ID jednostek, wiersze kolumn ROSTER_COLUMNS) w kolejności stron i wykazu"""
+    unit_ids = []
+    rows = []
+    for side_index, side_name in enumerate(UNIT_SIDES):
+        for unit_id, unit_data in units.get(side_name, {}).items():
+            unit_ids.append(unit_id)
+            rows.append(tuple(int(unit_data.get(column) or 0) for column in ROSTER_COLUMNS[:-1]) + (side_index,))
+    return unit_ids, rows
+
+
+def attach_block(name):
+    """Dołącza istniejący blok bez rejestracji w resource_tracker (Python 3.13+), aby proces roboczy go nie usuwał"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+
+class SharedRoster:
+    """Trzy bloki pamięci współdzielonej: kolumny wykazu (int32), siatka (int32) i wyniki (float64)
+
+    Proces główny tworzy bloki raz (create) i przekazuje procesom roboczym tylko spec - nazwy bloków i wymiary.
+    Proces roboczy dołącza je (attach) i czyta kolumny przez memoryview bez kopiowania; każde zadanie
+    zapisuje wyniki we własnym zakresie tablicy, więc zapis nie wymaga blokad.
+    """
+    
+    def __init__(self, spec, blocks, owner):
+        self.spec = spec
+        self.unit_count = spec["units"]
+        self.row_count = spec["rows"]
+        self.blocks = blocks
+        self.owner = owner
+        self.roster = blocks[0].buf[:4 * self.unit_count * len(ROSTER_COLUMNS)].cast('i')
+        self.grid = blocks[1].buf[:4 * self.row_count * len(GRID_FIELDS)].cast('i')
+        self.results = blocks[2].buf[:8 * self.row_count * self.unit_count * len(RESULT_FIELDS)].cast('d')
+        self.unit_ids = None  # Tylko w procesie głównym
+    
+    @classmethod
+    def create(cls, units, grid):
+        """Publikuje wykaz i siatkę (jedyna kopia danych); wyniki są zerowane"""
+        unit_ids, rows = roster_rows(units)
+        unit_count = len(rows)
+        columns = array('i', (row[column] for column in range(len(ROSTER_COLUMNS)) for row in rows))
+        cells = array('i', (value for row in grid for value in row))
+        sizes = (columns.itemsize * len(columns), cells.itemsize * len(cells),
+                 8 * len(grid) * unit_count * len(RESULT_FIELDS))
+        blocks = []
+        try:
+            for size in sizes:
+                blocks.append(shared_memory.SharedMemory(create=True, size=max(1, size)))
+            blocks[0].buf[:sizes[0]] = columns.tobytes()
+            blocks[1].buf[:sizes[1]] = cells.tobytes()
+            blocks[2].buf[:sizes[2]] = bytes(sizes[2])
+        except BaseException:
+            # Bloki utworzone przed błędem nie mogą zostać w systemie (np. brak miejsca w /dev/shm)
+            for block in blocks:
+                block.close()
+                block.unlink()
+            raise
+        spec = {"blocks": [block.name for block in blocks], "units": unit_count, "rows": len(grid)}
+        roster = cls(spec, blocks, owner=True)
+        roster.unit_ids = unit_ids
+        return roster
+    
+    @classmethod
+    def attach(cls, spec):
+        """Dołącza bloki opublikowane przez proces główny"""
+        return cls(spec, [attach_block(name) for name in spec["blocks"]], owner=False)
+    
+    def column(self, name):
+        """Widok kolumny (bez kopiowania)"""
+        start = ROSTER_COLUMNS.index(name) * self.unit_count
+        return self.roster[start:start + self.unit_count]
+    
+    def grid_row(self, index):
+        """Wiersz siatki jako (ustawienia jednostki bez liczebności, ustawienia przeciwnika)"""
+        width = len(GRID_FIELDS)
+        values = self.grid[index * width:(index + 1) * width]
+        own = dict(zip(OWN_FIELDS, values[:len(OWN_FIELDS)]))
+        enemy = side_inputs(**dict(zip(ENEMY_FIELDS, values[len(OWN_FIELDS):])))
+        return own, enemy
+    
+    def write_result(self, row, unit_index, values):
+        offset = (row * self.unit_count + unit_index) * len(RESULT_FIELDS)
+        self.results[offset:offset + len(RESULT_FIELDS)] = array('d', values)
+    
+    def read_results(self):
+        """{(ID jednostki, wiersz siatki): (odsetek wygranych, średnie straty, średnie straty przeciwnika)}"""
+        width = len(RESULT_FIELDS)
+        values = self.results.tolist()
+        return {
+            (unit_id, row): tuple(values[(row * self.unit_count + index) * width:
+                                         (row * self.unit_count + index + 1) * width])
+            for row in range(self.row_count) for index, unit_id in enumerate(self.unit_ids)
+        }
+    
+    def close(self):
+        """Zwalnia widoki i bloki; właściciel usuwa je z systemu"""
+        for view in (self.roster, self.grid, self.results):
+            view.release()
+        for block in self.blocks:
+            block.close()
+            if self.owner:
+                block.unlink()
+        self.blocks = []
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def simulate_unit(people, experience, supplies, own, enemy, rounds, rng):
+    """Monte Carlo jednej rundy: jednostka z ustawieniami own przeciw enemy; zwraca RESULT_FIELDS"""
+    side = side_inputs(people=people, experience=experience, no_supply=supplies <= 0, **own)
+    wins = 0
+    losses = 0
+    enemy_losses = 0
+    for _ in range(rounds):
+        result = resolve_round(side, enemy, rng)
+        wins += result["dice1_final"] > result["dice2_final"]
+        losses += result["losses1"]
+        enemy_losses += result["losses2"]
+    if not rounds:
+        return 0.0, 0.0, 0.0
+    return wins / rounds, losses / rounds, enemy_losses / rounds
+
+
+def build_tasks(unit_count, row_count, rounds, seed, chunk=DEFAULT_CHUNK):
+    """Zadania (wiersz siatki, pierwsza jednostka, koniec zakresu, liczba rund, ziarno)"""
+    return [(row, start, min(start + chunk, unit_count), rounds, seed + row * 1000003 + start)
+            for row in range(row_count) for start in range(0, unit_count, chunk)]
+
+
+def init_shared_worker(spec):
+    """Initializer puli: dołącza bloki raz na proces"""
+    global _worker_roster
+    _worker_roster = SharedRoster.attach(spec)
+
+
+def run_shared_task(task):
+    """Zadanie w trybie współdzielonym: odczyt kolumn w miejscu, wyniki do wspólnej tablicy; zwraca czas obliczeń"""
+    started = time.perf_counter()
+    row, start, stop, rounds, seed = task
+    roster = _worker_roster
+    people = roster.column("liczba_ludzi")
+    experience = roster.column("doświadczenie")
+    supplies = roster.column("zapasy")
+    own, enemy = roster.grid_row(row)
+    rng = random.Random(seed)
+    for index in range(start, stop):
+        roster.write_result(row, index, simulate_unit(people[index], experience[index], supplies[index],
+                                                      own, enemy, rounds, rng))
+    return time.perf_counter() - started
+
+
+def run_pickled_task(payload):
+    """Zadanie w trybie z serializacją: wykaz i siatka przychodzą w argumentach, wyniki wracają jako lista"""
+    started = time.perf_counter()
+    units, grid, (row, start, stop, rounds, seed) = payload
+    _, rows = roster_rows(units)
+    values = grid[row]
+    own = dict(zip(OWN_FIELDS, values[:len(OWN_FIELDS)]))
+    enemy = side_inputs(**dict(zip(ENEMY_FIELDS, values[len(OWN_FIELDS):])))
+    rng = random.Random(seed)
+    results = [simulate_unit(rows[index][0], rows[index][1], rows[index][2], own, enemy, rounds, rng)
+               for index in range(start, stop)]
+    return results, time.perf_counter() - started
+
+
+def run_sweep(units, grid, rounds, jobs=None, seed=1, chunk=DEFAULT_CHUNK, shared=True):
+    """Przegląd siatki dla wszystkich jednostek w puli procesów
+
+    Zwraca (wyniki {(ID, wiersz): RESULT_FIELDS}, statystyki): liczba zadań, czas publikacji bloków,
+    czas rozdziału zadań (pool.map, bez uruchamiania puli) i suma czasu obliczeń w procesach roboczych.
+    """
+    unit_ids, rows = roster_rows(units)
+    tasks = build_tasks(len(rows), len(grid), rounds, seed, chunk)
+    stats = {"tasks": len(tasks), "publish_seconds": 0.0}
+    if shared:
+        started = time.perf_counter()
+        with SharedRoster.create(units, grid) as roster:
+            stats["publish_seconds"] = time.perf_counter() - started
+            with multiprocessing.Pool(jobs, initializer=init_shared_worker, initargs=(roster.spec,)) as pool:
+                started = time.perf_counter()
+                compute = pool.map(run_shared_task, tasks, chunksize=1)
+                stats["map_seconds"] = time.perf_counter() - started
+            results = roster.read_results()
+    else:
+        with multiprocessing.Pool(jobs) as pool:
+            started = time.perf_counter()
+            outcomes = pool.map(run_pickled_task, [(units, grid, task) for task in tasks], chunksize=1)
+            stats["map_seconds"] = time.perf_counter() - started
+        results = {}
+        compute = []
+        for (row, start, _, _, _), (values, seconds) in zip(tasks, outcomes):
+            compute.append(seconds)
+            for offset, value in enumerate(values):
+                results[(unit_ids[start + offset], row)] = value
+    stats["compute_seconds"] = sum(compute)
+    return results, stats
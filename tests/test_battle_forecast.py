@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+Testy prognozy starcia: prognoza dokładna a prognoza na przedziałach liczebności
+Tests for BattleForecaster exact and coarsened forecasts
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from battle_forecast import BattleForecaster, forecast_task  # noqa: E402
+from combat_engine import side_inputs  # noqa: E402
+
+
+class BattleForecastTest(unittest.TestCase):
+
+    def setUp(self):
+        self.side1 = side_inputs(people=60, attacking=True)
+        self.side2 = side_inputs(people=50, defending=True, fortifications=1)
+    
+    def test_small_engagement_is_exact_and_resolved(self):
+        forecast = BattleForecaster(self.side1, self.side2).forecast(60, 50)
+        self.assertEqual(forecast["step"], 1)
+        self.assertFalse(forecast["truncated"])
+        self.assertAlmostEqual(sum(forecast["final"].values()) + forecast["pruned"], 1.0, places=9)
+    
+    def test_coarsened_forecast_stays_close_to_exact(self):
+        forecaster = BattleForecaster(self.side1, self.side2)
+        exact = forecaster.forecast(60, 50)
+        coarse = forecaster.forecast(60, 50, max_states=400, exact_work=0)
+        self.assertGreater(coarse["step"], 1)
+        self.assertFalse(coarse["truncated"])
+        self.assertAlmostEqual(sum(coarse["final"].values()) + coarse["pruned"], 1.0, places=9)
+        for field in ("side1_wins", "side2_wins", "mutual"):
+            self.assertAlmostEqual(coarse[field], exact[field], delta=0.01, msg=field)
+        self.assertAlmostEqual(coarse["expected_rounds"], exact["expected_rounds"], delta=0.2)
+    
+    def test_exact_chain_matches_bucketed_chain_with_unit_step(self):
+        forecaster = BattleForecaster(self.side1, self.side2)
+        exact = forecaster.forecast(60, 50)
+        reference = forecaster._bucketed_chain(60, 50, 0, 200, 1e-12, 10 ** 9, 1)
+        for field in ("side1_wins", "side2_wins", "mutual", "expected_rounds", "expected_people1", "expected_people2"):
+            self.assertAlmostEqual(exact[field], reference[field], delta=1e-8, msg=field)
+    
+    def test_few_hundred_per_side_stays_exact(self):
+        forecast = forecast_task(side_inputs(people=250, attacking=True), side_inputs(people=200, defending=True))
+        self.assertEqual(forecast["step"], 1)
+        self.assertFalse(forecast["truncated"])
+        self.assertAlmostEqual(sum(forecast["final"].values()) + forecast["pruned"], 1.0, places=9)
+    
+    def test_large_engagement_falls_back_to_buckets_past_the_work_budget(self):
+        forecast = forecast_task(side_inputs(people=1000, attacking=True), side_inputs(people=900, defending=True))
+        self.assertGreater(forecast["step"], 1)
+        self.assertFalse(forecast["truncated"])
+        self.assertLess(forecast["unresolved"], 1e-9)
+        
+        # Szacunek pracy z łańcucha na przedziałach (praca * step²) rozstrzyga o liczeniu dokładnym
+        forecaster = BattleForecaster(self.side1, self.side2)
+        coarse = forecaster.forecast(60, 50, max_states=800, exact_work=0)
+        estimate = coarse["work"] * coarse["step"] ** 2
+        self.assertEqual(forecaster.forecast(60, 50, max_states=800, exact_work=estimate)["step"], 1)
+        self.assertEqual(forecaster.forecast(60, 50, max_states=800, exact_work=estimate - 1)["step"], coarse["step"])
+    
+    def test_spread_keeps_mean_and_never_breaks_a_side(self):
+        for people in range(1, 40):
+            nodes = BattleForecaster._spread(people, 7, 0)
+            self.assertAlmostEqual(sum(weight for _, weight in nodes), 1.0)
+            self.assertAlmostEqual(sum(node * weight for node, weight in nodes), people)
+            self.assertTrue(all(node > 0 for node, _ in nodes))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+Testy indeksu starć: aktualizacja po zmianie strony i batalionu, usunięciu jednostki i cofnięciu wpisów
+Tests for incremental BattleIndex updates
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from battle_index import BattleIndex  # noqa: E402
+
+
+def unit_entry(battle, date, losses, own_dice, enemy_dice):
+    """Wpis historia_bitew jak w main.py: wynik z kości obu stron (remis przy równych wynikach)"""
+    return {"bitwa": battle, "data": date, "ludzie_przed": 100, "straty": losses, "wynik_kostki": own_dice,
+            "przeciwnik_kostka": enemy_dice, "zwyciestwo": own_dice > enemy_dice and own_dice > 1}
+
+
+def battle_entry(date, side1, side2):
+    return {"data": date, "side1_unit_ids": side1, "side2_unit_ids": side2, "people1_before": 100,
+            "people1_after": 90, "people2_before": 100, "people2_after": 95, "dice1_final": 5, "dice2_final": 3}
+
+
+class BattleIndexUpdateTest(unittest.TestCase):
+
+    def setUp(self):
+        self.units = {
+            "własne": {
+                "u1": {"batalion": "b1", "historia_bitew": [unit_entry("Pole", "2024-01-01 10:00", 10, 5, 3)]},
+                "u2": {"batalion": "b1", "historia_bitew": [unit_entry("Pole", "2024-01-02 10:00", 4, 4, 4)]}
+            },
+            "wroga": {
+                "e1": {"batalion": "b9", "historia_bitew": [unit_entry("Pole", "2024-01-01 10:00", 5, 3, 5)]}
+            }
+        }
+        self.battles = {"Pole": {"history": [battle_entry("2024-01-01 10:00", ["u1"], ["e1"])]}}
+        self.index = BattleIndex()
+        self.index.rebuild(self.units, self.battles, {})
+    
+    def unit_ids(self, **filters):
+        return sorted(record["jednostka"] for record in self.index.query(rodzaj="jednostka", **filters))
+    
+    def test_outcome_postings(self):
+        self.assertEqual(self.unit_ids(wyniki=["zwycięstwo"]), ["u1"])
+        self.assertEqual(self.unit_ids(wyniki=["remis"]), ["u2"])
+        self.assertEqual(self.unit_ids(wyniki=["porażka"]), ["e1"])
+        self.assertEqual(self.unit_ids(wyniki=["zwycięstwo", "remis"]), ["u1", "u2"])
+        self.assertEqual(self.unit_ids(wyniki=["remis"], bataliony=["b1"]), ["u2"])
+    
+    def test_battalion_change_rekeys_unit_and_battle_records(self):
+        self.units["własne"]["u1"]["batalion"] = "b2"
+        self.index.refresh_unit("u1", self.units)
+        
+        self.assertEqual(self.unit_ids(bataliony=["b1"]), ["u2"])
+        self.assertEqual(self.unit_ids(bataliony=["b2"]), ["u1"])
+        self.assertEqual(self.unit_ids(wyniki=["zwycięstwo"], bataliony=["b2"]), ["u1"])
+        self.assertEqual(self.unit_ids(wyniki=["zwycięstwo"], bataliony=["b1"]), [])
+        battle_records = self.index.query(rodzaj="bitwa", bataliony=["b2"])
+        self.assertEqual(len(battle_records), 1)
+        self.assertEqual(self.index.query(rodzaj="bitwa", bataliony=["b1"]), [])
+    
+    def test_side_change_rekeys_records(self):
+        self.units["wroga"]["u2"] = self.units["własne"].pop("u2")
+        self.index.refresh_unit("u2", self.units)
+        
+        self.assertEqual(self.unit_ids(strony=["wroga"]), ["e1", "u2"])
+        self.assertEqual(self.unit_ids(strony=["własne"]), ["u1"])
+        self.assertEqual(self.unit_ids(wyniki=["remis"], strony=["wroga"]), ["u2"])
+    
+    def test_deleted_unit_disappears_from_all_columns(self):
+        del self.units["własne"]["u1"]
+        self.index.refresh_unit("u1", self.units)
+        
+        self.assertEqual(self.unit_ids(), ["e1", "u2"])
+        self.assertEqual(self.unit_ids(data_od="2024-01-01", data_do="2024-01-01"), ["e1"])
+        self.assertEqual(self.unit_ids(straty_min=10), [])
+        self.assertEqual(self.unit_ids(wyniki=["zwycięstwo"]), [])
+        self.assertEqual(self.unit_ids(wyniki=["porażka", "remis"]), ["e1", "u2"])
+        self.assertEqual(len(self.index), 3)
+        # Wpis rejestru bitew zostaje, ale jego strony liczone są tylko z obecnych jednostek
+        self.assertEqual(self.index.query(rodzaj="bitwa", strony=["własne"]), [])
+    
+    def test_refreshed_index_matches_rebuild(self):
+        self.units["własne"]["u1"]["batalion"] = "b3"
+        self.units["wroga"]["u2"] = self.units["własne"].pop("u2")
+        del self.units["wroga"]["e1"]
+        for unit_id in ("u1", "u2", "e1"):
+            self.index.refresh_unit(unit_id, self.units)
+        
+        rebuilt = BattleIndex()
+        rebuilt.rebuild(self.units, self.battles, {})
+        for filters in ({}, {"bataliony": ["b3"]}, {"strony": ["wroga"]}, {"strony": ["własne"]},
+                        {"straty_min": 1, "straty_max": 20}, {"wyniki": ["remis"]},
+                        {"wyniki": ["porażka"], "strony": ["wroga"]}, {"rodzaj": "bitwa", "wyniki": ["remis"]}):
+            self.assertEqual([record["wpis"] for record in self.index.query(**filters)],
+                             [record["wpis"] for record in rebuilt.query(**filters)], filters)
+    
+    def test_remove_entries_drops_only_given_entries(self):
+        entry = unit_entry("Las", "2024-02-01 10:00", 7, 2, 6)
+        self.units["własne"]["u1"]["historia_bitew"].append(entry)
+        self.index.add_unit_entry("u1", "własne", "b1", entry)
+        self.assertEqual(len(self.index.query(bitwy=["Las"])), 1)
+        self.assertEqual(self.unit_ids(wyniki=["porażka"]), ["e1", "u1"])
+        
+        self.assertEqual(self.index.remove_entries([entry]), 1)
+        self.assertEqual(self.index.query(bitwy=["Las"]), [])
+        self.assertEqual(self.index.query(data_od="2024-02-01"), [])
+        self.assertEqual(self.unit_ids(wyniki=["porażka"]), ["e1"])
+        self.assertEqual(self.unit_ids(wyniki=["zwycięstwo"]), ["u1"])
+        self.assertEqual(self.unit_ids(jednostki=["u1"]), ["u1"])
+        self.assertEqual(self.index.remove_entries([entry]), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+Testy modelu kampanii: kolejność i łączenie zdarzeń dostarczanych po batch()
+Tests for CampaignModel event batching and delivery order
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from campaign_model import CampaignModel  # noqa: E402
+
+
+class CampaignModelBatchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.model = CampaignModel(history_limit=2)
+        self.model.units["własne"]["u1"] = {"liczba_ludzi": 100}
+        self.model.units["wroga"]["e1"] = {"liczba_ludzi": 100}
+        self.received = []
+        for event in CampaignModel.EVENTS:
+            self.model.subscribe(event, lambda event, payload: self.received.append((event, payload)))
+    
+    def test_events_outside_batch_are_delivered_immediately(self):
+        self.model.units_changed("u1")
+        self.assertEqual(self.received, [("unit_changed", ["u1"])])
+        self.model.append_battle_entry("Pole", {"data": "2024-01-01"})
+        self.assertEqual(self.received[-1], ("battle_appended", ["Pole"]))
+    
+    def test_batch_merges_payloads_and_delivers_each_event_once(self):
+        with self.model.batch():
+            self.model.units_changed("u1")
+            self.model.append_unit_battle("e1", {"straty": 3})
+            self.model.units_changed("u1")
+            self.assertEqual(self.received, [])
+        self.assertEqual(self.received, [("unit_changed", ["u1", "e1", "u1"])])
+    
+    def test_batch_delivers_in_events_order_with_resets_first(self):
+        with self.model.batch():
+            self.model.append_history({"dice1": 1})
+            self.model.units_changed("u1")
+            self.model.participation_changed("strona2")
+            self.model.create_battle("Las", created="2024-01-01T00:00:00")
+            self.model.append_battle_entry("Las", {"data": "2024-01-01"})
+            self.model.truncate_battle("Las", 0)
+            self.model.set_units(self.model.units, self.model.battalions)
+        self.assertEqual([event for event, _ in self.received],
+                         ['units_reset', 'battles_reset', 'unit_changed', 'participation_changed',
+                          'battle_created', 'battle_appended', 'history_appended'])
+        self.assertEqual(dict(self.received)["participation_changed"], ["strona2"])
+    
+    def test_nested_batches_deliver_after_outermost_block(self):
+        with self.model.batch():
+            with self.model.batch():
+                self.model.units_changed("u1")
+            self.assertEqual(self.received, [])
+            self.model.units_changed("e1")
+        self.assertEqual(self.received, [("unit_changed", ["u1", "e1"])])
+    
+    def test_events_raised_by_subscribers_after_batch_are_not_lost(self):
+        def on_reset(event, payload):
+            self.model.units_changed("u1")
+        self.model.subscribe('battles_reset', on_reset)
+        with self.model.batch():
+            self.model.set_battles({}, ["Niezapisana"])
+        self.assertIn(("unit_changed", ["u1"]), self.received)
+    
+    def test_history_append_reports_evicted_entries(self):
+        entries = [{"dice1": number} for number in range(3)]
+        with self.model.batch():
+            for entry in entries:
+                self.model.append_history(entry)
+        self.assertEqual(self.received, [("history_appended", [(entries[0], []), (entries[1], []),
+                                                               (entries[2], [entries[0]])])])
+        self.assertEqual(self.model.history, entries[1:])
+
+
+if __name__ == "__main__":
+    unittest.main()
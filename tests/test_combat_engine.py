@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+Testy reguł walki: rozdział strat między jednostki i przewaga liczebna
+Tests for loss allocation and numerical advantage in combat_engine
+"""
+
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from combat_engine import allocate_losses, loss_weight, numerical_advantage  # noqa: E402
+
+
+class AllocateLossesTest(unittest.TestCase):
+
+    def test_shares_sum_exactly_to_total(self):
+        rng = random.Random(7)
+        for _ in range(500):
+            count = rng.randint(1, 12)
+            weights = [loss_weight(rng.randint(-2, 2), rng.randint(1, 150)) for _ in range(count)]
+            total = rng.randint(0, 400)
+            shares = allocate_losses(total, weights)
+            self.assertEqual(sum(shares), total)
+            self.assertEqual(len(shares), count)
+            self.assertTrue(all(share >= 0 for share in shares))
+    
+    def test_largest_remainder_with_ties_to_earlier_units(self):
+        self.assertEqual(allocate_losses(10, [1.0, 1.0, 1.0]), [4, 3, 3])
+        self.assertEqual(allocate_losses(7, [3.0, 1.0]), [5, 2])
+        self.assertEqual(allocate_losses(1, [1.0, 1.0]), [1, 0])
+    
+    def test_shares_stay_within_one_of_the_exact_quota(self):
+        weights = [0.6, 1.0, 1.4, 1.05]
+        total = 97
+        for share, weight in zip(allocate_losses(total, weights), weights):
+            self.assertLess(abs(share - total * weight / sum(weights)), 1)
+    
+    def test_degenerate_inputs(self):
+        self.assertEqual(allocate_losses(5, []), [])
+        self.assertEqual(allocate_losses(0, [1.0, 2.0]), [0, 0])
+        self.assertEqual(allocate_losses(-3, [1.0]), [0])
+        self.assertEqual(allocate_losses(5, [0.0, 0.0]), [3, 2])
+
+
+class NumericalAdvantageTest(unittest.TestCase):
+
+    def test_steps_of_two_point_one(self):
+        self.assertEqual(numerical_advantage(100, 100), (0, 0))
+        self.assertEqual(numerical_advantage(209, 100), (0, 0))
+        self.assertEqual(numerical_advantage(210, 100), (1, 0))
+        self.assertEqual(numerical_advantage(420, 100), (2, 0))
+        self.assertEqual(numerical_advantage(100, 420), (0, 2))
+    
+    def test_exact_multiples_are_not_lost_to_rounding(self):
+        # 147 / 5 = 29.4 = 14 * 2.1 - dzielenie zmiennoprzecinkowe dawało 13
+        self.assertEqual(numerical_advantage(147, 5), (14, 0))
+        self.assertEqual(numerical_advantage(21, 10), (1, 0))
+        self.assertEqual(numerical_advantage(10, 63), (0, 3))
+    
+    def test_empty_side_has_no_advantage(self):
+        self.assertEqual(numerical_advantage(0, 50), (0, 0))
+        self.assertEqual(numerical_advantage(50, 0), (0, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
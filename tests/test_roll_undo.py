@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+Testy cofania rzutu: migawka obejmuje dodanych uczestników i jednostkę wybraną w comboboxie strony
+Tests for roll snapshots and undo covering both added participants and the combobox-selected unit
+"""
+
+import os
+import sys
+import unittest
+from collections import deque
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from battle_index import BattleIndex  # noqa: E402
+from campaign_analytics import CampaignAnalytics  # noqa: E402
+from campaign_model import CampaignModel  # noqa: E402
+from main import DiceRollerApp  # noqa: E402
+
+
+class Value:
+    """Zastępuje zmienną tkinter (get/set) - test działa bez ekranu"""
+    
+    def __init__(self, value=""):
+        self.value = value
+    
+    def get(self):
+        return self.value
+    
+    def set(self, value):
+        self.value = value
+
+
+def roster_unit(unit_id, side_name, people):
+    return {"id": unit_id, "numer": 1, "batalion": None, "liczba_ludzi": people, "liczba_zwycięstw": 0,
+            "strona": side_name, "historia_bitew": []}
+
+
+class RollUndoTest(unittest.TestCase):
+
+    def setUp(self):
+        # Aplikacja bez okien: tylko stan, z którego korzystają migawka i cofnięcie rzutu
+        app = self.app = DiceRollerApp.__new__(DiceRollerApp)
+        app.model = CampaignModel()
+        app.model.set_units({"własne": {"W1": roster_unit("W1", "własne", 100),
+                                        "W2": roster_unit("W2", "własne", 80)},
+                             "wroga": {"N1": roster_unit("N1", "wroga", 120)}}, {})
+        app.model.participating_units["strona1"].append({"id": "W1", "name": "W1", "people": 100, "side": "własne"})
+        app.participant_id_sets = {"strona1": {"W1"}, "strona2": set()}
+        app.selected_unit_side1, app.unit_side1_type = "W2", "własne"
+        app.selected_unit_side2, app.unit_side2_type = "N1", "wroga"
+        app.get_unit_display_name = lambda unit_id, side_name: unit_id
+        app.current_battle = "Most"
+        app.model.create_battle("Most")
+        app.dice1_people_var, app.dice2_people_var = Value("180"), Value("120")
+        app.undo_stack = deque()
+        app.unit_history_line_cache = {}
+        app.battle_index = BattleIndex()
+        app.analytics = CampaignAnalytics()
+        app.notify = lambda title, message: None
+    
+    def roll(self):
+        """Zmiany rzutu na wszystkich jednostkach stron (jak distribute_losses_for_side i statystyki po bitwie)"""
+        app = self.app
+        app.undo_stack.append(app.capture_roll_snapshot())
+        for _, unit_id, side_name, unit_data, _ in app.get_side_participants(1) + app.get_side_participants(2):
+            unit_data["liczba_ludzi"] -= 10
+            unit_data["liczba_zwycięstw"] += side_name == "własne"
+            entry = {"bitwa": "Most", "data": "2024-01-01 12:00", "ludzie_przed": unit_data["liczba_ludzi"] + 10,
+                     "straty": 10, "zwyciestwo": side_name == "własne"}
+            app.model.append_unit_battle(unit_id, entry)
+            app.battle_index.add_unit_entry(unit_id, side_name, None, entry)
+        app.model.append_battle_entry("Most", {"data": "2024-01-01 12:00", "side1_unit_ids": ["W1", "W2"],
+                                               "side2_unit_ids": ["N1"]})
+    
+    def test_snapshot_covers_selected_units(self):
+        self.assertEqual(sorted(self.app.capture_roll_snapshot()["units"]), ["N1", "W1", "W2"])
+    
+    def test_undo_restores_combobox_selected_unit(self):
+        self.roll()
+        self.app.undo_last_roll()
+        
+        units = self.app.model.units
+        for side_name, unit_id, people in (("własne", "W1", 100), ("własne", "W2", 80), ("wroga", "N1", 120)):
+            unit_data = units[side_name][unit_id]
+            self.assertEqual(unit_data["liczba_ludzi"], people, unit_id)
+            self.assertEqual(unit_data["liczba_zwycięstw"], 0, unit_id)
+            self.assertEqual(unit_data["historia_bitew"], [], unit_id)
+        self.assertEqual(self.app.model.battles["Most"]["history"], [])
+        self.assertEqual(self.app.battle_index.query(rodzaj="jednostka"), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
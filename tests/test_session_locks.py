@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+Testy blokad jednostek między sesjami: konflikty usuwają jednostkę z bitwy i wstrzymują rzut
+Tests for cross-session unit locks: conflicts drop the unit from the battle and block the roll
+"""
+
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+from battle_sessions import SessionRegistry  # noqa: E402
+from campaign_model import CampaignModel  # noqa: E402
+from main import DiceRollerApp  # noqa: E402
+
+
+class Value:
+    """Zastępuje zmienną tkinter (get/set) - test działa bez ekranu"""
+    
+    def __init__(self, value=""):
+        self.value = value
+    
+    def get(self):
+        return self.value
+    
+    def set(self, value):
+        self.value = value
+
+
+def roster_unit(unit_id, side_name, people):
+    return {"id": unit_id, "numer": 1, "batalion": None, "liczba_ludzi": people, "liczba_zwycięstw": 0,
+            "strona": side_name, "historia_bitew": []}
+
+
+class SessionLocksTest(unittest.TestCase):
+
+    def setUp(self):
+        # Aplikacja bez okien: W1 i W2 po stronie 1 aktywnej sesji, W2 zajęta przez drugą sesję
+        app = self.app = DiceRollerApp.__new__(DiceRollerApp)
+        app.model = CampaignModel()
+        app.model.set_units({"własne": {"W1": roster_unit("W1", "własne", 100),
+                                        "W2": roster_unit("W2", "własne", 80)},
+                             "wroga": {"N1": roster_unit("N1", "wroga", 120)}}, {})
+        app.sessions = SessionRegistry()
+        self.active = app.sessions.create()
+        self.other = app.sessions.create()
+        app.sessions.sync_locks(self.other.session_id, {"W2"})
+        
+        app.participant_id_sets = {"strona1": set(), "strona2": set()}
+        app.selected_unit_side1, app.unit_side1_type = None, "własne"
+        app.selected_unit_side2, app.unit_side2_type = "N1", "wroga"
+        app.unit_side1_var, app.unit_side2_var = Value(), Value("N1")
+        app.side1_locked, app.side2_locked = True, False
+        app.dice1_people_var, app.dice2_people_var = Value("180"), Value("120")
+        app.mark_dirty = lambda *regions: None
+        app.model.subscribe('participation_changed', app.on_model_event)
+        
+        self.warnings = []
+        patcher = mock.patch.object(main.messagebox, "showwarning",
+                                    side_effect=lambda title, message: self.warnings.append(message))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    def restore_participants(self):
+        """Uczestnicy przywróceni z zewnątrz (jak przy cofnięciu rzutu), gdy W2 należy już do drugiej sesji"""
+        self.app.participating_units = {
+            "strona1": [{"id": "W1", "name": "W1", "people": 100, "side": "własne"},
+                        {"id": "W2", "name": "W2", "people": 80, "side": "własne"}],
+            "strona2": []
+        }
+        self.app.model.participation_changed()
+    
+    def test_conflicting_participant_is_dropped_with_a_warning(self):
+        self.restore_participants()
+        
+        self.assertEqual([unit["id"] for unit in self.app.participating_units["strona1"]], ["W1"])
+        self.assertEqual(self.app.dice1_people_var.get(), "100")
+        self.assertEqual(self.app.sessions.lock_owner("W1"), self.active.session_id)
+        self.assertEqual(self.app.sessions.lock_owner("W2"), self.other.session_id)
+        self.assertEqual(self.app.sessions.lock_owner("N1"), self.active.session_id)
+        self.assertEqual(len(self.warnings), 1)
+        self.assertIn("W2", self.warnings[0])
+    
+    def test_roll_is_blocked_while_a_selected_unit_is_locked_elsewhere(self):
+        self.app.selected_unit_side1 = "W2"
+        self.app.unit_side1_var.set("W2")
+        self.app.read_combat_inputs = mock.Mock()
+        
+        self.app.roll_dice()
+        
+        self.app.read_combat_inputs.assert_not_called()
+        self.assertIsNone(self.app.selected_unit_side1)
+        self.assertEqual(self.app.unit_side1_var.get(), "")
+        self.assertEqual(self.app.units["własne"]["W2"]["liczba_ludzi"], 80)
+        self.assertEqual(len(self.warnings), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
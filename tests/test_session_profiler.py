@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""
+Testy profilu sesji: pomiar wywołań zwrotnych Tk zarejestrowanych przed i po włączeniu profilera
+Tests for SessionProfiler coverage of Tk callbacks registered before and after start()
+"""
+
+import os
+import sys
+import time
+import tkinter
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from session_profiler import SessionProfiler, install_call_wrapper  # noqa: E402
+
+
+def busy(seconds=0.03):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+class SessionProfilerTest(unittest.TestCase):
+
+    def setUp(self):
+        install_call_wrapper()
+        self.interp = tkinter.Tcl()
+        self.profiler = SessionProfiler(interval=0.001)
+    
+    def tearDown(self):
+        self.profiler.stop()
+    
+    def test_command_registered_before_start_is_recorded(self):
+        early = self.interp.register(busy)
+        self.profiler.start()
+        self.interp.tk.call(early)
+        late = self.interp.register(lambda: busy())
+        self.interp.tk.call(late)
+        self.profiler.stop()
+        
+        self.assertEqual(self.profiler.callbacks["busy"][0], 1)
+        self.assertEqual(self.profiler.callbacks["SessionProfilerTest.test_command_registered_before_start_is_recorded."
+                                                 "<locals>.<lambda>"][0], 1)
+        self.assertGreater(self.profiler.samples, 0)
+        self.assertTrue(any("busy" in label for label, *_ in self.profiler.top()))
+    
+    def test_callbacks_after_stop_are_not_recorded(self):
+        command = self.interp.register(busy)
+        self.profiler.start()
+        self.profiler.stop()
+        self.interp.tk.call(command)
+        self.assertEqual(self.profiler.callbacks, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+Testy synchronizacji sesji: zbieżność po cofnięciu rzutu i wczytaniu danych, konflikty kolejnych zmian
+Tests for session_sync convergence after undo and reloads, and conflict reporting for sequential edits
+"""
+
+import copy
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from session_sync import DEFAULT_HOST, ModelSync, SyncClient, SyncHub, demo_roster, model_state, pump  # noqa: E402
+
+
+class SessionSyncTest(unittest.TestCase):
+
+    def setUp(self):
+        self.hub = SyncHub(DEFAULT_HOST, 0).start()
+        self.peers = {}
+        for name in ("A", "B"):
+            client = SyncClient(name)
+            client.connect(*self.hub.address)
+            model = demo_roster()
+            self.peers[name] = (model, ModelSync(model, client))
+        pump(self.peers, self.hub)
+    
+    def tearDown(self):
+        for _, sync in self.peers.values():
+            sync.client.close()
+        self.hub.stop()
+    
+    def roll(self, name, number):
+        model, sync = self.peers[name]
+        with model.batch():
+            model.append_battle_entry("Most", {"rzut": number, "autor": name})
+            model.append_unit_battle("W1", {"bitwa": "Most", "rzut": number})
+        sync.flush()
+    
+    def edit(self, name, people):
+        model, sync = self.peers[name]
+        model.units["wroga"]["N1"]["liczba_ludzi"] = people
+        sync.units_touched("N1")
+        sync.flush()
+    
+    def assert_converged(self):
+        states = {name: model_state(model) for name, (model, _) in self.peers.items()}
+        self.assertEqual(states["A"], states["B"])
+    
+    def test_undo_truncates_battle_for_all_clients(self):
+        model, _ = self.peers["A"]
+        model.create_battle("Most")
+        for number in range(3):
+            self.roll("A", number)
+        pump(self.peers, self.hub)
+        
+        # Cofnięcie ostatniego rzutu (jak undo_last_roll) i nowy rzut zamiast niego
+        with model.batch():
+            del model.units["własne"]["W1"]["historia_bitew"][2:]
+            model.units_changed("W1")
+            model.truncate_battle("Most", 2)
+        self.roll("A", "po cofnięciu")
+        pump(self.peers, self.hub)
+        
+        self.assert_converged()
+        history = self.peers["B"][0].battles["Most"]["history"]
+        self.assertEqual([entry["rzut"] for entry in history], [0, 1, "po cofnięciu"])
+        self.assertEqual(self.hub.battle_lengths["Most"], 3)
+        self.assertEqual(self.hub.conflicts, 0)
+    
+    def test_sequential_edits_after_a_conflict_raise_no_new_conflicts(self):
+        self.edit("A", 140)
+        pump(self.peers, self.hub)
+        self.edit("B", 130)
+        self.edit("A", 120)
+        pump(self.peers, self.hub)
+        self.assertEqual(self.hub.conflicts, 1)
+        
+        for people in (110, 100, 90):
+            self.edit("A", people)
+            pump(self.peers, self.hub)
+        self.assertEqual(self.hub.conflicts, 1)
+        self.assert_converged()
+        self.assertEqual(self.peers["B"][0].units["wroga"]["N1"]["liczba_ludzi"], 90)
+    
+    def test_loaded_roster_and_registry_are_published(self):
+        model, _ = self.peers["A"]
+        model.create_battle("Most")
+        self.roll("A", 0)
+        pump(self.peers, self.hub)
+        
+        units = copy.deepcopy(model.units)
+        del units["wroga"]["N4"]
+        units["własne"]["W1"]["historia_bitew"] = []
+        units["własne"]["W1"]["liczba_ludzi"] = 75
+        battles = {"Las": {"history": [{"rzut": "wczytany"}], "created": "2024-01-01T00:00:00"},
+                   "Most": {"history": [], "created": model.battles["Most"]["created"]}}
+        with model.batch():
+            model.set_units(units, {})
+            model.set_battles(battles, ["Niezapisana", "Most", "Las"])
+        pump(self.peers, self.hub)
+        
+        other = self.peers["B"][0]
+        self.assertNotIn("N4", other.units["wroga"])
+        self.assertEqual(other.units["własne"]["W1"]["liczba_ludzi"], 75)
+        self.assertEqual(other.battles["Most"]["history"], [])
+        self.assertEqual(other.battles["Las"]["history"], [{"rzut": "wczytany"}])
+        self.assert_converged()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""
+Testy przeglądu wykazu w puli procesów: pamięć współdzielona a serializacja, sprzątanie bloków po błędzie
+Tests for shared-memory roster sweeps versus the pickling path, and block cleanup on failure
+"""
+
+import os
+import random
+import sys
+import unittest
+from multiprocessing import shared_memory
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import shared_roster  # noqa: E402
+from shared_roster import RESULT_FIELDS, SharedRoster, modifier_grid, run_sweep  # noqa: E402
+
+
+def small_roster(count=5, seed=3):
+    rng = random.Random(seed)
+    units = {"własne": {}, "wroga": {}}
+    for side_name, prefix in (("własne", "W"), ("wroga", "N")):
+        for number in range(1, count + 1):
+            unit_id = f"{prefix}{number}"
+            units[side_name][unit_id] = {
+                "id": unit_id, "numer": number, "liczba_ludzi": rng.randint(40, 250),
+                "doświadczenie": rng.randint(-2, 2), "zapasy": rng.randint(0, 3), "strona": side_name
+            }
+    return units
+
+
+class SharedRosterTest(unittest.TestCase):
+
+    def test_shared_and_pickled_sweeps_give_identical_results(self):
+        units = small_roster()
+        grid = modifier_grid(modifiers=range(-1, 2), fortifications=range(0, 2))
+        shared, shared_stats = run_sweep(units, grid, 4, jobs=2, seed=5, chunk=3, shared=True)
+        pickled, pickled_stats = run_sweep(units, grid, 4, jobs=2, seed=5, chunk=3, shared=False)
+        
+        self.assertEqual(shared, pickled)
+        self.assertEqual(len(shared), 10 * len(grid))
+        self.assertTrue(all(len(values) == len(RESULT_FIELDS) for values in shared.values()))
+        self.assertEqual(shared_stats["tasks"], pickled_stats["tasks"])
+    
+    def test_create_unlinks_blocks_when_allocation_fails(self):
+        created = []
+        real_block = shared_memory.SharedMemory
+        
+        def allocate(*args, **kwargs):
+            if len(created) == 2:
+                raise OSError("brak miejsca")
+            block = real_block(*args, **kwargs)
+            created.append(block.name)
+            return block
+        
+        with mock.patch.object(shared_roster.shared_memory, "SharedMemory", side_effect=allocate):
+            with self.assertRaises(OSError):
+                SharedRoster.create(small_roster(), modifier_grid())
+        self.assertEqual(len(created), 2)
+        for name in created:
+            with self.assertRaises(FileNotFoundError):
+                shared_memory.SharedMemory(name=name)
+
+
+if __name__ == "__main__":
+    unittest.main()
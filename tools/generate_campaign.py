@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Generator syntetycznych kampanii (wykaz jednostek i rejestr bitew) do testów skali
+Seeded, streaming generator of unit rosters and battle registries in the save_units/save_battles formats
+
+Uruchomienie:
+  python tools/generate_campaign.py --units-out jednostki.json --battles-out bitwy.json \\
+      [--seed 1] [--battalions 20] [--units-per-side 500] [--legacy 0] [--unit-history 10] \\
+      [--battles 100] [--rolls-per-battle 50] [--participants 5]
+
+Każda jednostka, batalion i rzut jest czystą funkcją (ziarno, indeks), więc wynik jest
+powtarzalny, a pliki są zapisywane strumieniowo - pamięć nie zależy od ich rozmiaru.
+Bajtowo odpowiadają json.dump(..., ensure_ascii=False, indent=2) używanemu przez aplikację.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from combat_engine import resolve_round, side_inputs  # noqa: E402
+
+SIDES = ("własne", "wroga")
+UNSAVED_BATTLE = "Niezapisana"
+DEFAULT_SAVED_AT = "2024-01-01T00:00:00"  # Stała data zapisu - pliki z tego samego ziarna są identyczne
+
+# Identyfikatory: indeks -> 5 znaków alfanumerycznych przez bijekcję (indeks * mnożnik + przesunięcie) mod 62^5
+ID_ALPHABET = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+ID_SPACE = len(ID_ALPHABET) ** 5
+ID_MULTIPLIER = 550292467  # Względnie pierwszy z 62^5 - różne indeksy dają różne ID
+UNIT_ID_OFFSET = 0
+BATTALION_ID_OFFSET = ID_SPACE // 2
+
+
+def encode_id(number):
+    """Liczba z przedziału [0, 62^5) jako 5-znakowy identyfikator"""
+    chars = []
+    for _ in range(5):
+        number, digit = divmod(number, len(ID_ALPHABET))
+        chars.append(ID_ALPHABET[digit])
+    return "".join(reversed(chars))
+
+
+class CampaignGenerator:
+    """Deterministyczna kampania: jednostki, bataliony i rzuty wyliczane na żądanie z ziarna"""
+    
+    def __init__(self, seed=1, battalions=20, units_per_side=500, legacy=0, unit_history=10,
+                 battles=100, rolls_per_battle=50, participants=5):
+        if units_per_side * len(SIDES) > ID_SPACE or battalions > ID_SPACE:
+            raise ValueError("Za dużo jednostek dla 5-znakowych identyfikatorów")
+        self.seed = seed
+        self.battalions = battalions
+        self.units_per_side = units_per_side
+        self.legacy = min(legacy, units_per_side)
+        self.unit_history = unit_history
+        self.battles = battles
+        self.rolls_per_battle = rolls_per_battle
+        self.participants = max(1, participants)
+    
+    def rng(self, *key):
+        """Niezależny generator dla danego klucza (napisy są haszowane deterministycznie)"""
+        return random.Random(":".join(str(part) for part in (self.seed,) + key))
+    
+    # --- Bataliony i jednostki ---
+    
+    def battalion_id(self, index):
+        return encode_id((index * ID_MULTIPLIER + BATTALION_ID_OFFSET) % ID_SPACE)
+    
+    def battalion(self, index):
+        """Batalion w formacie wykazu: {"nazwa", "id"}"""
+        return {"nazwa": str(index + 1), "id": self.battalion_id(index)}
+    
+    def unit_id(self, side_index, index):
+        return encode_id(((side_index * self.units_per_side + index) * ID_MULTIPLIER + UNIT_ID_OFFSET) % ID_SPACE)
+    
+    def is_legacy(self, index):
+        """Stare jednostki (bez ID) to ostatnie legacy jednostek każdej strony"""
+        return index >= self.units_per_side - self.legacy
+    
+    def unit_core(self, side_index, index):
+        """Stałe cechy jednostki: (numer, typ, batalion, liczba ludzi, doświadczenie)"""
+        rng = self.rng("unit", side_index, index)
+        battalion_index = index % self.battalions if self.battalions else None
+        battalion_id = self.battalion_id(battalion_index) if battalion_index is not None else None
+        number = index // self.battalions + 1 if self.battalions else index + 1
+        unit_type = "kompania" if rng.random() < 0.8 else "grupa"
+        people = rng.randint(40, 250)
+        experience = rng.choice((-2, -1, 0, 0, 0, 1, 1, 2))
+        return number, unit_type, battalion_id, people, experience
+    
+    def unit_key(self, side_index, index):
+        """Klucz jednostki w wykazie (dla starych jednostek - nazwa)"""
+        if self.is_legacy(index):
+            return f"Oddział {SIDES[side_index]} {index + 1}"
+        return self.unit_id(side_index, index)
+    
+    def display_name(self, side_index, index):
+        """Nazwa wyświetlana jak w DiceRollerApp.format_unit_display_name"""
+        number, unit_type, battalion_id, _, _ = self.unit_core(side_index, index)
+        type_suffix = "Komp." if unit_type == "kompania" else "Grupa"
+        battalion_part = ""
+        if battalion_id is not None:
+            battalion_part = f" Bat. {index % self.battalions + 1}"
+        return f"{number} {type_suffix}{battalion_part}"
+    
+    def unit(self, side_index, index):
+        """Dane jednostki w formacie save_units (stare jednostki - tylko pola sprzed migracji)"""
+        number, unit_type, battalion_id, people, experience = self.unit_core(side_index, index)
+        rng = self.rng("history", side_index, index)
+        history = [self.unit_history_entry(rng, side_index, index) for _ in range(self.unit_history)]
+        victories = sum(1 for entry in history if entry["zwyciestwo"])
+        if self.is_legacy(index):
+            return {
+                "liczba_ludzi": people,
+                "doświadczenie": experience,
+                "zapasy": rng.randint(0, 3),
+                "liczba_zwycięstw": victories,
+                "liczba_uzupełnień": rng.randint(0, 3),
+                "historia_bitew": history
+            }
+        return {
+            "id": self.unit_id(side_index, index),
+            "numer": number,
+            "typ": unit_type,
+            "batalion": battalion_id,
+            "liczba_ludzi": people,
+            "doświadczenie": experience,
+            "zapasy": rng.randint(0, 3),
+            "liczba_zwycięstw": victories,
+            "liczba_uzupełnień": rng.randint(0, 3),
+            "strona": SIDES[side_index],
+            "historia_bitew": history
+        }
+    
+    def unit_history_entry(self, rng, side_index, index):
+        """Wpis historii bitew jednostki (jak add_to_unit_battle_history)"""
+        own = rng.randint(1, 8)
+        enemy = rng.randint(1, 8)
+        friendly = [self.display_name(side_index, index)]
+        enemies = [self.display_name(1 - side_index, rng.randrange(self.units_per_side))]
+        attacking = rng.random() < 0.5
+        sides = (friendly, enemies) if side_index == 0 else (enemies, friendly)
+        return {
+            "data": self.timestamp(rng),
+            "wynik_kostki": own,
+            "przeciwnik_kostka": enemy,
+            "straty": rng.randint(0, 40),
+            "zwyciestwo": own > enemy and own > 1,
+            "side1_units": sides[0],
+            "side2_units": sides[1],
+            "side1_attacking": attacking,
+            "side2_attacking": not attacking,
+            "side1_in_motion": False,
+            "side2_in_motion": False,
+            "bitwa": self.battle_name(rng.randrange(self.battles)) if self.battles else UNSAVED_BATTLE,
+            "oczekiwana_kostka": round(rng.uniform(2.0, 6.0), 2),
+            "friendly_units": friendly,
+            "enemy_units": enemies
+        }
+    
+    @staticmethod
+    def timestamp(rng):
+        return f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} {rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}"
+    
+    def iter_units(self, side_index):
+        for index in range(self.units_per_side):
+            yield self.unit_key(side_index, index), self.unit(side_index, index)
+    
+    def iter_battalions(self):
+        for index in range(self.battalions):
+            yield self.battalion_id(index), self.battalion(index)
+    
+    # --- Rejestr bitew ---
+    
+    def battle_name(self, index):
+        return f"Bitwa {index + 1}"
+    
+    def roll(self, battle_index, roll_index):
+        """Wpis rzutu (jak add_to_history) rozstrzygnięty przez combat_engine.resolve_round"""
+        rng = self.rng("roll", battle_index, roll_index)
+        picked = []
+        for side_index in range(len(SIDES)):
+            count = rng.randint(1, min(self.participants, self.units_per_side))
+            picked.append(rng.sample(range(self.units_per_side), count) if self.units_per_side else [])
+        
+        attacking = rng.random() < 0.5
+        in_motion = rng.random() < 0.1
+        people = [sum(self.unit_core(side_index, i)[3] for i in indices) for side_index, indices in enumerate(picked)]
+        side1 = side_inputs(people=people[0], modifier=rng.randint(-1, 1), attacking=attacking and not in_motion,
+                            defending=not attacking and not in_motion, in_motion=in_motion)
+        side2 = side_inputs(people=people[1], modifier=rng.randint(-1, 1), attacking=not attacking and not in_motion,
+                            defending=attacking and not in_motion)
+        result = resolve_round(side1, side2, rng)
+        
+        return {
+            "dice1": result["dice1_final"],
+            "dice2": result["dice2_final"],
+            "people1_before": result["people1_before"],
+            "people1_after": result["people1_after"],
+            "people2_before": result["people2_before"],
+            "people2_after": result["people2_after"],
+            "exp1": result["exp1"],
+            "exp2": result["exp2"],
+            "side1_units": [self.display_name(0, i) for i in picked[0]],
+            "side2_units": [self.display_name(1, i) for i in picked[1]],
+            "side1_attacking": side1["attacking"],
+            "side2_attacking": side2["attacking"],
+            "side1_in_motion": in_motion,
+            "side2_in_motion": False,
+            "side1_unit_ids": [self.unit_key(0, i) for i in picked[0]],
+            "side2_unit_ids": [self.unit_key(1, i) for i in picked[1]],
+            "data": self.timestamp(rng)
+        }
+    
+    def iter_battles(self):
+        for battle_index in range(self.battles):
+            rng = self.rng("battle", battle_index)
+            created = f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T{rng.randint(0, 23):02d}:00:00"
+            rolls = (self.roll(battle_index, roll_index) for roll_index in range(self.rolls_per_battle))
+            yield self.battle_name(battle_index), StreamedDict((("history", StreamedList(rolls)),
+                                                                ("created", created)))
+    
+    def iter_battle_names(self):
+        yield UNSAVED_BATTLE
+        for battle_index in range(self.battles):
+            yield self.battle_name(battle_index)
+
+
+# --- Strumieniowy zapis JSON zgodny z json.dump(indent=2, ensure_ascii=False) ---
+
+class StreamedDict:
+    """Słownik zapisywany strumieniowo z iteratora par (klucz, wartość)"""
+    
+    def __init__(self, items):
+        self.items = items
+
+
+class StreamedList:
+    """Lista zapisywana strumieniowo z iteratora elementów"""
+    
+    def __init__(self, items):
+        self.items = items
+
+
+def write_value(f, value, depth=0):
+    """Zapisuje wartość z wcięciem jak json.dump(indent=2) na danej głębokości"""
+    if isinstance(value, StreamedDict):
+        write_container(f, "{", "}", ((key, item) for key, item in value.items), depth, keyed=True)
+    elif isinstance(value, StreamedList):
+        write_container(f, "[", "]", ((None, item) for item in value.items), depth, keyed=False)
+    else:
+        text = json.dumps(value, ensure_ascii=False, indent=2)
+        f.write(text.replace("\n", "\n" + "  " * depth) if depth else text)
+
+
+def write_container(f, opening, closing, items, depth, keyed):
+    inner = "\n" + "  " * (depth + 1)
+    empty = True
+    for key, item in items:
+        f.write((opening if empty else ",") + inner)
+        empty = False
+        if keyed:
+            f.write(json.dumps(key, ensure_ascii=False) + ": ")
+        write_value(f, item, depth + 1)
+    f.write(opening + closing if empty else "\n" + "  " * depth + closing)
+
+
+def write_units(path, generator, saved_at=DEFAULT_SAVED_AT):
+    """Zapisuje wykaz jednostek (format save_units)"""
+    document = StreamedDict((
+        ("units", StreamedDict((side, StreamedDict(generator.iter_units(i))) for i, side in enumerate(SIDES))),
+        ("battalions", StreamedDict(generator.iter_battalions())),
+        ("saved_at", saved_at)
+    ))
+    with open(path, 'w', encoding='utf-8') as f:
+        write_value(f, document)
+
+
+def write_battles(path, generator, saved_at=DEFAULT_SAVED_AT):
+    """Zapisuje rejestr bitew (format save_battles)"""
+    document = StreamedDict((
+        ("battles", StreamedDict(generator.iter_battles())),
+        ("battle_names", StreamedList(generator.iter_battle_names())),
+        ("saved_at", saved_at)
+    ))
+    with open(path, 'w', encoding='utf-8') as f:
+        write_value(f, document)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generator syntetycznych kampanii")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--battalions", type=int, default=20, help="liczba batalionów (0 = bez batalionów)")
+    parser.add_argument("--units-per-side", type=int, default=500)
+    parser.add_argument("--legacy", type=int, default=0, help="stare jednostki (bez ID) na stronę, do migracji")
+    parser.add_argument("--unit-history", type=int, default=10, help="wpisy historii bitew na jednostkę")
+    parser.add_argument("--battles", type=int, default=100)
+    parser.add_argument("--rolls-per-battle", type=int, default=50)
+    parser.add_argument("--participants", type=int, default=5, help="najwięcej jednostek strony w rzucie")
+    parser.add_argument("--saved-at", default=DEFAULT_SAVED_AT, help="wartość pola saved_at")
+    parser.add_argument("--units-out", help="plik wykazu jednostek")
+    parser.add_argument("--battles-out", help="plik rejestru bitew")
+    args = parser.parse_args()
+    
+    if not args.units_out and not args.battles_out:
+        parser.error("podaj --units-out i/lub --battles-out")
+    
+    generator = CampaignGenerator(
+        seed=args.seed, battalions=args.battalions, units_per_side=args.units_per_side, legacy=args.legacy,
+        unit_history=args.unit_history, battles=args.battles, rolls_per_battle=args.rolls_per_battle,
+        participants=args.participants
+    )
+    if args.units_out:
+        write_units(args.units_out, generator, args.saved_at)
+        print(f"Wykaz jednostek: {args.units_out} ({os.path.getsize(args.units_out)} B)", file=sys.stderr)
+    if args.battles_out:
+        write_battles(args.battles_out, generator, args.saved_at)
+        print(f"Rejestr bitew: {args.battles_out} ({os.path.getsize(args.battles_out)} B)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,411 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Weryfikacja statystyczna tabel strat, bonusów fortyfikacji, kości, przewagi liczebnej i wyniku taktycznego
+Statistical and exhaustive verification of the combat engine against its declared rules
+
+Uruchomienie: python tools/verify_tables.py [--samples 200000] [--jobs N] [--alpha 0.001] [--json]
+
+Próbkowane reguły (zakresy, rozkład jednostajny) są sprawdzane testem Kołmogorowa-Smirnowa,
+kości - testem chi-kwadrat, a wzory strat, modyfikatorów, przewagi 2.1x i wyniku taktycznego -
+porównaniem z niezależnie zapisaną specyfikacją dla każdej próbki lub wyczerpująco.
+Konfiguracje są liczone równolegle (multiprocessing); kod wyjścia 1 oznacza niezgodność.
+"""
+
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from combat_engine import (  # noqa: E402
+    LOSS_BANDS, LOW_RESULT_LOSS, ENEMY_FORTIFICATION_BANDS, ENEMY_BUILDINGS_BAND, OWN_FORTIFICATION_REDUCTION,
+    NEGATIVE_EXPERIENCE_PENALTY, LOSS_BASE_PEOPLE, base_loss_percentage, calculate_losses_for_side,
+    get_tactical_outcome, numerical_advantage, resolve_round, side_inputs
+)
+
+DEFAULT_SAMPLES = 200000  # Próbek na konfigurację (bez numpy - dziesiątki milionów nie zmieszczą się w minucie)
+DEFAULT_ALPHA = 0.001
+ADVANTAGE_GRID = 1000  # Przewaga liczebna sprawdzana dla wszystkich par 1..ADVANTAGE_GRID
+
+
+# --- Statystyka (tylko biblioteka standardowa) ---
+
+def regularized_gamma_q(a, x):
+    """Górna regularyzowana funkcja gamma Q(a, x) (szereg lub ułamek łańcuchowy)"""
+    if x <= 0:
+        return 1.0
+    log_prefix = -x + a * math.log(x) - math.lgamma(a)
+    if x < a + 1:
+        term = total = 1.0 / a
+        denominator = a
+        for _ in range(10000):
+            denominator += 1
+            term *= x / denominator
+            total += term
+            if abs(term) < abs(total) * 1e-15:
+                break
+        return max(0.0, 1.0 - total * math.exp(log_prefix))
+    # Ułamek łańcuchowy Lentza
+    tiny = 1e-300
+    b = x + 1 - a
+    c = 1 / tiny
+    d = 1 / b
+    h = d
+    for i in range(1, 10000):
+        an = -i * (i - a)
+        b += 2
+        d = an * d + b
+        d = tiny if abs(d) < tiny else d
+        c = b + an / c
+        c = tiny if abs(c) < tiny else c
+        d = 1 / d
+        delta = d * c
+        h *= delta
+        if abs(delta - 1) < 1e-15:
+            break
+    return math.exp(log_prefix) * h
+
+
+def chi_square_test(observed, expected):
+    """Zwraca (statystyka, p) testu chi-kwadrat zgodności"""
+    statistic = sum((o - e) ** 2 / e for o, e in zip(observed, expected))
+    return statistic, regularized_gamma_q((len(observed) - 1) / 2, statistic / 2)
+
+
+def kolmogorov_q(lam):
+    """Rozkład graniczny Kołmogorowa: P(K > lam)"""
+    if lam < 0.2:
+        return 1.0
+    total = 0.0
+    for k in range(1, 101):
+        term = 2 * (-1) ** (k - 1) * math.exp(-2 * k * k * lam * lam)
+        total += term
+        if abs(term) < 1e-12:
+            break
+    return max(0.0, min(1.0, total))
+
+
+def ks_uniform_test(values, low, high):
+    """Zwraca (D, p) testu Kołmogorowa-Smirnowa dla rozkładu jednostajnego na [low, high]"""
+    n = len(values)
+    width = high - low
+    d = 0.0
+    for i, value in enumerate(sorted(values)):
+        cdf = (value - low) / width
+        d = max(d, cdf - i / n, (i + 1) / n - cdf)
+    sqrt_n = math.sqrt(n)
+    return d, kolmogorov_q((sqrt_n + 0.12 + 0.11 / sqrt_n) * d)
+
+
+# --- Specyfikacja reguł (zapisana niezależnie od combat_engine) ---
+
+SPEC_LOSS_BANDS = {
+    1: (0.0, 0.02), 2: (0.03, 0.06), 3: (0.07, 0.10), 4: (0.11, 0.14), 5: (0.15, 0.18), 6: (0.19, 0.22),
+    7: (0.23, 0.28), 8: (0.29, 0.35), 9: (0.36, 0.45), 10: (0.46, 0.55), 11: (0.56, 0.70), 12: (0.75, 0.85)
+}
+SPEC_FORTIFICATION_BANDS = {1: (0.10, 0.15), 2: (0.16, 0.25), 3: (0.30, 0.40)}
+SPEC_BUILDINGS_BAND = (0.05, 0.15)
+SPEC_OWN_FORTIFICATION = {1: 0.05, 2: 0.10, 3: 0.15}
+SPEC_EXPERIENCE_PENALTY = {-1: 0.10, -2: 0.25}
+SPEC_LOW_RESULT_LOSS = 0.05
+SPEC_LOSS_BASE_PEOPLE = 150
+
+
+def spec_band(result):
+    return SPEC_LOSS_BANDS[min(result, 12)]
+
+
+def spec_advantage(people1, people2):
+    """Każde pełne 2.1x przewagi to +1 (arytmetyka dokładna)"""
+    if people1 <= 0 or people2 <= 0:
+        return 0, 0
+    return (10 * people1) // (21 * people2), (10 * people2) // (21 * people1)
+
+
+def spec_tactical(difference):
+    return 1 if difference <= 0 else min(difference + 1, 6)
+
+
+class RecordingRandom(random.Random):
+    """Generator zapisujący wywołania uniform(a, b) i ich wyniki"""
+    
+    def __init__(self, seed):
+        super().__init__(seed)
+        self.calls = []
+    
+    def uniform(self, a, b):
+        value = super().uniform(a, b)
+        self.calls.append((a, b, value))
+        return value
+
+
+class CountingRandom:
+    """Generator zliczający wywołania random() (get_tactical_outcome używa tylko tej metody)"""
+    
+    def __init__(self):
+        self.draws = 0
+    
+    def random(self):
+        self.draws += 1
+        return 0.5
+
+
+# --- Sprawdzenia (każde zwraca słownik wyniku) ---
+
+def check_declared_tables():
+    """Tabele combat_engine zgodne ze specyfikacją"""
+    problems = []
+    if LOSS_BANDS != SPEC_LOSS_BANDS:
+        problems.append("LOSS_BANDS")
+    if ENEMY_FORTIFICATION_BANDS != SPEC_FORTIFICATION_BANDS:
+        problems.append("ENEMY_FORTIFICATION_BANDS")
+    if tuple(ENEMY_BUILDINGS_BAND) != SPEC_BUILDINGS_BAND:
+        problems.append("ENEMY_BUILDINGS_BAND")
+    if OWN_FORTIFICATION_REDUCTION != SPEC_OWN_FORTIFICATION:
+        problems.append("OWN_FORTIFICATION_REDUCTION")
+    if NEGATIVE_EXPERIENCE_PENALTY != SPEC_EXPERIENCE_PENALTY:
+        problems.append("NEGATIVE_EXPERIENCE_PENALTY")
+    if (LOW_RESULT_LOSS, LOSS_BASE_PEOPLE) != (SPEC_LOW_RESULT_LOSS, SPEC_LOSS_BASE_PEOPLE):
+        problems.append("LOW_RESULT_LOSS/LOSS_BASE_PEOPLE")
+    return {"passed": not problems, "detail": "różnice: " + ", ".join(problems) if problems else "zgodne"}
+
+
+def check_loss_band(result, samples, seed):
+    """Procent strat dla wyniku przeciwnika: zakres i rozkład jednostajny (KS)"""
+    rng = random.Random(seed)
+    if result < 1:
+        values = {base_loss_percentage(result, rng) for _ in range(1000)}
+        passed = values == {SPEC_LOW_RESULT_LOSS}
+        return {"passed": passed, "detail": f"stała {sorted(values)}"}
+    
+    low, high = spec_band(result)
+    values = [base_loss_percentage(result, rng) for _ in range(samples)]
+    out_of_range = sum(1 for value in values if not low <= value <= high)
+    d, p = ks_uniform_test(values, low, high)
+    return {"passed": out_of_range == 0, "p_value": p, "detail": f"[{low}, {high}] D={d:.5f} poza={out_of_range}"}
+
+
+def check_attack_bonus(fortifications, buildings, samples, seed):
+    """Losowe bonusy fortyfikacji i zabudowań przeciwnika (KS) oraz wzór strat dla każdej próbki"""
+    rng = RecordingRandom(seed)
+    draw = random.Random(seed + 1)
+    bonus_values = {"fortifications": [], "buildings": []}
+    formula_errors = 0
+    sequence_errors = 0
+    for _ in range(samples):
+        enemy_result = draw.randint(-1, 14)
+        people = draw.randint(0, 600)
+        own = (draw.randint(0, 3), draw.random() < 0.5, draw.random() < 0.5, draw.randint(-2, 2),
+               draw.random() < 0.5, draw.random() < 0.5, draw.random() < 0.5)
+        own_fort, no_supply, own_buildings, experience, attacking, enemy_defending, enemy_in_motion = own
+        
+        rng.calls = []
+        people_after, losses = calculate_losses_for_side(
+            enemy_result, people, own_fort, no_supply, own_buildings, fortifications, buildings,
+            experience, attacking, enemy_defending, enemy_in_motion, rng
+        )
+        
+        # Kolejność losowań: pasmo strat (dla wyniku ≥ 1), fortyfikacje, zabudowania
+        expected_bands = []
+        if enemy_result >= 1:
+            expected_bands.append(spec_band(enemy_result))
+        if fortifications:
+            expected_bands.append(SPEC_FORTIFICATION_BANDS[fortifications])
+        if buildings:
+            expected_bands.append(SPEC_BUILDINGS_BAND)
+        if [(a, b) for a, b, _ in rng.calls] != expected_bands:
+            sequence_errors += 1
+            continue
+        
+        values = [value for _, _, value in rng.calls]
+        base = values.pop(0) if enemy_result >= 1 else SPEC_LOW_RESULT_LOSS
+        attack = 1.0
+        if fortifications:
+            bonus = values.pop(0)
+            bonus_values["fortifications"].append(bonus)
+            attack += bonus
+        if buildings:
+            bonus = values.pop(0)
+            bonus_values["buildings"].append(bonus)
+            attack += bonus
+        if attacking and enemy_defending:
+            attack += 0.05
+        
+        defense = 1.0 - SPEC_OWN_FORTIFICATION.get(own_fort, 0.0)
+        if no_supply:
+            defense += 0.05
+        if own_buildings:
+            defense -= 0.05
+        defense += SPEC_EXPERIENCE_PENALTY.get(experience, 0.0)
+        if enemy_in_motion:
+            defense -= 0.10
+        
+        loss_base = SPEC_LOSS_BASE_PEOPLE if people <= SPEC_LOSS_BASE_PEOPLE else people
+        expected_losses = min(int(loss_base * max(0.0, base * defense * attack)), people) if people > 0 else 0
+        if (people_after, losses) != (max(0, people - expected_losses), expected_losses):
+            formula_errors += 1
+    
+    p_values = []
+    details = [f"sekwencja={sequence_errors} wzór={formula_errors}"]
+    if fortifications:
+        d, p = ks_uniform_test(bonus_values["fortifications"], *SPEC_FORTIFICATION_BANDS[fortifications])
+        p_values.append(p)
+        details.append(f"fort D={d:.5f}")
+    if buildings:
+        d, p = ks_uniform_test(bonus_values["buildings"], *SPEC_BUILDINGS_BAND)
+        p_values.append(p)
+        details.append(f"zab. D={d:.5f}")
+    return {
+        "passed": sequence_errors == 0 and formula_errors == 0,
+        "p_value": min(p_values) if p_values else None,
+        "detail": " ".join(details)
+    }
+
+
+def check_dice(range_modifier, experience, samples, seed):
+    """Kość strony: rozkład jednostajny na 1..zakres (chi-kwadrat) i wynik końcowy = oczko + modyfikatory"""
+    rng = random.Random(seed)
+    draw = random.Random(seed + 1)
+    dice_max = max(1, 4 + range_modifier + max(0, experience) * 2)
+    counts = [0] * dice_max
+    errors = 0
+    for _ in range(samples):
+        people1 = draw.randint(0, 500)
+        people2 = draw.randint(0, 500)
+        modifier = draw.randint(-2, 2)
+        surrounded, buildings, no_supply = draw.random() < 0.3, draw.random() < 0.3, draw.random() < 0.3
+        fortifications = draw.randint(0, 3)
+        side1 = side_inputs(people=people1, modifier=modifier, range_modifier=range_modifier, experience=experience,
+                            surrounded=surrounded, defense_buildings=buildings, no_supply=no_supply,
+                            fortifications=fortifications)
+        side2 = side_inputs(people=people2)
+        result = resolve_round(side1, side2, rng)
+        
+        value = result["dice1_value"]
+        if not 1 <= value <= dice_max:
+            errors += 1
+            continue
+        counts[value - 1] += 1
+        advantage = spec_advantage(people1, people2)[0] if people1 and people2 else 0
+        expected_final = (value + modifier + experience + advantage + fortifications
+                          - surrounded + buildings - no_supply)
+        if result["dice1_final"] != expected_final or result["advantage1"] != advantage:
+            errors += 1
+    
+    statistic, p = chi_square_test(counts, [samples / dice_max] * dice_max) if dice_max > 1 else (0.0, 1.0)
+    return {"passed": errors == 0, "p_value": p, "detail": f"1..{dice_max} chi2={statistic:.1f} błędy={errors}"}
+
+
+def check_advantage(grid):
+    """Przewaga liczebna dla wszystkich par 1..grid w porównaniu z arytmetyką dokładną"""
+    mismatches = []
+    for people2 in range(1, grid + 1):
+        for people1 in range(1, grid + 1):
+            expected = spec_advantage(people1, people2)
+            if numerical_advantage(people1, people2) != expected:
+                mismatches.append((people1, people2))
+    for people1, people2 in ((0, 5), (5, 0), (0, 0), (-3, 4)):
+        if numerical_advantage(people1, people2) != (0, 0):
+            mismatches.append((people1, people2))
+    detail = f"{grid * grid} par, niezgodne={len(mismatches)}"
+    if mismatches:
+        detail += f" np. {mismatches[:3]}"
+    return {"passed": not mismatches, "detail": detail}
+
+
+def check_tactical():
+    """Wynik taktyczny dla różnic -30..30 i jedno losowanie tylko przy różnicy -1"""
+    problems = []
+    for attack in range(-15, 16):
+        for defense in range(-15, 16):
+            counter = CountingRandom()
+            outcome = get_tactical_outcome(attack, defense, counter)
+            difference = attack - defense
+            if outcome != spec_tactical(difference) or counter.draws != (1 if difference == -1 else 0):
+                problems.append((attack, defense))
+    return {"passed": not problems, "detail": f"961 par, niezgodne={len(problems)}"}
+
+
+def run_check(task):
+    """Wykonuje jedno sprawdzenie (w procesie roboczym); zwraca (nazwa, wynik, czas)"""
+    name, function, args = task
+    started = time.perf_counter()
+    result = CHECKS[function](*args)
+    return name, result, time.perf_counter() - started
+
+
+CHECKS = {
+    "declared": check_declared_tables,
+    "loss_band": check_loss_band,
+    "attack_bonus": check_attack_bonus,
+    "dice": check_dice,
+    "advantage": check_advantage,
+    "tactical": check_tactical,
+}
+
+
+def build_tasks(samples, seed):
+    """Lista (nazwa, sprawdzenie, argumenty) - każda konfiguracja z własnym ziarnem"""
+    tasks = [("tables.declared", "declared", ()), ("advantage.grid", "advantage", (ADVANTAGE_GRID,)),
+             ("tactical.exhaustive", "tactical", ())]
+    for result in (-2, 0) + tuple(range(1, 14)):
+        tasks.append((f"loss_band.result{result}", "loss_band", (result, samples, seed + result + 100)))
+    for fortifications in range(0, 4):
+        for buildings in (False, True):
+            tasks.append((f"attack_bonus.fort{fortifications}.buildings{int(buildings)}", "attack_bonus",
+                          (fortifications, buildings, samples, seed + 10 * fortifications + buildings)))
+    for range_modifier, experience in ((0, 0), (-3, 0), (2, 0), (0, 2), (1, -2), (4, 1)):
+        tasks.append((f"dice.range{range_modifier:+d}.exp{experience:+d}", "dice",
+                      (range_modifier, experience, samples, seed + 1000 + 7 * range_modifier + experience)))
+    return tasks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Weryfikacja tabel strat i kości")
+    parser.add_argument("--samples", type=int, default=DEFAULT_SAMPLES, help="próbek na konfigurację")
+    parser.add_argument("--seed", type=int, default=12345)
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="liczba procesów roboczych")
+    parser.add_argument("--alpha", type=float, default=DEFAULT_ALPHA, help="poziom istotności testów")
+    parser.add_argument("--json", action="store_true", help="wynik w formacie JSON")
+    args = parser.parse_args()
+    
+    tasks = build_tasks(args.samples, args.seed)
+    started = time.perf_counter()
+    if args.jobs > 1:
+        with multiprocessing.Pool(args.jobs) as pool:
+            outcomes = pool.map(run_check, tasks, chunksize=1)
+    else:
+        outcomes = [run_check(task) for task in tasks]
+    elapsed = time.perf_counter() - started
+    
+    rows = []
+    failures = 0
+    for name, result, seconds in outcomes:
+        p_value = result.get("p_value")
+        passed = result["passed"] and (p_value is None or p_value >= args.alpha)
+        failures += not passed
+        rows.append({"check": name, "passed": passed, "p_value": p_value, "detail": result["detail"],
+                     "seconds": round(seconds, 2)})
+    
+    if args.json:
+        print(json.dumps({"samples": args.samples, "alpha": args.alpha, "seconds": round(elapsed, 2),
+                          "failures": failures, "checks": rows}, ensure_ascii=False, indent=2))
+    else:
+        for row in rows:
+            p_text = f"p={row['p_value']:.4f}" if row["p_value"] is not None else ""
+            status = "OK " if row["passed"] else "BŁĄD"
+            print(f"{status} {row['check']:<32}{p_text:<12}{row['detail']}")
+        print(f"\n{len(rows) - failures}/{len(rows)} zgodnych, {args.samples} próbek na konfigurację, "
+              f"{elapsed:.1f} s")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())